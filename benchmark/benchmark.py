@@ -1,5 +1,6 @@
 """Benchmark module for various hash functions."""
 
+import argparse
 import hashlib
 import itertools
 import math
@@ -224,6 +225,85 @@ def add_cmdline_args(cmd: list, args) -> None:
     cmd.extend(("--test-buffer-size-max", str(args.test_buffer_size_max)))
 
 
+def add_test_hash_argument(parser: argparse.ArgumentParser, hashes: dict) -> None:
+    """Add the required ``--test-hash`` argument to a parser.
+
+    Args:
+        parser: The argument parser to extend.
+        hashes: The hash functions to choose from, keyed by their names.
+    """
+    parser.add_argument(
+        "--test-hash",
+        type=str,
+        help="Type of hash function to benchmark",
+        required=True,
+        choices=hashes.keys(),
+    )
+
+
+def mmh3_128_hasher(ba) -> bytes:
+    """Hash a buffer by a single update of the mmh3_x64_128 hasher.
+
+    Compare with ``mmh3_128`` to measure the overhead of incremental hashing.
+
+    Args:
+        ba: The buffer to hash.
+
+    Returns:
+        The hash value in bytes.
+    """
+    hasher = mmh3.mmh3_x64_128()
+    hasher.update(ba)
+    return hasher.digest()
+
+
+def mmh3_128_hasher_unaligned(ba) -> bytes:
+    """Hash a buffer by two updates of the mmh3_x64_128 hasher.
+
+    The first update leaves a partial block of 7 bytes, so the second update
+    starts off the block boundary.
+
+    Args:
+        ba: The buffer to hash.
+
+    Returns:
+        The hash value in bytes.
+    """
+    view = memoryview(ba)
+    hasher = mmh3.mmh3_x64_128()
+    hasher.update(view[:7])
+    hasher.update(view[7:])
+    return hasher.digest()
+
+
+def mmh3_hash_from_buffer_kw(ba) -> int:
+    """Hash a buffer by hash_from_buffer() with keyword arguments.
+
+    Use small buffers to measure the overhead of parsing keyword arguments.
+
+    Args:
+        ba: The buffer to hash.
+
+    Returns:
+        The hash value as an integer.
+    """
+    return mmh3.hash_from_buffer(ba, seed=42, signed=False)
+
+
+def mmh3_32_hasher_new(ba) -> bytes:
+    """Hash a buffer by a newly constructed mmh3_32 hasher.
+
+    Use small buffers to measure the overhead of constructing a hasher.
+
+    Args:
+        ba: The buffer to hash.
+
+    Returns:
+        The hash value in bytes.
+    """
+    return mmh3.mmh3_32(ba, seed=42).digest()
+
+
 # "if hasattr" is used to check for the existence of the function in the
 # module, to compare the performance of the current implementation with the
 # old one (version 4.1.0), which does not implement the new functions.
@@ -238,6 +318,11 @@ HASHES = {
         if hasattr(mmh3, "mmh3_x64_128_digest")
         else mmh3.hash128
     ),
+    "mmh3_128_hasher": mmh3_128_hasher,
+    "mmh3_hash_from_buffer": mmh3.hash_from_buffer,
+    "mmh3_hash_from_buffer_kw": mmh3_hash_from_buffer_kw,
+    "mmh3_32_hasher_new": mmh3_32_hasher_new,
+    "mmh3_128_hasher_unaligned": mmh3_128_hasher_unaligned,
     "xxh_32": xxhash.xxh32_digest,
     "xxh_64": xxhash.xxh64_digest,
     "xxh3_64": xxhash.xxh3_64_digest,
@@ -258,13 +343,7 @@ BENCHMARKING_TYPES = {
 if __name__ == "__main__":
     runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
 
-    runner.argparser.add_argument(
-        "--test-hash",
-        type=str,
-        help="Type of hash function to benchmark",
-        required=True,
-        choices=HASHES.keys(),
-    )
+    add_test_hash_argument(runner.argparser, HASHES)
 
     runner.argparser.add_argument(
         "--test-type",
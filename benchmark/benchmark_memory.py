@@ -0,0 +1,108 @@
+"""Benchmark module for the memory footprint of hashing str keys.
+
+CPython caches the UTF-8 representation of a non-ASCII str object once it is
+requested through PyUnicode_AsUTF8AndSize(), and keeps the cache as long as
+the object lives. This script builds a large corpus of non-ASCII strings,
+hashes every string, and reports the resident set size (RSS) of the process
+before and after hashing, so that such hidden copies become visible.
+"""
+
+import argparse
+import gc
+import random
+import resource
+import sys
+from collections.abc import Callable
+
+import benchmark
+import mmh3
+
+HASHES: dict[str, Callable] = {
+    "mmh3_base_hash": mmh3.hash,
+    "mmh3_64": mmh3.hash64,
+    "mmh3_128": mmh3.hash128,
+    "mmh3_bytes": mmh3.hash_bytes,
+    "mmh3_many": mmh3.hash_many,
+}
+
+
+def get_rss() -> int:
+    """Return the resident set size of the current process in bytes.
+
+    On Linux, the current RSS is read from ``/proc/self/statm``. On other
+    POSIX platforms, the peak RSS is returned instead.
+
+    Returns:
+        The resident set size in bytes.
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def generate_corpus(num_keys: int, key_length: int) -> list[str]:
+    """Generate a list of random strings of CJK characters.
+
+    Args:
+        num_keys: The number of strings to generate.
+        key_length: The number of characters in each string.
+
+    Returns:
+        The list of generated strings.
+    """
+    random.seed(42)
+    return [
+        "".join(chr(random.randint(0x4E00, 0x9FFF)) for _ in range(key_length))
+        for _ in range(num_keys)
+    ]
+
+
+def main() -> None:
+    """Run the memory benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    benchmark.add_test_hash_argument(parser, HASHES)
+    parser.add_argument(
+        "--num-keys",
+        type=int,
+        help="The number of strings to hash (default: 1000000)",
+        default=1000000,
+    )
+    parser.add_argument(
+        "--key-length",
+        type=int,
+        help="The number of characters in each string (default: 32)",
+        default=32,
+    )
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.num_keys, args.key_length)
+    gc.collect()
+    rss_before = get_rss()
+    size_before = sum(sys.getsizeof(s) for s in corpus)
+
+    f = HASHES[args.test_hash]
+    if args.test_hash == "mmh3_many":
+        f(corpus)
+    else:
+        for s in corpus:
+            f(s)
+
+    gc.collect()
+    rss_after = get_rss()
+    size_after = sum(sys.getsizeof(s) for s in corpus)
+
+    mib = 1024 * 1024
+    print(f"hash: {args.test_hash}")
+    print(f"keys: {args.num_keys} x {args.key_length} characters")
+    print(f"RSS before hashing: {rss_before / mib:.1f} MiB")
+    print(f"RSS after hashing: {rss_after / mib:.1f} MiB")
+    print(f"RSS increase: {(rss_after - rss_before) / mib:.1f} MiB")
+    print(f"Total size of str objects: {size_before} -> {size_after} bytes")
+
+
+if __name__ == "__main__":
+    main()
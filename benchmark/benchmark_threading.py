@@ -0,0 +1,107 @@
+"""Benchmark module for multi-threaded throughput of hash functions.
+
+Each thread hashes its own buffer repeatedly. With a standard (GIL) build of
+Python, threads can only run in parallel if the hash function releases the
+GIL while it processes the input, so the elapsed time for a fixed amount of
+work per thread indicates how well the function scales with threads.
+"""
+
+import itertools
+import threading
+import time
+from collections.abc import Callable
+
+import pyperf
+
+import benchmark
+
+
+def perf_hash_threaded(loops: int, f: Callable, size: int, n_threads: int) -> float:
+    """Benchmark a hash function called from multiple threads.
+
+    Args:
+        loops: The number of outer loops to run in each thread.
+        f: The hash function to benchmark.
+        size: The size of the buffer to hash.
+        n_threads: The number of threads to hash buffers in parallel.
+
+    Returns:
+        The time taken for all threads to hash their buffers in fractional
+        seconds.
+    """
+    if size <= 0:
+        raise ValueError("size must be greater than 0")
+
+    if n_threads <= 0:
+        raise ValueError("n_threads must be greater than 0")
+
+    data = bytes(benchmark.init_buffer(bytearray(size)))
+    barrier = threading.Barrier(n_threads + 1)
+
+    def worker() -> None:
+        range_it = itertools.repeat(None, loops)
+        barrier.wait()
+        for _ in range_it:
+            f(data)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.join()
+
+    return time.perf_counter() - t0
+
+
+def add_cmdline_args(cmd: list, args) -> None:
+    """Add command line arguments to the runner.
+
+    Args:
+        cmd: The command line arguments to extend.
+        args: The parsed command line arguments.
+    """
+    cmd.extend(("--test-hash", args.test_hash))
+    cmd.extend(("--test-buffer-size", str(args.test_buffer_size)))
+    cmd.extend(("--test-threads-max", str(args.test_threads_max)))
+
+
+HASHES = {
+    name: benchmark.HASHES[name]
+    for name in ["mmh3_base_hash", "mmh3_32", "mmh3_128", "md5", "sha1"]
+}
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+
+    benchmark.add_test_hash_argument(runner.argparser, HASHES)
+
+    runner.argparser.add_argument(
+        "--test-buffer-size",
+        type=int,
+        help="The size of the buffer to hash in each call (default: 1048576)",
+        default=1048576,
+    )
+
+    runner.argparser.add_argument(
+        "--test-threads-max",
+        type=int,
+        help="The maximum number of threads to use (default: 8)",
+        default=8,
+    )
+
+    process_args = runner.parse_args()
+    num_threads = 1
+
+    while num_threads <= process_args.test_threads_max:
+        runner.bench_time_func(
+            f"{num_threads} threads",
+            perf_hash_threaded,
+            HASHES[process_args.test_hash],
+            process_args.test_buffer_size,
+            num_threads,
+        )
+        num_threads *= 2
@@ -1,11 +1,17 @@
 import sys
-from typing import Any, final
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Any, TypeVar, final, overload
+
+from _typeshed import SupportsWrite
 
 if sys.version_info >= (3, 12):
     from collections.abc import Buffer
 else:
     from _typeshed import ReadableBuffer as Buffer
 
+_BufferT = TypeVar("_BufferT", bound=Buffer)
+
 def hash(key: bytes | str, seed: int = 0, signed: Any = True) -> int: ...
 def hash_from_buffer(key: Buffer | str, seed: int = 0, signed: Any = True) -> int: ...
 def hash64(
@@ -15,6 +21,175 @@ def hash128(
     key: bytes | str, seed: int = 0, x64arch: Any = True, signed: Any = False
 ) -> int: ...
 def hash_bytes(key: bytes | str, seed: int = 0, x64arch: Any = True) -> bytes: ...
+def hash_many(
+    keys: Iterable[bytes | str], seed: int = 0, signed: Any = True, threads: int = 1
+) -> array[int]: ...
+def hash64_many(
+    keys: Iterable[bytes | str],
+    seed: int = 0,
+    x64arch: Any = True,
+    signed: Any = True,
+    threads: int = 1,
+) -> array[int]: ...
+def hash_bytes_many(
+    keys: Iterable[bytes | str], seed: int = 0, x64arch: Any = True, threads: int = 1
+) -> bytes: ...
+def hash_int64(key: int, seed: int = 0, signed: Any = True) -> int: ...
+@overload
+def hash_int64_many(
+    keys: Buffer,
+    seed: int = 0,
+    signed: Any = True,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def hash_int64_many(
+    keys: Buffer,
+    seed: int = 0,
+    signed: Any = True,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def hash_arrow(
+    array: Any,
+    seed: int = 0,
+    signed: Any = True,
+    null: int = 0,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def hash_arrow(
+    array: Any,
+    seed: int = 0,
+    signed: Any = True,
+    null: int = 0,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def hash64_arrow(
+    array: Any,
+    seed: int = 0,
+    x64arch: Any = True,
+    signed: Any = True,
+    null: int = 0,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def hash64_arrow(
+    array: Any,
+    seed: int = 0,
+    x64arch: Any = True,
+    signed: Any = True,
+    null: int = 0,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def hash_numpy(
+    array: Buffer,
+    seed: int | Buffer = 0,
+    signed: Any = True,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def hash_numpy(
+    array: Buffer,
+    seed: int | Buffer = 0,
+    signed: Any = True,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def hash64_numpy(
+    array: Buffer,
+    seed: int | Buffer = 0,
+    x64arch: Any = True,
+    signed: Any = True,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def hash64_numpy(
+    array: Buffer,
+    seed: int | Buffer = 0,
+    x64arch: Any = True,
+    signed: Any = True,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def hash_seeds(
+    key: bytes | str,
+    seeds: Buffer | Iterable[int],
+    signed: Any = True,
+    out: None = None,
+) -> array[int]: ...
+@overload
+def hash_seeds(
+    key: bytes | str,
+    seeds: Buffer | Iterable[int],
+    signed: Any = True,
+    out: _BufferT = ...,
+) -> _BufferT: ...
+@overload
+def hash64_seeds(
+    key: bytes | str,
+    seeds: Buffer | Iterable[int],
+    x64arch: Any = True,
+    signed: Any = True,
+    out: None = None,
+) -> array[int]: ...
+@overload
+def hash64_seeds(
+    key: bytes | str,
+    seeds: Buffer | Iterable[int],
+    x64arch: Any = True,
+    signed: Any = True,
+    out: _BufferT = ...,
+) -> _BufferT: ...
+@overload
+def hash_seeds_many(
+    keys: Iterable[bytes | str],
+    seeds: Buffer | Iterable[int],
+    signed: Any = True,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def hash_seeds_many(
+    keys: Iterable[bytes | str],
+    seeds: Buffer | Iterable[int],
+    signed: Any = True,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def hash64_seeds_many(
+    keys: Iterable[bytes | str],
+    seeds: Buffer | Iterable[int],
+    x64arch: Any = True,
+    signed: Any = True,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def hash64_seeds_many(
+    keys: Iterable[bytes | str],
+    seeds: Buffer | Iterable[int],
+    x64arch: Any = True,
+    signed: Any = True,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+def simhash(
+    keys: Iterable[bytes | str], weights: Iterable[float] | None = None, seed: int = 0
+) -> int: ...
 def mmh3_32_digest(key: Buffer | str, seed: int = 0) -> bytes: ...
 def mmh3_32_sintdigest(key: Buffer | str, seed: int = 0) -> int: ...
 def mmh3_32_uintdigest(key: Buffer | str, seed: int = 0) -> int: ...
@@ -28,11 +203,90 @@ def mmh3_x86_128_sintdigest(key: Buffer | str, seed: int = 0) -> int: ...
 def mmh3_x86_128_uintdigest(key: Buffer | str, seed: int = 0) -> int: ...
 def mmh3_x86_128_stupledigest(key: Buffer | str, seed: int = 0) -> tuple[int, int]: ...
 def mmh3_x86_128_utupledigest(key: Buffer | str, seed: int = 0) -> tuple[int, int]: ...
+@overload
+def mmh3_32_uintdigest_rows(
+    key: Buffer,
+    seed: int = 0,
+    record_size: int = 0,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def mmh3_32_uintdigest_rows(
+    key: Buffer,
+    seed: int = 0,
+    record_size: int = 0,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def mmh3_x64_128_digest_rows(
+    key: Buffer,
+    seed: int = 0,
+    record_size: int = 0,
+    out: None = None,
+    threads: int = 1,
+) -> bytes: ...
+@overload
+def mmh3_x64_128_digest_rows(
+    key: Buffer,
+    seed: int = 0,
+    record_size: int = 0,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def mmh3_32_uintdigest_spans(
+    key: Buffer,
+    offsets: Buffer,
+    lengths: Buffer | None = None,
+    seed: int = 0,
+    out: None = None,
+    threads: int = 1,
+) -> array[int]: ...
+@overload
+def mmh3_32_uintdigest_spans(
+    key: Buffer,
+    offsets: Buffer,
+    lengths: Buffer | None = None,
+    seed: int = 0,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+@overload
+def mmh3_x64_128_digest_spans(
+    key: Buffer,
+    offsets: Buffer,
+    lengths: Buffer | None = None,
+    seed: int = 0,
+    out: None = None,
+    threads: int = 1,
+) -> bytes: ...
+@overload
+def mmh3_x64_128_digest_spans(
+    key: Buffer,
+    offsets: Buffer,
+    lengths: Buffer | None = None,
+    seed: int = 0,
+    out: _BufferT = ...,
+    threads: int = 1,
+) -> _BufferT: ...
+def mmh3_32_digest_into(
+    key: Buffer, out: Buffer, offset: int = 0, seed: int = 0
+) -> None: ...
+def mmh3_x64_128_digest_into(
+    key: Buffer, out: Buffer, offset: int = 0, seed: int = 0
+) -> None: ...
+def mmh3_x86_128_digest_into(
+    key: Buffer, out: Buffer, offset: int = 0, seed: int = 0
+) -> None: ...
+def _simd_name() -> str: ...
 
 class Hasher:
     def __init__(self, data: Buffer | None = None, seed: int = 0) -> None: ...
     def update(self, data: Buffer) -> None: ...
     def digest(self) -> bytes: ...
+    def digest_into(self, out: Buffer, offset: int = 0) -> None: ...
     def sintdigest(self) -> int: ...
     def uintdigest(self) -> int: ...
     def copy(self) -> Hasher: ...
@@ -55,3 +309,164 @@ class mmh3_x64_128(Hasher):
 class mmh3_x86_128(Hasher):
     def stupledigest(self) -> tuple[int, int]: ...
     def utupledigest(self) -> tuple[int, int]: ...
+
+@final
+class imap(Iterator[int]):
+    def __init__(
+        self,
+        iterable: Iterable[bytes | str],
+        algo: str = "mmh3_32",
+        seed: int = 0,
+        signed: Any = True,
+        chunk: int = 4096,
+    ) -> None: ...
+    def __next__(self) -> int: ...
+
+@final
+class MinHash:
+    def __init__(
+        self,
+        keys: Iterable[bytes | str] | None = None,
+        num_perm: int = 128,
+        seed: int = 0,
+        algo: str = "mmh3_32",
+    ) -> None: ...
+    def update(self, key: bytes | str) -> None: ...
+    def update_many(self, keys: Iterable[bytes | str]) -> None: ...
+    def signature(self) -> array[int]: ...
+    def merge(self, other: MinHash) -> None: ...
+    def jaccard(self, other: MinHash) -> float: ...
+    def copy(self) -> MinHash: ...
+    @property
+    def num_perm(self) -> int: ...
+    @property
+    def seed(self) -> int: ...
+
+@final
+class LSHIndex:
+    def __init__(self, bands: int, rows: int, seed: int = 0) -> None: ...
+    def insert_many(self, signatures: Buffer, ids: Buffer | None = None) -> None: ...
+    def query(self, signature: Buffer) -> array[int]: ...
+    def query_many(self, signatures: Buffer) -> list[array[int]]: ...
+    def tobytes(self) -> bytes: ...
+    @classmethod
+    def frombuffer(cls, buffer: Buffer) -> LSHIndex: ...
+    def __len__(self) -> int: ...
+    @property
+    def bands(self) -> int: ...
+    @property
+    def rows(self) -> int: ...
+    @property
+    def seed(self) -> int: ...
+
+@final
+class SimHashIndex:
+    def __init__(self, k: int = 3) -> None: ...
+    def insert_many(self, fingerprints: Buffer, ids: Buffer | None = None) -> None: ...
+    def query(self, fingerprint: int) -> array[int]: ...
+    def query_many(self, fingerprints: Buffer) -> list[array[int]]: ...
+    def __len__(self) -> int: ...
+    @property
+    def k(self) -> int: ...
+
+@final
+class BloomFilter:
+    def __init__(self, num_bits: int, num_hashes: int = 7, seed: int = 0) -> None: ...
+    def add(self, key: bytes | str) -> None: ...
+    def add_many(self, keys: Iterable[bytes | str]) -> None: ...
+    def contains_many(self, keys: Iterable[bytes | str]) -> array[int]: ...
+    def union(self, other: BloomFilter) -> BloomFilter: ...
+    def intersection(self, other: BloomFilter) -> BloomFilter: ...
+    def copy(self) -> BloomFilter: ...
+    def tobytes(self) -> bytes: ...
+    def tofile(self, file: SupportsWrite[bytes]) -> None: ...
+    @classmethod
+    def frombuffer(cls, buffer: Buffer) -> BloomFilter: ...
+    def __contains__(self, key: bytes | str) -> bool: ...
+    @property
+    def num_bits(self) -> int: ...
+    @property
+    def num_hashes(self) -> int: ...
+    @property
+    def seed(self) -> int: ...
+    @property
+    def readonly(self) -> bool: ...
+
+@final
+class CountMinSketch:
+    def __init__(
+        self,
+        width: int,
+        depth: int = 4,
+        seed: int = 0,
+        typecode: str = "I",
+        conservative: bool = False,
+    ) -> None: ...
+    def add(self, key: bytes | str, count: int = 1) -> None: ...
+    def add_many(
+        self, keys: Iterable[bytes | str], counts: Buffer | None = None
+    ) -> None: ...
+    def estimate(self, key: bytes | str) -> int: ...
+    def estimate_many(self, keys: Iterable[bytes | str]) -> array[int]: ...
+    def merge(self, other: CountMinSketch) -> None: ...
+    def copy(self) -> CountMinSketch: ...
+    def tobytes(self) -> bytes: ...
+    @classmethod
+    def frombuffer(cls, buffer: Buffer) -> CountMinSketch: ...
+    @property
+    def width(self) -> int: ...
+    @property
+    def depth(self) -> int: ...
+    @property
+    def seed(self) -> int: ...
+    @property
+    def typecode(self) -> str: ...
+    @property
+    def conservative(self) -> bool: ...
+    @property
+    def total(self) -> int: ...
+
+@final
+class HyperLogLog:
+    def __init__(
+        self, keys: Iterable[bytes | str] | None = None, p: int = 14, seed: int = 0
+    ) -> None: ...
+    def add(self, key: bytes | str) -> None: ...
+    def add_many(self, keys: Iterable[bytes | str]) -> None: ...
+    def count(self) -> float: ...
+    def merge(self, other: HyperLogLog) -> None: ...
+    def copy(self) -> HyperLogLog: ...
+    def tobytes(self) -> bytes: ...
+    @classmethod
+    def frombuffer(cls, buffer: Buffer) -> HyperLogLog: ...
+    @property
+    def p(self) -> int: ...
+    @property
+    def seed(self) -> int: ...
+    @property
+    def sparse(self) -> bool: ...
+
+@final
+class BottomKSketch:
+    def __init__(
+        self, keys: Iterable[bytes | str] | None = None, k: int = 4096, seed: int = 0
+    ) -> None: ...
+    def add(self, key: bytes | str) -> None: ...
+    def add_many(self, keys: Iterable[bytes | str]) -> None: ...
+    def add_int64_many(self, keys: Buffer) -> None: ...
+    def count(self) -> float: ...
+    def hashes(self) -> array[int]: ...
+    def union(self, other: BottomKSketch) -> BottomKSketch: ...
+    def intersection(self, other: BottomKSketch) -> BottomKSketch: ...
+    def difference(self, other: BottomKSketch) -> BottomKSketch: ...
+    def copy(self) -> BottomKSketch: ...
+    def tobytes(self) -> bytes: ...
+    @classmethod
+    def frombuffer(cls, buffer: Buffer) -> BottomKSketch: ...
+    def __len__(self) -> int: ...
+    @property
+    def k(self) -> int: ...
+    @property
+    def seed(self) -> int: ...
+    @property
+    def theta(self) -> int: ...
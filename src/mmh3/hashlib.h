@@ -1,5 +1,7 @@
 // This code was taken from a part of CPython's code base (Modules/hashlib.h)
 // at commit 9ce0f48e918860ffa32751a85b0fe7967723e2e3
+// ENTER_HASHLIB, LEAVE_HASHLIB, and HASHLIB_GIL_MINSIZE were taken from the
+// same file of CPython 3.12, which used PyThread_type_lock for the lock
 // Below is a copy of the license of CPython
 
 // PYTHON SOFTWARE FOUNDATION LICENSE VERSION 2
@@ -81,4 +83,38 @@
     } while (0)
 
 #define GET_BUFFER_VIEW_OR_ERROUT(obj, viewp) \
-    GET_BUFFER_VIEW_OR_ERROR(obj, viewp, return NULL)
\ No newline at end of file
+    GET_BUFFER_VIEW_OR_ERROR(obj, viewp, return NULL)
+
+/*
+ * Helper code to synchronize access to the hash object when the GIL is
+ * released around a CPU consuming hashlib operation. All code paths that
+ * access a mutable part of obj must be enclosed in an ENTER_HASHLIB /
+ * LEAVE_HASHLIB block or explicitly acquire and release the lock inside
+ * a PY_BEGIN / END_ALLOW_THREADS block if they wish to release the GIL for
+ * an operation.
+ *
+ * These only drop the GIL if the lock acquisition itself is likely to
+ * block. Thus the non-blocking acquire gating the GIL release for a
+ * blocking lock acquisition. The intent of these macros is to surround
+ * the assumed always "fast" operations that you aren't releasing the
+ * GIL around.  Otherwise use code similar to what you see in hash
+ * function update() methods.
+ */
+
+#include "pythread.h"
+#define ENTER_HASHLIB(obj)                                                \
+    if ((obj)->lock) {                                                    \
+        if (!PyThread_acquire_lock((obj)->lock, 0)) {                     \
+            Py_BEGIN_ALLOW_THREADS PyThread_acquire_lock((obj)->lock, 1); \
+            Py_END_ALLOW_THREADS                                          \
+        }                                                                 \
+    }
+#define LEAVE_HASHLIB(obj)                  \
+    if ((obj)->lock) {                      \
+        PyThread_release_lock((obj)->lock); \
+    }
+
+/* Inputs of at least this many bytes are hashed with the GIL released. The
+ * same threshold as CPython's hashlib: below it, releasing and reacquiring
+ * the GIL costs more than MurmurHash3 takes to hash the input. */
+#define HASHLIB_GIL_MINSIZE 2048
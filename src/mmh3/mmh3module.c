@@ -13,6 +13,7 @@
 
 #include "hashlib.h"
 #include "murmurhash3.h"
+#include "murmurhash3_simd.h"
 
 #if defined(_MSC_VER)
 typedef signed __int8 int8_t;
@@ -32,6 +33,19 @@ typedef unsigned __int64 uint64_t;
 #define MMH3_32_BLOCKSIZE 12
 #define MMH3_128_BLOCKSIZE 32
 
+// Run statement without holding the GIL if len is large enough for the
+// release to pay off. The statement must not touch any Python object.
+#define MMH3_HASH_MAYBE_ALLOW_THREADS(len, statement) \
+    do {                                              \
+        if ((len) >= HASHLIB_GIL_MINSIZE) {           \
+            Py_BEGIN_ALLOW_THREADS statement;         \
+            Py_END_ALLOW_THREADS                      \
+        }                                             \
+        else {                                        \
+            statement;                                \
+        }                                             \
+    } while (0)
+
 #define MMH3_VALIDATE_SEED_RETURN_NULL(seed)                       \
     if (seed < 0 || seed > 0xFFFFFFFF) {                           \
         PyErr_SetString(PyExc_ValueError, "seed is out of range"); \
@@ -46,24 +60,16 @@ typedef unsigned __int64 uint64_t;
     }
 
 // obj: PyObject*
-// target_str: const char *
-// len: Py_ssize_t
-#define MMH3_HASH_VALIDATE_AND_SET_BYTES(obj, target_str, len)          \
-    if (PyBytes_Check(obj)) {                                           \
-        target_str_len = PyBytes_Size(obj);                             \
-        target_str = PyBytes_AS_STRING(obj);                            \
-    }                                                                   \
-    else if (PyUnicode_Check(obj)) {                                    \
-        target_str_len = PyUnicode_GET_LENGTH(obj);                     \
-        target_str = PyUnicode_AsUTF8AndSize(obj, &target_str_len);     \
-    }                                                                   \
-    else {                                                              \
+// key: PyObject*, set to obj if obj is bytes or str
+#define MMH3_HASH_VALIDATE_AND_SET_KEY(obj, key)                        \
+    if (!PyBytes_Check(obj) && !PyUnicode_Check(obj)) {                 \
         PyErr_Format(PyExc_TypeError,                                   \
                      "argument 1 must be read-only bytes-like object, " \
                      "not '%s'",                                        \
                      Py_TYPE(obj)->tp_name);                            \
         return NULL;                                                    \
-    }
+    }                                                                   \
+    key = obj;
 
 // obj: PyObject*
 // seed: unsigned long
@@ -131,20 +137,616 @@ typedef unsigned __int64 uint64_t;
         seed = (uint32_t)seed_tmp;                                          \
     }
 
+//-----------------------------------------------------------------------------
+// Helpers for str keys
+
+// PyUnicode_AsUTF8AndSize() caches the UTF-8 representation inside a
+// non-ASCII str object until the object dies, which roughly doubles the
+// memory footprint of long-lived keys. The helpers below instead encode the
+// key into a transient buffer and leave the str object untouched.
+
+// Non-ASCII keys up to this many bytes in UTF-8 are encoded on the stack.
+#define MMH3_UTF8_STACK_SIZE 256
+
+// Maximum number of bytes in UTF-8 for a character of the given str kind
+#define MMH3_UTF8_MAX_CHAR_SIZE(kind)     \
+    ((kind) == PyUnicode_1BYTE_KIND   ? 2 \
+     : (kind) == PyUnicode_2BYTE_KIND ? 3 \
+                                      : 4)
+
+#define MMH3_UTF8_SIZE_LOOP(type, data, n, size)    \
+    do {                                            \
+        const type *p = (const type *)(data);       \
+        for (Py_ssize_t i = 0; i < (n); i++) {      \
+            const Py_UCS4 ch = p[i];                \
+            if (ch < 0x80) {                        \
+                size += 1;                          \
+            }                                       \
+            else if (ch < 0x800) {                  \
+                size += 2;                          \
+            }                                       \
+            else if (ch < 0x10000) {                \
+                if (ch >= 0xd800 && ch <= 0xdfff) { \
+                    return -1;                      \
+                }                                   \
+                size += 3;                          \
+            }                                       \
+            else {                                  \
+                if (ch > 0x10ffff) {                \
+                    return -1;                      \
+                }                                   \
+                size += 4;                          \
+            }                                       \
+        }                                           \
+    } while (0)
+
+#define MMH3_UTF8_ENCODE_LOOP(type, data, n, out)            \
+    do {                                                     \
+        const type *p = (const type *)(data);                \
+        for (Py_ssize_t i = 0; i < (n); i++) {               \
+            const Py_UCS4 ch = p[i];                         \
+            if (ch < 0x80) {                                 \
+                *out++ = (char)ch;                           \
+            }                                                \
+            else if (ch < 0x800) {                           \
+                *out++ = (char)(0xc0 | (ch >> 6));           \
+                *out++ = (char)(0x80 | (ch & 0x3f));         \
+            }                                                \
+            else if (ch < 0x10000) {                         \
+                if (ch >= 0xd800 && ch <= 0xdfff) {          \
+                    return -1;                               \
+                }                                            \
+                *out++ = (char)(0xe0 | (ch >> 12));          \
+                *out++ = (char)(0x80 | ((ch >> 6) & 0x3f));  \
+                *out++ = (char)(0x80 | (ch & 0x3f));         \
+            }                                                \
+            else {                                           \
+                *out++ = (char)(0xf0 | (ch >> 18));          \
+                *out++ = (char)(0x80 | ((ch >> 12) & 0x3f)); \
+                *out++ = (char)(0x80 | ((ch >> 6) & 0x3f));  \
+                *out++ = (char)(0x80 | (ch & 0x3f));         \
+            }                                                \
+        }                                                    \
+    } while (0)
+
+/*
+ * Return the length of the non-ASCII str obj in UTF-8, or -1 without an
+ * exception set if obj contains a lone surrogate, which cannot be encoded.
+ */
+static Py_ssize_t
+mmh3_utf8_size(PyObject *obj)
+{
+    const void *data = PyUnicode_DATA(obj);
+    const Py_ssize_t n = PyUnicode_GET_LENGTH(obj);
+    Py_ssize_t size = 0;
+
+    switch (PyUnicode_KIND(obj)) {
+        case PyUnicode_1BYTE_KIND:
+            MMH3_UTF8_SIZE_LOOP(Py_UCS1, data, n, size);
+            break;
+        case PyUnicode_2BYTE_KIND:
+            MMH3_UTF8_SIZE_LOOP(Py_UCS2, data, n, size);
+            break;
+        default:
+            MMH3_UTF8_SIZE_LOOP(Py_UCS4, data, n, size);
+            break;
+    }
+
+    return size;
+}
+
+/*
+ * Encode the non-ASCII str obj into out, which must have room for
+ * mmh3_utf8_size(obj) bytes. Returns the number of bytes written, or -1
+ * without an exception set if obj contains a lone surrogate.
+ */
+static Py_ssize_t
+mmh3_utf8_encode(PyObject *obj, char *out)
+{
+    const void *data = PyUnicode_DATA(obj);
+    const Py_ssize_t n = PyUnicode_GET_LENGTH(obj);
+    const char *start = out;
+
+    switch (PyUnicode_KIND(obj)) {
+        case PyUnicode_1BYTE_KIND:
+            MMH3_UTF8_ENCODE_LOOP(Py_UCS1, data, n, out);
+            break;
+        case PyUnicode_2BYTE_KIND:
+            MMH3_UTF8_ENCODE_LOOP(Py_UCS2, data, n, out);
+            break;
+        default:
+            MMH3_UTF8_ENCODE_LOOP(Py_UCS4, data, n, out);
+            break;
+    }
+
+    return out - start;
+}
+
+/*
+ * Raise the UnicodeEncodeError for the str obj that mmh3_utf8_size() has
+ * rejected. The message is left to CPython so that it is identical to that
+ * of str.encode(). Always returns -1.
+ */
+static int
+mmh3_utf8_error(PyObject *obj)
+{
+    PyObject *bytes = PyUnicode_AsUTF8String(obj);
+
+    if (bytes != NULL) {
+        Py_DECREF(bytes);
+        PyErr_SetString(PyExc_SystemError, "unexpected UTF-8 encoding");
+    }
+
+    return -1;
+}
+
+/*
+ * Return 1 if the str obj is stored as ASCII, in which case its data are
+ * already the UTF-8 representation, 0 if not, and -1 with an exception set on
+ * failure.
+ */
+static int
+mmh3_str_is_ascii(PyObject *obj)
+{
+#if PY_VERSION_HEX < 0x030C0000
+    if (PyUnicode_READY(obj) == -1) {
+        return -1;
+    }
+#endif
+    return PyUnicode_IS_ASCII(obj) ? 1 : 0;
+}
+
+// A bytes or str key viewed as UTF-8 bytes.
+typedef struct {
+    const char *buf;
+    Py_ssize_t len;
+    PyObject *bytes;  // temporary encoding of a long non-ASCII key, or NULL
+    char stack[MMH3_UTF8_STACK_SIZE];
+} MMH3Key;
+
+/*
+ * View obj, which must be bytes or str, as UTF-8 bytes in key without
+ * caching the UTF-8 representation in a str object. Returns 0 on success and
+ * -1 with an exception set on failure. On success, the view must be released
+ * by mmh3_key_release() after use.
+ */
+static int
+mmh3_key_init(MMH3Key *key, PyObject *obj)
+{
+    int is_ascii = 0;
+
+    key->bytes = NULL;
+
+    if (PyBytes_Check(obj)) {
+        key->buf = PyBytes_AS_STRING(obj);
+        key->len = PyBytes_GET_SIZE(obj);
+        return 0;
+    }
+
+    is_ascii = mmh3_str_is_ascii(obj);
+    if (is_ascii == -1) {
+        return -1;
+    }
+    if (is_ascii) {
+        key->buf = (const char *)PyUnicode_DATA(obj);
+        key->len = PyUnicode_GET_LENGTH(obj);
+        return 0;
+    }
+
+    // Short keys are encoded on the stack, as long as the encoding fits even
+    // if every character takes the most bytes.
+    if (PyUnicode_GET_LENGTH(obj) <=
+        MMH3_UTF8_STACK_SIZE / MMH3_UTF8_MAX_CHAR_SIZE(PyUnicode_KIND(obj))) {
+        key->len = mmh3_utf8_encode(obj, key->stack);
+        if (key->len == -1) {
+            return mmh3_utf8_error(obj);
+        }
+        key->buf = key->stack;
+        return 0;
+    }
+
+    // Longer keys are encoded into a temporary bytes object by CPython's own
+    // encoder, which is faster than ours for long inputs. Unlike
+    // PyUnicode_AsUTF8AndSize(), this does not cache anything in obj.
+    key->bytes = PyUnicode_AsUTF8String(obj);
+    if (key->bytes == NULL) {
+        return -1;
+    }
+    key->buf = PyBytes_AS_STRING(key->bytes);
+    key->len = PyBytes_GET_SIZE(key->bytes);
+
+    return 0;
+}
+
+static void
+mmh3_key_release(MMH3Key *key)
+{
+    Py_CLEAR(key->bytes);
+}
+
+// key: MMH3Key
+// obj: PyObject*, a bytes or str object validated by
+//      MMH3_HASH_VALIDATE_AND_SET_KEY, or NULL if not given
+#define MMH3_HASH_INIT_KEY(key, obj)                          \
+    if (obj == NULL) {                                        \
+        PyErr_SetString(PyExc_TypeError,                      \
+                        "function missing required argument " \
+                        "'key' (pos 1)");                     \
+        return NULL;                                          \
+    }                                                         \
+    if (mmh3_key_init(&key, obj) == -1) {                     \
+        return NULL;                                          \
+    }
+
+//-----------------------------------------------------------------------------
+// Helpers for argument parsing
+
+// Keyword names interned on module initialization. Keyword names passed by
+// callers are usually interned as well, so that they can be matched by
+// identity before falling back to comparing contents.
+static PyObject *mmh3_kwname_key = NULL;
+static PyObject *mmh3_kwname_seed = NULL;
+static PyObject *mmh3_kwname_signed = NULL;
+static PyObject *mmh3_kwname_data = NULL;
+
+// kwname: PyObject*, an item of kwnames
+// name: PyObject*, one of the interned keyword names above
+#define MMH3_KWNAME_EQ(kwname, name) \
+    ((kwname) == (name) || PyUnicode_Compare((kwname), (name)) == 0)
+
+/*
+ * Parse obj as a seed in the same way as the "L" format of
+ * PyArg_ParseTuple() followed by a range check. Returns 0 on success and -1
+ * with an exception set on failure.
+ */
+static int
+mmh3_parse_seed(PyObject *obj, uint32_t *seed)
+{
+    const long long value = PyLong_AsLongLong(obj);
+
+    if (value == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+
+    if (value < 0 || value > 0xFFFFFFFF) {
+        PyErr_SetString(PyExc_ValueError, "seed is out of range");
+        return -1;
+    }
+
+    *seed = (uint32_t)value;
+    return 0;
+}
+
+/*
+ * Raise TypeError unless obj supports the buffer protocol. Returns 0 if it
+ * does and -1 otherwise.
+ */
+static int
+mmh3_check_buffer(PyObject *obj)
+{
+    if (!PyObject_CheckBuffer(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "a bytes-like object is required, not '%s'",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    return 0;
+}
+
+/*
+ * Parse the arguments (data=None, seed=0) of a hasher constructor called
+ * with the vectorcall protocol. Returns 1 if data is given, in which case buf
+ * must be released by the caller, 0 if not, and -1 with an exception set on
+ * failure.
+ */
+static int
+mmh3_hasher_parse_args(PyObject *const *args, Py_ssize_t nargs,
+                       PyObject *kwnames, Py_buffer *buf, uint32_t *seed)
+{
+    PyObject *data = NULL;
+
+    *seed = 0;
+
+    if (nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 2 arguments (%d given)",
+                     (int)nargs);
+        return -1;
+    }
+
+    if (nargs >= 1) {
+        data = args[0];
+        if (mmh3_check_buffer(data) == -1) {
+            return -1;
+        }
+    }
+
+    if (nargs >= 2 && mmh3_parse_seed(args[1], seed) == -1) {
+        return -1;
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_GET_SIZE(kwnames); i++) {
+            PyObject *kwname = PyTuple_GET_ITEM(kwnames, i);
+            if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_data)) {
+                if (nargs >= 1) {
+                    PyErr_Format(PyExc_TypeError,
+                                 "argument for function given by name "
+                                 "('%s') and position (%d)",
+                                 "data", 1);
+                    return -1;
+                }
+                data = args[nargs + i];
+                if (mmh3_check_buffer(data) == -1) {
+                    return -1;
+                }
+            }
+            else if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_seed)) {
+                if (nargs >= 2) {
+                    PyErr_Format(PyExc_TypeError,
+                                 "argument for function given by name "
+                                 "('%s') and position (%d)",
+                                 "seed", 2);
+                    return -1;
+                }
+                if (mmh3_parse_seed(args[nargs + i], seed) == -1) {
+                    return -1;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%U' is an invalid keyword argument for this function",
+                    kwname);
+                return -1;
+            }
+        }
+    }
+
+    if (data == NULL) {
+        return 0;
+    }
+
+    if (PyObject_GetBuffer(data, buf, PyBUF_SIMPLE) == -1) {
+        return -1;
+    }
+
+    return 1;
+}
+
+//-----------------------------------------------------------------------------
+// Helpers for strided buffers
+
+/*
+ * Same as GET_BUFFER_VIEW_OR_ERROR in hashlib.h, but also accept a strided
+ * buffer with any number of dimensions, such as a column slice or a
+ * transposed view of a numpy array. Such a buffer is hashed as its logical
+ * contents in C order, i.e., as the bytes of its contiguous copy, by the
+ * mmh3_*_view functions below.
+ */
+#define MMH3_GET_STRIDED_VIEW_OR_ERROR(obj, viewp, erraction)             \
+    do {                                                                  \
+        if (PyUnicode_Check((obj))) {                                     \
+            PyErr_SetString(PyExc_TypeError,                              \
+                            "Strings must be encoded before hashing");    \
+            erraction;                                                    \
+        }                                                                 \
+        if (!PyObject_CheckBuffer((obj))) {                               \
+            PyErr_SetString(PyExc_TypeError,                              \
+                            "object supporting the buffer API required"); \
+            erraction;                                                    \
+        }                                                                 \
+        if (PyObject_GetBuffer((obj), (viewp), PyBUF_STRIDED_RO) == -1) { \
+            erraction;                                                    \
+        }                                                                 \
+    } while (0)
+
+#define MMH3_GET_STRIDED_VIEW_OR_ERROUT(obj, viewp) \
+    MMH3_GET_STRIDED_VIEW_OR_ERROR(obj, viewp, return NULL)
+
+// The size of the window on the stack through which the items of a
+// non-contiguous buffer are gathered before being hashed
+#define MMH3_GATHER_WINDOW_SIZE 4096
+
+// A function that hashes the next chunk of a stream. Only chunk->buf and
+// chunk->len are set.
+typedef void (*mmh3_feed_func)(void *state, const Py_buffer *chunk);
+
+typedef struct {
+    char window[MMH3_GATHER_WINDOW_SIZE];
+    Py_ssize_t filled;
+    mmh3_feed_func feed;
+    void *state;
+} MMH3Gather;
+
+static FORCE_INLINE void
+mmh3_gather_flush(MMH3Gather *g)
+{
+    Py_buffer chunk;
+
+    if (g->filled > 0) {
+        chunk.buf = g->window;
+        chunk.len = g->filled;
+        g->feed(g->state, &chunk);
+        g->filled = 0;
+    }
+}
+
+static FORCE_INLINE void
+mmh3_gather_append(MMH3Gather *g, const char *data, Py_ssize_t n)
+{
+    Py_buffer chunk;
+
+    // A long contiguous run is hashed in place.
+    if (n >= MMH3_GATHER_WINDOW_SIZE) {
+        mmh3_gather_flush(g);
+        chunk.buf = (void *)data;
+        chunk.len = n;
+        g->feed(g->state, &chunk);
+        return;
+    }
+
+    while (n > 0) {
+        Py_ssize_t m = MMH3_GATHER_WINDOW_SIZE - g->filled;
+        if (m > n) {
+            m = n;
+        }
+        memcpy(g->window + g->filled, data, m);
+        g->filled += m;
+        data += m;
+        n -= m;
+        if (g->filled == MMH3_GATHER_WINDOW_SIZE) {
+            mmh3_gather_flush(g);
+        }
+    }
+}
+
+/*
+ * Walk a non-contiguous buffer in C order and feed its bytes to feed in
+ * chunks. Runs of contiguous items are copied at once, and runs longer than
+ * the window are fed without being copied. Does not touch any Python
+ * object.
+ */
+static void
+mmh3_feed_strided(const Py_buffer *view, mmh3_feed_func feed, void *state)
+{
+    MMH3Gather g;
+    Py_ssize_t index[PyBUF_MAX_NDIM];
+    const int last = view->ndim - 1;
+    const Py_ssize_t itemsize = view->itemsize;
+    const Py_ssize_t inner_len = view->shape[last];
+    const Py_ssize_t inner_stride = view->strides[last];
+
+    if (view->len == 0) {
+        return;
+    }
+
+    g.filled = 0;
+    g.feed = feed;
+    g.state = state;
+
+    for (int d = 0; d < last; d++) {
+        index[d] = 0;
+    }
+
+    for (;;) {
+        const char *row = (const char *)view->buf;
+        int d = 0;
+
+        for (d = 0; d < last; d++) {
+            row += index[d] * view->strides[d];
+        }
+
+        if (inner_stride == itemsize) {
+            mmh3_gather_append(&g, row, inner_len * itemsize);
+        }
+        else if (itemsize == 1) {
+            for (Py_ssize_t j = 0; j < inner_len; j++) {
+                g.window[g.filled++] = row[j * inner_stride];
+                if (g.filled == MMH3_GATHER_WINDOW_SIZE) {
+                    mmh3_gather_flush(&g);
+                }
+            }
+        }
+        else {
+            for (Py_ssize_t j = 0; j < inner_len; j++) {
+                mmh3_gather_append(&g, row + j * inner_stride, itemsize);
+            }
+        }
+
+        // Advance the index of the outer dimensions like an odometer.
+        for (d = last - 1; d >= 0; d--) {
+            if (++index[d] < view->shape[d]) {
+                break;
+            }
+            index[d] = 0;
+        }
+        if (d < 0) {
+            break;
+        }
+    }
+
+    mmh3_gather_flush(&g);
+}
+
+/*
+ * Hash a buffer acquired by MMH3_GET_STRIDED_VIEW_OR_ERROR and store the
+ * result in out in the same format as murmurhash3_x86_32 and its variants.
+ * A non-contiguous buffer is streamed through the update functions of the
+ * hasher classes, which are defined below.
+ */
+static void
+mmh3_x86_32_view(const Py_buffer *view, uint32_t seed, void *out);
+
+static void
+mmh3_x64_128_view(const Py_buffer *view, uint32_t seed, void *out);
+
+static void
+mmh3_x86_128_view(const Py_buffer *view, uint32_t seed, void *out);
+
 //-----------------------------------------------------------------------------
 // Helpers for mutex manipulations for hashers
 
+// A hasher releases the GIL while it processes a buffer of at least
+// HASHLIB_GIL_MINSIZE bytes in update(). Every access to the mutable state
+// of a hasher must therefore be enclosed in MMH3_HASHER_LOCK and
+// MMH3_HASHER_UNLOCK, even in GIL-enabled builds.
 #ifdef Py_GIL_DISABLED
 #define MMH3_HASHER_LOCK(obj) PyMutex_Lock(&(obj->mutex))
 #define MMH3_HASHER_UNLOCK(obj) PyMutex_Unlock(&(obj->mutex))
 #define MMH3_HASHER_INIT_MUTEX(obj) \
     PyMutex t = {0};                \
     obj->mutex = t;
+#define MMH3_HASHER_FREE_MUTEX(obj) (void)0
+
+// Run statement, which updates the state of obj with len bytes, under the
+// lock of obj.
+#define MMH3_HASHER_UPDATE_LOCKED(obj, len, statement)    \
+    do {                                                  \
+        if ((len) >= HASHLIB_GIL_MINSIZE) {               \
+            Py_BEGIN_ALLOW_THREADS MMH3_HASHER_LOCK(obj); \
+            statement;                                    \
+            MMH3_HASHER_UNLOCK(obj);                      \
+            Py_END_ALLOW_THREADS                          \
+        }                                                 \
+        else {                                            \
+            MMH3_HASHER_LOCK(obj);                        \
+            statement;                                    \
+            MMH3_HASHER_UNLOCK(obj);                      \
+        }                                                 \
+    } while (0)
 
 #else
-#define MMH3_HASHER_LOCK(obj) (void)0
-#define MMH3_HASHER_UNLOCK(obj) (void)0
-#define MMH3_HASHER_INIT_MUTEX(obj) (void)0
+// The lock is allocated lazily on the first large update, since most
+// hashers are used only by a single thread for small inputs.
+#define MMH3_HASHER_LOCK(obj) ENTER_HASHLIB(obj)
+#define MMH3_HASHER_UNLOCK(obj) LEAVE_HASHLIB(obj)
+#define MMH3_HASHER_INIT_MUTEX(obj) obj->lock = NULL;
+#define MMH3_HASHER_FREE_MUTEX(obj)    \
+    if (obj->lock != NULL) {           \
+        PyThread_free_lock(obj->lock); \
+        obj->lock = NULL;              \
+    }
+
+#define MMH3_HASHER_UPDATE_LOCKED(obj, len, statement)                     \
+    do {                                                                   \
+        if ((obj)->lock == NULL && (len) >= HASHLIB_GIL_MINSIZE) {         \
+            /* fail? lock = NULL, we fall back to not releasing the GIL */ \
+            (obj)->lock = PyThread_allocate_lock();                        \
+        }                                                                  \
+        if ((obj)->lock != NULL && (len) >= HASHLIB_GIL_MINSIZE) {         \
+            Py_BEGIN_ALLOW_THREADS PyThread_acquire_lock((obj)->lock, 1);  \
+            statement;                                                     \
+            PyThread_release_lock((obj)->lock);                            \
+            Py_END_ALLOW_THREADS                                           \
+        }                                                                  \
+        else {                                                             \
+            MMH3_HASHER_LOCK(obj);                                         \
+            statement;                                                     \
+            MMH3_HASHER_UNLOCK(obj);                                       \
+        }                                                                  \
+    } while (0)
 #endif
 
 //-----------------------------------------------------------------------------
@@ -177,8 +779,8 @@ static PyObject *
 mmh3_hash(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
           PyObject *kwnames)
 {
-    const char *target_str;
-    Py_ssize_t target_str_len;
+    PyObject *target = NULL;
+    MMH3Key key;
     unsigned long seed = 0;
     int32_t result[1];
     long long_result = 0;
@@ -204,7 +806,7 @@ mmh3_hash(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
     }
 
     if (nargs >= 1) {
-        MMH3_HASH_VALIDATE_AND_SET_BYTES(args[0], target_str, target_str_len);
+        MMH3_HASH_VALIDATE_AND_SET_KEY(args[0], target);
     }
 
     if (nargs >= 2) {
@@ -220,8 +822,7 @@ mmh3_hash(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
             const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
             if (strcmp(kwname, "key") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
-                MMH3_HASH_VALIDATE_AND_SET_BYTES(args[nargs + i], target_str,
-                                                 target_str_len);
+                MMH3_HASH_VALIDATE_AND_SET_KEY(args[nargs + i], target);
             }
             else if (strcmp(kwname, "seed") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
@@ -241,7 +842,12 @@ mmh3_hash(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
         }
     }
 
-    murmurhash3_x86_32(target_str, target_str_len, (uint32_t)seed, result);
+    MMH3_HASH_INIT_KEY(key, target);
+
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        key.len, murmurhash3_x86_32(key.buf, key.len, (uint32_t)seed, result));
+
+    mmh3_key_release(&key);
 
 #if defined(_MSC_VER)
     /* for Windows envs */
@@ -299,32 +905,107 @@ PyDoc_STRVAR(
     "    ``bool`` to ``Any``.\n");
 
 static PyObject *
-mmh3_hash_from_buffer(PyObject *self, PyObject *args, PyObject *keywds)
+mmh3_hash_from_buffer(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                      PyObject *kwnames)
 {
+    PyObject *target = NULL;
     Py_buffer target_buf;
-    long long seed = 0;
+    MMH3Key key;
+    uint32_t seed = 0;
     int32_t result[1];
     long long_result = 0;
     int is_signed = 1;
 
-    static char *kwlist[] = {"key", "seed", "signed", NULL};
-
 #ifndef _MSC_VER
 #if __LONG_WIDTH__ == 64 || defined(__APPLE__)
     static uint64_t mask[] = {0x0ffffffff, 0xffffffffffffffff};
 #endif
 #endif
 
-    if (!PyArg_ParseTupleAndKeywords(args, keywds, "s*|Lp", kwlist,
-                                     &target_buf, &seed, &is_signed)) {
+    if (nargs > 3) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 3 arguments (%d given)",
+                     (int)nargs);
         return NULL;
     }
 
-    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
+    if (nargs >= 1) {
+        target = args[0];
+        if (!PyUnicode_Check(target) && mmh3_check_buffer(target) == -1) {
+            return NULL;
+        }
+    }
 
-    murmurhash3_x86_32(target_buf.buf, target_buf.len, (uint32_t)seed, result);
+    if (nargs >= 2 && mmh3_parse_seed(args[1], &seed) == -1) {
+        return NULL;
+    }
 
-    PyBuffer_Release(&target_buf);
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_GET_SIZE(kwnames); i++) {
+            PyObject *kwname = PyTuple_GET_ITEM(kwnames, i);
+            if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_key)) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
+                target = args[nargs + i];
+                if (!PyUnicode_Check(target) &&
+                    mmh3_check_buffer(target) == -1) {
+                    return NULL;
+                }
+            }
+            else if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_seed)) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                if (mmh3_parse_seed(args[nargs + i], &seed) == -1) {
+                    return NULL;
+                }
+            }
+            else if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_signed)) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%U' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (target != NULL && PyUnicode_Check(target)) {
+        MMH3_HASH_INIT_KEY(key, target);
+
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            key.len, murmurhash3_x86_32(key.buf, key.len, seed, result));
+
+        mmh3_key_release(&key);
+    }
+    else {
+        if (target == NULL) {
+            PyErr_SetString(
+                PyExc_TypeError,
+                "function missing required argument 'key' (pos 1)");
+            return NULL;
+        }
+
+        if (PyObject_GetBuffer(target, &target_buf, PyBUF_STRIDED_RO) == -1) {
+            return NULL;
+        }
+
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            target_buf.len, mmh3_x86_32_view(&target_buf, seed, result));
+
+        PyBuffer_Release(&target_buf);
+    }
 
 #if defined(_MSC_VER)
     /* for Windows envs */
@@ -386,8 +1067,8 @@ static PyObject *
 mmh3_hash64(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
             PyObject *kwnames)
 {
-    const char *target_str;
-    Py_ssize_t target_str_len;
+    PyObject *target = NULL;
+    MMH3Key key;
     long long seed = 0;
     uint64_t result[2];
     int x64arch = 1;
@@ -409,7 +1090,7 @@ mmh3_hash64(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
     }
 
     if (nargs >= 1) {
-        MMH3_HASH_VALIDATE_AND_SET_BYTES(args[0], target_str, target_str_len);
+        MMH3_HASH_VALIDATE_AND_SET_KEY(args[0], target);
     }
 
     if (nargs >= 2) {
@@ -429,8 +1110,7 @@ mmh3_hash64(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
             const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
             if (strcmp(kwname, "key") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
-                MMH3_HASH_VALIDATE_AND_SET_BYTES(args[nargs + i], target_str,
-                                                 target_str_len);
+                MMH3_HASH_VALIDATE_AND_SET_KEY(args[nargs + i], target);
             }
             else if (strcmp(kwname, "seed") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
@@ -454,15 +1134,21 @@ mmh3_hash64(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
         }
     }
 
+    MMH3_HASH_INIT_KEY(key, target);
+
     if (x64arch == 1) {
-        murmurhash3_x64_128(target_str, target_str_len, (uint32_t)seed,
-                            result);
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            key.len,
+            murmurhash3_x64_128(key.buf, key.len, (uint32_t)seed, result));
     }
     else {
-        murmurhash3_x86_128(target_str, target_str_len, (uint32_t)seed,
-                            result);
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            key.len,
+            murmurhash3_x86_128(key.buf, key.len, (uint32_t)seed, result));
     }
 
+    mmh3_key_release(&key);
+
     PyObject *retval = Py_BuildValue(valflag[is_signed], result[0], result[1]);
     return retval;
 }
@@ -499,8 +1185,8 @@ static PyObject *
 mmh3_hash128(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
              PyObject *kwnames)
 {
-    const char *target_str;
-    Py_ssize_t target_str_len;
+    PyObject *target = NULL;
+    MMH3Key key;
     long long seed = 0;
     uint64_t result[2];
     int x64arch = 1;
@@ -520,7 +1206,7 @@ mmh3_hash128(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
     }
 
     if (nargs >= 1) {
-        MMH3_HASH_VALIDATE_AND_SET_BYTES(args[0], target_str, target_str_len);
+        MMH3_HASH_VALIDATE_AND_SET_KEY(args[0], target);
     }
 
     if (nargs >= 2) {
@@ -540,8 +1226,7 @@ mmh3_hash128(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
             const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
             if (strcmp(kwname, "key") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
-                MMH3_HASH_VALIDATE_AND_SET_BYTES(args[nargs + i], target_str,
-                                                 target_str_len);
+                MMH3_HASH_VALIDATE_AND_SET_KEY(args[nargs + i], target);
             }
             else if (strcmp(kwname, "seed") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
@@ -565,13 +1250,19 @@ mmh3_hash128(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
         }
     }
 
+    MMH3_HASH_INIT_KEY(key, target);
+
     if (x64arch == 1) {
-        murmurhash3_x64_128(target_str, target_str_len, seed, result);
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            key.len, murmurhash3_x64_128(key.buf, key.len, seed, result));
     }
     else {
-        murmurhash3_x86_128(target_str, target_str_len, seed, result);
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            key.len, murmurhash3_x86_128(key.buf, key.len, seed, result));
     }
 
+    mmh3_key_release(&key);
+
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
     result[0] = bswap_64(result[0]);
     result[1] = bswap_64(result[1]);
@@ -618,8 +1309,8 @@ static PyObject *
 mmh3_hash_bytes(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
                 PyObject *kwnames)
 {
-    const char *target_str;
-    Py_ssize_t target_str_len;
+    PyObject *target = NULL;
+    MMH3Key key;
     long long seed = 0;
     uint64_t result[2];
     int x64arch = 1;
@@ -638,7 +1329,7 @@ mmh3_hash_bytes(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
     }
 
     if (nargs >= 1) {
-        MMH3_HASH_VALIDATE_AND_SET_BYTES(args[0], target_str, target_str_len);
+        MMH3_HASH_VALIDATE_AND_SET_KEY(args[0], target);
     }
 
     if (nargs >= 2) {
@@ -654,8 +1345,7 @@ mmh3_hash_bytes(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
             const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
             if (strcmp(kwname, "key") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
-                MMH3_HASH_VALIDATE_AND_SET_BYTES(args[nargs + i], target_str,
-                                                 target_str_len);
+                MMH3_HASH_VALIDATE_AND_SET_KEY(args[nargs + i], target);
             }
             else if (strcmp(kwname, "seed") == 0) {
                 MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
@@ -675,13 +1365,19 @@ mmh3_hash_bytes(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
         }
     }
 
+    MMH3_HASH_INIT_KEY(key, target);
+
     if (x64arch == 1) {
-        murmurhash3_x64_128(target_str, target_str_len, seed, result);
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            key.len, murmurhash3_x64_128(key.buf, key.len, seed, result));
     }
     else {
-        murmurhash3_x86_128(target_str, target_str_len, seed, result);
+        MMH3_HASH_MAYBE_ALLOW_THREADS(
+            key.len, murmurhash3_x86_128(key.buf, key.len, seed, result));
     }
 
+    mmh3_key_release(&key);
+
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
     result[0] = bswap_64(result[0]);
     result[1] = bswap_64(result[1]);
@@ -721,9 +1417,10 @@ mmh3_mmh3_32_digest(PyObject *self, PyObject *const *args, Py_ssize_t nargs)
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_32(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(target_buf.len,
+                                  mmh3_x86_32_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
@@ -761,9 +1458,10 @@ mmh3_mmh3_32_sintdigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_32(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(target_buf.len,
+                                  mmh3_x86_32_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
     return PyLong_FromLong(result[0]);
@@ -797,9 +1495,10 @@ mmh3_mmh3_32_uintdigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_32(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(target_buf.len,
+                                  mmh3_x86_32_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
     return PyLong_FromUnsignedLong(result[0]);
@@ -834,9 +1533,10 @@ mmh3_mmh3_x64_128_digest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x64_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x64_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
@@ -875,9 +1575,10 @@ mmh3_mmh3_x64_128_sintdigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x64_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x64_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
@@ -925,9 +1626,10 @@ mmh3_mmh3_x64_128_uintdigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x64_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x64_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
@@ -976,9 +1678,10 @@ mmh3_mmh3_x64_128_stupledigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x64_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x64_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
     PyObject *retval = Py_BuildValue("LL", result[0], result[1]);
@@ -1015,9 +1718,10 @@ mmh3_mmh3_x64_128_utupledigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x64_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x64_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
     PyObject *retval = Py_BuildValue("KK", result[0], result[1]);
@@ -1053,9 +1757,10 @@ mmh3_mmh3_x86_128_digest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x86_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
@@ -1094,9 +1799,10 @@ mmh3_mmh3_x86_128_sintdigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x86_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
@@ -1144,9 +1850,10 @@ mmh3_mmh3_x86_128_uintdigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x86_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
 #if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
@@ -1195,9 +1902,10 @@ mmh3_mmh3_x86_128_stupledigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x86_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
     PyObject *retval = Py_BuildValue("LL", result[0], result[1]);
@@ -1234,1133 +1942,12477 @@ mmh3_mmh3_x86_128_utupledigest(PyObject *self, PyObject *const *args,
 
     MMH3_VALIDATE_ARGS_AND_SET_SEED(nargs, args, seed);
 
-    GET_BUFFER_VIEW_OR_ERROUT(args[0], &target_buf);
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(args[0], &target_buf);
 
-    murmurhash3_x86_128(target_buf.buf, target_buf.len, seed, result);
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        target_buf.len, mmh3_x86_128_view(&target_buf, seed, result));
     PyBuffer_Release(&target_buf);
 
     PyObject *retval = Py_BuildValue("KK", result[0], result[1]);
     return retval;
 }
 
-// Casting to PyCFunction is mandatory for
-//   METH_VARARGS | METH_KEYWORDS functions.
-// See
-// https://docs.python.org/3/extending/extending.html#keyword-parameters-for-extension-functions
-static PyMethodDef Mmh3Methods[] = {
-    {"hash", (PyCFunction)mmh3_hash, METH_FASTCALL | METH_KEYWORDS,
-     mmh3_hash_doc},
-    {"hash_from_buffer", (PyCFunction)mmh3_hash_from_buffer,
-     METH_VARARGS | METH_KEYWORDS, mmh3_hash_from_buffer_doc},
-    {"hash64", (PyCFunction)mmh3_hash64, METH_FASTCALL | METH_KEYWORDS,
-     mmh3_hash64_doc},
-    {"hash128", (PyCFunction)mmh3_hash128, METH_FASTCALL | METH_KEYWORDS,
-     mmh3_hash128_doc},
-    {"hash_bytes", (PyCFunction)mmh3_hash_bytes, METH_FASTCALL | METH_KEYWORDS,
-     mmh3_hash_bytes_doc},
-    {"mmh3_32_digest", (PyCFunction)mmh3_mmh3_32_digest, METH_FASTCALL,
-     mmh3_mmh3_32_digest_doc},
-    {"mmh3_32_sintdigest", (PyCFunction)mmh3_mmh3_32_sintdigest, METH_FASTCALL,
-     mmh3_mmh3_32_sintdigest_doc},
-    {"mmh3_32_uintdigest", (PyCFunction)mmh3_mmh3_32_uintdigest, METH_FASTCALL,
-     mmh3_mmh3_32_uintdigest_doc},
-    {"mmh3_x64_128_digest", (PyCFunction)mmh3_mmh3_x64_128_digest,
-     METH_FASTCALL, mmh3_mmh3_x64_128_digest_doc},
-    {"mmh3_x64_128_sintdigest", (PyCFunction)mmh3_mmh3_x64_128_sintdigest,
-     METH_FASTCALL, mmh3_mmh3_x64_128_sintdigest_doc},
-    {"mmh3_x64_128_uintdigest", (PyCFunction)mmh3_mmh3_x64_128_uintdigest,
-     METH_FASTCALL, mmh3_mmh3_x64_128_uintdigest_doc},
-    {"mmh3_x64_128_stupledigest", (PyCFunction)mmh3_mmh3_x64_128_stupledigest,
-     METH_FASTCALL, mmh3_mmh3_x64_128_stupledigest_doc},
-    {"mmh3_x64_128_utupledigest", (PyCFunction)mmh3_mmh3_x64_128_utupledigest,
-     METH_FASTCALL, mmh3_mmh3_x64_128_utupledigest_doc},
-    {"mmh3_x86_128_digest", (PyCFunction)mmh3_mmh3_x86_128_digest,
-     METH_FASTCALL, mmh3_mmh3_x86_128_digest_doc},
-    {"mmh3_x86_128_sintdigest", (PyCFunction)mmh3_mmh3_x86_128_sintdigest,
-     METH_FASTCALL, mmh3_mmh3_x86_128_sintdigest_doc},
-    {"mmh3_x86_128_uintdigest", (PyCFunction)mmh3_mmh3_x86_128_uintdigest,
-     METH_FASTCALL, mmh3_mmh3_x86_128_uintdigest_doc},
-    {"mmh3_x86_128_stupledigest", (PyCFunction)mmh3_mmh3_x86_128_stupledigest,
-     METH_FASTCALL, mmh3_mmh3_x86_128_stupledigest_doc},
-    {"mmh3_x86_128_utupledigest", (PyCFunction)mmh3_mmh3_x86_128_utupledigest,
-     METH_FASTCALL, mmh3_mmh3_x86_128_utupledigest_doc},
-    {NULL, NULL, 0, NULL}};
-
 //-----------------------------------------------------------------------------
-// Hasher classes
-//
-// The design of hasher classes are loosely based on the Google Guava
-// implementation (Java)
+// Batch functions
 
-//-----------------------------------------------------------------------------
-// Hasher for murmurhash3_x86_32
+// array.array, imported on module initialization
+static PyObject *mmh3_array_type = NULL;
+
+// Keys of a batch, validated and gathered before hashing so that the hash
+// loops never touch Python objects.
 typedef struct {
-    PyObject_HEAD uint32_t h;
-    uint64_t buffer;
-    uint8_t shift;
-    Py_ssize_t length;
-#ifdef Py_GIL_DISABLED
-    PyMutex mutex;
-#endif
-} MMH3Hasher32;
+    PyObject *seq;  // tuple holding references to all keys
+    char *arena;    // UTF-8 encodings of all non-ASCII str keys
+    const char **keys;
+    Py_ssize_t *lens;
+    Py_ssize_t n;
+    Py_ssize_t size;  // total length of the keys in bytes
+} MMH3KeyBatch;
 
-static PyTypeObject MMH3Hasher32Type;
+static void
+mmh3_key_batch_release(MMH3KeyBatch *batch)
+{
+    PyMem_Free(batch->keys);
+    batch->keys = NULL;
+    PyMem_Free(batch->lens);
+    batch->lens = NULL;
+    PyMem_Free(batch->arena);
+    batch->arena = NULL;
+    Py_CLEAR(batch->seq);
+}
 
-static FORCE_INLINE void
-update32_impl(MMH3Hasher32 *self, Py_buffer *buf)
+/*
+ * Gather the bytes or str objects in the iterable obj into batch.
+ * Returns 0 on success and -1 with an exception set on failure.
+ */
+static int
+mmh3_key_batch_init(MMH3KeyBatch *batch, PyObject *obj)
 {
-    Py_ssize_t i = 0;
-    uint32_t h1 = 0;
-    uint32_t k1 = 0;
-    const uint32_t c1 = 0xe6546b64;
-    const uint64_t mask = 0xffffffffUL;
+    Py_ssize_t arena_size = 0;
 
-    MMH3_HASHER_LOCK(self);
-    h1 = self->h;
+    batch->seq = NULL;
+    batch->arena = NULL;
+    batch->keys = NULL;
+    batch->lens = NULL;
+    batch->n = 0;
+    batch->size = 0;
+
+    if (PyBytes_Check(obj) || PyUnicode_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "keys must be an iterable of bytes or str, not '%s'",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
 
-    for (; i + 4 <= buf->len; i += 4) {
-        k1 = getblock32(buf->buf, i / 4);
-        self->buffer |= (k1 & mask) << self->shift;
-        self->length += 4;
+    // A tuple keeps every key alive even if the caller mutates the original
+    // list from another thread while the keys are being hashed.
+    batch->seq = PySequence_Tuple(obj);
+    if (batch->seq == NULL) {
+        return -1;
+    }
 
-        h1 ^= mixK1(self->buffer);
-        h1 = mixH1(h1, 0, 13, c1);
-        self->buffer >>= 32;
+    batch->n = PyTuple_GET_SIZE(batch->seq);
+    batch->keys = PyMem_New(const char *, batch->n);
+    batch->lens = PyMem_New(Py_ssize_t, batch->n);
+    if (batch->keys == NULL || batch->lens == NULL) {
+        mmh3_key_batch_release(batch);
+        PyErr_NoMemory();
+        return -1;
     }
 
-    for (; i < buf->len; i++) {
-        k1 = ((uint8_t *)buf->buf)[i];
-        self->buffer |= (k1 & mask) << self->shift;
-        self->shift += 8;
-        self->length += 1;
+    // First pass: validate the keys and measure their UTF-8 lengths. The
+    // keys of non-ASCII str objects are left NULL for the second pass.
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        PyObject *key = PyTuple_GET_ITEM(batch->seq, i);
+        int is_ascii = 0;
 
-        if (self->shift >= 32) {
-            h1 ^= mixK1(self->buffer);
-            h1 = mixH1(h1, 0, 13, c1);
-            self->buffer >>= 32;
-            self->shift -= 32;
+        if (PyBytes_Check(key)) {
+            batch->keys[i] = PyBytes_AS_STRING(key);
+            batch->lens[i] = PyBytes_GET_SIZE(key);
         }
+        else if (PyUnicode_Check(key)) {
+            is_ascii = mmh3_str_is_ascii(key);
+            if (is_ascii == -1) {
+                goto error;
+            }
+            if (is_ascii) {
+                batch->keys[i] = (const char *)PyUnicode_DATA(key);
+                batch->lens[i] = PyUnicode_GET_LENGTH(key);
+            }
+            else {
+                batch->keys[i] = NULL;
+                batch->lens[i] = mmh3_utf8_size(key);
+                if (batch->lens[i] == -1) {
+                    mmh3_utf8_error(key);
+                    goto error;
+                }
+                arena_size += batch->lens[i];
+            }
+        }
+        else {
+            PyErr_Format(PyExc_TypeError,
+                         "argument 1 must be read-only bytes-like object, "
+                         "not '%s'",
+                         Py_TYPE(key)->tp_name);
+            goto error;
+        }
+        batch->size += batch->lens[i];
     }
 
-    self->h = h1;
+    // Second pass: encode all non-ASCII keys into a single arena, which
+    // lives as long as the batch.
+    if (arena_size > 0) {
+        char *out = NULL;
 
-    MMH3_HASHER_UNLOCK(self);
+        batch->arena = (char *)PyMem_Malloc(arena_size);
+        if (batch->arena == NULL) {
+            PyErr_NoMemory();
+            goto error;
+        }
 
-    PyBuffer_Release(buf);
+        out = batch->arena;
+        for (Py_ssize_t i = 0; i < batch->n; i++) {
+            if (batch->keys[i] == NULL) {
+                mmh3_utf8_encode(PyTuple_GET_ITEM(batch->seq, i), out);
+                batch->keys[i] = out;
+                out += batch->lens[i];
+            }
+        }
+    }
+
+    return 0;
 
-    return;
+error:
+    mmh3_key_batch_release(batch);
+    return -1;
 }
 
-static void
-MMH3Hasher32_dealloc(MMH3Hasher32 *self)
+/*
+ * Return the size of an item of the array.array typecode, or 0 if typecode
+ * is 0 (bytes).
+ */
+static Py_ssize_t
+mmh3_typecode_itemsize(char typecode)
 {
-    Py_TYPE(self)->tp_free((PyObject *)self);
+    switch (typecode) {
+        case 'B':
+            return 1;
+        case 'i':
+        case 'I':
+            return sizeof(int);
+        case 'q':
+        case 'Q':
+            return sizeof(long long);
+        default:
+            return 0;
+    }
 }
 
+/*
+ * Return a new array.array of the given typecode with size bytes of zeroed
+ * items. The items are allocated once, without an intermediate bytes
+ * object.
+ */
 static PyObject *
-MMH3Hasher32_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+mmh3_array_new(char typecode, Py_ssize_t size)
 {
-    MMH3Hasher32 *self;
-    self = (MMH3Hasher32 *)type->tp_alloc(type, 0);
-    if (self != NULL) {
-        self->h = 0;
-        self->buffer = 0;
-        self->shift = 0;
-        self->length = 0;
-        MMH3_HASHER_INIT_MUTEX(self);
+    static const char zeros[sizeof(long long)] = {0};
+    const Py_ssize_t itemsize = mmh3_typecode_itemsize(typecode);
+
+    PyObject *item = PyObject_CallFunction(mmh3_array_type, "Cy#", typecode,
+                                           zeros, itemsize);
+    if (item == NULL) {
+        return NULL;
     }
-    return (PyObject *)self;
+
+    PyObject *retval = PySequence_Repeat(item, size / itemsize);
+    Py_DECREF(item);
+
+    return retval;
 }
 
-/* It is impossible to add docstring for __init__ in Python C extension.
-  Therefore, the constructor docstring should be described in the class
-  docstring. See also https://stackoverflow.com/q/11913492 */
+// Destination of a function that writes its results into a flat buffer.
+// Either a new bytes or array.array object allocated by the function or a
+// writable buffer given by the caller via the ``out`` argument.
+typedef struct {
+    PyObject *out;     // the caller's object, or NULL
+    PyObject *result;  // a new bytes or array.array object, or NULL
+    Py_buffer view;    // buffer of out or of a new array.array
+    int has_view;
+    // Aligned buffer that holds the results until they are copied to an
+    // unaligned out, or NULL
+    char *tmp;
+    Py_ssize_t size;
+    char *buf;
+} MMH3Output;
+
+/*
+ * Check that the buffer out given by the caller can hold the results of
+ * typecode: a buffer of bytes, or of native integers of the same size if
+ * typecode is not 0. Returns 0 on success and -1 with a TypeError set on
+ * failure.
+ */
 static int
-MMH3Hasher32_init(MMH3Hasher32 *self, PyObject *args, PyObject *kwds)
+mmh3_output_check_format(const Py_buffer *view, char typecode)
 {
-    Py_buffer target_buf = {0};
-    long long seed = 0;
-    static char *kwlist[] = {"data", "seed", NULL};
+    const Py_ssize_t itemsize = mmh3_typecode_itemsize(typecode);
+    const char *format = view->format != NULL ? view->format : "B";
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|y*L", kwlist, &target_buf,
-                                     &seed))
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    const char native = '>';
+#else
+    const char native = '<';
+#endif
+
+    if (*format == '@' || *format == '=' || *format == native) {
+        format++;
+    }
+
+    if (format[0] != '\0' && format[1] == '\0') {
+        if (strchr("Bbc", format[0]) != NULL) {
+            return 0;
+        }
+        if (itemsize > 0 && view->itemsize == itemsize &&
+            strchr("iIlLqQnN", format[0]) != NULL) {
+            return 0;
+        }
+    }
+
+    if (itemsize > 0) {
+        PyErr_Format(PyExc_TypeError,
+                     "out must be a buffer of bytes or %zd-byte integers, "
+                     "not a buffer of format '%s'",
+                     itemsize, view->format != NULL ? view->format : "B");
+    }
+    else {
+        PyErr_Format(PyExc_TypeError,
+                     "out must be a buffer of bytes, not a buffer of format "
+                     "'%s'",
+                     view->format != NULL ? view->format : "B");
+    }
+    return -1;
+}
+
+/*
+ * Prepare an output of size bytes for the results of typecode. If out is
+ * NULL or None, a new array.array of typecode is allocated, or a new bytes
+ * object if typecode is 0. Returns 0 on success and -1 with an exception
+ * set on failure.
+ */
+static int
+mmh3_output_init(MMH3Output *output, PyObject *out, Py_ssize_t size,
+                 char typecode)
+{
+    output->out = NULL;
+    output->result = NULL;
+    output->has_view = 0;
+    output->tmp = NULL;
+    output->size = size;
+    output->buf = NULL;
+
+    if ((out == NULL || out == Py_None) && typecode == 0) {
+        output->result = PyBytes_FromStringAndSize(NULL, size);
+        if (output->result == NULL) {
+            return -1;
+        }
+        output->buf = PyBytes_AS_STRING(output->result);
+        return 0;
+    }
+
+    if (out == NULL || out == Py_None) {
+        output->result = mmh3_array_new(typecode, size);
+        if (output->result == NULL) {
+            return -1;
+        }
+        if (PyObject_GetBuffer(output->result, &output->view,
+                               PyBUF_WRITABLE) == -1) {
+            Py_CLEAR(output->result);
+            return -1;
+        }
+        output->has_view = 1;
+        output->buf = output->view.buf;
+        return 0;
+    }
+
+    if (PyObject_GetBuffer(
+            out, &output->view,
+            PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == -1) {
         return -1;
+    }
 
-    MMH3_VALIDATE_SEED_RETURN_INT(seed, target_buf);
+    if (mmh3_output_check_format(&output->view, typecode) < 0) {
+        PyBuffer_Release(&output->view);
+        return -1;
+    }
 
-    self->h = (uint32_t)seed;
+    if (output->view.len < size) {
+        PyErr_Format(PyExc_ValueError,
+                     "output buffer is too small (%zd bytes given, "
+                     "%zd bytes required)",
+                     output->view.len, size);
+        PyBuffer_Release(&output->view);
+        return -1;
+    }
 
-    if (target_buf.buf != NULL) {
-        // target_buf will be released in update32_impl
-        update32_impl(self, &target_buf);
+    // The results are written as 32-bit or 64-bit words, so a buffer of
+    // bytes at an unaligned address, e.g., a slice of a memoryview, gets
+    // them through an aligned temporary buffer.
+    const Py_ssize_t align =
+        typecode == 0 ? 8 : mmh3_typecode_itemsize(typecode);
+    if ((uintptr_t)output->view.buf % align != 0) {
+        output->tmp = PyMem_Malloc(size > 0 ? size : 1);
+        if (output->tmp == NULL) {
+            PyBuffer_Release(&output->view);
+            PyErr_NoMemory();
+            return -1;
+        }
     }
 
+    output->out = out;
+    output->has_view = 1;
+    output->buf = output->tmp != NULL ? output->tmp : output->view.buf;
     return 0;
 }
 
-PyDoc_STRVAR(
-    MMH3Hasher_update_doc,
-    "update(data)\n"
-    "\n"
-    "Update this hash object's state with the provided bytes-like object.\n"
-    "\n"
-    "Args:\n"
-    "    data (Buffer): The buffer to hash.\n");
+static void
+mmh3_output_abort(MMH3Output *output)
+{
+    if (output->has_view) {
+        PyBuffer_Release(&output->view);
+        output->has_view = 0;
+    }
+    PyMem_Free(output->tmp);
+    output->tmp = NULL;
+    output->out = NULL;
+    Py_CLEAR(output->result);
+}
 
+/*
+ * Finish an output and return the object to be returned to the caller:
+ * out if given, or the new bytes or array.array object otherwise.
+ */
 static PyObject *
-MMH3Hasher32_update(MMH3Hasher32 *self, PyObject *obj)
+mmh3_output_finish(MMH3Output *output)
 {
-    Py_buffer buf;
+    if (output->tmp != NULL) {
+        memcpy(output->view.buf, output->tmp, output->size);
+        PyMem_Free(output->tmp);
+    }
 
-    GET_BUFFER_VIEW_OR_ERROUT(obj, &buf);
+    if (output->has_view) {
+        PyBuffer_Release(&output->view);
+    }
 
-    // buf will be released in update32_impl
-    update32_impl(self, &buf);
+    if (output->out != NULL) {
+        return Py_NewRef(output->out);
+    }
 
-    Py_RETURN_NONE;
+    return output->result;
 }
 
-static FORCE_INLINE uint32_t
-digest32_impl(uint32_t h, uint64_t k1, Py_ssize_t length)
+/*
+ * Convert obj to a non-negative Py_ssize_t stored in value. name is used
+ * in error messages. Returns 0 on success and -1 with an exception set on
+ * failure.
+ */
+static int
+mmh3_parse_nonnegative_ssize(PyObject *obj, const char *name,
+                             Py_ssize_t *value)
 {
-    h ^= mixK1(k1);
-    h ^= length;
-    h = fmix32(h);
-    return h;
-}
+    if (!PyLong_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "'%s' object cannot be interpreted as an integer",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
 
-PyDoc_STRVAR(MMH3Hasher_digest_doc,
-             "digest() -> bytes\n"
-             "\n"
-             "Return the digest value as a ``bytes`` object.\n"
-             "\n"
-             "Returns:\n"
-             "    bytes: The digest value.\n");
+    *value = PyLong_AsSsize_t(obj);
+    if (*value == -1 && PyErr_Occurred()) {
+        if (PyErr_ExceptionMatches(PyExc_OverflowError)) {
+            PyErr_Format(PyExc_ValueError, "%s is out of range", name);
+        }
+        return -1;
+    }
 
-static PyObject *
-MMH3Hasher32_digest(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
+    if (*value < 0) {
+        PyErr_Format(PyExc_ValueError, "%s must be non-negative", name);
+        return -1;
+    }
+
+    return 0;
+}
+
+/*
+ * Convert obj to the number of threads stored in threads. Returns 0 on
+ * success and -1 with an exception set on failure.
+ */
+static int
+mmh3_parse_threads(PyObject *obj, int *threads)
 {
-    MMH3_HASHER_LOCK(self);
-    uint32_t h = digest32_impl(self->h, self->buffer, self->length);
-    MMH3_HASHER_UNLOCK(self);
+    if (!PyLong_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "'%s' object cannot be interpreted as an integer",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
 
-    char out[MMH3_32_DIGESTSIZE];
+    int overflow;
+    long value = PyLong_AsLongAndOverflow(obj, &overflow);
+    if (value == -1 && PyErr_Occurred()) {
+        return -1;
+    }
 
-#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
-    ((uint32_t *)out)[0] = bswap_32(h);
-#else
-    ((uint32_t *)out)[0] = h;
-#endif
+    if (overflow < 0 || value < 1) {
+        PyErr_SetString(PyExc_ValueError,
+                        "threads must be a positive integer");
+        return -1;
+    }
 
-    return PyBytes_FromStringAndSize(out, MMH3_32_DIGESTSIZE);
+    *threads = (overflow > 0 || value > INT_MAX) ? INT_MAX : (int)value;
+    return 0;
 }
 
-PyDoc_STRVAR(MMH3Hasher_sintdigest_doc,
-             "sintdigest() -> int\n"
-             "\n"
-             "Return the digest value as a signed integer.\n"
-             "\n"
-             "Returns:\n"
-             "    int: The digest value as a signed integer.\n");
-
-static PyObject *
-MMH3Hasher32_sintdigest(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
-{
-    MMH3_HASHER_LOCK(self);
-    uint32_t h = digest32_impl(self->h, self->buffer, self->length);
-    MMH3_HASHER_UNLOCK(self);
+//-----------------------------------------------------------------------------
+// Parallel execution of batch functions
 
-    // Note that simple casting ("(int32_t) h") is an undefined behavior
-    int32_t result = *(int32_t *)&h;
+// A worker thread is assigned at least MMH3_PARALLEL_MIN_ITEMS items or
+// MMH3_PARALLEL_MIN_SIZE bytes. Smaller chunks do not pay off the cost of
+// starting a thread.
+#define MMH3_PARALLEL_MIN_ITEMS 4096
+#define MMH3_PARALLEL_MIN_SIZE 65536
 
-    return PyLong_FromLong(result);
-}
+// A function that processes the items in [start, stop) of a batch described
+// by arg. It is called without the GIL and must not touch any Python object.
+typedef void (*mmh3_range_func)(const void *arg, Py_ssize_t start,
+                                Py_ssize_t stop);
 
-PyDoc_STRVAR(MMH3Hasher_uintdigest_doc,
-             "uintdigest() -> int\n"
-             "\n"
-             "Return the digest value as an unsigned integer.\n"
-             "\n"
-             "Returns:\n"
-             "    int: The digest value as an unsigned integer.\n");
+typedef struct {
+    mmh3_range_func func;
+    const void *arg;
+    Py_ssize_t start;
+    Py_ssize_t stop;
+    PyThread_type_lock done;  // held until the worker finishes
+} MMH3ParallelTask;
 
-static PyObject *
-MMH3Hasher32_uintdigest(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
+static void
+mmh3_parallel_worker(void *task_arg)
 {
-    MMH3_HASHER_LOCK(self);
-    uint32_t h = digest32_impl(self->h, self->buffer, self->length);
-    MMH3_HASHER_UNLOCK(self);
+    MMH3ParallelTask *task = (MMH3ParallelTask *)task_arg;
 
-    return PyLong_FromUnsignedLong(h);
+    task->func(task->arg, task->start, task->stop);
+    PyThread_release_lock(task->done);
 }
 
-PyDoc_STRVAR(MMH3Hasher32_copy_doc,
-             "copy() -> mmh3_32\n"
-             "\n"
-             "Return a copy of the hash object..\n"
-             "\n"
-             "Returns:\n"
-             "    mmh3_32: A copy of this hash object.\n");
-
-static PyObject *
-MMH3Hasher32_copy(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
+/*
+ * Process the n items of a batch, size bytes in total, by func with at most
+ * threads threads including the calling thread. The GIL is released unless
+ * the batch is small. A chunk that cannot be handed to a new thread is
+ * processed by the calling thread. Returns 0 on success and -1 with an
+ * exception set on failure.
+ */
+static int
+mmh3_run_parallel(mmh3_range_func func, const void *arg, Py_ssize_t n,
+                  Py_ssize_t size, int threads)
 {
-    MMH3Hasher32 *p;
+    Py_ssize_t n_tasks = n / MMH3_PARALLEL_MIN_ITEMS;
+    if (n_tasks < size / MMH3_PARALLEL_MIN_SIZE) {
+        n_tasks = size / MMH3_PARALLEL_MIN_SIZE;
+    }
+    if (n_tasks > n) {
+        n_tasks = n;
+    }
+    if (n_tasks > threads) {
+        n_tasks = threads;
+    }
 
-    if ((p = PyObject_New(MMH3Hasher32, &MMH3Hasher32Type)) == NULL) {
-        return NULL;
+    if (n_tasks <= 1) {
+        if (size >= HASHLIB_GIL_MINSIZE) {
+            /* clang-format off */
+            Py_BEGIN_ALLOW_THREADS
+            func(arg, 0, n);
+            Py_END_ALLOW_THREADS
+            /* clang-format on */
+        }
+        else {
+            func(arg, 0, n);
+        }
+        return 0;
     }
 
-    MMH3_HASHER_LOCK(self);
-    p->h = self->h;
-    p->buffer = self->buffer;
-    p->shift = self->shift;
-    p->length = self->length;
-    MMH3_HASHER_INIT_MUTEX(p);
-    MMH3_HASHER_UNLOCK(self);
+    MMH3ParallelTask *tasks = PyMem_New(MMH3ParallelTask, n_tasks);
+    if (tasks == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
 
-    return (PyObject *)p;
-}
+    for (Py_ssize_t t = 0; t < n_tasks; t++) {
+        tasks[t].func = func;
+        tasks[t].arg = arg;
+        tasks[t].start = n * t / n_tasks;
+        tasks[t].stop = n * (t + 1) / n_tasks;
+        tasks[t].done = NULL;
 
-static PyMethodDef MMH3Hasher32_methods[] = {
+        // The first chunk is always processed by the calling thread.
+        if (t == 0) {
+            continue;
+        }
+
+        PyThread_type_lock done = PyThread_allocate_lock();
+        if (done == NULL) {
+            continue;
+        }
+        PyThread_acquire_lock(done, 1);
+        tasks[t].done = done;
+
+        if (PyThread_start_new_thread(mmh3_parallel_worker, &tasks[t]) ==
+            PYTHREAD_INVALID_THREAD_ID) {
+            PyThread_release_lock(done);
+            PyThread_free_lock(done);
+            tasks[t].done = NULL;
+        }
+    }
+
+    // Process the chunks left to the calling thread and wait for the others.
+    /* clang-format off */
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t t = 0; t < n_tasks; t++) {
+        if (tasks[t].done == NULL) {
+            func(arg, tasks[t].start, tasks[t].stop);
+        }
+        else {
+            PyThread_acquire_lock(tasks[t].done, 1);
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    for (Py_ssize_t t = 0; t < n_tasks; t++) {
+        if (tasks[t].done != NULL) {
+            PyThread_release_lock(tasks[t].done);
+            PyThread_free_lock(tasks[t].done);
+        }
+    }
+    /* clang-format on */
+    PyMem_Free(tasks);
+
+    return 0;
+}
+
+// Arguments of the batch functions for hash_many() and its variants
+typedef struct {
+    const char *const *keys;
+    const Py_ssize_t *lens;
+    uint32_t seed;
+    char *out;
+    const uint32_t *seeds;  // seed of each key, or NULL to use seed for all
+} MMH3BatchArgs;
+
+static void
+mmh3_x86_32_batch(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3BatchArgs *a = (const MMH3BatchArgs *)arg;
+
+    if (a->seeds != NULL) {
+        uint32_t *out = (uint32_t *)a->out;
+        for (Py_ssize_t i = start; i < stop; i++) {
+            murmurhash3_x86_32(a->keys[i], a->lens[i], a->seeds[i], &out[i]);
+        }
+        return;
+    }
+
+    murmurhash3_x86_32_many(a->keys + start, a->lens + start, stop - start,
+                            a->seed, (uint32_t *)a->out + start);
+}
+
+static void
+mmh3_x64_128_batch(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3BatchArgs *a = (const MMH3BatchArgs *)arg;
+    uint64_t *out = (uint64_t *)a->out;
+
+    for (Py_ssize_t i = start; i < stop; i++) {
+        const uint32_t seed = a->seeds != NULL ? a->seeds[i] : a->seed;
+        murmurhash3_x64_128(a->keys[i], a->lens[i], seed, &out[i * 2]);
+    }
+}
+
+static void
+mmh3_x86_128_batch(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3BatchArgs *a = (const MMH3BatchArgs *)arg;
+    uint64_t *out = (uint64_t *)a->out;
+
+    for (Py_ssize_t i = start; i < stop; i++) {
+        const uint32_t seed = a->seeds != NULL ? a->seeds[i] : a->seed;
+        murmurhash3_x86_128(a->keys[i], a->lens[i], seed, &out[i * 2]);
+    }
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_many_doc,
+    "hash_many(keys, seed=0, signed=True, threads=1) -> array.array\n"
+    "\n"
+    "Return hashes of many keys as an array of 32-bit integers.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The result is the\n"
+    "same as ``[hash(key, seed, signed) for key in keys]``, but the keys\n"
+    "are hashed in a single call and the hashes are stored in a compact\n"
+    "typed array instead of a list of ``int`` objects.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The input data to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    signed (Any): If True, return signed integers (typecode ``'i'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'I'``).\n"
+    "    threads (int): The maximum number of threads to hash the keys in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    array.array: The hash values as 32-bit integers.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_many(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+               PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    MMH3KeyBatch batch;
+    MMH3Output output;
+    unsigned long seed = 0;
+    int is_signed = 1;
+    int threads = 1;
+
+    if ((nargs < 1) && kwnames == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (nargs > 4) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 4 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[1], seed);
+    }
+
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+    }
+
+    if (nargs >= 4) {
+        if (mmh3_parse_threads(args[3], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 4);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, NULL, batch.n * MMH3_32_DIGESTSIZE,
+                         is_signed == 1 ? 'i' : 'I') < 0) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {batch.keys, batch.lens, (uint32_t)seed,
+                                output.buf};
+    if (mmh3_run_parallel(mmh3_x86_32_batch, &batch_args, batch.n, batch.size,
+                          threads) < 0) {
+        mmh3_key_batch_release(&batch);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    mmh3_key_batch_release(&batch);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_hash64_many_doc,
+    "hash64_many(keys, seed=0, x64arch=True, signed=True, threads=1) -> "
+    "array.array\n"
+    "\n"
+    "Return hashes of many keys as an array of 64-bit integer pairs.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x{64, 86}_128 algorithm. The result\n"
+    "is a flat array of length ``2 * len(keys)``, where the items at\n"
+    "``2 * i`` and ``2 * i + 1`` are the tuple returned by\n"
+    "``hash64(keys[i], seed, x64arch, signed)``.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The input data to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    x64arch (Any): If True, use an algorithm optimized for 64-bit\n"
+    "        architecture. Otherwise, use one optimized for 32-bit\n"
+    "        architecture.\n"
+    "    signed (Any): If True, return signed integers (typecode ``'q'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'Q'``).\n"
+    "    threads (int): The maximum number of threads to hash the keys in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    array.array: The hash values as pairs of 64-bit integers.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash64_many(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                 PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    MMH3KeyBatch batch;
+    MMH3Output output;
+    unsigned long seed = 0;
+    int x64arch = 1;
+    int is_signed = 1;
+    int threads = 1;
+
+    if ((nargs < 1) && kwnames == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (nargs > 5) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 5 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[1], seed);
+    }
+
+    if (nargs >= 3) {
+        x64arch = PyObject_IsTrue(args[2]);
+    }
+
+    if (nargs >= 4) {
+        is_signed = PyObject_IsTrue(args[3]);
+    }
+
+    if (nargs >= 5) {
+        if (mmh3_parse_threads(args[4], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);
+            }
+            else if (strcmp(kwname, "x64arch") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "x64arch", 3);
+                x64arch = PyObject_IsTrue(args[nargs + i]);
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 4);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 5);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (batch.n > PY_SSIZE_T_MAX / MMH3_128_DIGESTSIZE) {
+        mmh3_key_batch_release(&batch);
+        return PyErr_NoMemory();
+    }
+
+    if (mmh3_output_init(&output, NULL, batch.n * MMH3_128_DIGESTSIZE,
+                         is_signed == 1 ? 'q' : 'Q') < 0) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {batch.keys, batch.lens, (uint32_t)seed,
+                                output.buf};
+    if (mmh3_run_parallel(
+            x64arch == 1 ? mmh3_x64_128_batch : mmh3_x86_128_batch,
+            &batch_args, batch.n, batch.size, threads) < 0) {
+        mmh3_key_batch_release(&batch);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    mmh3_key_batch_release(&batch);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_bytes_many_doc,
+    "hash_bytes_many(keys, seed=0, x64arch=True, threads=1) -> bytes\n"
+    "\n"
+    "Return 16-byte hashes of many keys concatenated into one ``bytes``.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x{64, 86}_128 algorithm. The result is\n"
+    "the same as ``b\"\".join(hash_bytes(key, seed, x64arch) for key in "
+    "keys)``.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The input data to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    x64arch (Any): If True, use an algorithm optimized for 64-bit\n"
+    "        architecture. Otherwise, use one optimized for 32-bit\n"
+    "        architecture.\n"
+    "    threads (int): The maximum number of threads to hash the keys in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    bytes: The hash values with a length of ``16 * len(keys)`` bytes.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_bytes_many(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                     PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    MMH3KeyBatch batch;
+    unsigned long seed = 0;
+    int x64arch = 1;
+    int threads = 1;
+
+    if ((nargs < 1) && kwnames == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (nargs > 4) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 4 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[1], seed);
+    }
+
+    if (nargs >= 3) {
+        x64arch = PyObject_IsTrue(args[2]);
+    }
+
+    if (nargs >= 4) {
+        if (mmh3_parse_threads(args[3], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);
+            }
+            else if (strcmp(kwname, "x64arch") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "x64arch", 3);
+                x64arch = PyObject_IsTrue(args[nargs + i]);
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 4);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (batch.n > PY_SSIZE_T_MAX / MMH3_128_DIGESTSIZE) {
+        mmh3_key_batch_release(&batch);
+        return PyErr_NoMemory();
+    }
+
+    PyObject *result =
+        PyBytes_FromStringAndSize(NULL, batch.n * MMH3_128_DIGESTSIZE);
+    if (result == NULL) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    uint64_t *out = (uint64_t *)PyBytes_AS_STRING(result);
+
+    MMH3BatchArgs batch_args = {batch.keys, batch.lens, (uint32_t)seed,
+                                (char *)out};
+    if (mmh3_run_parallel(
+            x64arch == 1 ? mmh3_x64_128_batch : mmh3_x86_128_batch,
+            &batch_args, batch.n, batch.size, threads) < 0) {
+        mmh3_key_batch_release(&batch);
+        Py_DECREF(result);
+        return NULL;
+    }
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    for (Py_ssize_t i = 0; i < batch.n * 2; i++) {
+        out[i] = bswap_64(out[i]);
+    }
+#endif
+
+    mmh3_key_batch_release(&batch);
+
+    return result;
+}
+
+/*
+ * Acquire a C-contiguous buffer of obj and compute the layout of its rows.
+ * A buffer with two or more dimensions is split along its first dimension,
+ * while a one-dimensional buffer is split into records of record_size
+ * bytes. Returns 0 on success and -1 with an exception set on failure.
+ */
+static int
+mmh3_get_rows(PyObject *obj, Py_buffer *view, Py_ssize_t record_size,
+              Py_ssize_t *n_rows, Py_ssize_t *row_size)
+{
+    if (PyUnicode_Check(obj)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "Strings must be encoded before hashing");
+        return -1;
+    }
+
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS) == -1) {
+        return -1;
+    }
+
+    if (view->ndim >= 2) {
+        *n_rows = view->shape[0];
+        *row_size = *n_rows > 0 ? view->len / *n_rows : 0;
+        if (record_size != 0 && record_size != *row_size) {
+            PyErr_Format(PyExc_ValueError,
+                         "record_size (%zd) does not match the row size of "
+                         "the buffer (%zd)",
+                         record_size, *row_size);
+            PyBuffer_Release(view);
+            return -1;
+        }
+        return 0;
+    }
+
+    if (record_size == 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "record_size is required for a buffer with fewer "
+                        "than two dimensions");
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    if (view->len % record_size != 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "buffer length (%zd) is not a multiple of record_size "
+                     "(%zd)",
+                     view->len, record_size);
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    *n_rows = view->len / record_size;
+    *row_size = record_size;
+    return 0;
+}
+
+// Arguments of the batch functions for mmh3_32_uintdigest_rows() and its
+// variants
+typedef struct {
+    const char *buf;
+    Py_ssize_t row_size;
+    uint32_t seed;
+    char *out;
+} MMH3RowsArgs;
+
+// The number of rows passed to the multi-lane kernel at once
+#define MMH3_ROWS_CHUNK 64
+
+static void
+mmh3_x86_32_rows(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3RowsArgs *a = (const MMH3RowsArgs *)arg;
+    const char *keys[MMH3_ROWS_CHUNK];
+    Py_ssize_t lens[MMH3_ROWS_CHUNK];
+    uint32_t result[MMH3_ROWS_CHUNK];
+
+    // Rows are hashed in chunks by the multi-lane kernel.
+    for (Py_ssize_t i = start; i < stop; i += MMH3_ROWS_CHUNK) {
+        Py_ssize_t n = stop - i < MMH3_ROWS_CHUNK ? stop - i : MMH3_ROWS_CHUNK;
+
+        for (Py_ssize_t j = 0; j < n; j++) {
+            keys[j] = a->buf + (i + j) * a->row_size;
+            lens[j] = a->row_size;
+        }
+
+        murmurhash3_x86_32_many(keys, lens, n, a->seed, result);
+        memcpy(a->out + i * MMH3_32_DIGESTSIZE, result,
+               n * MMH3_32_DIGESTSIZE);
+    }
+}
+
+static void
+mmh3_x64_128_rows(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3RowsArgs *a = (const MMH3RowsArgs *)arg;
+    uint64_t result[2];
+
+    for (Py_ssize_t i = start; i < stop; i++) {
+        murmurhash3_x64_128(a->buf + i * a->row_size, a->row_size, a->seed,
+                            result);
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+        result[0] = bswap_64(result[0]);
+        result[1] = bswap_64(result[1]);
+#endif
+        memcpy(a->out + i * MMH3_128_DIGESTSIZE, result, MMH3_128_DIGESTSIZE);
+    }
+}
+
+// nargs: Py_ssize_t
+// args: PyObject *const *
+// kwnames: PyObject *
+// key: PyObject *
+// seed: unsigned long
+// record_size: Py_ssize_t
+// out: PyObject *
+// threads: int
+#define MMH3_ROWS_PARSE_ARGS(nargs, args, kwnames, key, seed, record_size,   \
+                             out, threads)                                   \
+    if ((nargs < 1) && kwnames == NULL) {                                    \
+        PyErr_SetString(PyExc_TypeError,                                     \
+                        "function missing required argument 'key' (pos 1)"); \
+        return NULL;                                                         \
+    }                                                                        \
+    if (nargs > 5) {                                                         \
+        PyErr_Format(PyExc_TypeError,                                        \
+                     "function takes at most 5 arguments (%d given)",        \
+                     (int)nargs);                                            \
+        return NULL;                                                         \
+    }                                                                        \
+    if (nargs >= 1) {                                                        \
+        key = args[0];                                                       \
+    }                                                                        \
+    if (nargs >= 2) {                                                        \
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[1], seed);                      \
+    }                                                                        \
+    if (nargs >= 3) {                                                        \
+        if (mmh3_parse_nonnegative_ssize(args[2], "record_size",             \
+                                         &record_size) < 0) {                \
+            return NULL;                                                     \
+        }                                                                    \
+    }                                                                        \
+    if (nargs >= 4) {                                                        \
+        out = args[3];                                                       \
+    }                                                                        \
+    if (nargs >= 5) {                                                        \
+        if (mmh3_parse_threads(args[4], &threads) < 0) {                     \
+            return NULL;                                                     \
+        }                                                                    \
+    }                                                                        \
+    if (kwnames) {                                                           \
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {             \
+            const char *kwname =                                             \
+                PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));               \
+            if (strcmp(kwname, "key") == 0) {                                \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);         \
+                key = args[nargs + i];                                       \
+            }                                                                \
+            else if (strcmp(kwname, "seed") == 0) {                          \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);        \
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);      \
+            }                                                                \
+            else if (strcmp(kwname, "record_size") == 0) {                   \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "record_size", 3); \
+                if (mmh3_parse_nonnegative_ssize(                            \
+                        args[nargs + i], "record_size", &record_size) < 0) { \
+                    return NULL;                                             \
+                }                                                            \
+            }                                                                \
+            else if (strcmp(kwname, "out") == 0) {                           \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 4);         \
+                out = args[nargs + i];                                       \
+            }                                                                \
+            else if (strcmp(kwname, "threads") == 0) {                       \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 5);     \
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {     \
+                    return NULL;                                             \
+                }                                                            \
+            }                                                                \
+            else {                                                           \
+                PyErr_Format(                                                \
+                    PyExc_TypeError,                                         \
+                    "'%s' is an invalid keyword argument for this function", \
+                    kwname);                                                 \
+                return NULL;                                                 \
+            }                                                                \
+        }                                                                    \
+    }                                                                        \
+    if (key == NULL) {                                                       \
+        PyErr_SetString(PyExc_TypeError,                                     \
+                        "function missing required argument 'key' (pos 1)"); \
+        return NULL;                                                         \
+    }
+
+PyDoc_STRVAR(
+    mmh3_mmh3_32_uintdigest_rows_doc,
+    "mmh3_32_uintdigest_rows(key, seed=0, record_size=0, out=None, "
+    "threads=1) -> Buffer\n"
+    "\n"
+    "Return a hash for each row of the buffer as a 32-bit unsigned "
+    "integer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. A C-contiguous buffer\n"
+    "with two or more dimensions (e.g., a ``numpy`` array of the shape\n"
+    "``(n_rows, width)``) is split along its first dimension. A\n"
+    "one-dimensional buffer is split into records of ``record_size`` "
+    "bytes.\n"
+    "The hash of each row equals ``mmh3_32_uintdigest(row, seed)``.\n"
+    "\n"
+    "Args:\n"
+    "    key (Buffer): The C-contiguous buffer to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    record_size (int): The size of a row in bytes. Required for a\n"
+    "        one-dimensional buffer. If given for a buffer with two or more\n"
+    "        dimensions, it must match the size of the rows.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``4 * n_rows`` bytes to store the hashes in native byte order.\n"
+    "        If None, a new array is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the rows in\n"
+    "        parallel. Small buffers are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or otherwise a new ``array.array`` of\n"
+    "    the typecode ``'I'``.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_mmh3_32_uintdigest_rows(PyObject *self, PyObject *const *args,
+                             Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *key = NULL;
+    PyObject *out = NULL;
+    unsigned long seed = 0;
+    Py_ssize_t record_size = 0;
+    int threads = 1;
+    Py_buffer target_buf;
+    Py_ssize_t n_rows;
+    Py_ssize_t row_size;
+    MMH3Output output;
+
+    MMH3_ROWS_PARSE_ARGS(nargs, args, kwnames, key, seed, record_size, out,
+                         threads);
+
+    if (mmh3_get_rows(key, &target_buf, record_size, &n_rows, &row_size) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, n_rows * MMH3_32_DIGESTSIZE, 'I') < 0) {
+        PyBuffer_Release(&target_buf);
+        return NULL;
+    }
+
+    MMH3RowsArgs rows_args = {target_buf.buf, row_size, (uint32_t)seed,
+                              output.buf};
+    if (mmh3_run_parallel(mmh3_x86_32_rows, &rows_args, n_rows, target_buf.len,
+                          threads) < 0) {
+        PyBuffer_Release(&target_buf);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    PyBuffer_Release(&target_buf);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_mmh3_x64_128_digest_rows_doc,
+    "mmh3_x64_128_digest_rows(key, seed=0, record_size=0, out=None, "
+    "threads=1) -> Buffer\n"
+    "\n"
+    "Return a 16-byte hash for each row of the buffer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x64_128 algorithm. Rows are determined\n"
+    "in the same way as ``mmh3_32_uintdigest_rows()``. The hash of each\n"
+    "row equals ``mmh3_x64_128_digest(row, seed)``, and the hashes are\n"
+    "stored one after another.\n"
+    "\n"
+    "Args:\n"
+    "    key (Buffer): The C-contiguous buffer to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    record_size (int): The size of a row in bytes. Required for a\n"
+    "        one-dimensional buffer. If given for a buffer with two or more\n"
+    "        dimensions, it must match the size of the rows.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``16 * n_rows`` bytes to store the hashes. If None, a new\n"
+    "        ``bytes`` object is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the rows in\n"
+    "        parallel. Small buffers are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or otherwise a new ``bytes`` object with\n"
+    "    a length of ``16 * n_rows`` bytes.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_mmh3_x64_128_digest_rows(PyObject *self, PyObject *const *args,
+                              Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *key = NULL;
+    PyObject *out = NULL;
+    unsigned long seed = 0;
+    Py_ssize_t record_size = 0;
+    int threads = 1;
+    Py_buffer target_buf;
+    Py_ssize_t n_rows;
+    Py_ssize_t row_size;
+    MMH3Output output;
+
+    MMH3_ROWS_PARSE_ARGS(nargs, args, kwnames, key, seed, record_size, out,
+                         threads);
+
+    if (mmh3_get_rows(key, &target_buf, record_size, &n_rows, &row_size) < 0) {
+        return NULL;
+    }
+
+    if (n_rows > PY_SSIZE_T_MAX / MMH3_128_DIGESTSIZE) {
+        PyBuffer_Release(&target_buf);
+        return PyErr_NoMemory();
+    }
+
+    if (mmh3_output_init(&output, out, n_rows * MMH3_128_DIGESTSIZE, 0) < 0) {
+        PyBuffer_Release(&target_buf);
+        return NULL;
+    }
+
+    MMH3RowsArgs rows_args = {target_buf.buf, row_size, (uint32_t)seed,
+                              output.buf};
+    if (mmh3_run_parallel(mmh3_x64_128_rows, &rows_args, n_rows,
+                          target_buf.len, threads) < 0) {
+        PyBuffer_Release(&target_buf);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    PyBuffer_Release(&target_buf);
+
+    return mmh3_output_finish(&output);
+}
+
+/*
+ * Acquire a C-contiguous buffer of native integers from obj, such as
+ * array.array('q') or a numpy array of int64, and store whether the
+ * integers are signed in is_signed. name is used in error messages.
+ * Returns 0 on success and -1 with an exception set on failure.
+ */
+static int
+mmh3_get_index_buffer(PyObject *obj, const char *name, Py_buffer *view,
+                      int *is_signed)
+{
+    const char *format = NULL;
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    const char native_order = '>';
+#else
+    const char native_order = '<';
+#endif
+
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ==
+        -1) {
+        return -1;
+    }
+
+    format = view->format != NULL ? view->format : "B";
+    if (*format == '@' || *format == '=' || *format == native_order) {
+        format++;
+    }
+
+    if (format[0] == '\0' || format[1] != '\0' ||
+        strchr("bBhHiIlLqQnN", format[0]) == NULL ||
+        (view->itemsize != 1 && view->itemsize != 2 && view->itemsize != 4 &&
+         view->itemsize != 8)) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s must be a buffer of native integers, not a buffer "
+                     "of format '%s'",
+                     name, view->format != NULL ? view->format : "B");
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    *is_signed = Py_ISLOWER(format[0]);
+    return 0;
+}
+
+/*
+ * Return the i-th item of a buffer acquired by mmh3_get_index_buffer() if it
+ * is a non-negative integer that fits in int64_t, or -1 otherwise.
+ */
+static FORCE_INLINE int64_t
+mmh3_read_nonnegative(const Py_buffer *view, int is_signed, Py_ssize_t i)
+{
+    const char *p = (const char *)view->buf + i * view->itemsize;
+    int64_t svalue = 0;
+    uint64_t uvalue = 0;
+
+    switch (view->itemsize) {
+        case 1:
+            svalue = is_signed ? *(const int8_t *)p : *(const uint8_t *)p;
+            break;
+        case 2: {
+            uint16_t v;
+            memcpy(&v, p, 2);
+            svalue = is_signed ? (int16_t)v : v;
+            break;
+        }
+        case 4: {
+            uint32_t v;
+            memcpy(&v, p, 4);
+            svalue = is_signed ? (int64_t)(int32_t)v : (int64_t)v;
+            break;
+        }
+        default:
+            memcpy(&uvalue, p, 8);
+            if (!is_signed && uvalue > INT64_MAX) {
+                return -1;
+            }
+            svalue = (int64_t)uvalue;
+            break;
+    }
+
+    return svalue < 0 ? -1 : svalue;
+}
+
+/*
+ * Return the i-th item of a buffer acquired by mmh3_get_index_buffer() if it
+ * is a non-negative integer that fits in Py_ssize_t, or -1 otherwise.
+ */
+static FORCE_INLINE Py_ssize_t
+mmh3_read_index(const Py_buffer *view, int is_signed, Py_ssize_t i)
+{
+    const int64_t value = mmh3_read_nonnegative(view, is_signed, i);
+
+    if (value > PY_SSIZE_T_MAX) {
+        return -1;
+    }
+    return (Py_ssize_t)value;
+}
+
+/*
+ * Gather the spans of buf given by offsets and lengths into batch. If
+ * lengths is NULL or None, offsets must hold (offset, length) pairs, either
+ * as a buffer of the shape (n, 2) or as a flat buffer. Every span is
+ * checked to lie within buf. Returns 0 on success and -1 with an exception
+ * set on failure.
+ */
+static int
+mmh3_span_batch_init(MMH3KeyBatch *batch, const Py_buffer *buf,
+                     PyObject *offsets, PyObject *lengths)
+{
+    Py_buffer offsets_buf;
+    Py_buffer lengths_buf;
+    int offsets_signed = 0;
+    int lengths_signed = 0;
+    int has_lengths = lengths != NULL && lengths != Py_None;
+    Py_ssize_t n_offsets = 0;
+
+    batch->seq = NULL;
+    batch->arena = NULL;
+    batch->keys = NULL;
+    batch->lens = NULL;
+    batch->n = 0;
+    batch->size = 0;
+
+    if (mmh3_get_index_buffer(offsets, "offsets", &offsets_buf,
+                              &offsets_signed) < 0) {
+        return -1;
+    }
+    n_offsets = offsets_buf.len / offsets_buf.itemsize;
+
+    if (has_lengths) {
+        if (mmh3_get_index_buffer(lengths, "lengths", &lengths_buf,
+                                  &lengths_signed) < 0) {
+            PyBuffer_Release(&offsets_buf);
+            return -1;
+        }
+        if (lengths_buf.len / lengths_buf.itemsize != n_offsets) {
+            PyErr_Format(PyExc_ValueError,
+                         "offsets and lengths must have the same number of "
+                         "items (%zd and %zd given)",
+                         n_offsets, lengths_buf.len / lengths_buf.itemsize);
+            goto error;
+        }
+        batch->n = n_offsets;
+    }
+    else {
+        if ((offsets_buf.ndim >= 2 &&
+             offsets_buf.shape[offsets_buf.ndim - 1] != 2) ||
+            n_offsets % 2 != 0) {
+            PyErr_SetString(PyExc_ValueError,
+                            "offsets must hold (offset, length) pairs if "
+                            "lengths is not given");
+            goto error;
+        }
+        batch->n = n_offsets / 2;
+    }
+
+    batch->keys = PyMem_New(const char *, batch->n);
+    batch->lens = PyMem_New(Py_ssize_t, batch->n);
+    if (batch->keys == NULL || batch->lens == NULL) {
+        PyErr_NoMemory();
+        goto error;
+    }
+
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        Py_ssize_t offset = 0;
+        Py_ssize_t length = 0;
+
+        if (has_lengths) {
+            offset = mmh3_read_index(&offsets_buf, offsets_signed, i);
+            length = mmh3_read_index(&lengths_buf, lengths_signed, i);
+        }
+        else {
+            offset = mmh3_read_index(&offsets_buf, offsets_signed, i * 2);
+            length = mmh3_read_index(&offsets_buf, offsets_signed, i * 2 + 1);
+        }
+
+        if (offset < 0 || length < 0 || offset > buf->len ||
+            length > buf->len - offset) {
+            PyErr_Format(PyExc_ValueError,
+                         "span %zd is out of range of the buffer (%zd bytes)",
+                         i, buf->len);
+            goto error;
+        }
+
+        batch->keys[i] = (const char *)buf->buf + offset;
+        batch->lens[i] = length;
+        batch->size += length;
+    }
+
+    PyBuffer_Release(&offsets_buf);
+    if (has_lengths) {
+        PyBuffer_Release(&lengths_buf);
+    }
+    return 0;
+
+error:
+    PyBuffer_Release(&offsets_buf);
+    if (has_lengths) {
+        PyBuffer_Release(&lengths_buf);
+    }
+    mmh3_key_batch_release(batch);
+    return -1;
+}
+
+// nargs: Py_ssize_t
+// args: PyObject *const *
+// kwnames: PyObject *
+// key: PyObject *
+// offsets: PyObject *
+// lengths: PyObject *
+// seed: unsigned long
+// out: PyObject *
+// threads: int
+#define MMH3_SPANS_PARSE_ARGS(nargs, args, kwnames, key, offsets, lengths,   \
+                              seed, out, threads)                            \
+    if (nargs > 6) {                                                         \
+        PyErr_Format(PyExc_TypeError,                                        \
+                     "function takes at most 6 arguments (%d given)",        \
+                     (int)nargs);                                            \
+        return NULL;                                                         \
+    }                                                                        \
+    if (nargs >= 1) {                                                        \
+        key = args[0];                                                       \
+    }                                                                        \
+    if (nargs >= 2) {                                                        \
+        offsets = args[1];                                                   \
+    }                                                                        \
+    if (nargs >= 3) {                                                        \
+        lengths = args[2];                                                   \
+    }                                                                        \
+    if (nargs >= 4) {                                                        \
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[3], seed);                      \
+    }                                                                        \
+    if (nargs >= 5) {                                                        \
+        out = args[4];                                                       \
+    }                                                                        \
+    if (nargs >= 6) {                                                        \
+        if (mmh3_parse_threads(args[5], &threads) < 0) {                     \
+            return NULL;                                                     \
+        }                                                                    \
+    }                                                                        \
+    if (kwnames) {                                                           \
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {             \
+            const char *kwname =                                             \
+                PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));               \
+            if (strcmp(kwname, "key") == 0) {                                \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);         \
+                key = args[nargs + i];                                       \
+            }                                                                \
+            else if (strcmp(kwname, "offsets") == 0) {                       \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "offsets", 2);     \
+                offsets = args[nargs + i];                                   \
+            }                                                                \
+            else if (strcmp(kwname, "lengths") == 0) {                       \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "lengths", 3);     \
+                lengths = args[nargs + i];                                   \
+            }                                                                \
+            else if (strcmp(kwname, "seed") == 0) {                          \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 4);        \
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);      \
+            }                                                                \
+            else if (strcmp(kwname, "out") == 0) {                           \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 5);         \
+                out = args[nargs + i];                                       \
+            }                                                                \
+            else if (strcmp(kwname, "threads") == 0) {                       \
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 6);     \
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {     \
+                    return NULL;                                             \
+                }                                                            \
+            }                                                                \
+            else {                                                           \
+                PyErr_Format(                                                \
+                    PyExc_TypeError,                                         \
+                    "'%s' is an invalid keyword argument for this function", \
+                    kwname);                                                 \
+                return NULL;                                                 \
+            }                                                                \
+        }                                                                    \
+    }                                                                        \
+    if (key == NULL) {                                                       \
+        PyErr_SetString(PyExc_TypeError,                                     \
+                        "function missing required argument 'key' (pos 1)"); \
+        return NULL;                                                         \
+    }                                                                        \
+    if (offsets == NULL) {                                                   \
+        PyErr_SetString(                                                     \
+            PyExc_TypeError,                                                 \
+            "function missing required argument 'offsets' (pos 2)");         \
+        return NULL;                                                         \
+    }
+
+PyDoc_STRVAR(
+    mmh3_mmh3_32_uintdigest_spans_doc,
+    "mmh3_32_uintdigest_spans(key, offsets, lengths=None, seed=0, out=None, "
+    "threads=1) -> Buffer\n"
+    "\n"
+    "Return a hash for each span of the buffer as a 32-bit unsigned "
+    "integer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The hash of the span\n"
+    "at ``offset`` with ``length`` bytes equals\n"
+    "``mmh3_32_uintdigest(key[offset:offset + length], seed)``, but no\n"
+    "span is copied.\n"
+    "\n"
+    "Args:\n"
+    "    key (Buffer): The C-contiguous buffer that contains the spans.\n"
+    "    offsets (Buffer): A C-contiguous buffer of native integers, such\n"
+    "        as ``array.array('q')``, with the start offset of each span in\n"
+    "        bytes. If ``lengths`` is None, it must instead hold\n"
+    "        ``(offset, length)`` pairs, as a flat buffer or a buffer of the\n"
+    "        shape ``(n_spans, 2)``.\n"
+    "    lengths (Buffer | None): A C-contiguous buffer of native integers\n"
+    "        with the length of each span in bytes.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``4 * n_spans`` bytes to store the hashes in native byte order.\n"
+    "        If None, a new array is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the spans in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or otherwise a new ``array.array`` of\n"
+    "    the typecode ``'I'``.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_mmh3_32_uintdigest_spans(PyObject *self, PyObject *const *args,
+                              Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *key = NULL;
+    PyObject *offsets = NULL;
+    PyObject *lengths = NULL;
+    PyObject *out = NULL;
+    unsigned long seed = 0;
+    int threads = 1;
+    Py_buffer target_buf;
+    MMH3KeyBatch batch;
+    MMH3Output output;
+
+    MMH3_SPANS_PARSE_ARGS(nargs, args, kwnames, key, offsets, lengths, seed,
+                          out, threads);
+
+    GET_BUFFER_VIEW_OR_ERROUT(key, &target_buf);
+
+    if (mmh3_span_batch_init(&batch, &target_buf, offsets, lengths) < 0) {
+        PyBuffer_Release(&target_buf);
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, batch.n * MMH3_32_DIGESTSIZE, 'I') <
+        0) {
+        mmh3_key_batch_release(&batch);
+        PyBuffer_Release(&target_buf);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {batch.keys, batch.lens, (uint32_t)seed,
+                                output.buf};
+    if (mmh3_run_parallel(mmh3_x86_32_batch, &batch_args, batch.n, batch.size,
+                          threads) < 0) {
+        mmh3_key_batch_release(&batch);
+        PyBuffer_Release(&target_buf);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    mmh3_key_batch_release(&batch);
+    PyBuffer_Release(&target_buf);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_mmh3_x64_128_digest_spans_doc,
+    "mmh3_x64_128_digest_spans(key, offsets, lengths=None, seed=0, "
+    "out=None, threads=1) -> Buffer\n"
+    "\n"
+    "Return a 16-byte hash for each span of the buffer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x64_128 algorithm. Spans are given in\n"
+    "the same way as ``mmh3_32_uintdigest_spans()``. The hash of each span\n"
+    "equals ``mmh3_x64_128_digest(key[offset:offset + length], seed)``,\n"
+    "and the hashes are stored one after another.\n"
+    "\n"
+    "Args:\n"
+    "    key (Buffer): The C-contiguous buffer that contains the spans.\n"
+    "    offsets (Buffer): A C-contiguous buffer of native integers with\n"
+    "        the start offset of each span in bytes, or with\n"
+    "        ``(offset, length)`` pairs if ``lengths`` is None.\n"
+    "    lengths (Buffer | None): A C-contiguous buffer of native integers\n"
+    "        with the length of each span in bytes.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``16 * n_spans`` bytes to store the hashes. If None, a new\n"
+    "        ``bytes`` object is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the spans in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or otherwise a new ``bytes`` object with\n"
+    "    a length of ``16 * n_spans`` bytes.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_mmh3_x64_128_digest_spans(PyObject *self, PyObject *const *args,
+                               Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *key = NULL;
+    PyObject *offsets = NULL;
+    PyObject *lengths = NULL;
+    PyObject *out = NULL;
+    unsigned long seed = 0;
+    int threads = 1;
+    Py_buffer target_buf;
+    MMH3KeyBatch batch;
+    MMH3Output output;
+
+    MMH3_SPANS_PARSE_ARGS(nargs, args, kwnames, key, offsets, lengths, seed,
+                          out, threads);
+
+    GET_BUFFER_VIEW_OR_ERROUT(key, &target_buf);
+
+    if (mmh3_span_batch_init(&batch, &target_buf, offsets, lengths) < 0) {
+        PyBuffer_Release(&target_buf);
+        return NULL;
+    }
+
+    if (batch.n > PY_SSIZE_T_MAX / MMH3_128_DIGESTSIZE) {
+        mmh3_key_batch_release(&batch);
+        PyBuffer_Release(&target_buf);
+        return PyErr_NoMemory();
+    }
+
+    if (mmh3_output_init(&output, out, batch.n * MMH3_128_DIGESTSIZE, 0) < 0) {
+        mmh3_key_batch_release(&batch);
+        PyBuffer_Release(&target_buf);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {batch.keys, batch.lens, (uint32_t)seed,
+                                output.buf};
+    if (mmh3_run_parallel(mmh3_x64_128_batch, &batch_args, batch.n, batch.size,
+                          threads) < 0) {
+        mmh3_key_batch_release(&batch);
+        PyBuffer_Release(&target_buf);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    uint64_t *hashes = (uint64_t *)output.buf;
+    for (Py_ssize_t i = 0; i < batch.n * 2; i++) {
+        hashes[i] = bswap_64(hashes[i]);
+    }
+#endif
+
+    mmh3_key_batch_release(&batch);
+    PyBuffer_Release(&target_buf);
+
+    return mmh3_output_finish(&output);
+}
+
+//-----------------------------------------------------------------------------
+// Functions that write a digest into a buffer
+
+/*
+ * Acquire a writable buffer of out and locate size bytes at offset in it.
+ * offset may be NULL, meaning 0. Returns a pointer to the destination on
+ * success, in which case view must be released by the caller, and NULL with
+ * an exception set on failure.
+ */
+static char *
+mmh3_get_digest_dest(PyObject *out, PyObject *offset, Py_ssize_t size,
+                     Py_buffer *view)
+{
+    Py_ssize_t pos = 0;
+
+    if (offset != NULL &&
+        mmh3_parse_nonnegative_ssize(offset, "offset", &pos) == -1) {
+        return NULL;
+    }
+
+    if (PyObject_GetBuffer(out, view, PyBUF_WRITABLE) == -1) {
+        return NULL;
+    }
+
+    if (pos > view->len - size) {
+        PyErr_Format(PyExc_ValueError,
+                     "output buffer is too small for a %zd-byte digest at "
+                     "offset %zd (%zd bytes given)",
+                     size, pos, view->len);
+        PyBuffer_Release(view);
+        return NULL;
+    }
+
+    return (char *)view->buf + pos;
+}
+
+/*
+ * Parse the arguments (key, out, offset=0, seed=0, /) of the functions
+ * below. Returns a pointer to the destination of a digest of size bytes on
+ * success, in which case key_view and out_view must be released by the
+ * caller, and NULL with an exception set on failure.
+ */
+static char *
+mmh3_digest_into_parse_args(PyObject *const *args, Py_ssize_t nargs,
+                            Py_ssize_t size, Py_buffer *key_view,
+                            Py_buffer *out_view, uint32_t *seed)
+{
+    char *dest = NULL;
+
+    if (nargs < 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at least 2 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs > 4) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 4 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    *seed = 0;
+    if (nargs == 4 && mmh3_parse_seed(args[3], seed) == -1) {
+        return NULL;
+    }
+
+    MMH3_GET_STRIDED_VIEW_OR_ERROR(args[0], key_view, return NULL);
+
+    dest = mmh3_get_digest_dest(args[1], nargs >= 3 ? args[2] : NULL, size,
+                                out_view);
+    if (dest == NULL) {
+        PyBuffer_Release(key_view);
+        return NULL;
+    }
+
+    return dest;
+}
+
+PyDoc_STRVAR(
+    mmh3_mmh3_32_digest_into_doc,
+    "mmh3_32_digest_into(key, out, offset=0, seed=0, /) -> None\n"
+    "\n"
+    "Write a 4-byte hash for the buffer into another buffer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The bytes written are\n"
+    "the same as those returned by ``mmh3_32_digest()``, but no new object\n"
+    "is created.\n"
+    "\n"
+    "Args:\n"
+    "    key (Buffer): The input buffer to hash.\n"
+    "    out (Buffer): The writable buffer to write the hash into.\n"
+    "    offset (int): The position in ``out`` at which the hash is written.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_mmh3_32_digest_into(PyObject *self, PyObject *const *args,
+                         Py_ssize_t nargs)
+{
+    Py_buffer key_buf;
+    Py_buffer out_buf;
+    uint32_t seed = 0;
+    uint32_t result[1];
+    char *dest = mmh3_digest_into_parse_args(args, nargs, MMH3_32_DIGESTSIZE,
+                                             &key_buf, &out_buf, &seed);
+
+    if (dest == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASH_MAYBE_ALLOW_THREADS(key_buf.len,
+                                  mmh3_x86_32_view(&key_buf, seed, result));
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result[0] = bswap_32(result[0]);
+#endif
+
+    memcpy(dest, result, MMH3_32_DIGESTSIZE);
+    PyBuffer_Release(&key_buf);
+    PyBuffer_Release(&out_buf);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    mmh3_mmh3_x64_128_digest_into_doc,
+    "mmh3_x64_128_digest_into(key, out, offset=0, seed=0, /) -> None\n"
+    "\n"
+    "Write a 16-byte hash for the buffer into another buffer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x64_128 algorithm. The bytes written are\n"
+    "the same as those returned by ``mmh3_x64_128_digest()``, but no new\n"
+    "object is created.\n"
+    "\n"
+    "Args:\n"
+    "    key (Buffer): The input buffer to hash.\n"
+    "    out (Buffer): The writable buffer to write the hash into.\n"
+    "    offset (int): The position in ``out`` at which the hash is written.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_mmh3_x64_128_digest_into(PyObject *self, PyObject *const *args,
+                              Py_ssize_t nargs)
+{
+    Py_buffer key_buf;
+    Py_buffer out_buf;
+    uint32_t seed = 0;
+    uint64_t result[2];
+    char *dest = mmh3_digest_into_parse_args(args, nargs, MMH3_128_DIGESTSIZE,
+                                             &key_buf, &out_buf, &seed);
+
+    if (dest == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASH_MAYBE_ALLOW_THREADS(key_buf.len,
+                                  mmh3_x64_128_view(&key_buf, seed, result));
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result[0] = bswap_64(result[0]);
+    result[1] = bswap_64(result[1]);
+#endif
+
+    memcpy(dest, result, MMH3_128_DIGESTSIZE);
+    PyBuffer_Release(&key_buf);
+    PyBuffer_Release(&out_buf);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    mmh3_mmh3_x86_128_digest_into_doc,
+    "mmh3_x86_128_digest_into(key, out, offset=0, seed=0, /) -> None\n"
+    "\n"
+    "Write a 16-byte hash for the buffer into another buffer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_128 algorithm. The bytes written are\n"
+    "the same as those returned by ``mmh3_x86_128_digest()``, but no new\n"
+    "object is created.\n"
+    "\n"
+    "Args:\n"
+    "    key (Buffer): The input buffer to hash.\n"
+    "    out (Buffer): The writable buffer to write the hash into.\n"
+    "    offset (int): The position in ``out`` at which the hash is written.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_mmh3_x86_128_digest_into(PyObject *self, PyObject *const *args,
+                              Py_ssize_t nargs)
+{
+    Py_buffer key_buf;
+    Py_buffer out_buf;
+    uint32_t seed = 0;
+    uint64_t result[2];
+    char *dest = mmh3_digest_into_parse_args(args, nargs, MMH3_128_DIGESTSIZE,
+                                             &key_buf, &out_buf, &seed);
+
+    if (dest == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASH_MAYBE_ALLOW_THREADS(key_buf.len,
+                                  mmh3_x86_128_view(&key_buf, seed, result));
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result[0] = bswap_64(result[0]);
+    result[1] = bswap_64(result[1]);
+#endif
+
+    memcpy(dest, result, MMH3_128_DIGESTSIZE);
+    PyBuffer_Release(&key_buf);
+    PyBuffer_Release(&out_buf);
+
+    Py_RETURN_NONE;
+}
+
+//-----------------------------------------------------------------------------
+// Functions for integer keys
+
+/*
+ * Return murmurhash3_x86_32 of the 8-byte little-endian representation of
+ * key, unrolled for the two blocks.
+ */
+static FORCE_INLINE uint32_t
+mmh3_hash_int64_impl(uint64_t key, uint32_t seed)
+{
+    const uint32_t c1 = 0xe6546b64;
+    uint32_t h1 = seed;
+
+    h1 ^= mixK1((uint32_t)key);
+    h1 = mixH1(h1, 0, 13, c1);
+    h1 ^= mixK1((uint32_t)(key >> 32));
+    h1 = mixH1(h1, 0, 13, c1);
+
+    h1 ^= 8;
+
+    return fmix32(h1);
+}
+
+static FORCE_INLINE uint64_t
+mmh3_bswap64(uint64_t x)
+{
+    return ((x & 0x00000000000000ffULL) << 56) |
+           ((x & 0x000000000000ff00ULL) << 40) |
+           ((x & 0x0000000000ff0000ULL) << 24) |
+           ((x & 0x00000000ff000000ULL) << 8) |
+           ((x & 0x000000ff00000000ULL) >> 8) |
+           ((x & 0x0000ff0000000000ULL) >> 24) |
+           ((x & 0x00ff000000000000ULL) >> 40) |
+           ((x & 0xff00000000000000ULL) >> 56);
+}
+
+/*
+ * Convert obj to a 64-bit integer stored in value. Both signed and unsigned
+ * 64-bit integers are accepted, i.e., integers in the range
+ * [-2**63, 2**64). name is used in error messages. Returns 0 on success and
+ * -1 with an exception set on failure.
+ */
+static int
+mmh3_parse_int64(PyObject *obj, const char *name, uint64_t *value)
+{
+    int overflow = 0;
+    long long svalue = 0;
+    unsigned long long uvalue = 0;
+
+    if (!PyLong_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "'%s' object cannot be interpreted as an integer",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    svalue = PyLong_AsLongLongAndOverflow(obj, &overflow);
+    if (svalue == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+
+    if (overflow == 0) {
+        *value = (uint64_t)svalue;
+        return 0;
+    }
+
+    if (overflow > 0) {
+        uvalue = PyLong_AsUnsignedLongLong(obj);
+        if (!(uvalue == (unsigned long long)-1 && PyErr_Occurred())) {
+            *value = (uint64_t)uvalue;
+            return 0;
+        }
+        if (!PyErr_ExceptionMatches(PyExc_OverflowError)) {
+            return -1;
+        }
+        PyErr_Clear();
+    }
+
+    PyErr_Format(PyExc_ValueError, "%s is out of range", name);
+    return -1;
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_int64_doc,
+    "hash_int64(key, seed=0, signed=True) -> int\n"
+    "\n"
+    "Return a hash of a 64-bit integer as a 32-bit integer.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm over the 8-byte\n"
+    "little-endian representation of the key, i.e., the result is the same\n"
+    "as ``hash(key.to_bytes(8, \"little\", signed=key < 0), seed, signed)``.\n"
+    "\n"
+    "Args:\n"
+    "    key (int): The integer to hash. Must be in the range\n"
+    "        [-2**63, 2**64), so that both signed and unsigned 64-bit\n"
+    "        integers are accepted.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    signed (Any): If True, return a signed integer. Otherwise, return\n"
+    "        an unsigned integer.\n"
+    "\n"
+    "Returns:\n"
+    "    int: The hash value as a 32-bit integer.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_int64(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    uint64_t key = 0;
+    uint32_t seed = 0;
+    uint32_t result = 0;
+    int is_signed = 1;
+
+    if (nargs > 3) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 3 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        target = args[0];
+    }
+
+    if (nargs >= 2 && mmh3_parse_seed(args[1], &seed) == -1) {
+        return NULL;
+    }
+
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_GET_SIZE(kwnames); i++) {
+            PyObject *kwname = PyTuple_GET_ITEM(kwnames, i);
+            if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_key)) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
+                target = args[nargs + i];
+            }
+            else if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_seed)) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                if (mmh3_parse_seed(args[nargs + i], &seed) == -1) {
+                    return NULL;
+                }
+            }
+            else if (MMH3_KWNAME_EQ(kwname, mmh3_kwname_signed)) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%U' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (target == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'key' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_parse_int64(target, "key", &key) == -1) {
+        return NULL;
+    }
+
+    result = mmh3_hash_int64_impl(key, seed);
+
+    if (is_signed == 1) {
+        return PyLong_FromLong((int32_t)result);
+    }
+    return PyLong_FromUnsignedLong(result);
+}
+
+// Arguments of the batch function for hash_int64_many()
+typedef struct {
+    const char *keys;  // 8-byte integers, possibly unaligned
+    int swap;          // whether the keys are in the non-native byte order
+    uint32_t seed;
+    char *out;
+} MMH3Int64Args;
+
+static void
+mmh3_hash_int64_batch(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3Int64Args *a = (const MMH3Int64Args *)arg;
+    uint32_t *out = (uint32_t *)a->out;
+
+    if (a->swap) {
+        for (Py_ssize_t i = start; i < stop; i++) {
+            uint64_t key;
+            memcpy(&key, a->keys + i * 8, 8);
+            out[i] = mmh3_hash_int64_impl(mmh3_bswap64(key), a->seed);
+        }
+        return;
+    }
+
+    for (Py_ssize_t i = start; i < stop; i++) {
+        uint64_t key;
+        memcpy(&key, a->keys + i * 8, 8);
+        out[i] = mmh3_hash_int64_impl(key, a->seed);
+    }
+}
+
+/*
+ * Acquire a C-contiguous buffer of 64-bit integers from obj. The byte
+ * order given in the format of the buffer is stored in swap, which is 1 if
+ * the integers are not in the native byte order. Returns 0 on success and -1
+ * with an exception set on failure.
+ */
+static int
+mmh3_get_int64_buffer(PyObject *obj, Py_buffer *view, int *swap)
+{
+    const char *format = NULL;
+    int big_endian = 0;
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    const int native_big_endian = 1;
+#else
+    const int native_big_endian = 0;
+#endif
+
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ==
+        -1) {
+        return -1;
+    }
+
+    format = view->format != NULL ? view->format : "B";
+    big_endian = native_big_endian;
+    if (*format == '<') {
+        big_endian = 0;
+        format++;
+    }
+    else if (*format == '>' || *format == '!') {
+        big_endian = 1;
+        format++;
+    }
+    else if (*format == '@' || *format == '=') {
+        format++;
+    }
+
+    if (view->itemsize != 8 || format[0] == '\0' || format[1] != '\0' ||
+        strchr("qQlLnN", format[0]) == NULL) {
+        PyErr_Format(PyExc_TypeError,
+                     "keys must be a buffer of 64-bit integers, not a buffer "
+                     "of format '%s'",
+                     view->format != NULL ? view->format : "B");
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    *swap = big_endian != native_big_endian;
+    return 0;
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_int64_many_doc,
+    "hash_int64_many(keys, seed=0, signed=True, out=None, threads=1) -> "
+    "Buffer\n"
+    "\n"
+    "Return hashes of many 64-bit integers as 32-bit integers.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The hash of each key\n"
+    "equals ``hash_int64(key, seed, signed)``.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Buffer): A C-contiguous buffer of 64-bit integers, such as\n"
+    "        ``array.array('q')`` or a ``numpy`` array of ``int64`` or\n"
+    "        ``uint64``. Signed and unsigned integers give the same hash\n"
+    "        for the same bit pattern.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    signed (Any): If True, return signed integers (typecode ``'i'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'I'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``4 * len(keys)`` bytes to store the hashes as native 32-bit\n"
+    "        integers. If None, a new ``array.array`` is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the keys in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_int64_many(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                     PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    PyObject *out = NULL;
+    unsigned long seed = 0;
+    int is_signed = 1;
+    int threads = 1;
+    int swap = 0;
+    Py_buffer keys_buf;
+    Py_ssize_t n = 0;
+    MMH3Output output;
+
+    if (nargs > 5) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 5 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[1], seed);
+    }
+
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        out = args[3];
+    }
+
+    if (nargs >= 5) {
+        if (mmh3_parse_threads(args[4], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 4);
+                out = args[nargs + i];
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 5);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_get_int64_buffer(keys, &keys_buf, &swap) < 0) {
+        return NULL;
+    }
+    n = keys_buf.len / 8;
+
+    if (mmh3_output_init(&output, out, n * MMH3_32_DIGESTSIZE,
+                         is_signed == 1 ? 'i' : 'I') < 0) {
+        PyBuffer_Release(&keys_buf);
+        return NULL;
+    }
+
+    MMH3Int64Args int64_args = {keys_buf.buf, swap, (uint32_t)seed,
+                                output.buf};
+    if (mmh3_run_parallel(mmh3_hash_int64_batch, &int64_args, n, keys_buf.len,
+                          threads) < 0) {
+        PyBuffer_Release(&keys_buf);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    PyBuffer_Release(&keys_buf);
+
+    return mmh3_output_finish(&output);
+}
+
+//-----------------------------------------------------------------------------
+// Functions for Arrow arrays
+
+/*
+ * Structures of the Arrow C data interface, copied from
+ * https://arrow.apache.org/docs/format/CDataInterface.html so that no
+ * Arrow library is required.
+ */
+#ifndef ARROW_C_DATA_INTERFACE
+#define ARROW_C_DATA_INTERFACE
+
+#define ARROW_FLAG_DICTIONARY_ORDERED 1
+#define ARROW_FLAG_NULLABLE 2
+#define ARROW_FLAG_MAP_KEYS_SORTED 4
+
+struct ArrowSchema {
+    // Array type description
+    const char *format;
+    const char *name;
+    const char *metadata;
+    int64_t flags;
+    int64_t n_children;
+    struct ArrowSchema **children;
+    struct ArrowSchema *dictionary;
+
+    // Release callback
+    void (*release)(struct ArrowSchema *);
+    // Opaque producer-specific data
+    void *private_data;
+};
+
+struct ArrowArray {
+    // Array data description
+    int64_t length;
+    int64_t null_count;
+    int64_t offset;
+    int64_t n_buffers;
+    int64_t n_children;
+    const void **buffers;
+    struct ArrowArray **children;
+    struct ArrowArray *dictionary;
+
+    // Release callback
+    void (*release)(struct ArrowArray *);
+    // Opaque producer-specific data
+    void *private_data;
+};
+
+#endif  // ARROW_C_DATA_INTERFACE
+
+// Keys of an Arrow array of strings or binaries. The keys point into the
+// data buffer of the array, which is kept alive by batch.seq.
+typedef struct {
+    MMH3KeyBatch batch;
+    const uint8_t *validity;  // NULL if no element is null
+    int64_t offset;
+} MMH3ArrowBatch;
+
+static FORCE_INLINE int
+mmh3_arrow_is_null(const MMH3ArrowBatch *arrow, Py_ssize_t i)
+{
+    int64_t j = arrow->offset + i;
+
+    return arrow->validity != NULL &&
+           !((arrow->validity[j >> 3] >> (j & 7)) & 1);
+}
+
+/*
+ * Gather the elements of obj, which must implement __arrow_c_array__ and
+ * export a utf8, large_utf8, binary, or large_binary array, into arrow.
+ * No element is copied. Null elements are given as empty keys, whose
+ * hashes must be overwritten by the caller. Returns 0 on success and -1
+ * with an exception set on failure.
+ */
+static int
+mmh3_arrow_batch_init(MMH3ArrowBatch *arrow, PyObject *obj)
+{
+    MMH3KeyBatch *batch = &arrow->batch;
+    PyObject *capsules = NULL;
+    struct ArrowSchema *schema = NULL;
+    struct ArrowArray *array = NULL;
+    const char *data = NULL;
+    const void *offsets = NULL;
+    int large = 0;
+
+    batch->seq = NULL;
+    batch->arena = NULL;
+    batch->keys = NULL;
+    batch->lens = NULL;
+    batch->n = 0;
+    batch->size = 0;
+    arrow->validity = NULL;
+    arrow->offset = 0;
+
+    if (!PyObject_HasAttrString(obj, "__arrow_c_array__")) {
+        PyErr_Format(PyExc_TypeError,
+                     "array must implement __arrow_c_array__, not '%s'",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    // The tuple holds the capsules, whose destructors release the exported
+    // structures when the batch is released.
+    capsules = PyObject_CallMethod(obj, "__arrow_c_array__", NULL);
+    if (capsules == NULL) {
+        return -1;
+    }
+    batch->seq = capsules;
+
+    if (!PyTuple_Check(capsules) || PyTuple_GET_SIZE(capsules) != 2) {
+        PyErr_SetString(PyExc_TypeError,
+                        "__arrow_c_array__ must return a tuple of two "
+                        "PyCapsule objects");
+        goto error;
+    }
+
+    schema = (struct ArrowSchema *)PyCapsule_GetPointer(
+        PyTuple_GET_ITEM(capsules, 0), "arrow_schema");
+    if (schema == NULL) {
+        goto error;
+    }
+    array = (struct ArrowArray *)PyCapsule_GetPointer(
+        PyTuple_GET_ITEM(capsules, 1), "arrow_array");
+    if (array == NULL) {
+        goto error;
+    }
+
+    if (schema->release == NULL || array->release == NULL) {
+        PyErr_SetString(PyExc_ValueError,
+                        "the Arrow array has already been released");
+        goto error;
+    }
+
+    if (strcmp(schema->format, "u") == 0 || strcmp(schema->format, "z") == 0) {
+        large = 0;
+    }
+    else if (strcmp(schema->format, "U") == 0 ||
+             strcmp(schema->format, "Z") == 0) {
+        large = 1;
+    }
+    else {
+        PyErr_Format(PyExc_TypeError,
+                     "array must be an Arrow array of utf8, large_utf8, "
+                     "binary, or large_binary, not of format '%s'",
+                     schema->format);
+        goto error;
+    }
+
+    if (array->n_buffers != 3 || array->length < 0 || array->offset < 0 ||
+        array->length > PY_SSIZE_T_MAX / (Py_ssize_t)sizeof(char *)) {
+        PyErr_SetString(PyExc_ValueError, "invalid Arrow array");
+        goto error;
+    }
+
+    batch->n = (Py_ssize_t)array->length;
+    if (array->null_count != 0) {
+        arrow->validity = (const uint8_t *)array->buffers[0];
+    }
+    arrow->offset = array->offset;
+    offsets = array->buffers[1];
+    // The data buffer may be NULL if all the elements are empty.
+    data = array->buffers[2] != NULL ? (const char *)array->buffers[2] : "";
+
+    if (batch->n > 0 && offsets == NULL) {
+        PyErr_SetString(PyExc_ValueError, "invalid Arrow array");
+        goto error;
+    }
+
+    batch->keys = PyMem_New(const char *, batch->n);
+    batch->lens = PyMem_New(Py_ssize_t, batch->n);
+    if (batch->keys == NULL || batch->lens == NULL) {
+        PyErr_NoMemory();
+        goto error;
+    }
+
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        int64_t j = arrow->offset + i;
+        int64_t start = 0;
+        int64_t stop = 0;
+
+        if (mmh3_arrow_is_null(arrow, i)) {
+            batch->keys[i] = data;
+            batch->lens[i] = 0;
+            continue;
+        }
+
+        if (large) {
+            start = ((const int64_t *)offsets)[j];
+            stop = ((const int64_t *)offsets)[j + 1];
+        }
+        else {
+            start = ((const int32_t *)offsets)[j];
+            stop = ((const int32_t *)offsets)[j + 1];
+        }
+
+        if (start < 0 || stop < start || stop - start > PY_SSIZE_T_MAX) {
+            PyErr_SetString(PyExc_ValueError,
+                            "invalid offsets in the Arrow array");
+            goto error;
+        }
+
+        batch->keys[i] = data + start;
+        batch->lens[i] = (Py_ssize_t)(stop - start);
+        batch->size += batch->lens[i];
+    }
+
+    return 0;
+
+error:
+    mmh3_key_batch_release(batch);
+    return -1;
+}
+
+/*
+ * Convert obj to the value stored for null elements, which must fit in an
+ * integer of the given number of bits (32 or 64), either signed or
+ * unsigned. Returns 0 on success and -1 with an exception set on failure.
+ */
+static int
+mmh3_parse_arrow_null(PyObject *obj, int bits, uint64_t *value)
+{
+    int overflow = 0;
+    long long svalue = 0;
+
+    if (bits == 64) {
+        return mmh3_parse_int64(obj, "null", value);
+    }
+
+    if (!PyLong_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "'%s' object cannot be interpreted as an integer",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    svalue = PyLong_AsLongLongAndOverflow(obj, &overflow);
+    if (svalue == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+
+    if (overflow != 0 || svalue < INT32_MIN ||
+        svalue > (long long)UINT32_MAX) {
+        PyErr_SetString(PyExc_ValueError, "null is out of range");
+        return -1;
+    }
+
+    *value = (uint64_t)svalue;
+    return 0;
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_arrow_doc,
+    "hash_arrow(array, seed=0, signed=True, null=0, out=None, threads=1) -> "
+    "Buffer\n"
+    "\n"
+    "Return hashes of the elements of an Arrow array as 32-bit integers.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The hash of each\n"
+    "non-null element equals ``hash(element, seed, signed)``. The\n"
+    "elements are read directly from the buffers of the array, without\n"
+    "creating ``bytes`` or ``str`` objects.\n"
+    "\n"
+    "Chunked arrays, such as a ``pyarrow.ChunkedArray``, and arrays of the\n"
+    "view types ``string_view`` and ``binary_view`` are not supported and\n"
+    "raise TypeError. Hash each chunk separately, and cast view arrays to\n"
+    "``utf8`` or ``binary`` first.\n"
+    "\n"
+    "Args:\n"
+    "    array (Any): An object that implements the Arrow PyCapsule\n"
+    "        interface (``__arrow_c_array__``), such as a ``pyarrow.Array``,\n"
+    "        of the type ``utf8``, ``large_utf8``, ``binary``, or\n"
+    "        ``large_binary``.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    signed (Any): If True, return signed integers (typecode ``'i'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'I'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    null (int): The value stored for null elements. Must be an integer\n"
+    "        in the range [-2**31, 2**32).\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``4 * len(array)`` bytes to store the hashes as native 32-bit\n"
+    "        integers. If None, a new ``array.array`` is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the elements\n"
+    "        in parallel. Small arrays are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_arrow(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    PyObject *out = NULL;
+    unsigned long seed = 0;
+    int is_signed = 1;
+    uint64_t null_value = 0;
+    int threads = 1;
+    MMH3ArrowBatch arrow;
+    MMH3Output output;
+
+    if (nargs > 6) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 6 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        target = args[0];
+    }
+
+    if (nargs >= 2) {
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[1], seed);
+    }
+
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        if (mmh3_parse_arrow_null(args[3], 32, &null_value) < 0) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 5) {
+        out = args[4];
+    }
+
+    if (nargs >= 6) {
+        if (mmh3_parse_threads(args[5], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "array") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "array", 1);
+                target = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "null") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "null", 4);
+                if (mmh3_parse_arrow_null(args[nargs + i], 32, &null_value) <
+                    0) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 5);
+                out = args[nargs + i];
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 6);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (target == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'array' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_arrow_batch_init(&arrow, target) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, arrow.batch.n * MMH3_32_DIGESTSIZE,
+                         is_signed == 1 ? 'i' : 'I') < 0) {
+        mmh3_key_batch_release(&arrow.batch);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {arrow.batch.keys, arrow.batch.lens,
+                                (uint32_t)seed, output.buf};
+    if (mmh3_run_parallel(mmh3_x86_32_batch, &batch_args, arrow.batch.n,
+                          arrow.batch.size, threads) < 0) {
+        mmh3_key_batch_release(&arrow.batch);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+
+    if (arrow.validity != NULL) {
+        uint32_t *hashes = (uint32_t *)output.buf;
+        for (Py_ssize_t i = 0; i < arrow.batch.n; i++) {
+            if (mmh3_arrow_is_null(&arrow, i)) {
+                hashes[i] = (uint32_t)null_value;
+            }
+        }
+    }
+    mmh3_key_batch_release(&arrow.batch);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_hash64_arrow_doc,
+    "hash64_arrow(array, seed=0, x64arch=True, signed=True, null=0, "
+    "out=None, threads=1) -> Buffer\n"
+    "\n"
+    "Return hashes of the elements of an Arrow array as 64-bit integer\n"
+    "pairs.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x{64, 86}_128 algorithm. The result\n"
+    "is a flat array of length ``2 * len(array)``, where the items at\n"
+    "``2 * i`` and ``2 * i + 1`` are the tuple returned by\n"
+    "``hash64(array[i], seed, x64arch, signed)`` for a non-null element,\n"
+    "and both ``null`` for a null element. The elements are read directly\n"
+    "from the buffers of the array, without creating ``bytes`` or ``str``\n"
+    "objects.\n"
+    "\n"
+    "Chunked arrays, such as a ``pyarrow.ChunkedArray``, and arrays of the\n"
+    "view types ``string_view`` and ``binary_view`` are not supported and\n"
+    "raise TypeError. Hash each chunk separately, and cast view arrays to\n"
+    "``utf8`` or ``binary`` first.\n"
+    "\n"
+    "Args:\n"
+    "    array (Any): An object that implements the Arrow PyCapsule\n"
+    "        interface (``__arrow_c_array__``), such as a ``pyarrow.Array``,\n"
+    "        of the type ``utf8``, ``large_utf8``, ``binary``, or\n"
+    "        ``large_binary``.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    x64arch (Any): If True, use an algorithm optimized for 64-bit\n"
+    "        architecture. Otherwise, use one optimized for 32-bit\n"
+    "        architecture.\n"
+    "    signed (Any): If True, return signed integers (typecode ``'q'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'Q'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    null (int): The value stored for null elements. Must be an integer\n"
+    "        in the range [-2**63, 2**64).\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``16 * len(array)`` bytes to store the hashes as native 64-bit\n"
+    "        integers. If None, a new ``array.array`` is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the elements\n"
+    "        in parallel. Small arrays are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash64_arrow(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                  PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    PyObject *out = NULL;
+    unsigned long seed = 0;
+    int x64arch = 1;
+    int is_signed = 1;
+    uint64_t null_value = 0;
+    int threads = 1;
+    MMH3ArrowBatch arrow;
+    MMH3Output output;
+
+    if (nargs > 7) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 7 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        target = args[0];
+    }
+
+    if (nargs >= 2) {
+        MMH3_HASH_VALIDATE_AND_SET_SEED(args[1], seed);
+    }
+
+    if (nargs >= 3) {
+        x64arch = PyObject_IsTrue(args[2]);
+        if (x64arch == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        is_signed = PyObject_IsTrue(args[3]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 5) {
+        if (mmh3_parse_arrow_null(args[4], 64, &null_value) < 0) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 6) {
+        out = args[5];
+    }
+
+    if (nargs >= 7) {
+        if (mmh3_parse_threads(args[6], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "array") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "array", 1);
+                target = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                MMH3_HASH_VALIDATE_AND_SET_SEED(args[nargs + i], seed);
+            }
+            else if (strcmp(kwname, "x64arch") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "x64arch", 3);
+                x64arch = PyObject_IsTrue(args[nargs + i]);
+                if (x64arch == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 4);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "null") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "null", 5);
+                if (mmh3_parse_arrow_null(args[nargs + i], 64, &null_value) <
+                    0) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 6);
+                out = args[nargs + i];
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 7);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (target == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'array' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_arrow_batch_init(&arrow, target) < 0) {
+        return NULL;
+    }
+
+    if (arrow.batch.n > PY_SSIZE_T_MAX / MMH3_128_DIGESTSIZE) {
+        mmh3_key_batch_release(&arrow.batch);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, arrow.batch.n * MMH3_128_DIGESTSIZE,
+                         is_signed == 1 ? 'q' : 'Q') < 0) {
+        mmh3_key_batch_release(&arrow.batch);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {arrow.batch.keys, arrow.batch.lens,
+                                (uint32_t)seed, output.buf};
+    if (mmh3_run_parallel(
+            x64arch == 1 ? mmh3_x64_128_batch : mmh3_x86_128_batch,
+            &batch_args, arrow.batch.n, arrow.batch.size, threads) < 0) {
+        mmh3_key_batch_release(&arrow.batch);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+
+    if (arrow.validity != NULL) {
+        uint64_t *hashes = (uint64_t *)output.buf;
+        for (Py_ssize_t i = 0; i < arrow.batch.n; i++) {
+            if (mmh3_arrow_is_null(&arrow, i)) {
+                hashes[i * 2] = null_value;
+                hashes[i * 2 + 1] = null_value;
+            }
+        }
+    }
+    mmh3_key_batch_release(&arrow.batch);
+
+    return mmh3_output_finish(&output);
+}
+
+//-----------------------------------------------------------------------------
+// Functions for multiple seeds
+
+/*
+ * Convert obj, either a buffer of native integers or an iterable of int, to
+ * a new array of seeds stored in *seeds, whose length is stored in *k. The
+ * array must be freed by PyMem_Free(). name is used in error messages.
+ * Returns 0 on success and -1 with an exception set on failure.
+ */
+static int
+mmh3_parse_seeds(PyObject *obj, const char *name, uint32_t **seeds,
+                 Py_ssize_t *k)
+{
+    *seeds = NULL;
+    *k = 0;
+
+    if (PyObject_CheckBuffer(obj)) {
+        Py_buffer view;
+        int is_signed = 0;
+
+        if (mmh3_get_index_buffer(obj, name, &view, &is_signed) < 0) {
+            return -1;
+        }
+
+        *k = view.len / view.itemsize;
+        *seeds = PyMem_New(uint32_t, *k > 0 ? *k : 1);
+        if (*seeds == NULL) {
+            PyBuffer_Release(&view);
+            PyErr_NoMemory();
+            return -1;
+        }
+
+        for (Py_ssize_t i = 0; i < *k; i++) {
+            const int64_t value = mmh3_read_nonnegative(&view, is_signed, i);
+
+            if (value < 0 || value > 0xFFFFFFFF) {
+                PyBuffer_Release(&view);
+                PyMem_Free(*seeds);
+                *seeds = NULL;
+                PyErr_SetString(PyExc_ValueError, "seed is out of range");
+                return -1;
+            }
+            (*seeds)[i] = (uint32_t)value;
+        }
+
+        PyBuffer_Release(&view);
+        return 0;
+    }
+
+    PyObject *seq = PySequence_Fast(obj, "seeds must be an iterable of int");
+    if (seq == NULL) {
+        return -1;
+    }
+
+    *k = PySequence_Fast_GET_SIZE(seq);
+    *seeds = PyMem_New(uint32_t, *k > 0 ? *k : 1);
+    if (*seeds == NULL) {
+        Py_DECREF(seq);
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    for (Py_ssize_t i = 0; i < *k; i++) {
+        if (mmh3_parse_seed(PySequence_Fast_GET_ITEM(seq, i), &(*seeds)[i]) <
+            0) {
+            Py_DECREF(seq);
+            PyMem_Free(*seeds);
+            *seeds = NULL;
+            return -1;
+        }
+    }
+
+    Py_DECREF(seq);
+    return 0;
+}
+
+// Number of seeds whose states are updated together for each block of a
+// key. The inner loops over the lanes are simple enough to be vectorized by
+// the compiler.
+#define MMH3_SEEDS_LANES 8
+
+/*
+ * Hash key by MurmurHash3_x86_32 with each of the k seeds and store the
+ * results in out as native integers. Each block of key is read and mixed
+ * once per group of MMH3_SEEDS_LANES seeds, whose states are updated together.
+ */
+static void
+mmh3_x86_32_seeds(const char *key, Py_ssize_t len, const uint32_t *seeds,
+                  Py_ssize_t k, uint32_t *out)
+{
+    const uint32_t *blocks = (const uint32_t *)key;
+    const Py_ssize_t nblocks = len / 4;
+    const uint8_t *tail = (const uint8_t *)key + nblocks * 4;
+    uint32_t k1 = 0;
+
+    for (Py_ssize_t i = 0; i < (len & 3); i++) {
+        k1 ^= (uint32_t)tail[i] << (8 * i);
+    }
+    k1 = mixK1(k1);
+
+    for (Py_ssize_t j0 = 0; j0 < k; j0 += MMH3_SEEDS_LANES) {
+        const Py_ssize_t lanes =
+            k - j0 < MMH3_SEEDS_LANES ? k - j0 : MMH3_SEEDS_LANES;
+        uint32_t h1[MMH3_SEEDS_LANES] = {0};
+
+        for (Py_ssize_t j = 0; j < lanes; j++) {
+            h1[j] = seeds[j0 + j];
+        }
+
+        for (Py_ssize_t i = 0; i < nblocks; i++) {
+            const uint32_t b1 = mixK1(getblock32(blocks, i));
+            for (int j = 0; j < MMH3_SEEDS_LANES; j++) {
+                h1[j] = mixH1(h1[j] ^ b1, 0, 13, 0xe6546b64);
+            }
+        }
+
+        for (Py_ssize_t j = 0; j < lanes; j++) {
+            out[j0 + j] = fmix32(h1[j] ^ k1 ^ (uint32_t)len);
+        }
+    }
+}
+
+/*
+ * Hash key by MurmurHash3_x64_128 with each of the k seeds and store the
+ * results in out as pairs of native 64-bit integers, in the same format as
+ * murmurhash3_x64_128. Each block of key is read and mixed once per group of
+ * MMH3_SEEDS_LANES seeds, whose states are updated together.
+ */
+static void
+mmh3_x64_128_seeds(const char *key, Py_ssize_t len, const uint32_t *seeds,
+                   Py_ssize_t k, uint64_t *out)
+{
+    const uint64_t *blocks = (const uint64_t *)key;
+    const Py_ssize_t nblocks = len / 16;
+    const uint8_t *tail = (const uint8_t *)key + nblocks * 16;
+    uint64_t k1 = 0;
+    uint64_t k2 = 0;
+
+    for (Py_ssize_t i = 0; i < (len & 15); i++) {
+        if (i < 8) {
+            k1 ^= (uint64_t)tail[i] << (8 * i);
+        }
+        else {
+            k2 ^= (uint64_t)tail[i] << (8 * (i - 8));
+        }
+    }
+    k1 = mixK1_x64_128(k1);
+    k2 = mixK2_x64_128(k2);
+
+    for (Py_ssize_t j0 = 0; j0 < k; j0 += MMH3_SEEDS_LANES) {
+        const Py_ssize_t lanes =
+            k - j0 < MMH3_SEEDS_LANES ? k - j0 : MMH3_SEEDS_LANES;
+        uint64_t h1[MMH3_SEEDS_LANES] = {0};
+        uint64_t h2[MMH3_SEEDS_LANES] = {0};
+
+        for (Py_ssize_t j = 0; j < lanes; j++) {
+            h1[j] = seeds[j0 + j];
+            h2[j] = seeds[j0 + j];
+        }
+
+        for (Py_ssize_t i = 0; i < nblocks; i++) {
+            const uint64_t b1 = mixK1_x64_128(getblock64(blocks, i * 2));
+            const uint64_t b2 = mixK2_x64_128(getblock64(blocks, i * 2 + 1));
+            for (int j = 0; j < MMH3_SEEDS_LANES; j++) {
+                h1[j] = mixH_x64_128(h1[j] ^ b1, h2[j], 27, 0x52dce729);
+                h2[j] = mixH_x64_128(h2[j] ^ b2, h1[j], 31, 0x38495ab5);
+            }
+        }
+
+        for (Py_ssize_t j = 0; j < lanes; j++) {
+            uint64_t f1 = h1[j] ^ k1 ^ (uint64_t)len;
+            uint64_t f2 = h2[j] ^ k2 ^ (uint64_t)len;
+
+            f1 += f2;
+            f2 += f1;
+            f1 = fmix64(f1);
+            f2 = fmix64(f2);
+            f1 += f2;
+            f2 += f1;
+
+            out[(j0 + j) * 2] = f1;
+            out[(j0 + j) * 2 + 1] = f2;
+        }
+    }
+}
+
+/*
+ * Hash key by MurmurHash3_x86_128 with each of the k seeds and store the
+ * results in out as pairs of native 64-bit integers, in the same format as
+ * murmurhash3_x86_128. Each block of key is read and mixed once per group of
+ * MMH3_SEEDS_LANES seeds, whose states are updated together.
+ */
+static void
+mmh3_x86_128_seeds(const char *key, Py_ssize_t len, const uint32_t *seeds,
+                   Py_ssize_t k, uint64_t *out)
+{
+    const uint32_t c1 = 0x239b961b;
+    const uint32_t c2 = 0xab0e9789;
+    const uint32_t c3 = 0x38b34ae5;
+    const uint32_t c4 = 0xa1e38b93;
+    const uint32_t *blocks = (const uint32_t *)key;
+    const Py_ssize_t nblocks = len / 16;
+    const uint8_t *tail = (const uint8_t *)key + nblocks * 16;
+    uint32_t t[4] = {0, 0, 0, 0};
+
+    for (Py_ssize_t i = 0; i < (len & 15); i++) {
+        t[i / 4] ^= (uint32_t)tail[i] << (8 * (i % 4));
+    }
+    t[0] = (uint32_t)mixK_x86_128(t[0], 15, c1, c2);
+    t[1] = (uint32_t)mixK_x86_128(t[1], 16, c2, c3);
+    t[2] = (uint32_t)mixK_x86_128(t[2], 17, c3, c4);
+    t[3] = (uint32_t)mixK_x86_128(t[3], 18, c4, c1);
+
+    for (Py_ssize_t j0 = 0; j0 < k; j0 += MMH3_SEEDS_LANES) {
+        const Py_ssize_t lanes =
+            k - j0 < MMH3_SEEDS_LANES ? k - j0 : MMH3_SEEDS_LANES;
+        uint32_t h1[MMH3_SEEDS_LANES] = {0};
+        uint32_t h2[MMH3_SEEDS_LANES] = {0};
+        uint32_t h3[MMH3_SEEDS_LANES] = {0};
+        uint32_t h4[MMH3_SEEDS_LANES] = {0};
+
+        for (Py_ssize_t j = 0; j < lanes; j++) {
+            h1[j] = h2[j] = h3[j] = h4[j] = seeds[j0 + j];
+        }
+
+        for (Py_ssize_t i = 0; i < nblocks; i++) {
+            const uint32_t b1 =
+                (uint32_t)mixK_x86_128(getblock32(blocks, i * 4), 15, c1, c2);
+            const uint32_t b2 = (uint32_t)mixK_x86_128(
+                getblock32(blocks, i * 4 + 1), 16, c2, c3);
+            const uint32_t b3 = (uint32_t)mixK_x86_128(
+                getblock32(blocks, i * 4 + 2), 17, c3, c4);
+            const uint32_t b4 = (uint32_t)mixK_x86_128(
+                getblock32(blocks, i * 4 + 3), 18, c4, c1);
+            for (int j = 0; j < MMH3_SEEDS_LANES; j++) {
+                h1[j] = mixH1(h1[j] ^ b1, h2[j], 19, 0x561ccd1b);
+                h2[j] = mixH1(h2[j] ^ b2, h3[j], 17, 0x0bcaa747);
+                h3[j] = mixH1(h3[j] ^ b3, h4[j], 15, 0x96cd1c35);
+                h4[j] = mixH1(h4[j] ^ b4, h1[j], 13, 0x32ac3b17);
+            }
+        }
+
+        for (Py_ssize_t j = 0; j < lanes; j++) {
+            uint32_t f1 = h1[j] ^ t[0] ^ (uint32_t)len;
+            uint32_t f2 = h2[j] ^ t[1] ^ (uint32_t)len;
+            uint32_t f3 = h3[j] ^ t[2] ^ (uint32_t)len;
+            uint32_t f4 = h4[j] ^ t[3] ^ (uint32_t)len;
+
+            f1 += f2 + f3 + f4;
+            f2 += f1;
+            f3 += f1;
+            f4 += f1;
+            f1 = fmix32(f1);
+            f2 = fmix32(f2);
+            f3 = fmix32(f3);
+            f4 = fmix32(f4);
+            f1 += f2 + f3 + f4;
+            f2 += f1;
+            f3 += f1;
+            f4 += f1;
+
+            out[(j0 + j) * 2] = ((uint64_t)f2 << 32) | f1;
+            out[(j0 + j) * 2 + 1] = ((uint64_t)f4 << 32) | f3;
+        }
+    }
+}
+
+// Arguments of the batch functions for hash_seeds_many() and its variants
+typedef struct {
+    const char *const *keys;
+    const Py_ssize_t *lens;
+    const uint32_t *seeds;
+    Py_ssize_t k;
+    char *out;
+} MMH3SeedsArgs;
+
+static void
+mmh3_x86_32_seeds_batch(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3SeedsArgs *a = (const MMH3SeedsArgs *)arg;
+    uint32_t *out = (uint32_t *)a->out;
+
+    for (Py_ssize_t i = start; i < stop; i++) {
+        mmh3_x86_32_seeds(a->keys[i], a->lens[i], a->seeds, a->k,
+                          &out[i * a->k]);
+    }
+}
+
+static void
+mmh3_x64_128_seeds_batch(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3SeedsArgs *a = (const MMH3SeedsArgs *)arg;
+    uint64_t *out = (uint64_t *)a->out;
+
+    for (Py_ssize_t i = start; i < stop; i++) {
+        mmh3_x64_128_seeds(a->keys[i], a->lens[i], a->seeds, a->k,
+                           &out[i * a->k * 2]);
+    }
+}
+
+static void
+mmh3_x86_128_seeds_batch(const void *arg, Py_ssize_t start, Py_ssize_t stop)
+{
+    const MMH3SeedsArgs *a = (const MMH3SeedsArgs *)arg;
+    uint64_t *out = (uint64_t *)a->out;
+
+    for (Py_ssize_t i = start; i < stop; i++) {
+        mmh3_x86_128_seeds(a->keys[i], a->lens[i], a->seeds, a->k,
+                           &out[i * a->k * 2]);
+    }
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_seeds_doc,
+    "hash_seeds(key, seeds, signed=True, out=None) -> Buffer\n"
+    "\n"
+    "Return hashes of a key with many seeds as 32-bit integers.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The item at ``j``\n"
+    "equals ``hash(key, seeds[j], signed)``, but the key is read only\n"
+    "once per group of 8 seeds, whose states are updated together. This\n"
+    "makes this function much faster than calling ``hash()`` for each\n"
+    "seed, e.g., to obtain the ``k`` hash functions of a Bloom filter or a\n"
+    "MinHash signature.\n"
+    "\n"
+    "Args:\n"
+    "    key (bytes | str): The input data to hash.\n"
+    "    seeds (Buffer | Iterable[int]): The seeds, given as a buffer of\n"
+    "        native integers or an iterable of ``int``. Each seed must be\n"
+    "        an integer in the range [0, 0xFFFFFFFF].\n"
+    "    signed (Any): If True, return signed integers (typecode ``'i'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'I'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``4 * len(seeds)`` bytes to store the hashes as native 32-bit\n"
+    "        integers. If None, a new ``array.array`` is allocated.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_seeds(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    PyObject *seeds_obj = NULL;
+    PyObject *out = NULL;
+    int is_signed = 1;
+    uint32_t *seeds = NULL;
+    Py_ssize_t k = 0;
+    MMH3Key key;
+    MMH3Output output;
+
+    if (nargs > 4) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 4 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        MMH3_HASH_VALIDATE_AND_SET_KEY(args[0], target);
+    }
+
+    if (nargs >= 2) {
+        seeds_obj = args[1];
+    }
+
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        out = args[3];
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "key") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
+                MMH3_HASH_VALIDATE_AND_SET_KEY(args[nargs + i], target);
+            }
+            else if (strcmp(kwname, "seeds") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seeds", 2);
+                seeds_obj = args[nargs + i];
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 4);
+                out = args[nargs + i];
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (seeds_obj == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'seeds' (pos 2)");
+        return NULL;
+    }
+
+    MMH3_HASH_INIT_KEY(key, target);
+
+    if (mmh3_parse_seeds(seeds_obj, "seeds", &seeds, &k) < 0) {
+        mmh3_key_release(&key);
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, k * MMH3_32_DIGESTSIZE,
+                         is_signed == 1 ? 'i' : 'I') < 0) {
+        PyMem_Free(seeds);
+        mmh3_key_release(&key);
+        return NULL;
+    }
+
+    mmh3_x86_32_seeds(key.buf, key.len, seeds, k, (uint32_t *)output.buf);
+
+    PyMem_Free(seeds);
+    mmh3_key_release(&key);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_hash64_seeds_doc,
+    "hash64_seeds(key, seeds, x64arch=True, signed=True, out=None) -> "
+    "Buffer\n"
+    "\n"
+    "Return hashes of a key with many seeds as 64-bit integer pairs.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x{64, 86}_128 algorithm. The result\n"
+    "is a flat array of length ``2 * len(seeds)``, where the items at\n"
+    "``2 * j`` and ``2 * j + 1`` are the tuple returned by\n"
+    "``hash64(key, seeds[j], x64arch, signed)``. The key is read only once\n"
+    "per group of 8 seeds.\n"
+    "\n"
+    "Args:\n"
+    "    key (bytes | str): The input data to hash.\n"
+    "    seeds (Buffer | Iterable[int]): The seeds, given as a buffer of\n"
+    "        native integers or an iterable of ``int``. Each seed must be\n"
+    "        an integer in the range [0, 0xFFFFFFFF].\n"
+    "    x64arch (Any): If True, use an algorithm optimized for 64-bit\n"
+    "        architecture. Otherwise, use one optimized for 32-bit\n"
+    "        architecture.\n"
+    "    signed (Any): If True, return signed integers (typecode ``'q'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'Q'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``16 * len(seeds)`` bytes to store the hashes as native 64-bit\n"
+    "        integers. If None, a new ``array.array`` is allocated.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash64_seeds(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                  PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    PyObject *seeds_obj = NULL;
+    PyObject *out = NULL;
+    int x64arch = 1;
+    int is_signed = 1;
+    uint32_t *seeds = NULL;
+    Py_ssize_t k = 0;
+    MMH3Key key;
+    MMH3Output output;
+
+    if (nargs > 5) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 5 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        MMH3_HASH_VALIDATE_AND_SET_KEY(args[0], target);
+    }
+
+    if (nargs >= 2) {
+        seeds_obj = args[1];
+    }
+
+    if (nargs >= 3) {
+        x64arch = PyObject_IsTrue(args[2]);
+        if (x64arch == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        is_signed = PyObject_IsTrue(args[3]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 5) {
+        out = args[4];
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "key") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
+                MMH3_HASH_VALIDATE_AND_SET_KEY(args[nargs + i], target);
+            }
+            else if (strcmp(kwname, "seeds") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seeds", 2);
+                seeds_obj = args[nargs + i];
+            }
+            else if (strcmp(kwname, "x64arch") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "x64arch", 3);
+                x64arch = PyObject_IsTrue(args[nargs + i]);
+                if (x64arch == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 4);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 5);
+                out = args[nargs + i];
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (seeds_obj == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'seeds' (pos 2)");
+        return NULL;
+    }
+
+    MMH3_HASH_INIT_KEY(key, target);
+
+    if (mmh3_parse_seeds(seeds_obj, "seeds", &seeds, &k) < 0) {
+        mmh3_key_release(&key);
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, k * MMH3_128_DIGESTSIZE,
+                         is_signed == 1 ? 'q' : 'Q') < 0) {
+        PyMem_Free(seeds);
+        mmh3_key_release(&key);
+        return NULL;
+    }
+
+    if (x64arch == 1) {
+        mmh3_x64_128_seeds(key.buf, key.len, seeds, k, (uint64_t *)output.buf);
+    }
+    else {
+        mmh3_x86_128_seeds(key.buf, key.len, seeds, k, (uint64_t *)output.buf);
+    }
+
+    PyMem_Free(seeds);
+    mmh3_key_release(&key);
+
+    return mmh3_output_finish(&output);
+}
+
+/*
+ * Return the size of the results of n keys hashed with k seeds, each of
+ * digest_size bytes, or -1 with MemoryError set on overflow.
+ */
+static Py_ssize_t
+mmh3_seeds_output_size(Py_ssize_t n, Py_ssize_t k, Py_ssize_t digest_size)
+{
+    if (k > 0 && n > PY_SSIZE_T_MAX / digest_size / k) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    return n * k * digest_size;
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_seeds_many_doc,
+    "hash_seeds_many(keys, seeds, signed=True, out=None, threads=1) -> "
+    "Buffer\n"
+    "\n"
+    "Return hashes of many keys with many seeds as 32-bit integers.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The result is a\n"
+    "row-major ``len(keys)`` by ``len(seeds)`` matrix flattened into one\n"
+    "array, where the item at ``i * len(seeds) + j`` equals\n"
+    "``hash(keys[i], seeds[j], signed)``. Each key is read only once per\n"
+    "group of 8 seeds.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The input data to hash.\n"
+    "    seeds (Buffer | Iterable[int]): The seeds, given as a buffer of\n"
+    "        native integers or an iterable of ``int``. Each seed must be\n"
+    "        an integer in the range [0, 0xFFFFFFFF].\n"
+    "    signed (Any): If True, return signed integers (typecode ``'i'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'I'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``4 * len(keys) * len(seeds)`` bytes to store the hashes as\n"
+    "        native 32-bit integers, such as a NumPy array of the dtype\n"
+    "        ``uint32`` and the shape ``(len(keys), len(seeds))``. If None,\n"
+    "        a new ``array.array`` is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the keys in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_seeds_many(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                     PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    PyObject *seeds_obj = NULL;
+    PyObject *out = NULL;
+    int is_signed = 1;
+    int threads = 1;
+    uint32_t *seeds = NULL;
+    Py_ssize_t k = 0;
+    Py_ssize_t size = 0;
+    MMH3KeyBatch batch;
+    MMH3Output output;
+
+    if (nargs > 5) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 5 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        seeds_obj = args[1];
+    }
+
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        out = args[3];
+    }
+
+    if (nargs >= 5) {
+        if (mmh3_parse_threads(args[4], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seeds") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seeds", 2);
+                seeds_obj = args[nargs + i];
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 4);
+                out = args[nargs + i];
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 5);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (seeds_obj == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'seeds' (pos 2)");
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_parse_seeds(seeds_obj, "seeds", &seeds, &k) < 0) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    size = mmh3_seeds_output_size(batch.n, k, MMH3_32_DIGESTSIZE);
+    if (size < 0 ||
+        mmh3_output_init(&output, out, size, is_signed == 1 ? 'i' : 'I') < 0) {
+        PyMem_Free(seeds);
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    MMH3SeedsArgs seeds_args = {batch.keys, batch.lens, seeds, k, output.buf};
+    if (mmh3_run_parallel(mmh3_x86_32_seeds_batch, &seeds_args, batch.n, size,
+                          threads) < 0) {
+        PyMem_Free(seeds);
+        mmh3_key_batch_release(&batch);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+
+    PyMem_Free(seeds);
+    mmh3_key_batch_release(&batch);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_hash64_seeds_many_doc,
+    "hash64_seeds_many(keys, seeds, x64arch=True, signed=True, out=None, "
+    "threads=1) -> Buffer\n"
+    "\n"
+    "Return hashes of many keys with many seeds as 64-bit integer pairs.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x{64, 86}_128 algorithm. The result is\n"
+    "a row-major ``len(keys)`` by ``len(seeds)`` matrix of pairs flattened\n"
+    "into one array, where the items at ``2 * (i * len(seeds) + j)`` and\n"
+    "the next index are the tuple returned by\n"
+    "``hash64(keys[i], seeds[j], x64arch, signed)``. Each key is read only\n"
+    "once per group of 8 seeds.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The input data to hash.\n"
+    "    seeds (Buffer | Iterable[int]): The seeds, given as a buffer of\n"
+    "        native integers or an iterable of ``int``. Each seed must be\n"
+    "        an integer in the range [0, 0xFFFFFFFF].\n"
+    "    x64arch (Any): If True, use an algorithm optimized for 64-bit\n"
+    "        architecture. Otherwise, use one optimized for 32-bit\n"
+    "        architecture.\n"
+    "    signed (Any): If True, return signed integers (typecode ``'q'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'Q'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``16 * len(keys) * len(seeds)`` bytes to store the hashes as\n"
+    "        native 64-bit integers. If None, a new ``array.array`` is\n"
+    "        allocated.\n"
+    "    threads (int): The maximum number of threads to hash the keys in\n"
+    "        parallel. Small batches are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash64_seeds_many(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                       PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    PyObject *seeds_obj = NULL;
+    PyObject *out = NULL;
+    int x64arch = 1;
+    int is_signed = 1;
+    int threads = 1;
+    uint32_t *seeds = NULL;
+    Py_ssize_t k = 0;
+    Py_ssize_t size = 0;
+    MMH3KeyBatch batch;
+    MMH3Output output;
+
+    if (nargs > 6) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 6 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        seeds_obj = args[1];
+    }
+
+    if (nargs >= 3) {
+        x64arch = PyObject_IsTrue(args[2]);
+        if (x64arch == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        is_signed = PyObject_IsTrue(args[3]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 5) {
+        out = args[4];
+    }
+
+    if (nargs >= 6) {
+        if (mmh3_parse_threads(args[5], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seeds") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seeds", 2);
+                seeds_obj = args[nargs + i];
+            }
+            else if (strcmp(kwname, "x64arch") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "x64arch", 3);
+                x64arch = PyObject_IsTrue(args[nargs + i]);
+                if (x64arch == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 4);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 5);
+                out = args[nargs + i];
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 6);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (seeds_obj == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'seeds' (pos 2)");
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_parse_seeds(seeds_obj, "seeds", &seeds, &k) < 0) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    size = mmh3_seeds_output_size(batch.n, k, MMH3_128_DIGESTSIZE);
+    if (size < 0 ||
+        mmh3_output_init(&output, out, size, is_signed == 1 ? 'q' : 'Q') < 0) {
+        PyMem_Free(seeds);
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    MMH3SeedsArgs seeds_args = {batch.keys, batch.lens, seeds, k, output.buf};
+    if (mmh3_run_parallel(
+            x64arch == 1 ? mmh3_x64_128_seeds_batch : mmh3_x86_128_seeds_batch,
+            &seeds_args, batch.n, size, threads) < 0) {
+        PyMem_Free(seeds);
+        mmh3_key_batch_release(&batch);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+
+    PyMem_Free(seeds);
+    mmh3_key_batch_release(&batch);
+
+    return mmh3_output_finish(&output);
+}
+
+//-----------------------------------------------------------------------------
+// Functions for NumPy arrays of strings
+
+// Keys of a NumPy array of the dtype 'S' or 'U', read through the buffer
+// protocol so that NumPy is required neither to build nor to import mmh3.
+typedef struct {
+    MMH3KeyBatch batch;
+    Py_buffer view;  // the array, which keys of the dtype 'S' point into
+    uint32_t seed;
+    uint32_t *seeds;  // seed of each key, or NULL to use seed for all
+} MMH3NumpyBatch;
+
+static void
+mmh3_numpy_batch_release(MMH3NumpyBatch *numpy)
+{
+    mmh3_key_batch_release(&numpy->batch);
+    PyMem_Free(numpy->seeds);
+    numpy->seeds = NULL;
+    if (numpy->view.obj != NULL) {
+        PyBuffer_Release(&numpy->view);
+    }
+}
+
+static FORCE_INLINE uint32_t
+mmh3_bswap32(uint32_t x)
+{
+    return ((x & 0x000000ffU) << 24) | ((x & 0x0000ff00U) << 8) |
+           ((x & 0x00ff0000U) >> 8) | ((x & 0xff000000U) >> 24);
+}
+
+/*
+ * Return the first n code points of the 'U' element at p as native,
+ * aligned UCS4 data, copying them into tmp if p is unaligned or swap is
+ * nonzero. *len is set to n minus the number of trailing NUL characters,
+ * which NumPy strips when it reads an element.
+ */
+static const Py_UCS4 *
+mmh3_numpy_ucs4(const char *p, Py_ssize_t n, int swap, Py_UCS4 *tmp,
+                Py_ssize_t *len)
+{
+    const Py_UCS4 *data = (const Py_UCS4 *)p;
+
+    if (swap || ((uintptr_t)p % sizeof(Py_UCS4)) != 0) {
+        memcpy(tmp, p, n * sizeof(Py_UCS4));
+        if (swap) {
+            for (Py_ssize_t i = 0; i < n; i++) {
+                tmp[i] = mmh3_bswap32(tmp[i]);
+            }
+        }
+        data = tmp;
+    }
+
+    while (n > 0 && data[n - 1] == 0) {
+        n--;
+    }
+
+    *len = n;
+    return data;
+}
+
+/*
+ * Return the length of the UCS4 data in UTF-8, or -1 without an exception
+ * set if data contains a lone surrogate or a code point beyond U+10FFFF.
+ */
+static Py_ssize_t
+mmh3_ucs4_utf8_size(const Py_UCS4 *data, Py_ssize_t n)
+{
+    Py_ssize_t size = 0;
+
+    MMH3_UTF8_SIZE_LOOP(Py_UCS4, data, n, size);
+
+    return size;
+}
+
+/*
+ * Encode the UCS4 data accepted by mmh3_ucs4_utf8_size() into out.
+ * Returns the number of bytes written.
+ */
+static Py_ssize_t
+mmh3_ucs4_utf8_encode(const Py_UCS4 *data, Py_ssize_t n, char *out)
+{
+    const char *start = out;
+
+    MMH3_UTF8_ENCODE_LOOP(Py_UCS4, data, n, out);
+
+    return out - start;
+}
+
+/*
+ * Raise the exception for the UCS4 data rejected by mmh3_ucs4_utf8_size(),
+ * i.e., the ValueError of chr() for a code point beyond U+10FFFF or the
+ * UnicodeEncodeError of str.encode() for a lone surrogate. Always returns
+ * -1.
+ */
+static int
+mmh3_ucs4_utf8_error(const Py_UCS4 *data, Py_ssize_t n)
+{
+    PyObject *obj = NULL;
+
+    for (Py_ssize_t i = 0; i < n; i++) {
+        if (data[i] > 0x10ffff) {
+            PyErr_Format(PyExc_ValueError,
+                         "character U+%x is not in range [U+0000; U+10ffff]",
+                         (unsigned int)data[i]);
+            return -1;
+        }
+    }
+
+    obj = PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, data, n);
+
+    if (obj != NULL) {
+        mmh3_utf8_error(obj);
+        Py_DECREF(obj);
+    }
+
+    return -1;
+}
+
+/*
+ * Convert obj to the seeds of the keys in numpy. obj is either an int, which
+ * is used for all the keys, or a C-contiguous buffer of native integers whose
+ * shape is broadcast to that of the array as in NumPy, i.e., the trailing
+ * dimensions are aligned and those of size 1 are repeated. Returns 0 on
+ * success and -1 with an exception set on failure.
+ */
+static int
+mmh3_numpy_parse_seeds(MMH3NumpyBatch *numpy, PyObject *obj)
+{
+    const Py_buffer *array = &numpy->view;
+    Py_buffer view;
+    Py_ssize_t strides[PyBUF_MAX_NDIM];
+    Py_ssize_t index[PyBUF_MAX_NDIM];
+    Py_ssize_t stride = 1;
+    Py_ssize_t j = 0;
+    int is_signed = 0;
+    int offset = 0;
+
+    if (PyLong_Check(obj)) {
+        return mmh3_parse_seed(obj, &numpy->seed);
+    }
+
+    if (!PyObject_CheckBuffer(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "seed must be an int or a buffer of native integers, "
+                     "not '%s'",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    if (mmh3_get_index_buffer(obj, "seed", &view, &is_signed) < 0) {
+        return -1;
+    }
+
+    // Strides of seed in items along each dimension of the array, which are
+    // 0 for the broadcast dimensions.
+    offset = array->ndim - view.ndim;
+    for (int d = array->ndim - 1; d >= 0 && d >= offset; d--) {
+        const Py_ssize_t size = view.shape[d - offset];
+
+        if (size != 1 && size != array->shape[d]) {
+            offset = -1;
+            break;
+        }
+        strides[d] = size == 1 ? 0 : stride;
+        stride *= size;
+    }
+    if (offset < 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "seed must have a shape that can be broadcast to "
+                        "that of array");
+        PyBuffer_Release(&view);
+        return -1;
+    }
+    for (int d = 0; d < offset; d++) {
+        strides[d] = 0;
+    }
+    for (int d = 0; d < array->ndim; d++) {
+        index[d] = 0;
+    }
+
+    numpy->seeds =
+        PyMem_New(uint32_t, numpy->batch.n > 0 ? numpy->batch.n : 1);
+    if (numpy->seeds == NULL) {
+        PyBuffer_Release(&view);
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    // Walk the seeds in the C order of the array.
+    for (Py_ssize_t i = 0; i < numpy->batch.n; i++) {
+        const int64_t value = mmh3_read_nonnegative(&view, is_signed, j);
+
+        if (value < 0 || value > 0xFFFFFFFF) {
+            PyBuffer_Release(&view);
+            PyErr_SetString(PyExc_ValueError, "seed is out of range");
+            return -1;
+        }
+        numpy->seeds[i] = (uint32_t)value;
+
+        for (int d = array->ndim - 1; d >= 0; d--) {
+            if (++index[d] < array->shape[d]) {
+                j += strides[d];
+                break;
+            }
+            j -= strides[d] * (array->shape[d] - 1);
+            index[d] = 0;
+        }
+    }
+
+    PyBuffer_Release(&view);
+    return 0;
+}
+
+/*
+ * Gather the elements of obj, which must export a buffer of fixed-width
+ * bytes (format 's', the dtype 'S' of NumPy) or UCS4 strings (format 'w',
+ * the dtype 'U'), into numpy, together with the seeds given by seed, or 0
+ * if seed is NULL. The buffer may have any shape and strides, and its
+ * elements are taken in C order. Trailing NUL characters are stripped from
+ * each element, as NumPy does. Elements of the dtype 'S' are not copied,
+ * while those of the dtype 'U' are encoded in UTF-8 into numpy->batch.arena.
+ * Returns 0 on success and -1 with an exception set on failure.
+ */
+static int
+mmh3_numpy_batch_init(MMH3NumpyBatch *numpy, PyObject *obj, PyObject *seed)
+{
+    MMH3KeyBatch *batch = &numpy->batch;
+    Py_buffer *view = &numpy->view;
+    Py_ssize_t index[PyBUF_MAX_NDIM];
+    const char *format = NULL;
+    const char *p = NULL;
+    Py_UCS4 *tmp = NULL;
+    Py_ssize_t arena_size = 0;
+    Py_ssize_t n_chars = 0;
+    char kind = 0;
+    int swap = 0;
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    const char native_order = '>';
+#else
+    const char native_order = '<';
+#endif
+
+    batch->seq = NULL;
+    batch->arena = NULL;
+    batch->keys = NULL;
+    batch->lens = NULL;
+    batch->n = 0;
+    batch->size = 0;
+    view->obj = NULL;
+    numpy->seed = 0;
+    numpy->seeds = NULL;
+
+    if (PyBytes_Check(obj) || PyUnicode_Check(obj) ||
+        !PyObject_CheckBuffer(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "array must be a NumPy array of the dtype 'S' or 'U', "
+                     "not '%s'",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    if (PyObject_GetBuffer(obj, view, PyBUF_RECORDS_RO) == -1) {
+        view->obj = NULL;
+        // NumPy raises ValueError for the dtypes that cannot be exported as
+        // a buffer, such as StringDType.
+        if (PyErr_ExceptionMatches(PyExc_ValueError)) {
+            PyObject *dtype = NULL;
+
+            PyErr_Clear();
+            dtype = PyObject_GetAttrString(obj, "dtype");
+            PyErr_Clear();
+            if (dtype != NULL) {
+                PyErr_Format(PyExc_TypeError,
+                             "array must be a NumPy array of the dtype 'S' or "
+                             "'U', not of the dtype '%S'",
+                             dtype);
+                Py_DECREF(dtype);
+            }
+            else {
+                PyErr_Format(PyExc_TypeError,
+                             "array must be a NumPy array of the dtype 'S' or "
+                             "'U', not '%s'",
+                             Py_TYPE(obj)->tp_name);
+            }
+        }
+        return -1;
+    }
+
+    format = view->format != NULL ? view->format : "B";
+    if (*format == '@' || *format == '=') {
+        format++;
+    }
+    else if (*format == '<' || *format == '>' || *format == '!') {
+        swap = (*format == '<') != (native_order == '<');
+        format++;
+    }
+    while (Py_ISDIGIT(*format)) {
+        format++;
+    }
+    kind = *format;
+
+    if ((kind != 's' && kind != 'w') || format[1] != '\0' ||
+        (kind == 'w' && view->itemsize % sizeof(Py_UCS4) != 0)) {
+        PyErr_Format(PyExc_TypeError,
+                     "array must be a NumPy array of the dtype 'S' or 'U', "
+                     "not a buffer of format '%s'",
+                     view->format != NULL ? view->format : "B");
+        goto error;
+    }
+
+    batch->n = 1;
+    for (int d = 0; d < view->ndim; d++) {
+        batch->n *= view->shape[d];
+        index[d] = 0;
+    }
+
+    batch->keys = PyMem_New(const char *, batch->n > 0 ? batch->n : 1);
+    batch->lens = PyMem_New(Py_ssize_t, batch->n > 0 ? batch->n : 1);
+    if (batch->keys == NULL || batch->lens == NULL) {
+        PyErr_NoMemory();
+        goto error;
+    }
+
+    // Walk the elements in C order.
+    p = (const char *)view->buf;
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        batch->keys[i] = p;
+        for (int d = view->ndim - 1; d >= 0; d--) {
+            if (++index[d] < view->shape[d]) {
+                p += view->strides[d];
+                break;
+            }
+            p -= view->strides[d] * (view->shape[d] - 1);
+            index[d] = 0;
+        }
+    }
+
+    if (kind == 's') {
+        for (Py_ssize_t i = 0; i < batch->n; i++) {
+            Py_ssize_t len = view->itemsize;
+            while (len > 0 && batch->keys[i][len - 1] == '\0') {
+                len--;
+            }
+            batch->lens[i] = len;
+            batch->size += len;
+        }
+    }
+    else {
+        n_chars = view->itemsize / (Py_ssize_t)sizeof(Py_UCS4);
+        tmp = PyMem_New(Py_UCS4, n_chars > 0 ? n_chars : 1);
+        if (tmp == NULL) {
+            PyErr_NoMemory();
+            goto error;
+        }
+
+        // Every code point takes at most 4 bytes in UTF-8, so that
+        // arena_size never exceeds view->len.
+        for (Py_ssize_t i = 0; i < batch->n; i++) {
+            Py_ssize_t len = 0;
+            const Py_UCS4 *data =
+                mmh3_numpy_ucs4(batch->keys[i], n_chars, swap, tmp, &len);
+            const Py_ssize_t size = mmh3_ucs4_utf8_size(data, len);
+
+            if (size < 0) {
+                mmh3_ucs4_utf8_error(data, len);
+                goto error;
+            }
+            batch->lens[i] = size;
+            arena_size += size;
+        }
+
+        batch->arena = PyMem_Malloc(arena_size > 0 ? arena_size : 1);
+        if (batch->arena == NULL) {
+            PyErr_NoMemory();
+            goto error;
+        }
+
+        char *arena = batch->arena;
+        for (Py_ssize_t i = 0; i < batch->n; i++) {
+            Py_ssize_t len = 0;
+            const Py_UCS4 *data =
+                mmh3_numpy_ucs4(batch->keys[i], n_chars, swap, tmp, &len);
+
+            batch->keys[i] = arena;
+            arena += mmh3_ucs4_utf8_encode(data, len, arena);
+        }
+        batch->size = arena_size;
+
+        PyMem_Free(tmp);
+        tmp = NULL;
+    }
+
+    if (seed != NULL && mmh3_numpy_parse_seeds(numpy, seed) < 0) {
+        goto error;
+    }
+
+    return 0;
+
+error:
+    PyMem_Free(tmp);
+    mmh3_numpy_batch_release(numpy);
+    return -1;
+}
+
+PyDoc_STRVAR(
+    mmh3_hash_numpy_doc,
+    "hash_numpy(array, seed=0, signed=True, out=None, threads=1) -> Buffer\n"
+    "\n"
+    "Return hashes of the elements of a NumPy string array as 32-bit\n"
+    "integers.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x86_32 algorithm. The hash of each\n"
+    "element equals ``hash(element, seed, signed)``, where elements of the\n"
+    "dtype ``'U'`` are encoded in UTF-8. The elements are read directly\n"
+    "from the memory of the array, without creating ``bytes`` or ``str``\n"
+    "objects, and are taken in C order if the array has more than one\n"
+    "dimension. NumPy itself is not required.\n"
+    "\n"
+    "Unlike a ufunc, this function returns a flat array of the hashes in\n"
+    "C order; pass ``out`` with the shape of ``array`` to keep the shape.\n"
+    "Arrays of ``StringDType`` are not supported: they do not export their\n"
+    "memory and raise TypeError. Hash ``array.ravel().tolist()`` by\n"
+    "``hash_many()`` instead, or convert them by ``array.astype('U<n>')``\n"
+    "with ``n`` at least the length of the longest string, since NumPy\n"
+    "cannot cast them to ``'U'`` without an explicit width and truncates\n"
+    "longer strings.\n"
+    "\n"
+    "Args:\n"
+    "    array (Buffer): A NumPy array of the dtype ``'S'`` or ``'U'``, or\n"
+    "        any other object that exports a buffer of such fixed-width\n"
+    "        strings. The array may have any shape and strides.\n"
+    "    seed (int | Buffer): The seed value. Must be an integer in the\n"
+    "        range [0, 0xFFFFFFFF], or a C-contiguous buffer of such\n"
+    "        integers whose shape is broadcast to that of ``array`` as in\n"
+    "        NumPy, giving the seed of each element.\n"
+    "    signed (Any): If True, return signed integers (typecode ``'i'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'I'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``4 * array.size`` bytes to store the hashes as native 32-bit\n"
+    "        integers, such as a NumPy array of the dtype ``uint32`` with\n"
+    "        the same shape as ``array``. If None, a new ``array.array`` is\n"
+    "        allocated.\n"
+    "    threads (int): The maximum number of threads to hash the elements\n"
+    "        in parallel. Small arrays are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash_numpy(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    PyObject *seed = NULL;
+    PyObject *out = NULL;
+    int is_signed = 1;
+    int threads = 1;
+    MMH3NumpyBatch numpy;
+    MMH3Output output;
+
+    if (nargs > 5) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 5 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        target = args[0];
+    }
+
+    if (nargs >= 2) {
+        seed = args[1];
+    }
+
+    if (nargs >= 3) {
+        is_signed = PyObject_IsTrue(args[2]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        out = args[3];
+    }
+
+    if (nargs >= 5) {
+        if (mmh3_parse_threads(args[4], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "array") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "array", 1);
+                target = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                seed = args[nargs + i];
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 3);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 4);
+                out = args[nargs + i];
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 5);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (target == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'array' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_numpy_batch_init(&numpy, target, seed) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, numpy.batch.n * MMH3_32_DIGESTSIZE,
+                         is_signed == 1 ? 'i' : 'I') < 0) {
+        mmh3_numpy_batch_release(&numpy);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {numpy.batch.keys, numpy.batch.lens, numpy.seed,
+                                output.buf, numpy.seeds};
+    if (mmh3_run_parallel(mmh3_x86_32_batch, &batch_args, numpy.batch.n,
+                          numpy.batch.size, threads) < 0) {
+        mmh3_numpy_batch_release(&numpy);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    mmh3_numpy_batch_release(&numpy);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    mmh3_hash64_numpy_doc,
+    "hash64_numpy(array, seed=0, x64arch=True, signed=True, out=None, "
+    "threads=1) -> Buffer\n"
+    "\n"
+    "Return hashes of the elements of a NumPy string array as 64-bit\n"
+    "integer pairs.\n"
+    "\n"
+    "Calculated by the MurmurHash3_x{64, 86}_128 algorithm. The result\n"
+    "is a flat array of length ``2 * array.size``, where the items at\n"
+    "``2 * i`` and ``2 * i + 1`` are the tuple returned by\n"
+    "``hash64(element, seed, x64arch, signed)`` for the ``i``-th element\n"
+    "in C order. Elements of the dtype ``'U'`` are encoded in UTF-8. The\n"
+    "elements are read directly from the memory of the array, without\n"
+    "creating ``bytes`` or ``str`` objects. NumPy itself is not required.\n"
+    "Arrays of ``StringDType`` are not supported: they do not export their\n"
+    "memory and raise TypeError. Hash ``array.ravel().tolist()`` by\n"
+    "``hash64_many()`` instead, or convert them by ``array.astype('U<n>')``\n"
+    "with ``n`` at least the length of the longest string, since NumPy\n"
+    "cannot cast them to ``'U'`` without an explicit width and truncates\n"
+    "longer strings.\n"
+    "\n"
+    "Args:\n"
+    "    array (Buffer): A NumPy array of the dtype ``'S'`` or ``'U'``, or\n"
+    "        any other object that exports a buffer of such fixed-width\n"
+    "        strings. The array may have any shape and strides.\n"
+    "    seed (int | Buffer): The seed value. Must be an integer in the\n"
+    "        range [0, 0xFFFFFFFF], or a C-contiguous buffer of such\n"
+    "        integers whose shape is broadcast to that of ``array`` as in\n"
+    "        NumPy, giving the seed of each element.\n"
+    "    x64arch (Any): If True, use an algorithm optimized for 64-bit\n"
+    "        architecture. Otherwise, use one optimized for 32-bit\n"
+    "        architecture.\n"
+    "    signed (Any): If True, return signed integers (typecode ``'q'``).\n"
+    "        Otherwise, return unsigned integers (typecode ``'Q'``). Ignored\n"
+    "        if ``out`` is given.\n"
+    "    out (Buffer | None): A writable buffer with at least\n"
+    "        ``16 * array.size`` bytes to store the hashes as native 64-bit\n"
+    "        integers, such as a NumPy array of the dtype ``uint64`` and\n"
+    "        the shape ``array.shape + (2,)``. If None, a new\n"
+    "        ``array.array`` is allocated.\n"
+    "    threads (int): The maximum number of threads to hash the elements\n"
+    "        in parallel. Small arrays are hashed by fewer threads.\n"
+    "\n"
+    "Returns:\n"
+    "    Buffer: ``out`` if given, or a new ``array.array`` of the hash\n"
+    "    values otherwise.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_hash64_numpy(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+                  PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    PyObject *seed = NULL;
+    PyObject *out = NULL;
+    int x64arch = 1;
+    int is_signed = 1;
+    int threads = 1;
+    MMH3NumpyBatch numpy;
+    MMH3Output output;
+
+    if (nargs > 6) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 6 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        target = args[0];
+    }
+
+    if (nargs >= 2) {
+        seed = args[1];
+    }
+
+    if (nargs >= 3) {
+        x64arch = PyObject_IsTrue(args[2]);
+        if (x64arch == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 4) {
+        is_signed = PyObject_IsTrue(args[3]);
+        if (is_signed == -1) {
+            return NULL;
+        }
+    }
+
+    if (nargs >= 5) {
+        out = args[4];
+    }
+
+    if (nargs >= 6) {
+        if (mmh3_parse_threads(args[5], &threads) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "array") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "array", 1);
+                target = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 2);
+                seed = args[nargs + i];
+            }
+            else if (strcmp(kwname, "x64arch") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "x64arch", 3);
+                x64arch = PyObject_IsTrue(args[nargs + i]);
+                if (x64arch == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "signed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signed", 4);
+                is_signed = PyObject_IsTrue(args[nargs + i]);
+                if (is_signed == -1) {
+                    return NULL;
+                }
+            }
+            else if (strcmp(kwname, "out") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "out", 5);
+                out = args[nargs + i];
+            }
+            else if (strcmp(kwname, "threads") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "threads", 6);
+                if (mmh3_parse_threads(args[nargs + i], &threads) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (target == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'array' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_numpy_batch_init(&numpy, target, seed) < 0) {
+        return NULL;
+    }
+
+    if (numpy.batch.n > PY_SSIZE_T_MAX / MMH3_128_DIGESTSIZE) {
+        mmh3_numpy_batch_release(&numpy);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, out, numpy.batch.n * MMH3_128_DIGESTSIZE,
+                         is_signed == 1 ? 'q' : 'Q') < 0) {
+        mmh3_numpy_batch_release(&numpy);
+        return NULL;
+    }
+
+    MMH3BatchArgs batch_args = {numpy.batch.keys, numpy.batch.lens, numpy.seed,
+                                output.buf, numpy.seeds};
+    if (mmh3_run_parallel(
+            x64arch == 1 ? mmh3_x64_128_batch : mmh3_x86_128_batch,
+            &batch_args, numpy.batch.n, numpy.batch.size, threads) < 0) {
+        mmh3_numpy_batch_release(&numpy);
+        mmh3_output_abort(&output);
+        return NULL;
+    }
+    mmh3_numpy_batch_release(&numpy);
+
+    return mmh3_output_finish(&output);
+}
+
+//-----------------------------------------------------------------------------
+// SimHash
+
+/*
+ * Return the SimHash fingerprint of the n keys of batch, each of which is
+ * weighted by weights[i], or 1 if weights is NULL. Does not touch any
+ * Python object.
+ */
+static uint64_t
+mmh3_simhash_impl(const MMH3KeyBatch *batch, const double *weights,
+                  uint32_t seed)
+{
+    double acc[64] = {0};
+    uint64_t fingerprint = 0;
+
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        const double w = weights != NULL ? weights[i] : 1.0;
+        uint64_t out[2];
+
+        murmurhash3_x64_128(batch->keys[i], batch->lens[i], seed, out);
+        for (int b = 0; b < 64; b++) {
+            acc[b] += ((out[0] >> b) & 1) ? w : -w;
+        }
+    }
+
+    for (int b = 0; b < 64; b++) {
+        if (acc[b] > 0) {
+            fingerprint |= (uint64_t)1 << b;
+        }
+    }
+
+    return fingerprint;
+}
+
+PyDoc_STRVAR(
+    mmh3_simhash_doc,
+    "simhash(keys, weights=None, seed=0) -> int\n"
+    "\n"
+    "Return the 64-bit SimHash fingerprint of weighted keys.\n"
+    "\n"
+    "Each key, e.g., a token or a shingle of a document, is hashed to the\n"
+    "first value of ``hash64(key, seed, signed=False)``. The ``b``-th bit\n"
+    "of the fingerprint is 1 if the total weight of the keys whose hashes\n"
+    "have the ``b``-th bit set is greater than that of the other keys, and\n"
+    "0 otherwise. Similar sets of keys have fingerprints with a small\n"
+    "Hamming distance, which can be searched by ``SimHashIndex``.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys, i.e., the features.\n"
+    "    weights (Iterable[float] | None): The weights of the keys, of the\n"
+    "        same length as ``keys``. If None, every key has the weight 1.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "\n"
+    "Returns:\n"
+    "    int: The fingerprint as an unsigned 64-bit integer.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+mmh3_simhash(PyObject *self, PyObject *const *args, Py_ssize_t nargs,
+             PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    PyObject *weights_obj = NULL;
+    uint32_t seed = 0;
+    double *weights = NULL;
+    uint64_t fingerprint = 0;
+    MMH3KeyBatch batch;
+
+    if (nargs > 3) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 3 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        weights_obj = args[1];
+    }
+
+    if (nargs >= 3) {
+        if (mmh3_parse_seed(args[2], &seed) < 0) {
+            return NULL;
+        }
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "weights") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "weights", 2);
+                weights_obj = args[nargs + i];
+            }
+            else if (strcmp(kwname, "seed") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "seed", 3);
+                if (mmh3_parse_seed(args[nargs + i], &seed) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (weights_obj != NULL && weights_obj != Py_None) {
+        PyObject *seq =
+            PySequence_Fast(weights_obj, "weights must be an iterable");
+        if (seq == NULL) {
+            mmh3_key_batch_release(&batch);
+            return NULL;
+        }
+
+        if (PySequence_Fast_GET_SIZE(seq) != batch.n) {
+            PyErr_Format(PyExc_ValueError,
+                         "weights must have the same number of items as "
+                         "keys (%zd and %zd given)",
+                         PySequence_Fast_GET_SIZE(seq), batch.n);
+            Py_DECREF(seq);
+            mmh3_key_batch_release(&batch);
+            return NULL;
+        }
+
+        weights = PyMem_New(double, batch.n > 0 ? batch.n : 1);
+        if (weights == NULL) {
+            Py_DECREF(seq);
+            mmh3_key_batch_release(&batch);
+            return PyErr_NoMemory();
+        }
+
+        for (Py_ssize_t i = 0; i < batch.n; i++) {
+            weights[i] = PyFloat_AsDouble(PySequence_Fast_GET_ITEM(seq, i));
+            if (weights[i] == -1.0 && PyErr_Occurred()) {
+                PyMem_Free(weights);
+                Py_DECREF(seq);
+                mmh3_key_batch_release(&batch);
+                return NULL;
+            }
+        }
+
+        Py_DECREF(seq);
+    }
+
+    MMH3_HASH_MAYBE_ALLOW_THREADS(
+        batch.size, fingerprint = mmh3_simhash_impl(&batch, weights, seed));
+
+    PyMem_Free(weights);
+    mmh3_key_batch_release(&batch);
+
+    return PyLong_FromUnsignedLongLong(fingerprint);
+}
+
+PyDoc_STRVAR(mmh3_simd_name_doc,
+             "_simd_name() -> str\n"
+             "\n"
+             "Return the name of the multi-lane kernel used by batch hash\n"
+             "functions, e.g., ``'avx2'`` or ``'none'``. Used by tests.\n");
+
+static PyObject *
+mmh3_simd_name(PyObject *self, PyObject *Py_UNUSED(ignored))
+{
+    return PyUnicode_FromString(murmurhash3_simd_name());
+}
+
+// Casting to PyCFunction is mandatory for
+//   METH_VARARGS | METH_KEYWORDS functions.
+// See
+// https://docs.python.org/3/extending/extending.html#keyword-parameters-for-extension-functions
+static PyMethodDef Mmh3Methods[] = {
+    {"hash", (PyCFunction)mmh3_hash, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash_doc},
+    {"hash_from_buffer", (PyCFunction)mmh3_hash_from_buffer,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash_from_buffer_doc},
+    {"hash64", (PyCFunction)mmh3_hash64, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash64_doc},
+    {"hash128", (PyCFunction)mmh3_hash128, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash128_doc},
+    {"hash_bytes", (PyCFunction)mmh3_hash_bytes, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash_bytes_doc},
+    {"mmh3_32_digest", (PyCFunction)mmh3_mmh3_32_digest, METH_FASTCALL,
+     mmh3_mmh3_32_digest_doc},
+    {"mmh3_32_sintdigest", (PyCFunction)mmh3_mmh3_32_sintdigest, METH_FASTCALL,
+     mmh3_mmh3_32_sintdigest_doc},
+    {"mmh3_32_uintdigest", (PyCFunction)mmh3_mmh3_32_uintdigest, METH_FASTCALL,
+     mmh3_mmh3_32_uintdigest_doc},
+    {"mmh3_x64_128_digest", (PyCFunction)mmh3_mmh3_x64_128_digest,
+     METH_FASTCALL, mmh3_mmh3_x64_128_digest_doc},
+    {"mmh3_x64_128_sintdigest", (PyCFunction)mmh3_mmh3_x64_128_sintdigest,
+     METH_FASTCALL, mmh3_mmh3_x64_128_sintdigest_doc},
+    {"mmh3_x64_128_uintdigest", (PyCFunction)mmh3_mmh3_x64_128_uintdigest,
+     METH_FASTCALL, mmh3_mmh3_x64_128_uintdigest_doc},
+    {"mmh3_x64_128_stupledigest", (PyCFunction)mmh3_mmh3_x64_128_stupledigest,
+     METH_FASTCALL, mmh3_mmh3_x64_128_stupledigest_doc},
+    {"mmh3_x64_128_utupledigest", (PyCFunction)mmh3_mmh3_x64_128_utupledigest,
+     METH_FASTCALL, mmh3_mmh3_x64_128_utupledigest_doc},
+    {"mmh3_x86_128_digest", (PyCFunction)mmh3_mmh3_x86_128_digest,
+     METH_FASTCALL, mmh3_mmh3_x86_128_digest_doc},
+    {"mmh3_x86_128_sintdigest", (PyCFunction)mmh3_mmh3_x86_128_sintdigest,
+     METH_FASTCALL, mmh3_mmh3_x86_128_sintdigest_doc},
+    {"mmh3_x86_128_uintdigest", (PyCFunction)mmh3_mmh3_x86_128_uintdigest,
+     METH_FASTCALL, mmh3_mmh3_x86_128_uintdigest_doc},
+    {"mmh3_x86_128_stupledigest", (PyCFunction)mmh3_mmh3_x86_128_stupledigest,
+     METH_FASTCALL, mmh3_mmh3_x86_128_stupledigest_doc},
+    {"mmh3_x86_128_utupledigest", (PyCFunction)mmh3_mmh3_x86_128_utupledigest,
+     METH_FASTCALL, mmh3_mmh3_x86_128_utupledigest_doc},
+    {"hash_many", (PyCFunction)mmh3_hash_many, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash_many_doc},
+    {"hash64_many", (PyCFunction)mmh3_hash64_many,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash64_many_doc},
+    {"hash_bytes_many", (PyCFunction)mmh3_hash_bytes_many,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash_bytes_many_doc},
+    {"mmh3_32_uintdigest_rows", (PyCFunction)mmh3_mmh3_32_uintdigest_rows,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_mmh3_32_uintdigest_rows_doc},
+    {"mmh3_x64_128_digest_rows", (PyCFunction)mmh3_mmh3_x64_128_digest_rows,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_mmh3_x64_128_digest_rows_doc},
+    {"mmh3_32_uintdigest_spans", (PyCFunction)mmh3_mmh3_32_uintdigest_spans,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_mmh3_32_uintdigest_spans_doc},
+    {"mmh3_x64_128_digest_spans", (PyCFunction)mmh3_mmh3_x64_128_digest_spans,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_mmh3_x64_128_digest_spans_doc},
+    {"hash_int64", (PyCFunction)mmh3_hash_int64, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash_int64_doc},
+    {"hash_int64_many", (PyCFunction)mmh3_hash_int64_many,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash_int64_many_doc},
+    {"hash_arrow", (PyCFunction)mmh3_hash_arrow, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash_arrow_doc},
+    {"hash64_arrow", (PyCFunction)mmh3_hash64_arrow,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash64_arrow_doc},
+    {"simhash", (PyCFunction)mmh3_simhash, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_simhash_doc},
+    {"hash_seeds", (PyCFunction)mmh3_hash_seeds, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash_seeds_doc},
+    {"hash64_seeds", (PyCFunction)mmh3_hash64_seeds,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash64_seeds_doc},
+    {"hash_seeds_many", (PyCFunction)mmh3_hash_seeds_many,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash_seeds_many_doc},
+    {"hash64_seeds_many", (PyCFunction)mmh3_hash64_seeds_many,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash64_seeds_many_doc},
+    {"hash_numpy", (PyCFunction)mmh3_hash_numpy, METH_FASTCALL | METH_KEYWORDS,
+     mmh3_hash_numpy_doc},
+    {"hash64_numpy", (PyCFunction)mmh3_hash64_numpy,
+     METH_FASTCALL | METH_KEYWORDS, mmh3_hash64_numpy_doc},
+    {"mmh3_32_digest_into", (PyCFunction)mmh3_mmh3_32_digest_into,
+     METH_FASTCALL, mmh3_mmh3_32_digest_into_doc},
+    {"mmh3_x64_128_digest_into", (PyCFunction)mmh3_mmh3_x64_128_digest_into,
+     METH_FASTCALL, mmh3_mmh3_x64_128_digest_into_doc},
+    {"mmh3_x86_128_digest_into", (PyCFunction)mmh3_mmh3_x86_128_digest_into,
+     METH_FASTCALL, mmh3_mmh3_x86_128_digest_into_doc},
+    {"_simd_name", (PyCFunction)mmh3_simd_name, METH_NOARGS,
+     mmh3_simd_name_doc},
+    {NULL, NULL, 0, NULL}};
+
+//-----------------------------------------------------------------------------
+// Hasher classes
+//
+// The design of hasher classes are loosely based on the Google Guava
+// implementation (Java)
+
+//-----------------------------------------------------------------------------
+// Hasher for murmurhash3_x86_32
+typedef struct {
+    PyObject_HEAD uint32_t h;
+    uint64_t buffer;
+    uint8_t shift;
+    Py_ssize_t length;
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3Hasher32;
+
+static PyTypeObject MMH3Hasher32Type;
+
+/*
+ * Feed n bytes to the carry-over buffer one by one, mixing the buffer into
+ * *h1 whenever it gets a full block. Used only for the bytes before and after
+ * the whole blocks of an update, i.e., fewer than 4 bytes per call.
+ */
+static FORCE_INLINE void
+update32_feed_bytes(MMH3Hasher32 *self, uint32_t *h1, const uint8_t *data,
+                    Py_ssize_t n)
+{
+    const uint32_t c1 = 0xe6546b64;
+
+    for (Py_ssize_t i = 0; i < n; i++) {
+        self->buffer |= (uint64_t)data[i] << self->shift;
+        self->shift += 8;
+
+        if (self->shift == 32) {
+            *h1 ^= mixK1((uint32_t)self->buffer);
+            *h1 = mixH1(*h1, 0, 13, c1);
+            self->buffer = 0;
+            self->shift = 0;
+        }
+    }
+}
+
+static FORCE_INLINE void
+update32_unlocked(MMH3Hasher32 *self, const Py_buffer *buf)
+{
+    const uint8_t *data = (const uint8_t *)buf->buf;
+    Py_ssize_t len = buf->len;
+    Py_ssize_t head = 0;
+    Py_ssize_t nblocks = 0;
+    const uint32_t *blocks = NULL;
+    uint32_t h1 = self->h;
+    const uint32_t c1 = 0xe6546b64;
+
+    // Complete the pending partial block first, so that the rest of the
+    // input is aligned to the block boundary of the whole stream.
+    if (self->shift != 0) {
+        head = (32 - self->shift) / 8;
+        if (head > len) {
+            head = len;
+        }
+        update32_feed_bytes(self, &h1, data, head);
+    }
+
+    nblocks = (len - head) / 4;
+    blocks = (const uint32_t *)(data + head);
+
+    for (Py_ssize_t i = 0; i < nblocks; i++) {
+        h1 ^= mixK1(getblock32(blocks, i));
+        h1 = mixH1(h1, 0, 13, c1);
+    }
+
+    update32_feed_bytes(self, &h1, data + head + nblocks * 4,
+                        len - head - nblocks * 4);
+
+    self->h = h1;
+    self->length += len;
+}
+
+static void
+update32_feed_chunk(void *self, const Py_buffer *chunk)
+{
+    update32_unlocked((MMH3Hasher32 *)self, chunk);
+}
+
+// Same as update32_unlocked, but also accept a non-contiguous buffer.
+static void
+update32_view_unlocked(MMH3Hasher32 *self, const Py_buffer *buf)
+{
+    if (PyBuffer_IsContiguous(buf, 'C')) {
+        update32_unlocked(self, buf);
+    }
+    else {
+        mmh3_feed_strided(buf, update32_feed_chunk, self);
+    }
+}
+
+static void
+update32_impl(MMH3Hasher32 *self, Py_buffer *buf)
+{
+    MMH3_HASHER_UPDATE_LOCKED(self, buf->len,
+                              update32_view_unlocked(self, buf));
+    PyBuffer_Release(buf);
+}
+
+static void
+MMH3Hasher32_dealloc(MMH3Hasher32 *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+MMH3Hasher32_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    MMH3Hasher32 *self;
+    self = (MMH3Hasher32 *)type->tp_alloc(type, 0);
+    if (self != NULL) {
+        self->h = 0;
+        self->buffer = 0;
+        self->shift = 0;
+        self->length = 0;
+        MMH3_HASHER_INIT_MUTEX(self);
+    }
+    return (PyObject *)self;
+}
+
+/* It is impossible to add docstring for __init__ in Python C extension.
+  Therefore, the constructor docstring should be described in the class
+  docstring. See also https://stackoverflow.com/q/11913492 */
+static int
+MMH3Hasher32_init(MMH3Hasher32 *self, PyObject *args, PyObject *kwds)
+{
+    Py_buffer target_buf = {0};
+    long long seed = 0;
+    static char *kwlist[] = {"data", "seed", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|y*L", kwlist, &target_buf,
+                                     &seed))
+        return -1;
+
+    MMH3_VALIDATE_SEED_RETURN_INT(seed, target_buf);
+
+    self->h = (uint32_t)seed;
+
+    if (target_buf.buf != NULL) {
+        // target_buf will be released in update32_impl
+        update32_impl(self, &target_buf);
+    }
+
+    return 0;
+}
+
+/* Construct a hasher without going through tp_new and tp_init, which would
+   require packing the arguments into a tuple and a dict. */
+static PyObject *
+MMH3Hasher32_vectorcall(PyObject *type, PyObject *const *args, size_t nargsf,
+                        PyObject *kwnames)
+{
+    Py_buffer buf;
+    uint32_t seed = 0;
+    MMH3Hasher32 *self = NULL;
+    const int has_data = mmh3_hasher_parse_args(
+        args, PyVectorcall_NARGS(nargsf), kwnames, &buf, &seed);
+
+    if (has_data == -1) {
+        return NULL;
+    }
+
+    self = (MMH3Hasher32 *)MMH3Hasher32_new((PyTypeObject *)type, NULL, NULL);
+    if (self == NULL) {
+        if (has_data) {
+            PyBuffer_Release(&buf);
+        }
+        return NULL;
+    }
+
+    self->h = seed;
+
+    if (has_data) {
+        // buf will be released in update32_impl
+        update32_impl(self, &buf);
+    }
+
+    return (PyObject *)self;
+}
+
+PyDoc_STRVAR(
+    MMH3Hasher_update_doc,
+    "update(data)\n"
+    "\n"
+    "Update this hash object's state with the provided bytes-like object.\n"
+    "\n"
+    "Args:\n"
+    "    data (Buffer): The buffer to hash.\n");
+
+static PyObject *
+MMH3Hasher32_update(MMH3Hasher32 *self, PyObject *obj)
+{
+    Py_buffer buf;
+
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(obj, &buf);
+
+    // buf will be released in update32_impl
+    update32_impl(self, &buf);
+
+    Py_RETURN_NONE;
+}
+
+static FORCE_INLINE uint32_t
+digest32_impl(uint32_t h, uint64_t k1, Py_ssize_t length)
+{
+    h ^= mixK1(k1);
+    h ^= length;
+    h = fmix32(h);
+    return h;
+}
+
+PyDoc_STRVAR(MMH3Hasher_digest_doc,
+             "digest() -> bytes\n"
+             "\n"
+             "Return the digest value as a ``bytes`` object.\n"
+             "\n"
+             "Returns:\n"
+             "    bytes: The digest value.\n");
+
+PyDoc_STRVAR(
+    MMH3Hasher_digest_into_doc,
+    "digest_into(out, offset=0, /) -> None\n"
+    "\n"
+    "Write the digest value into a buffer.\n"
+    "\n"
+    "The bytes written are the same as those returned by ``digest()``, but\n"
+    "no new object is created.\n"
+    "\n"
+    "Args:\n"
+    "    out (Buffer): The writable buffer to write the digest into.\n"
+    "    offset (int): The position in ``out`` at which the digest is\n"
+    "        written.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyObject *
+MMH3Hasher32_digest(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3_HASHER_LOCK(self);
+    uint32_t h = digest32_impl(self->h, self->buffer, self->length);
+    MMH3_HASHER_UNLOCK(self);
+
+    char out[MMH3_32_DIGESTSIZE];
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    ((uint32_t *)out)[0] = bswap_32(h);
+#else
+    ((uint32_t *)out)[0] = h;
+#endif
+
+    return PyBytes_FromStringAndSize(out, MMH3_32_DIGESTSIZE);
+}
+
+static PyObject *
+MMH3Hasher32_digest_into(MMH3Hasher32 *self, PyObject *const *args,
+                         Py_ssize_t nargs)
+{
+    Py_buffer out_buf;
+    char *dest = NULL;
+
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes 1 or 2 arguments (%d given)", (int)nargs);
+        return NULL;
+    }
+
+    dest = mmh3_get_digest_dest(args[0], nargs == 2 ? args[1] : NULL,
+                                MMH3_32_DIGESTSIZE, &out_buf);
+    if (dest == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    uint32_t h = digest32_impl(self->h, self->buffer, self->length);
+    MMH3_HASHER_UNLOCK(self);
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    h = bswap_32(h);
+#endif
+
+    memcpy(dest, &h, MMH3_32_DIGESTSIZE);
+    PyBuffer_Release(&out_buf);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(MMH3Hasher_sintdigest_doc,
+             "sintdigest() -> int\n"
+             "\n"
+             "Return the digest value as a signed integer.\n"
+             "\n"
+             "Returns:\n"
+             "    int: The digest value as a signed integer.\n");
+
+static PyObject *
+MMH3Hasher32_sintdigest(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3_HASHER_LOCK(self);
+    uint32_t h = digest32_impl(self->h, self->buffer, self->length);
+    MMH3_HASHER_UNLOCK(self);
+
+    // Note that simple casting ("(int32_t) h") is an undefined behavior
+    int32_t result = *(int32_t *)&h;
+
+    return PyLong_FromLong(result);
+}
+
+PyDoc_STRVAR(MMH3Hasher_uintdigest_doc,
+             "uintdigest() -> int\n"
+             "\n"
+             "Return the digest value as an unsigned integer.\n"
+             "\n"
+             "Returns:\n"
+             "    int: The digest value as an unsigned integer.\n");
+
+static PyObject *
+MMH3Hasher32_uintdigest(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3_HASHER_LOCK(self);
+    uint32_t h = digest32_impl(self->h, self->buffer, self->length);
+    MMH3_HASHER_UNLOCK(self);
+
+    return PyLong_FromUnsignedLong(h);
+}
+
+PyDoc_STRVAR(MMH3Hasher32_copy_doc,
+             "copy() -> mmh3_32\n"
+             "\n"
+             "Return a copy of the hash object..\n"
+             "\n"
+             "Returns:\n"
+             "    mmh3_32: A copy of this hash object.\n");
+
+static PyObject *
+MMH3Hasher32_copy(MMH3Hasher32 *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3Hasher32 *p;
+
+    if ((p = PyObject_New(MMH3Hasher32, &MMH3Hasher32Type)) == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    p->h = self->h;
+    p->buffer = self->buffer;
+    p->shift = self->shift;
+    p->length = self->length;
+    MMH3_HASHER_INIT_MUTEX(p);
+    MMH3_HASHER_UNLOCK(self);
+
+    return (PyObject *)p;
+}
+
+static PyMethodDef MMH3Hasher32_methods[] = {
     {"update", (PyCFunction)MMH3Hasher32_update, METH_O,
      MMH3Hasher_update_doc},
-    {
-        "digest",
-        (PyCFunction)MMH3Hasher32_digest,
-        METH_NOARGS,
-        MMH3Hasher_digest_doc,
-    },
-    {"sintdigest", (PyCFunction)MMH3Hasher32_sintdigest, METH_NOARGS,
+    {
+        "digest",
+        (PyCFunction)MMH3Hasher32_digest,
+        METH_NOARGS,
+        MMH3Hasher_digest_doc,
+    },
+    {"digest_into", (PyCFunction)MMH3Hasher32_digest_into, METH_FASTCALL,
+     MMH3Hasher_digest_into_doc},
+    {"sintdigest", (PyCFunction)MMH3Hasher32_sintdigest, METH_NOARGS,
+     MMH3Hasher_sintdigest_doc},
+    {"uintdigest", (PyCFunction)MMH3Hasher32_uintdigest, METH_NOARGS,
+     MMH3Hasher_uintdigest_doc},
+    {"copy", (PyCFunction)MMH3Hasher32_copy, METH_NOARGS,
+     MMH3Hasher32_copy_doc},
+    {NULL} /* Sentinel */
+};
+
+static PyObject *
+MMH3Hasher32_get_digest_size(PyObject *self, void *closure)
+{
+    return PyLong_FromLong(MMH3_32_DIGESTSIZE);
+}
+
+static PyObject *
+MMH3Hasher32_get_block_size(PyObject *self, void *closure)
+{
+    return PyLong_FromLong(MMH3_32_BLOCKSIZE);
+}
+
+static PyObject *
+MMH3Hasher32_get_name(PyObject *self, void *closure)
+{
+    return PyUnicode_FromStringAndSize("mmh3_32", 7);
+}
+
+static PyGetSetDef MMH3Hasher32_getsetters[] = {
+    {"digest_size", (getter)MMH3Hasher32_get_digest_size, NULL,
+     "int: Number of bytes in this hashes output", NULL},
+    {"block_size", (getter)MMH3Hasher32_get_block_size, NULL,
+     "int: Number of bytes of the internal block of this algorithm", NULL},
+    {"name", (getter)MMH3Hasher32_get_name, NULL,
+     "str: The hash algorithm being used by this object", NULL},
+    {NULL} /* Sentinel */
+};
+
+PyDoc_STRVAR(
+    MMH3Hasher32Type_doc,
+    "__init__(data=None, seed=0)\n"
+    "\n"
+    "Hasher for incrementally calculating the murmurhash3_x86_32 hash.\n"
+    "\n"
+    "Args:\n"
+    "    data (Buffer | None): The initial data to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionchanged:: 5.2.0\n"
+    "    Experimental no-GIL support; thread safety not fully verified.\n"
+    "\n"
+    ".. versionchanged:: 5.0.0\n"
+    "    Added the optional ``data`` parameter as the first argument.\n"
+    "    The ``seed`` argument is now strictly checked for valid range.\n");
+
+static PyTypeObject MMH3Hasher32Type = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.mmh3_32",
+    .tp_doc = MMH3Hasher32Type_doc,
+    .tp_basicsize = sizeof(MMH3Hasher32),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = MMH3Hasher32_new,
+    .tp_init = (initproc)MMH3Hasher32_init,
+    .tp_vectorcall = (vectorcallfunc)MMH3Hasher32_vectorcall,
+    .tp_dealloc = (destructor)MMH3Hasher32_dealloc,
+    .tp_methods = MMH3Hasher32_methods,
+    .tp_getset = MMH3Hasher32_getsetters,
+};
+
+//-----------------------------------------------------------------------------
+// Hasher for murmurhash3_x64_128
+typedef struct {
+    PyObject_HEAD uint64_t h1;
+    uint64_t h2;
+    uint64_t buffer1;
+    uint64_t buffer2;
+    uint8_t shift;
+    Py_ssize_t length;
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3Hasher128x64;
+
+static PyTypeObject MMH3Hasher128x64Type;
+
+/*
+ * Feed n bytes to the carry-over buffers one by one, mixing the buffers into
+ * *h1 and *h2 whenever they get a full block. Used only for the bytes before
+ * and after the whole blocks of an update, i.e., fewer than 16 bytes per
+ * call.
+ */
+static FORCE_INLINE void
+update_x64_128_feed_bytes(MMH3Hasher128x64 *self, uint64_t *h1, uint64_t *h2,
+                          const uint8_t *data, Py_ssize_t n)
+{
+    for (Py_ssize_t i = 0; i < n; i++) {
+        const uint64_t k = data[i];
+
+        if (self->shift < 64) {
+            self->buffer1 |= k << self->shift;
+        }
+        else {
+            self->buffer2 |= k << (self->shift - 64);
+        }
+        self->shift += 8;
+
+        if (self->shift == 128) {
+            *h1 ^= mixK1_x64_128(self->buffer1);
+            *h1 = mixH_x64_128(*h1, *h2, 27, 0x52dce729UL);
+            *h2 ^= mixK2_x64_128(self->buffer2);
+            *h2 = mixH_x64_128(*h2, *h1, 31, 0x38495ab5UL);
+
+            self->buffer1 = 0;
+            self->buffer2 = 0;
+            self->shift = 0;
+        }
+    }
+}
+
+static FORCE_INLINE void
+update_x64_128_unlocked(MMH3Hasher128x64 *self, const Py_buffer *buf)
+{
+    const uint8_t *data = (const uint8_t *)buf->buf;
+    Py_ssize_t len = buf->len;
+    Py_ssize_t head = 0;
+    Py_ssize_t nblocks = 0;
+    const uint64_t *blocks = NULL;
+    uint64_t h1 = self->h1;
+    uint64_t h2 = self->h2;
+
+    // Complete the pending partial block first, so that the rest of the
+    // input is aligned to the block boundary of the whole stream.
+    if (self->shift != 0) {
+        head = (128 - self->shift) / 8;
+        if (head > len) {
+            head = len;
+        }
+        update_x64_128_feed_bytes(self, &h1, &h2, data, head);
+    }
+
+    nblocks = (len - head) / 16;
+    blocks = (const uint64_t *)(data + head);
+
+    for (Py_ssize_t i = 0; i < nblocks; i++) {
+        uint64_t k1 = getblock64(blocks, i * 2);
+        uint64_t k2 = getblock64(blocks, i * 2 + 1);
+
+        h1 ^= mixK1_x64_128(k1);
+        h1 = mixH_x64_128(h1, h2, 27, 0x52dce729UL);
+        h2 ^= mixK2_x64_128(k2);
+        h2 = mixH_x64_128(h2, h1, 31, 0x38495ab5UL);
+    }
+
+    update_x64_128_feed_bytes(self, &h1, &h2, data + head + nblocks * 16,
+                              len - head - nblocks * 16);
+
+    self->h1 = h1;
+    self->h2 = h2;
+    self->length += len;
+}
+
+static void
+update_x64_128_feed_chunk(void *self, const Py_buffer *chunk)
+{
+    update_x64_128_unlocked((MMH3Hasher128x64 *)self, chunk);
+}
+
+// Same as update_x64_128_unlocked, but also accept a non-contiguous buffer.
+static void
+update_x64_128_view_unlocked(MMH3Hasher128x64 *self, const Py_buffer *buf)
+{
+    if (PyBuffer_IsContiguous(buf, 'C')) {
+        update_x64_128_unlocked(self, buf);
+    }
+    else {
+        mmh3_feed_strided(buf, update_x64_128_feed_chunk, self);
+    }
+}
+
+static void
+update_x64_128_impl(MMH3Hasher128x64 *self, Py_buffer *buf)
+{
+    MMH3_HASHER_UPDATE_LOCKED(self, buf->len,
+                              update_x64_128_view_unlocked(self, buf));
+    PyBuffer_Release(buf);
+}
+
+static void
+MMH3Hasher128x64_dealloc(MMH3Hasher128x64 *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+MMH3Hasher128x64_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    MMH3Hasher128x64 *self;
+    self = (MMH3Hasher128x64 *)type->tp_alloc(type, 0);
+    if (self != NULL) {
+        self->h1 = 0;
+        self->h2 = 0;
+        self->buffer1 = 0;
+        self->buffer2 = 0;
+        self->shift = 0;
+        self->length = 0;
+        MMH3_HASHER_INIT_MUTEX(self);
+    }
+    return (PyObject *)self;
+}
+
+static int
+MMH3Hasher128x64_init(MMH3Hasher128x64 *self, PyObject *args, PyObject *kwds)
+{
+    Py_buffer target_buf = {0};
+    long long seed = 0;
+    static char *kwlist[] = {"data", "seed", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|y*L", kwlist, &target_buf,
+                                     &seed))
+        return -1;
+
+    MMH3_VALIDATE_SEED_RETURN_INT(seed, target_buf);
+
+    self->h1 = (uint64_t)seed;
+    self->h2 = self->h1;
+
+    if (target_buf.buf != NULL) {
+        // target_buf will be released in update_x64_128_impl
+        update_x64_128_impl(self, &target_buf);
+    }
+
+    return 0;
+}
+
+/* Construct a hasher without going through tp_new and tp_init, which would
+   require packing the arguments into a tuple and a dict. */
+static PyObject *
+MMH3Hasher128x64_vectorcall(PyObject *type, PyObject *const *args,
+                            size_t nargsf, PyObject *kwnames)
+{
+    Py_buffer buf;
+    uint32_t seed = 0;
+    MMH3Hasher128x64 *self = NULL;
+    const int has_data = mmh3_hasher_parse_args(
+        args, PyVectorcall_NARGS(nargsf), kwnames, &buf, &seed);
+
+    if (has_data == -1) {
+        return NULL;
+    }
+
+    self = (MMH3Hasher128x64 *)MMH3Hasher128x64_new((PyTypeObject *)type, NULL,
+                                                    NULL);
+    if (self == NULL) {
+        if (has_data) {
+            PyBuffer_Release(&buf);
+        }
+        return NULL;
+    }
+
+    self->h1 = seed;
+    self->h2 = seed;
+
+    if (has_data) {
+        // buf will be released in update_x64_128_impl
+        update_x64_128_impl(self, &buf);
+    }
+
+    return (PyObject *)self;
+}
+
+static PyObject *
+MMH3Hasher128x64_update(MMH3Hasher128x64 *self, PyObject *obj)
+{
+    Py_buffer buf;
+
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(obj, &buf);
+
+    // buf will be released in update_x64_128_impl
+    update_x64_128_impl(self, &buf);
+
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+MMH3Hasher128x64_digest(MMH3Hasher128x64 *self, PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+    return PyBytes_FromStringAndSize(out, MMH3_128_DIGESTSIZE);
+}
+
+static PyObject *
+MMH3Hasher128x64_digest_into(MMH3Hasher128x64 *self, PyObject *const *args,
+                             Py_ssize_t nargs)
+{
+    Py_buffer out_buf;
+    char *dest = NULL;
+
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes 1 or 2 arguments (%d given)", (int)nargs);
+        return NULL;
+    }
+
+    dest = mmh3_get_digest_dest(args[0], nargs == 2 ? args[1] : NULL,
+                                MMH3_128_DIGESTSIZE, &out_buf);
+    if (dest == NULL) {
+        return NULL;
+    }
+
+    char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+
+    memcpy(dest, out, MMH3_128_DIGESTSIZE);
+    PyBuffer_Release(&out_buf);
+
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+MMH3Hasher128x64_sintdigest(MMH3Hasher128x64 *self,
+                            PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+    const int little_endian = 1;
+    const int is_signed = 1;
+
+    /**
+     * _PyLong_FromByteArray is not a part of the official Python/C API
+     * and may be removed in the future (although it is practically stable).
+     * cf.
+     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
+     */
+    PyObject *retval = _PyLong_FromByteArray(
+        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+
+    return retval;
+}
+
+static PyObject *
+MMH3Hasher128x64_uintdigest(MMH3Hasher128x64 *self,
+                            PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+    const int little_endian = 1;
+    const int is_signed = 0;
+
+    /**
+     * _PyLong_FromByteArray is not a part of the official Python/C API
+     * and may be removed in the future (although it is practically stable).
+     * cf.
+     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
+     */
+    PyObject *retval = _PyLong_FromByteArray(
+        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+
+    return retval;
+}
+
+PyDoc_STRVAR(MMH3Hasher128_stupledigest_doc,
+             "stupledigest() -> tuple[int, int]\n"
+             "\n"
+             "Return the digest value as a tuple of two signed integers.\n"
+             "\n"
+             "Returns:\n"
+             "    tuple[int, int]: The digest value as a tuple of two signed\n"
+             "    integers.\n");
+
+static PyObject *
+MMH3Hasher128x64_stupledigest(MMH3Hasher128x64 *self,
+                              PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+
+    const char *valflag = "LL";
+    uint64_t result1 = ((uint64_t *)out)[0];
+    uint64_t result2 = ((uint64_t *)out)[1];
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result1 = bswap_64(result1);
+    result2 = bswap_64(result2);
+#endif
+
+    return Py_BuildValue(valflag, result1, result2);
+}
+
+PyDoc_STRVAR(
+    MMH3Hasher128_utupledigest_doc,
+    "utupledigest() -> tuple[int, int]\n"
+    "\n"
+    "Return the digest value as a tuple of two unsigned integers.\n"
+    "\n"
+    "Returns:\n"
+    "    tuple[int, int]: The digest value as a tuple of two unsigned\n"
+    "    integers.\n");
+
+static PyObject *
+MMH3Hasher128x64_utupledigest(MMH3Hasher128x64 *self,
+                              PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+
+    const char *valflag = "KK";
+    uint64_t result1 = ((uint64_t *)out)[0];
+    uint64_t result2 = ((uint64_t *)out)[1];
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result1 = bswap_64(result1);
+    result2 = bswap_64(result2);
+#endif
+
+    return Py_BuildValue(valflag, result1, result2);
+}
+
+PyDoc_STRVAR(MMH3Hasher128x64_copy_doc,
+             "copy() -> mmh3_128x64\n"
+             "\n"
+             "Return a copy of the hash object..\n"
+             "\n"
+             "Returns:\n"
+             "    mmh3_128x64: A copy of this hash object.\n");
+
+static PyObject *
+MMH3Hasher128x64_copy(MMH3Hasher128x64 *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3Hasher128x64 *p;
+
+    if ((p = PyObject_New(MMH3Hasher128x64, &MMH3Hasher128x64Type)) == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    p->h1 = self->h1;
+    p->h2 = self->h2;
+    p->buffer1 = self->buffer1;
+    p->buffer2 = self->buffer2;
+    p->shift = self->shift;
+    p->length = self->length;
+    MMH3_HASHER_INIT_MUTEX(p);
+    MMH3_HASHER_UNLOCK(self);
+
+    return (PyObject *)p;
+}
+
+static PyMethodDef MMH3Hasher128x64_methods[] = {
+    {"update", (PyCFunction)MMH3Hasher128x64_update, METH_O,
+     MMH3Hasher_update_doc},
+    {"digest", (PyCFunction)MMH3Hasher128x64_digest, METH_NOARGS,
+     MMH3Hasher_digest_doc},
+    {"digest_into", (PyCFunction)MMH3Hasher128x64_digest_into, METH_FASTCALL,
+     MMH3Hasher_digest_into_doc},
+    {"sintdigest", (PyCFunction)MMH3Hasher128x64_sintdigest, METH_NOARGS,
+     MMH3Hasher_sintdigest_doc},
+    {"uintdigest", (PyCFunction)MMH3Hasher128x64_uintdigest, METH_NOARGS,
+     MMH3Hasher_uintdigest_doc},
+    {"stupledigest", (PyCFunction)MMH3Hasher128x64_stupledigest, METH_NOARGS,
+     MMH3Hasher128_stupledigest_doc},
+    {"utupledigest", (PyCFunction)MMH3Hasher128x64_utupledigest, METH_NOARGS,
+     MMH3Hasher128_utupledigest_doc},
+    {"copy", (PyCFunction)MMH3Hasher128x64_copy, METH_NOARGS,
+     MMH3Hasher128x64_copy_doc},
+    {NULL} /* Sentinel */
+};
+
+static PyObject *
+MMH3Hasher128x64_get_digest_size(PyObject *self, void *closure)
+{
+    return PyLong_FromLong(MMH3_128_DIGESTSIZE);
+}
+
+static PyObject *
+MMH3Hasher128x64_get_block_size(PyObject *self, void *closure)
+{
+    return PyLong_FromLong(MMH3_128_BLOCKSIZE);
+}
+
+static PyObject *
+MMH3Hasher128x64_get_name(PyObject *self, void *closure)
+{
+    return PyUnicode_FromStringAndSize("mmh3_x64_128", 12);
+}
+
+static PyGetSetDef MMH3Hasher128x64_getsetters[] = {
+    {"digest_size", (getter)MMH3Hasher128x64_get_digest_size, NULL,
+     "int: Number of bytes in this hashes output.", NULL},
+    {"block_size", (getter)MMH3Hasher128x64_get_block_size, NULL,
+     "int: Number of bytes of the internal block of this algorithm.", NULL},
+    {"name", (getter)MMH3Hasher128x64_get_name, NULL,
+     "str: The hash algorithm being used by this object.", NULL},
+    {NULL} /* Sentinel */
+};
+
+PyDoc_STRVAR(
+    MMH3Hasher128x64Type_doc,
+    "__init__(data=None, seed=0)\n"
+    "\n"
+    "Hasher for incrementally calculating the murmurhash3_x64_128 hash.\n"
+    "\n"
+    "Args:\n"
+    "    data (Buffer | None): The initial data to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionchanged:: 5.2.0\n"
+    "    Experimental no-GIL support; thread safety not fully verified.\n"
+    "\n"
+    ".. versionchanged:: 5.0.0\n"
+    "    Added the optional ``data`` parameter as the first argument.\n"
+    "    The ``seed`` argument is now strictly checked for valid range.\n");
+
+static PyTypeObject MMH3Hasher128x64Type = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.mmh3_x64_128",
+    .tp_doc = MMH3Hasher128x64Type_doc,
+    .tp_basicsize = sizeof(MMH3Hasher128x64),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = MMH3Hasher128x64_new,
+    .tp_init = (initproc)MMH3Hasher128x64_init,
+    .tp_vectorcall = (vectorcallfunc)MMH3Hasher128x64_vectorcall,
+    .tp_dealloc = (destructor)MMH3Hasher128x64_dealloc,
+    .tp_methods = MMH3Hasher128x64_methods,
+    .tp_getset = MMH3Hasher128x64_getsetters,
+};
+
+//-----------------------------------------------------------------------------
+// Hasher for murmurhash3_x86_128
+typedef struct {
+    PyObject_HEAD uint32_t h1;
+    uint32_t h2;
+    uint32_t h3;
+    uint32_t h4;
+    uint32_t buffer1;
+    uint32_t buffer2;
+    uint32_t buffer3;
+    uint32_t buffer4;
+    uint8_t shift;
+    Py_ssize_t length;
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3Hasher128x86;
+
+static PyTypeObject MMH3Hasher128x86Type;
+
+/*
+ * Mix a full 16-byte block into the four lanes of MurmurHash3_x86_128.
+ */
+static FORCE_INLINE void
+update_x86_128_mix_block(uint32_t *h1, uint32_t *h2, uint32_t *h3,
+                         uint32_t *h4, uint32_t k1, uint32_t k2, uint32_t k3,
+                         uint32_t k4)
+{
+    const uint32_t c1 = 0x239b961b;
+    const uint32_t c2 = 0xab0e9789;
+    const uint32_t c3 = 0x38b34ae5;
+    const uint32_t c4 = 0xa1e38b93;
+
+    *h1 ^= mixK_x86_128(k1, 15, c1, c2);
+    *h1 = mixH1(*h1, *h2, 19, 0x561ccd1bUL);
+
+    *h2 ^= mixK_x86_128(k2, 16, c2, c3);
+    *h2 = mixH1(*h2, *h3, 17, 0x0bcaa747UL);
+
+    *h3 ^= mixK_x86_128(k3, 17, c3, c4);
+    *h3 = mixH1(*h3, *h4, 15, 0x96cd1c35UL);
+
+    *h4 ^= mixK_x86_128(k4, 18, c4, c1);
+    *h4 = mixH1(*h4, *h1, 13, 0x32ac3b17UL);
+}
+
+/*
+ * Feed n bytes to the carry-over buffers one by one, mixing the buffers into
+ * the lanes whenever they get a full block. Used only for the bytes before
+ * and after the whole blocks of an update, i.e., fewer than 16 bytes per
+ * call.
+ */
+static FORCE_INLINE void
+update_x86_128_feed_bytes(MMH3Hasher128x86 *self, uint32_t *h1, uint32_t *h2,
+                          uint32_t *h3, uint32_t *h4, const uint8_t *data,
+                          Py_ssize_t n)
+{
+    for (Py_ssize_t i = 0; i < n; i++) {
+        const uint32_t k = data[i];
+
+        if (self->shift < 32) {
+            self->buffer1 |= k << self->shift;
+        }
+        else if (self->shift < 64) {
+            self->buffer2 |= k << (self->shift - 32);
+        }
+        else if (self->shift < 96) {
+            self->buffer3 |= k << (self->shift - 64);
+        }
+        else {
+            self->buffer4 |= k << (self->shift - 96);
+        }
+        self->shift += 8;
+
+        if (self->shift == 128) {
+            update_x86_128_mix_block(h1, h2, h3, h4, self->buffer1,
+                                     self->buffer2, self->buffer3,
+                                     self->buffer4);
+
+            self->buffer1 = 0;
+            self->buffer2 = 0;
+            self->buffer3 = 0;
+            self->buffer4 = 0;
+            self->shift = 0;
+        }
+    }
+}
+
+static FORCE_INLINE void
+update_x86_128_unlocked(MMH3Hasher128x86 *self, const Py_buffer *buf)
+{
+    const uint8_t *data = (const uint8_t *)buf->buf;
+    Py_ssize_t len = buf->len;
+    Py_ssize_t head = 0;
+    Py_ssize_t nblocks = 0;
+    const uint32_t *blocks = NULL;
+    uint32_t h1 = self->h1;
+    uint32_t h2 = self->h2;
+    uint32_t h3 = self->h3;
+    uint32_t h4 = self->h4;
+
+    // Complete the pending partial block first, so that the rest of the
+    // input is aligned to the block boundary of the whole stream.
+    if (self->shift != 0) {
+        head = (128 - self->shift) / 8;
+        if (head > len) {
+            head = len;
+        }
+        update_x86_128_feed_bytes(self, &h1, &h2, &h3, &h4, data, head);
+    }
+
+    nblocks = (len - head) / 16;
+    blocks = (const uint32_t *)(data + head);
+
+    for (Py_ssize_t i = 0; i < nblocks; i++) {
+        update_x86_128_mix_block(&h1, &h2, &h3, &h4, getblock32(blocks, i * 4),
+                                 getblock32(blocks, i * 4 + 1),
+                                 getblock32(blocks, i * 4 + 2),
+                                 getblock32(blocks, i * 4 + 3));
+    }
+
+    update_x86_128_feed_bytes(self, &h1, &h2, &h3, &h4,
+                              data + head + nblocks * 16,
+                              len - head - nblocks * 16);
+
+    self->h1 = h1;
+    self->h2 = h2;
+    self->h3 = h3;
+    self->h4 = h4;
+    self->length += len;
+}
+
+static void
+update_x86_128_feed_chunk(void *self, const Py_buffer *chunk)
+{
+    update_x86_128_unlocked((MMH3Hasher128x86 *)self, chunk);
+}
+
+// Same as update_x86_128_unlocked, but also accept a non-contiguous buffer.
+static void
+update_x86_128_view_unlocked(MMH3Hasher128x86 *self, const Py_buffer *buf)
+{
+    if (PyBuffer_IsContiguous(buf, 'C')) {
+        update_x86_128_unlocked(self, buf);
+    }
+    else {
+        mmh3_feed_strided(buf, update_x86_128_feed_chunk, self);
+    }
+}
+
+static void
+update_x86_128_impl(MMH3Hasher128x86 *self, Py_buffer *buf)
+{
+    MMH3_HASHER_UPDATE_LOCKED(self, buf->len,
+                              update_x86_128_view_unlocked(self, buf));
+    PyBuffer_Release(buf);
+}
+
+static void
+MMH3Hasher128x86_dealloc(MMH3Hasher128x86 *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+MMH3Hasher128x86_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    MMH3Hasher128x86 *self;
+    self = (MMH3Hasher128x86 *)type->tp_alloc(type, 0);
+    if (self != NULL) {
+        self->h1 = 0;
+        self->h2 = 0;
+        self->h3 = 0;
+        self->h4 = 0;
+        self->buffer1 = 0;
+        self->buffer2 = 0;
+        self->buffer3 = 0;
+        self->buffer4 = 0;
+        self->shift = 0;
+        self->length = 0;
+        MMH3_HASHER_INIT_MUTEX(self);
+    }
+    return (PyObject *)self;
+}
+
+static int
+MMH3Hasher128x86_init(MMH3Hasher128x86 *self, PyObject *args, PyObject *kwds)
+{
+    Py_buffer target_buf = {0};
+    long long seed = 0;
+    static char *kwlist[] = {"data", "seed", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|y*L", kwlist, &target_buf,
+                                     &seed))
+        return -1;
+
+    MMH3_VALIDATE_SEED_RETURN_INT(seed, target_buf);
+    self->h1 = (uint32_t)seed;
+    self->h2 = self->h1;
+    self->h3 = self->h1;
+    self->h4 = self->h1;
+
+    if (target_buf.buf != NULL) {
+        // target_buf will be released in update_x86_128_impl
+        update_x86_128_impl(self, &target_buf);
+    }
+
+    return 0;
+}
+
+/* Construct a hasher without going through tp_new and tp_init, which would
+   require packing the arguments into a tuple and a dict. */
+static PyObject *
+MMH3Hasher128x86_vectorcall(PyObject *type, PyObject *const *args,
+                            size_t nargsf, PyObject *kwnames)
+{
+    Py_buffer buf;
+    uint32_t seed = 0;
+    MMH3Hasher128x86 *self = NULL;
+    const int has_data = mmh3_hasher_parse_args(
+        args, PyVectorcall_NARGS(nargsf), kwnames, &buf, &seed);
+
+    if (has_data == -1) {
+        return NULL;
+    }
+
+    self = (MMH3Hasher128x86 *)MMH3Hasher128x86_new((PyTypeObject *)type, NULL,
+                                                    NULL);
+    if (self == NULL) {
+        if (has_data) {
+            PyBuffer_Release(&buf);
+        }
+        return NULL;
+    }
+
+    self->h1 = seed;
+    self->h2 = seed;
+    self->h3 = seed;
+    self->h4 = seed;
+
+    if (has_data) {
+        // buf will be released in update_x86_128_impl
+        update_x86_128_impl(self, &buf);
+    }
+
+    return (PyObject *)self;
+}
+
+static PyObject *
+MMH3Hasher128x86_update(MMH3Hasher128x86 *self, PyObject *obj)
+{
+    Py_buffer buf;
+
+    MMH3_GET_STRIDED_VIEW_OR_ERROUT(obj, &buf);
+
+    // buf will be released in update_x86_128_impl
+    update_x86_128_impl(self, &buf);
+
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+MMH3Hasher128x86_digest(MMH3Hasher128x86 *self, PyObject *Py_UNUSED(ignored))
+{
+    char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
+                        self->buffer2, self->buffer3, self->buffer4,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+    return PyBytes_FromStringAndSize(out, MMH3_128_DIGESTSIZE);
+}
+
+static PyObject *
+MMH3Hasher128x86_digest_into(MMH3Hasher128x86 *self, PyObject *const *args,
+                             Py_ssize_t nargs)
+{
+    Py_buffer out_buf;
+    char *dest = NULL;
+
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes 1 or 2 arguments (%d given)", (int)nargs);
+        return NULL;
+    }
+
+    dest = mmh3_get_digest_dest(args[0], nargs == 2 ? args[1] : NULL,
+                                MMH3_128_DIGESTSIZE, &out_buf);
+    if (dest == NULL) {
+        return NULL;
+    }
+
+    char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
+                        self->buffer2, self->buffer3, self->buffer4,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+
+    memcpy(dest, out, MMH3_128_DIGESTSIZE);
+    PyBuffer_Release(&out_buf);
+
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+MMH3Hasher128x86_sintdigest(MMH3Hasher128x86 *self,
+                            PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
+                        self->buffer2, self->buffer3, self->buffer4,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+    const int little_endian = 1;
+    const int is_signed = 1;
+
+    /**
+     * _PyLong_FromByteArray is not a part of the official Python/C API
+     * and may be removed in the future (although it is practically stable).
+     * cf.
+     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
+     */
+    PyObject *retval = _PyLong_FromByteArray(
+        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+
+    return retval;
+}
+
+static PyObject *
+MMH3Hasher128x86_uintdigest(MMH3Hasher128x86 *self,
+                            PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
+                        self->buffer2, self->buffer3, self->buffer4,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+    const int little_endian = 1;
+    const int is_signed = 0;
+
+    /**
+     * _PyLong_FromByteArray is not a part of the official Python/C API
+     * and may be removed in the future (although it is practically stable).
+     * cf.
+     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
+     */
+    PyObject *retval = _PyLong_FromByteArray(
+        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+
+    return retval;
+}
+
+static PyObject *
+MMH3Hasher128x86_stupledigest(MMH3Hasher128x86 *self,
+                              PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
+                        self->buffer2, self->buffer3, self->buffer4,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+
+    const char *valflag = "LL";
+    uint64_t result1 = ((uint64_t *)out)[0];
+    uint64_t result2 = ((uint64_t *)out)[1];
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result1 = bswap_64(result1);
+    result2 = bswap_64(result2);
+#endif
+
+    return Py_BuildValue(valflag, result1, result2);
+}
+
+static PyObject *
+MMH3Hasher128x86_utupledigest(MMH3Hasher128x86 *self,
+                              PyObject *Py_UNUSED(ignored))
+{
+    const char out[MMH3_128_DIGESTSIZE];
+    MMH3_HASHER_LOCK(self);
+    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
+                        self->buffer2, self->buffer3, self->buffer4,
+                        self->length, out);
+    MMH3_HASHER_UNLOCK(self);
+
+    const char *valflag = "KK";
+    uint64_t result1 = ((uint64_t *)out)[0];
+    uint64_t result2 = ((uint64_t *)out)[1];
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result1 = bswap_64(result1);
+    result2 = bswap_64(result2);
+#endif
+
+    return Py_BuildValue(valflag, result1, result2);
+}
+
+PyDoc_STRVAR(MMH3Hasher128x86_copy_doc,
+             "copy() -> mmh3_128x86\n"
+             "\n"
+             "Return a copy of the hash object..\n"
+             "\n"
+             "Returns:\n"
+             "    mmh3_128x86: A copy of this hash object.\n");
+
+static PyObject *
+MMH3Hasher128x86_copy(MMH3Hasher128x86 *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3Hasher128x86 *p;
+
+    if ((p = PyObject_New(MMH3Hasher128x86, &MMH3Hasher128x86Type)) == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    p->h1 = self->h1;
+    p->h2 = self->h2;
+    p->h3 = self->h3;
+    p->h4 = self->h4;
+    p->buffer1 = self->buffer1;
+    p->buffer2 = self->buffer2;
+    p->buffer3 = self->buffer3;
+    p->buffer4 = self->buffer4;
+    p->shift = self->shift;
+    p->length = self->length;
+    MMH3_HASHER_INIT_MUTEX(p);
+    MMH3_HASHER_UNLOCK(self);
+
+    return (PyObject *)p;
+}
+
+static PyMethodDef MMH3Hasher128x86_methods[] = {
+    {"update", (PyCFunction)MMH3Hasher128x86_update, METH_O,
+     MMH3Hasher_update_doc},
+    {"digest", (PyCFunction)MMH3Hasher128x86_digest, METH_NOARGS,
+     MMH3Hasher_digest_doc},
+    {"digest_into", (PyCFunction)MMH3Hasher128x86_digest_into, METH_FASTCALL,
+     MMH3Hasher_digest_into_doc},
+    {"sintdigest", (PyCFunction)MMH3Hasher128x86_sintdigest, METH_NOARGS,
      MMH3Hasher_sintdigest_doc},
-    {"uintdigest", (PyCFunction)MMH3Hasher32_uintdigest, METH_NOARGS,
+    {"uintdigest", (PyCFunction)MMH3Hasher128x86_uintdigest, METH_NOARGS,
      MMH3Hasher_uintdigest_doc},
-    {"copy", (PyCFunction)MMH3Hasher32_copy, METH_NOARGS,
-     MMH3Hasher32_copy_doc},
+    {"stupledigest", (PyCFunction)MMH3Hasher128x86_stupledigest, METH_NOARGS,
+     MMH3Hasher128_stupledigest_doc},
+    {"utupledigest", (PyCFunction)MMH3Hasher128x86_utupledigest, METH_NOARGS,
+     MMH3Hasher128_utupledigest_doc},
+    {"copy", (PyCFunction)MMH3Hasher128x86_copy, METH_NOARGS,
+     MMH3Hasher128x86_copy_doc},
+    {NULL} /* Sentinel */
+};
+
+static PyObject *
+MMH3Hasher128x86_get_digest_size(PyObject *self, void *closure)
+{
+    return PyLong_FromLong(MMH3_128_DIGESTSIZE);
+}
+
+static PyObject *
+MMH3Hasher128x86_get_block_size(PyObject *self, void *closure)
+{
+    return PyLong_FromLong(MMH3_128_BLOCKSIZE);
+}
+
+static PyObject *
+MMH3Hasher128x86_get_name(PyObject *self, void *closure)
+{
+    return PyUnicode_FromStringAndSize("mmh3_x86_128", 12);
+}
+
+static PyGetSetDef MMH3Hasher128x86_getsetters[] = {
+    {"digest_size", (getter)MMH3Hasher128x86_get_digest_size, NULL,
+     "int: Number of bytes in this hashes output", NULL},
+    {"block_size", (getter)MMH3Hasher128x86_get_block_size, NULL,
+     "int: Number of bytes of the internal block of this algorithm", NULL},
+    {"name", (getter)MMH3Hasher128x86_get_name, NULL,
+     "str: The hash algorithm being used by this object", NULL},
+    {NULL} /* Sentinel */
+};
+
+PyDoc_STRVAR(
+    MMH3Hasher128x86Type_doc,
+    "__init__(data=None, seed=0)\n"
+    "\n"
+    "Hasher for incrementally calculating the murmurhash3_x86_128 hash.\n"
+    "\n"
+    "Args:\n"
+    "    data (Buffer | None): The initial data to hash.\n"
+    "    seed (int): The seed value. Must be an integer in the range "
+    "[0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionchanged:: 5.2.0\n"
+    "    Experimental no-GIL support; thread safety not fully verified.\n"
+    "\n"
+    ".. versionchanged:: 5.0.0\n"
+    "    Added the optional ``data`` parameter as the first argument.\n"
+    "    The ``seed`` argument is now strictly checked for valid range.\n");
+
+static PyTypeObject MMH3Hasher128x86Type = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.mmh3_x86_128",
+    .tp_doc = MMH3Hasher128x86Type_doc,
+    .tp_basicsize = sizeof(MMH3Hasher128x86),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = MMH3Hasher128x86_new,
+    .tp_init = (initproc)MMH3Hasher128x86_init,
+    .tp_vectorcall = (vectorcallfunc)MMH3Hasher128x86_vectorcall,
+    .tp_dealloc = (destructor)MMH3Hasher128x86_dealloc,
+    .tp_methods = MMH3Hasher128x86_methods,
+    .tp_getset = MMH3Hasher128x86_getsetters,
+};
+
+//-----------------------------------------------------------------------------
+// Hashing of strided buffers by one-shot functions
+
+static void
+mmh3_x86_32_view(const Py_buffer *view, uint32_t seed, void *out)
+{
+    MMH3Hasher32 state;
+    uint32_t h;
+
+    if (PyBuffer_IsContiguous(view, 'C')) {
+        murmurhash3_x86_32(view->buf, view->len, seed, out);
+        return;
+    }
+
+    state.h = seed;
+    state.buffer = 0;
+    state.shift = 0;
+    state.length = 0;
+    mmh3_feed_strided(view, update32_feed_chunk, &state);
+
+    h = digest32_impl(state.h, state.buffer, state.length);
+    memcpy(out, &h, sizeof(h));
+}
+
+/*
+ * The digest functions of the 128-bit hashers return the little-endian
+ * bytes of a digest, while murmurhash3_x{64, 86}_128 store two native
+ * 64-bit integers.
+ */
+static FORCE_INLINE void
+mmh3_digest128_to_native(const char *digest, void *out)
+{
+    memcpy(out, digest, MMH3_128_DIGESTSIZE);
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    ((uint64_t *)out)[0] = bswap_64(((uint64_t *)out)[0]);
+    ((uint64_t *)out)[1] = bswap_64(((uint64_t *)out)[1]);
+#endif
+}
+
+static void
+mmh3_x64_128_view(const Py_buffer *view, uint32_t seed, void *out)
+{
+    MMH3Hasher128x64 state;
+    char digest[MMH3_128_DIGESTSIZE];
+
+    if (PyBuffer_IsContiguous(view, 'C')) {
+        murmurhash3_x64_128(view->buf, view->len, seed, out);
+        return;
+    }
+
+    state.h1 = seed;
+    state.h2 = seed;
+    state.buffer1 = 0;
+    state.buffer2 = 0;
+    state.shift = 0;
+    state.length = 0;
+    mmh3_feed_strided(view, update_x64_128_feed_chunk, &state);
+
+    digest_x64_128_impl(state.h1, state.h2, state.buffer1, state.buffer2,
+                        state.length, digest);
+    mmh3_digest128_to_native(digest, out);
+}
+
+static void
+mmh3_x86_128_view(const Py_buffer *view, uint32_t seed, void *out)
+{
+    MMH3Hasher128x86 state;
+    char digest[MMH3_128_DIGESTSIZE];
+
+    if (PyBuffer_IsContiguous(view, 'C')) {
+        murmurhash3_x86_128(view->buf, view->len, seed, out);
+        return;
+    }
+
+    state.h1 = seed;
+    state.h2 = seed;
+    state.h3 = seed;
+    state.h4 = seed;
+    state.buffer1 = 0;
+    state.buffer2 = 0;
+    state.buffer3 = 0;
+    state.buffer4 = 0;
+    state.shift = 0;
+    state.length = 0;
+    mmh3_feed_strided(view, update_x86_128_feed_chunk, &state);
+
+    digest_x86_128_impl(state.h1, state.h2, state.h3, state.h4, state.buffer1,
+                        state.buffer2, state.buffer3, state.buffer4,
+                        state.length, digest);
+    mmh3_digest128_to_native(digest, out);
+}
+
+//-----------------------------------------------------------------------------
+// Lazy iterator over the hashes of an iterable
+
+// Algorithms of imap and the sketches below, selected by the algo argument
+#define MMH3_ALGO_X86_32 0
+#define MMH3_ALGO_X64_128 1
+#define MMH3_ALGO_X86_128 2
+
+/*
+ * Convert the name of an algorithm to one of the MMH3_ALGO_* values stored
+ * in result. Returns 0 on success and -1 with ValueError set on failure.
+ */
+static int
+mmh3_parse_algo(const char *algo, int *result)
+{
+    if (strcmp(algo, "mmh3_32") == 0) {
+        *result = MMH3_ALGO_X86_32;
+    }
+    else if (strcmp(algo, "mmh3_x64_128") == 0) {
+        *result = MMH3_ALGO_X64_128;
+    }
+    else if (strcmp(algo, "mmh3_x86_128") == 0) {
+        *result = MMH3_ALGO_X86_128;
+    }
+    else {
+        PyErr_Format(PyExc_ValueError,
+                     "algo must be 'mmh3_32', 'mmh3_x64_128', or "
+                     "'mmh3_x86_128', not '%s'",
+                     algo);
+        return -1;
+    }
+
+    return 0;
+}
+
+typedef struct {
+    PyObject_HEAD PyObject *it;  // iterator of the keys, NULL once exhausted
+    int algo;
+    uint32_t seed;
+    int is_signed;
+    Py_ssize_t chunk;
+    char *hashes;         // hashes of the current chunk as native words
+    Py_ssize_t capacity;  // number of hashes that fit in hashes
+    Py_ssize_t n;         // number of hashes in the current chunk
+    Py_ssize_t pos;       // index of the next hash to return
+} MMH3Imap;
+
+static PyTypeObject MMH3ImapType;
+
+static PyObject *
+MMH3Imap_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    PyObject *iterable = NULL;
+    const char *algo = "mmh3_32";
+    long long seed = 0;
+    int is_signed = 1;
+    Py_ssize_t chunk = 4096;
+    MMH3Imap *self = NULL;
+    static char *kwlist[] = {"iterable", "algo",  "seed",
+                             "signed",   "chunk", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|sLpn", kwlist, &iterable,
+                                     &algo, &seed, &is_signed, &chunk)) {
+        return NULL;
+    }
+
+    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
+
+    if (chunk < 1) {
+        PyErr_SetString(PyExc_ValueError, "chunk must be a positive integer");
+        return NULL;
+    }
+
+    self = (MMH3Imap *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    if (mmh3_parse_algo(algo, &self->algo) < 0) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    self->it = PyObject_GetIter(iterable);
+    if (self->it == NULL) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    self->seed = (uint32_t)seed;
+    self->is_signed = is_signed;
+    self->chunk = chunk;
+    self->hashes = NULL;
+    self->capacity = 0;
+    self->n = 0;
+    self->pos = 0;
+
+    return (PyObject *)self;
+}
+
+static int
+MMH3Imap_traverse(MMH3Imap *self, visitproc visit, void *arg)
+{
+    Py_VISIT(self->it);
+    return 0;
+}
+
+static void
+MMH3Imap_dealloc(MMH3Imap *self)
+{
+    PyObject_GC_UnTrack(self);
+    Py_CLEAR(self->it);
+    PyMem_Free(self->hashes);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+/*
+ * Pull up to self->chunk keys from the iterator and hash them in one batch.
+ * Returns the number of new hashes, which is 0 once the iterator is
+ * exhausted, or -1 with an exception set on failure. The keys pulled before
+ * a failure are discarded.
+ */
+static Py_ssize_t
+MMH3Imap_fill(MMH3Imap *self)
+{
+    const Py_ssize_t digest_size = self->algo == MMH3_ALGO_X86_32
+                                       ? MMH3_32_DIGESTSIZE
+                                       : MMH3_128_DIGESTSIZE;
+    PyObject *keys = NULL;
+    MMH3KeyBatch batch;
+
+    self->n = 0;
+    self->pos = 0;
+
+    if (self->it == NULL) {
+        return 0;
+    }
+
+    keys = PyList_New(0);
+    if (keys == NULL) {
+        return -1;
+    }
+
+    while (PyList_GET_SIZE(keys) < self->chunk) {
+        PyObject *key = PyIter_Next(self->it);
+        if (key == NULL) {
+            if (PyErr_Occurred()) {
+                Py_DECREF(keys);
+                return -1;
+            }
+            Py_CLEAR(self->it);
+            break;
+        }
+
+        int retval = PyList_Append(keys, key);
+        Py_DECREF(key);
+        if (retval < 0) {
+            Py_DECREF(keys);
+            return -1;
+        }
+    }
+
+    // Validated in the same way as the keys of hash_many().
+    int retval = mmh3_key_batch_init(&batch, keys);
+    Py_DECREF(keys);
+    if (retval < 0) {
+        return -1;
+    }
+
+    if (batch.n > self->capacity) {
+        char *hashes = PyMem_Realloc(self->hashes, batch.n * digest_size);
+        if (hashes == NULL) {
+            mmh3_key_batch_release(&batch);
+            PyErr_NoMemory();
+            return -1;
+        }
+        self->hashes = hashes;
+        self->capacity = batch.n;
+    }
+
+    MMH3BatchArgs batch_args = {batch.keys, batch.lens, self->seed,
+                                self->hashes};
+    mmh3_range_func func = self->algo == MMH3_ALGO_X86_32 ? mmh3_x86_32_batch
+                           : self->algo == MMH3_ALGO_X64_128
+                               ? mmh3_x64_128_batch
+                               : mmh3_x86_128_batch;
+    if (mmh3_run_parallel(func, &batch_args, batch.n, batch.size, 1) < 0) {
+        mmh3_key_batch_release(&batch);
+        return -1;
+    }
+
+    self->n = batch.n;
+    mmh3_key_batch_release(&batch);
+
+    return self->n;
+}
+
+static PyObject *
+MMH3Imap_next_unlocked(MMH3Imap *self)
+{
+    if (self->pos == self->n) {
+        Py_ssize_t n = MMH3Imap_fill(self);
+        if (n <= 0) {
+            // NULL without an exception set means the end of iteration.
+            return NULL;
+        }
+    }
+
+    const Py_ssize_t i = self->pos++;
+
+    if (self->algo == MMH3_ALGO_X86_32) {
+        const uint32_t h = ((const uint32_t *)self->hashes)[i];
+        if (self->is_signed) {
+            return PyLong_FromLong((int32_t)h);
+        }
+        return PyLong_FromUnsignedLong(h);
+    }
+
+    uint64_t result[2];
+    memcpy(result, self->hashes + i * MMH3_128_DIGESTSIZE,
+           MMH3_128_DIGESTSIZE);
+
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    result[0] = bswap_64(result[0]);
+    result[1] = bswap_64(result[1]);
+#endif
+
+    return _PyLong_FromByteArray((unsigned char *)result, MMH3_128_DIGESTSIZE,
+                                 1, self->is_signed);
+}
+
+static PyObject *
+MMH3Imap_next(MMH3Imap *self)
+{
+    PyObject *retval = NULL;
+
+#ifdef Py_GIL_DISABLED
+    Py_BEGIN_CRITICAL_SECTION(self);
+    retval = MMH3Imap_next_unlocked(self);
+    Py_END_CRITICAL_SECTION();
+#else
+    retval = MMH3Imap_next_unlocked(self);
+#endif
+
+    return retval;
+}
+
+PyDoc_STRVAR(
+    MMH3ImapType_doc,
+    "__init__(iterable, algo='mmh3_32', seed=0, signed=True, chunk=4096)\n"
+    "\n"
+    "Iterator over the hashes of the keys pulled lazily from an iterable.\n"
+    "\n"
+    "The keys are pulled from ``iterable`` in chunks of at most ``chunk``\n"
+    "keys, and each chunk is hashed in one batch like ``hash_many()``.\n"
+    "Therefore, the memory usage stays bounded for an unbounded iterable,\n"
+    "such as a generator or a database cursor, while the per-key overhead\n"
+    "of calling a hash function from Python is amortized. The hash of each\n"
+    "key is yielded as an integer, which equals\n"
+    "``mmh3_32_sintdigest(key, seed)`` (if ``signed``) or\n"
+    "``mmh3_32_uintdigest(key, seed)`` (otherwise) for the default\n"
+    "``algo``, and likewise for the other algorithms.\n"
+    "\n"
+    "If ``iterable`` raises an exception or yields a key that is neither\n"
+    "``bytes`` nor ``str``, the exception is propagated when the chunk\n"
+    "containing it is pulled, and the other keys of that chunk are\n"
+    "discarded.\n"
+    "\n"
+    "Args:\n"
+    "    iterable (Iterable[bytes | str]): The keys to hash.\n"
+    "    algo (str): The algorithm, one of ``'mmh3_32'``,\n"
+    "        ``'mmh3_x64_128'``, and ``'mmh3_x86_128'``.\n"
+    "    seed (int): The seed value. Must be an integer in the range\n"
+    "        [0, 0xFFFFFFFF].\n"
+    "    signed (bool): If True, yield signed integers. Otherwise, yield\n"
+    "        unsigned integers.\n"
+    "    chunk (int): The maximum number of keys pulled from ``iterable``\n"
+    "        and hashed at once. Must be positive.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyTypeObject MMH3ImapType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.imap",
+    .tp_doc = MMH3ImapType_doc,
+    .tp_basicsize = sizeof(MMH3Imap),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_new = MMH3Imap_new,
+    .tp_traverse = (traverseproc)MMH3Imap_traverse,
+    .tp_dealloc = (destructor)MMH3Imap_dealloc,
+    .tp_iter = PyObject_SelfIter,
+    .tp_iternext = (iternextfunc)MMH3Imap_next,
+};
+
+//-----------------------------------------------------------------------------
+// MinHash
+
+typedef struct {
+    PyObject_HEAD int algo;
+    uint32_t seed;
+    Py_ssize_t num_perm;
+    uint32_t *seeds;   // seed + j for each permutation j
+    uint64_t *hashes;  // hashes of the current key, 2 * num_perm words
+    char *signature;   // num_perm native uint32_t or uint64_t minima
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3MinHash;
+
+static PyTypeObject MMH3MinHashType;
+
+// The size of each value of the signature of a MinHash object
+#define MMH3_MINHASH_ITEMSIZE(self) \
+    ((self)->algo == MMH3_ALGO_X86_32 ? sizeof(uint32_t) : sizeof(uint64_t))
+
+/*
+ * Allocate a MinHash object with an empty signature, in which every value
+ * is the maximum. Returns NULL with an exception set on failure.
+ */
+static MMH3MinHash *
+mmh3_minhash_alloc(PyTypeObject *type, int algo, uint32_t seed,
+                   Py_ssize_t num_perm)
+{
+    MMH3MinHash *self = (MMH3MinHash *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    self->algo = algo;
+    self->seed = seed;
+    self->num_perm = num_perm;
+    MMH3_HASHER_INIT_MUTEX(self);
+
+    self->seeds = PyMem_New(uint32_t, num_perm);
+    self->hashes = PyMem_New(uint64_t, num_perm * 2);
+    self->signature = PyMem_Malloc(num_perm * MMH3_MINHASH_ITEMSIZE(self));
+    if (self->seeds == NULL || self->hashes == NULL ||
+        self->signature == NULL) {
+        Py_DECREF(self);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    for (Py_ssize_t j = 0; j < num_perm; j++) {
+        self->seeds[j] = seed + (uint32_t)j;
+    }
+    memset(self->signature, 0xff, num_perm * MMH3_MINHASH_ITEMSIZE(self));
+
+    return self;
+}
+
+static void
+mmh3_minhash_update_unlocked(MMH3MinHash *self, const char *key,
+                             Py_ssize_t len)
+{
+    const Py_ssize_t k = self->num_perm;
+
+    if (self->algo == MMH3_ALGO_X86_32) {
+        uint32_t *hashes = (uint32_t *)self->hashes;
+        uint32_t *signature = (uint32_t *)self->signature;
+
+        mmh3_x86_32_seeds(key, len, self->seeds, k, hashes);
+        for (Py_ssize_t j = 0; j < k; j++) {
+            if (hashes[j] < signature[j]) {
+                signature[j] = hashes[j];
+            }
+        }
+        return;
+    }
+
+    uint64_t *signature = (uint64_t *)self->signature;
+
+    if (self->algo == MMH3_ALGO_X64_128) {
+        mmh3_x64_128_seeds(key, len, self->seeds, k, self->hashes);
+    }
+    else {
+        mmh3_x86_128_seeds(key, len, self->seeds, k, self->hashes);
+    }
+    for (Py_ssize_t j = 0; j < k; j++) {
+        if (self->hashes[j * 2] < signature[j]) {
+            signature[j] = self->hashes[j * 2];
+        }
+    }
+}
+
+static void
+mmh3_minhash_update_batch_unlocked(MMH3MinHash *self,
+                                   const MMH3KeyBatch *batch)
+{
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        mmh3_minhash_update_unlocked(self, batch->keys[i], batch->lens[i]);
+    }
+}
+
+/*
+ * Update self with the keys of an iterable. Returns 0 on success and -1
+ * with an exception set on failure, in which case self is not updated.
+ */
+static int
+mmh3_minhash_update_many_impl(MMH3MinHash *self, PyObject *keys)
+{
+    MMH3KeyBatch batch;
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return -1;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, batch.size, mmh3_minhash_update_batch_unlocked(self, &batch));
+
+    mmh3_key_batch_release(&batch);
+    return 0;
+}
+
+static void
+MMH3MinHash_dealloc(MMH3MinHash *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    PyMem_Free(self->seeds);
+    PyMem_Free(self->hashes);
+    PyMem_Free(self->signature);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+MMH3MinHash_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    PyObject *keys = NULL;
+    Py_ssize_t num_perm = 128;
+    long long seed = 0;
+    const char *algo_name = "mmh3_32";
+    int algo = MMH3_ALGO_X86_32;
+    MMH3MinHash *self = NULL;
+    static char *kwlist[] = {"keys", "num_perm", "seed", "algo", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OnLs", kwlist, &keys,
+                                     &num_perm, &seed, &algo_name)) {
+        return NULL;
+    }
+
+    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
+
+    if (num_perm < 1 || num_perm > PY_SSIZE_T_MAX / MMH3_128_DIGESTSIZE) {
+        PyErr_SetString(PyExc_ValueError,
+                        "num_perm must be a positive integer");
+        return NULL;
+    }
+
+    if (mmh3_parse_algo(algo_name, &algo) < 0) {
+        return NULL;
+    }
+
+    self = mmh3_minhash_alloc(type, algo, (uint32_t)seed, num_perm);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    if (keys != NULL && keys != Py_None &&
+        mmh3_minhash_update_many_impl(self, keys) < 0) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    return (PyObject *)self;
+}
+
+PyDoc_STRVAR(MMH3MinHash_update_doc,
+             "update(key)\n"
+             "\n"
+             "Add a key to the set summarized by this object.\n"
+             "\n"
+             "Args:\n"
+             "    key (bytes | str): The key to add.\n");
+
+static PyObject *
+MMH3MinHash_update(MMH3MinHash *self, PyObject *obj)
+{
+    PyObject *target = NULL;
+    MMH3Key key;
+
+    MMH3_HASH_VALIDATE_AND_SET_KEY(obj, target);
+    MMH3_HASH_INIT_KEY(key, target);
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, key.len, mmh3_minhash_update_unlocked(self, key.buf, key.len));
+
+    mmh3_key_release(&key);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3MinHash_update_many_doc,
+    "update_many(keys)\n"
+    "\n"
+    "Add many keys to the set summarized by this object.\n"
+    "\n"
+    "Same as calling ``update()`` for each key, but the keys are hashed in\n"
+    "one batch like ``hash_many()``. If any key is invalid, none of the keys\n"
+    "is added.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys to add.\n");
+
+static PyObject *
+MMH3MinHash_update_many(MMH3MinHash *self, PyObject *keys)
+{
+    if (mmh3_minhash_update_many_impl(self, keys) < 0) {
+        return NULL;
+    }
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3MinHash_signature_doc,
+    "signature() -> array.array[int]\n"
+    "\n"
+    "Return the signature, i.e., the minimum hash of the keys for each\n"
+    "permutation.\n"
+    "\n"
+    "Returns:\n"
+    "    array.array[int]: The ``num_perm`` values of the signature, of the\n"
+    "    typecode ``'I'`` if ``algo`` is ``'mmh3_32'`` and ``'Q'``\n"
+    "    otherwise. The values are the maximum of the type if no key has\n"
+    "    been added.\n");
+
+static PyObject *
+MMH3MinHash_signature(MMH3MinHash *self, PyObject *Py_UNUSED(ignored))
+{
+    const Py_ssize_t size = self->num_perm * MMH3_MINHASH_ITEMSIZE(self);
+    MMH3Output output;
+
+    if (mmh3_output_init(&output, NULL, size,
+                         self->algo == MMH3_ALGO_X86_32 ? 'I' : 'Q') < 0) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    memcpy(output.buf, self->signature, size);
+    MMH3_HASHER_UNLOCK(self);
+
+    return mmh3_output_finish(&output);
+}
+
+/*
+ * Return a copy of the signature of other, which must be a MinHash object
+ * with the same parameters as self, or NULL with an exception set on
+ * failure. The copy must be freed by PyMem_Free(). name is the name of the
+ * calling method used in error messages.
+ */
+static char *
+mmh3_minhash_copy_other(MMH3MinHash *self, PyObject *other, const char *name)
+{
+    if (!PyObject_TypeCheck(other, &MMH3MinHashType)) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s() argument must be MinHash, not '%s'", name,
+                     Py_TYPE(other)->tp_name);
+        return NULL;
+    }
+
+    MMH3MinHash *o = (MMH3MinHash *)other;
+    if (o->algo != self->algo || o->seed != self->seed ||
+        o->num_perm != self->num_perm) {
+        PyErr_Format(PyExc_ValueError,
+                     "cannot %s MinHash objects with different num_perm, "
+                     "seed, or algo",
+                     name);
+        return NULL;
+    }
+
+    const Py_ssize_t size = o->num_perm * MMH3_MINHASH_ITEMSIZE(o);
+    char *signature = PyMem_Malloc(size);
+    if (signature == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(o);
+    memcpy(signature, o->signature, size);
+    MMH3_HASHER_UNLOCK(o);
+
+    return signature;
+}
+
+PyDoc_STRVAR(
+    MMH3MinHash_merge_doc,
+    "merge(other)\n"
+    "\n"
+    "Update this object with the element-wise minimum of the signatures.\n"
+    "\n"
+    "After the merge, this object summarizes the union of the two sets.\n"
+    "\n"
+    "Args:\n"
+    "    other (MinHash): A MinHash object with the same ``num_perm``,\n"
+    "        ``seed``, and ``algo``.\n");
+
+static PyObject *
+MMH3MinHash_merge(MMH3MinHash *self, PyObject *other)
+{
+    char *signature = mmh3_minhash_copy_other(self, other, "merge");
+    if (signature == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    for (Py_ssize_t j = 0; j < self->num_perm; j++) {
+        if (self->algo == MMH3_ALGO_X86_32) {
+            uint32_t *dest = (uint32_t *)self->signature;
+            const uint32_t value = ((const uint32_t *)signature)[j];
+            if (value < dest[j]) {
+                dest[j] = value;
+            }
+        }
+        else {
+            uint64_t *dest = (uint64_t *)self->signature;
+            const uint64_t value = ((const uint64_t *)signature)[j];
+            if (value < dest[j]) {
+                dest[j] = value;
+            }
+        }
+    }
+    MMH3_HASHER_UNLOCK(self);
+
+    PyMem_Free(signature);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3MinHash_jaccard_doc,
+    "jaccard(other) -> float\n"
+    "\n"
+    "Return the estimated Jaccard similarity of the two sets.\n"
+    "\n"
+    "The estimate is the fraction of the permutations for which the two\n"
+    "signatures agree.\n"
+    "\n"
+    "Args:\n"
+    "    other (MinHash): A MinHash object with the same ``num_perm``,\n"
+    "        ``seed``, and ``algo``.\n"
+    "\n"
+    "Returns:\n"
+    "    float: The estimated Jaccard similarity in the range [0, 1].\n");
+
+static PyObject *
+MMH3MinHash_jaccard(MMH3MinHash *self, PyObject *other)
+{
+    const Py_ssize_t size = self->num_perm * MMH3_MINHASH_ITEMSIZE(self);
+    const Py_ssize_t itemsize = MMH3_MINHASH_ITEMSIZE(self);
+    Py_ssize_t matches = 0;
+
+    char *signature = mmh3_minhash_copy_other(self, other, "jaccard");
+    if (signature == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    for (Py_ssize_t offset = 0; offset < size; offset += itemsize) {
+        matches += memcmp(self->signature + offset, signature + offset,
+                          itemsize) == 0;
+    }
+    MMH3_HASHER_UNLOCK(self);
+
+    PyMem_Free(signature);
+
+    return PyFloat_FromDouble((double)matches / (double)self->num_perm);
+}
+
+PyDoc_STRVAR(MMH3MinHash_copy_doc,
+             "copy() -> MinHash\n"
+             "\n"
+             "Return a copy of this object.\n"
+             "\n"
+             "Returns:\n"
+             "    MinHash: A copy of this object.\n");
+
+static PyObject *
+MMH3MinHash_copy(MMH3MinHash *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3MinHash *p = mmh3_minhash_alloc(Py_TYPE(self), self->algo, self->seed,
+                                        self->num_perm);
+    if (p == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    memcpy(p->signature, self->signature,
+           self->num_perm * MMH3_MINHASH_ITEMSIZE(self));
+    MMH3_HASHER_UNLOCK(self);
+
+    return (PyObject *)p;
+}
+
+static PyMethodDef MMH3MinHash_methods[] = {
+    {"update", (PyCFunction)MMH3MinHash_update, METH_O,
+     MMH3MinHash_update_doc},
+    {"update_many", (PyCFunction)MMH3MinHash_update_many, METH_O,
+     MMH3MinHash_update_many_doc},
+    {"signature", (PyCFunction)MMH3MinHash_signature, METH_NOARGS,
+     MMH3MinHash_signature_doc},
+    {"merge", (PyCFunction)MMH3MinHash_merge, METH_O, MMH3MinHash_merge_doc},
+    {"jaccard", (PyCFunction)MMH3MinHash_jaccard, METH_O,
+     MMH3MinHash_jaccard_doc},
+    {"copy", (PyCFunction)MMH3MinHash_copy, METH_NOARGS, MMH3MinHash_copy_doc},
+    {NULL} /* Sentinel */
+};
+
+static PyObject *
+MMH3MinHash_get_num_perm(MMH3MinHash *self, void *closure)
+{
+    return PyLong_FromSsize_t(self->num_perm);
+}
+
+static PyObject *
+MMH3MinHash_get_seed(MMH3MinHash *self, void *closure)
+{
+    return PyLong_FromUnsignedLong(self->seed);
+}
+
+static PyGetSetDef MMH3MinHash_getsetters[] = {
+    {"num_perm", (getter)MMH3MinHash_get_num_perm, NULL,
+     "int: Number of permutations, i.e., the length of the signature", NULL},
+    {"seed", (getter)MMH3MinHash_get_seed, NULL,
+     "int: The seed of the first permutation", NULL},
+    {NULL} /* Sentinel */
+};
+
+PyDoc_STRVAR(
+    MMH3MinHashType_doc,
+    "__init__(keys=None, num_perm=128, seed=0, algo='mmh3_32')\n"
+    "\n"
+    "MinHash signature of a set of keys for estimating Jaccard similarity.\n"
+    "\n"
+    "The value of the signature for the ``j``-th permutation is the minimum\n"
+    "unsigned hash of the keys with the seed ``(seed + j) & 0xFFFFFFFF``.\n"
+    "For the default ``algo``, it equals the minimum of\n"
+    "``mmh3_32_uintdigest(key, seed + j)``; for ``'mmh3_x64_128'`` and\n"
+    "``'mmh3_x86_128'``, it is the minimum of the first value of\n"
+    "``hash64(key, seed + j, x64arch, signed=False)``. Each key is read only\n"
+    "once per group of 8 permutations, like ``hash_seeds()``, and no Python\n"
+    "object is created per key.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str] | None): The initial keys to add.\n"
+    "    num_perm (int): The number of permutations. Must be positive.\n"
+    "    seed (int): The seed of the first permutation. Must be an integer\n"
+    "        in the range [0, 0xFFFFFFFF].\n"
+    "    algo (str): The algorithm, one of ``'mmh3_32'`` (32-bit\n"
+    "        signature), ``'mmh3_x64_128'``, and ``'mmh3_x86_128'`` (64-bit\n"
+    "        signature).\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyTypeObject MMH3MinHashType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.MinHash",
+    .tp_doc = MMH3MinHashType_doc,
+    .tp_basicsize = sizeof(MMH3MinHash),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = MMH3MinHash_new,
+    .tp_dealloc = (destructor)MMH3MinHash_dealloc,
+    .tp_methods = MMH3MinHash_methods,
+    .tp_getset = MMH3MinHash_getsetters,
+};
+
+//-----------------------------------------------------------------------------
+// Helpers for serialization of sketches
+//
+// Sketches are serialized as a fixed-size header followed by their tables,
+// all of which are stored in little-endian, so that a serialized sketch can
+// be moved between platforms and be used in place, e.g., through mmap, on
+// little-endian platforms.
+
+// Convert a native integer to little-endian and vice versa
+static FORCE_INLINE uint64_t
+mmh3_le64(uint64_t x)
+{
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    return mmh3_bswap64(x);
+#else
+    return x;
+#endif
+}
+
+static FORCE_INLINE uint32_t
+mmh3_le32(uint32_t x)
+{
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    return mmh3_bswap32(x);
+#else
+    return x;
+#endif
+}
+
+static FORCE_INLINE uint64_t
+mmh3_load_le64(const char *p)
+{
+    uint64_t x;
+    memcpy(&x, p, sizeof(x));
+    return mmh3_le64(x);
+}
+
+static FORCE_INLINE uint32_t
+mmh3_load_le32(const char *p)
+{
+    uint32_t x;
+    memcpy(&x, p, sizeof(x));
+    return mmh3_le32(x);
+}
+
+static FORCE_INLINE void
+mmh3_store_le64(char *p, uint64_t x)
+{
+    x = mmh3_le64(x);
+    memcpy(p, &x, sizeof(x));
+}
+
+static FORCE_INLINE void
+mmh3_store_le32(char *p, uint32_t x)
+{
+    x = mmh3_le32(x);
+    memcpy(p, &x, sizeof(x));
+}
+
+/*
+ * Return 1 if a table of native words can be used in place at p, i.e., p
+ * is aligned for uint64_t and the platform is little-endian, or 0 if the
+ * table must be copied.
+ */
+static FORCE_INLINE int
+mmh3_can_borrow_table(const char *p)
+{
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    return 0;
+#else
+    return ((uintptr_t)p % sizeof(uint64_t)) == 0;
+#endif
+}
+
+//-----------------------------------------------------------------------------
+// Sorted tables of entries for the indexes below
+
+// An entry of a table: a 64-bit key and the id of the item it belongs to
+typedef struct {
+    uint64_t key;
+    uint64_t id;
+} MMH3TableEntry;
+
+// Tables of the same number of entries. Entries are appended to the end of
+// each table and sorted by (key, id) lazily before lookups. The tables are
+// either allocated by PyMem or borrowed from a buffer of serialized tables.
+typedef struct {
+    MMH3TableEntry **tables;
+    Py_ssize_t count;     // number of tables
+    Py_ssize_t n;         // number of entries in each table
+    Py_ssize_t n_sorted;  // number of leading entries sorted in each table
+    Py_ssize_t capacity;  // entries allocated for each table, 0 if borrowed
+    Py_buffer view;       // buffer the tables are borrowed from, if view.obj
+} MMH3Tables;
+
+/*
+ * Initialize count empty tables. Returns 0 on success and -1 with an
+ * exception set on failure.
+ */
+static int
+mmh3_tables_init(MMH3Tables *t, Py_ssize_t count)
+{
+    t->count = count;
+    t->n = 0;
+    t->n_sorted = 0;
+    t->capacity = 0;
+    t->view.obj = NULL;
+
+    t->tables = PyMem_New(MMH3TableEntry *, count);
+    if (t->tables == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    for (Py_ssize_t i = 0; i < count; i++) {
+        t->tables[i] = NULL;
+    }
+
+    return 0;
+}
+
+static void
+mmh3_tables_free_entries(MMH3Tables *t)
+{
+    if (t->view.obj != NULL) {
+        PyBuffer_Release(&t->view);
+    }
+    else {
+        for (Py_ssize_t i = 0; i < t->count; i++) {
+            PyMem_Free(t->tables[i]);
+        }
+    }
+
+    for (Py_ssize_t i = 0; i < t->count; i++) {
+        t->tables[i] = NULL;
+    }
+}
+
+static void
+mmh3_tables_release(MMH3Tables *t)
+{
+    if (t->tables == NULL) {
+        return;
+    }
+
+    mmh3_tables_free_entries(t);
+    PyMem_Free(t->tables);
+    t->tables = NULL;
+}
+
+/*
+ * Make room for at least n entries in each table, copying the tables
+ * borrowed from a buffer if any. Returns 0 on success and -1 with an
+ * exception set on failure, in which case t is unchanged.
+ */
+static int
+mmh3_tables_reserve(MMH3Tables *t, Py_ssize_t n)
+{
+    const Py_ssize_t max_capacity =
+        PY_SSIZE_T_MAX / (Py_ssize_t)sizeof(MMH3TableEntry);
+
+    if (n <= t->capacity) {
+        return 0;
+    }
+
+    if (n > max_capacity) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    Py_ssize_t capacity = t->capacity > 16 ? t->capacity : 16;
+    while (capacity < n) {
+        capacity = capacity > max_capacity / 2 ? max_capacity : capacity * 2;
+    }
+
+    MMH3TableEntry **tables = PyMem_New(MMH3TableEntry *, t->count);
+    if (tables == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    for (Py_ssize_t i = 0; i < t->count; i++) {
+        tables[i] = PyMem_New(MMH3TableEntry, capacity);
+        if (tables[i] == NULL) {
+            while (i-- > 0) {
+                PyMem_Free(tables[i]);
+            }
+            PyMem_Free(tables);
+            PyErr_NoMemory();
+            return -1;
+        }
+        if (t->n > 0) {
+            memcpy(tables[i], t->tables[i], t->n * sizeof(MMH3TableEntry));
+        }
+    }
+
+    mmh3_tables_free_entries(t);
+    PyMem_Free(t->tables);
+    t->tables = tables;
+    t->capacity = capacity;
+
+    return 0;
+}
+
+static int
+mmh3_table_entry_compare(const void *a, const void *b)
+{
+    const MMH3TableEntry *x = (const MMH3TableEntry *)a;
+    const MMH3TableEntry *y = (const MMH3TableEntry *)b;
+
+    if (x->key != y->key) {
+        return x->key < y->key ? -1 : 1;
+    }
+    if (x->id != y->id) {
+        return x->id < y->id ? -1 : 1;
+    }
+    return 0;
+}
+
+static int
+mmh3_uint64_compare(const void *a, const void *b)
+{
+    const uint64_t x = *(const uint64_t *)a;
+    const uint64_t y = *(const uint64_t *)b;
+
+    return (x > y) - (x < y);
+}
+
+/*
+ * Sort the entries appended since the last sort and merge them into the
+ * sorted entries. Returns 0 on success and -1 with an exception set on
+ * failure.
+ */
+static int
+mmh3_tables_sort(MMH3Tables *t)
+{
+    const Py_ssize_t head = t->n_sorted;
+    MMH3TableEntry *tmp = NULL;
+
+    if (head == t->n) {
+        return 0;
+    }
+
+    if (head > 0) {
+        tmp = PyMem_New(MMH3TableEntry, head);
+        if (tmp == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+    }
+
+    for (Py_ssize_t c = 0; c < t->count; c++) {
+        MMH3TableEntry *table = t->tables[c];
+
+        qsort(table + head, t->n - head, sizeof(MMH3TableEntry),
+              mmh3_table_entry_compare);
+
+        if (head == 0) {
+            continue;
+        }
+
+        // Merge forward. The write position never passes the read position
+        // in the tail, so the tail can be merged in place.
+        memcpy(tmp, table, head * sizeof(MMH3TableEntry));
+        Py_ssize_t i = 0;
+        Py_ssize_t j = head;
+        Py_ssize_t k = 0;
+        while (i < head && j < t->n) {
+            if (mmh3_table_entry_compare(&table[j], &tmp[i]) < 0) {
+                table[k++] = table[j++];
+            }
+            else {
+                table[k++] = tmp[i++];
+            }
+        }
+        while (i < head) {
+            table[k++] = tmp[i++];
+        }
+    }
+
+    PyMem_Free(tmp);
+    t->n_sorted = t->n;
+
+    return 0;
+}
+
+/*
+ * Return the index of the first entry of a sorted table of n entries whose
+ * key is not less than key.
+ */
+static Py_ssize_t
+mmh3_table_lower_bound(const MMH3TableEntry *table, Py_ssize_t n, uint64_t key)
+{
+    Py_ssize_t lo = 0;
+    Py_ssize_t hi = n;
+
+    while (lo < hi) {
+        const Py_ssize_t mid = lo + (hi - lo) / 2;
+        if (table[mid].key < key) {
+            lo = mid + 1;
+        }
+        else {
+            hi = mid;
+        }
+    }
+
+    return lo;
+}
+
+/*
+ * Write the sorted tables to p in little-endian, which must have room for
+ * count * n * sizeof(MMH3TableEntry) bytes.
+ */
+static void
+mmh3_tables_write(const MMH3Tables *t, char *p)
+{
+    for (Py_ssize_t c = 0; c < t->count; c++) {
+        for (Py_ssize_t i = 0; i < t->n; i++, p += sizeof(MMH3TableEntry)) {
+            mmh3_store_le64(p, t->tables[c][i].key);
+            mmh3_store_le64(p + 8, t->tables[c][i].id);
+        }
+    }
+}
+
+/*
+ * Load sorted tables of n entries written by mmh3_tables_write() at p, a
+ * position in view. The tables are borrowed from view if possible, in which
+ * case t takes over view; otherwise they are copied. view is released in
+ * any case unless borrowed. Returns 0 on success and -1 with an exception
+ * set on failure.
+ */
+static int
+mmh3_tables_load(MMH3Tables *t, Py_buffer *view, const char *p, Py_ssize_t n)
+{
+    if (mmh3_can_borrow_table(p)) {
+        for (Py_ssize_t c = 0; c < t->count; c++) {
+            t->tables[c] =
+                (MMH3TableEntry *)(p + c * n * sizeof(MMH3TableEntry));
+        }
+        t->view = *view;
+        t->n = n;
+        t->n_sorted = n;
+        return 0;
+    }
+
+    if (mmh3_tables_reserve(t, n) < 0) {
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    for (Py_ssize_t c = 0; c < t->count; c++) {
+        for (Py_ssize_t i = 0; i < n; i++, p += sizeof(MMH3TableEntry)) {
+            t->tables[c][i].key = mmh3_load_le64(p);
+            t->tables[c][i].id = mmh3_load_le64(p + 8);
+        }
+    }
+    t->n = n;
+    t->n_sorted = n;
+
+    PyBuffer_Release(view);
+    return 0;
+}
+
+// A growable list of ids collected by a query
+typedef struct {
+    uint64_t *ids;
+    Py_ssize_t n;
+    Py_ssize_t capacity;
+} MMH3IdList;
+
+/*
+ * Append id to list. Returns 0 on success and -1 with an exception set on
+ * failure.
+ */
+static int
+mmh3_id_list_append(MMH3IdList *list, uint64_t id)
+{
+    if (list->n == list->capacity) {
+        const Py_ssize_t capacity =
+            list->capacity > 0 ? list->capacity * 2 : 16;
+        uint64_t *ids = PyMem_Realloc(list->ids, capacity * sizeof(uint64_t));
+        if (ids == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        list->ids = ids;
+        list->capacity = capacity;
+    }
+
+    list->ids[list->n++] = id;
+    return 0;
+}
+
+/*
+ * Free list and return its ids as a new array.array of the typecode 'Q',
+ * sorted in ascending order without duplicates, or NULL with an exception
+ * set on failure.
+ */
+static PyObject *
+mmh3_id_list_finish(MMH3IdList *list)
+{
+    MMH3Output output;
+    Py_ssize_t n = list->n;
+
+    if (n > 1) {
+        qsort(list->ids, n, sizeof(uint64_t), mmh3_uint64_compare);
+        Py_ssize_t unique = 1;
+        for (Py_ssize_t i = 1; i < n; i++) {
+            if (list->ids[i] != list->ids[unique - 1]) {
+                list->ids[unique++] = list->ids[i];
+            }
+        }
+        n = unique;
+    }
+
+    if (mmh3_output_init(&output, NULL, n * sizeof(uint64_t), 'Q') < 0) {
+        PyMem_Free(list->ids);
+        return NULL;
+    }
+    if (n > 0) {
+        memcpy(output.buf, list->ids, n * sizeof(uint64_t));
+    }
+    PyMem_Free(list->ids);
+
+    return mmh3_output_finish(&output);
+}
+
+/*
+ * Return the i-th item of a buffer acquired by mmh3_get_index_buffer() as
+ * an unsigned integer, zero-extended to 64 bits. Unlike
+ * mmh3_read_nonnegative(), the bits of signed items are taken as is.
+ */
+static FORCE_INLINE uint64_t
+mmh3_read_bits(const Py_buffer *view, Py_ssize_t i)
+{
+    const char *p = (const char *)view->buf + i * view->itemsize;
+
+    switch (view->itemsize) {
+        case 1:
+            return *(const uint8_t *)p;
+        case 2: {
+            uint16_t v;
+            memcpy(&v, p, 2);
+            return v;
+        }
+        case 4: {
+            uint32_t v;
+            memcpy(&v, p, 4);
+            return v;
+        }
+        default: {
+            uint64_t v;
+            memcpy(&v, p, 8);
+            return v;
+        }
+    }
+}
+
+/*
+ * Convert the optional argument obj of n non-negative integers, e.g., the
+ * ids of n items, into view, acquired by mmh3_get_index_buffer(). If obj is
+ * NULL or None, view->obj is set to NULL. name and items_name are used in
+ * error messages. Returns 0 on success and -1 with an exception set on
+ * failure.
+ */
+static int
+mmh3_get_nonnegative_items(PyObject *obj, const char *name, Py_ssize_t n,
+                           Py_buffer *view, int *is_signed,
+                           const char *items_name)
+{
+    view->obj = NULL;
+
+    if (obj == NULL || obj == Py_None) {
+        return 0;
+    }
+
+    if (mmh3_get_index_buffer(obj, name, view, is_signed) < 0) {
+        return -1;
+    }
+
+    if (view->len / view->itemsize != n) {
+        PyErr_Format(PyExc_ValueError,
+                     "%s must have the same number of items as %s (%zd and "
+                     "%zd given)",
+                     name, items_name, view->len / view->itemsize, n);
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    for (Py_ssize_t i = 0; i < n; i++) {
+        if (mmh3_read_nonnegative(view, *is_signed, i) < 0) {
+            PyErr_Format(PyExc_ValueError, "%s must be non-negative", name);
+            PyBuffer_Release(view);
+            return -1;
+        }
+    }
+
+    return 0;
+}
+
+//-----------------------------------------------------------------------------
+// LSH index for MinHash signatures
+
+// Serialized format of LSHIndex, in little-endian:
+//
+// offset  size  content
+// 0       8     magic "MMH3LSH1"
+// 8       4     bands
+// 12      4     rows
+// 16      4     seed
+// 20      4     reserved, 0
+// 24      8     number of entries in each table (n)
+// 32            bands tables of n entries (key, id), each sorted by (key, id)
+#define MMH3_LSH_MAGIC "MMH3LSH1"
+#define MMH3_LSH_HEADER_SIZE 32
+
+typedef struct {
+    PyObject_HEAD uint32_t bands;
+    uint32_t rows;
+    uint32_t seed;
+    MMH3Tables tables;  // a table for each band, keyed by the hash of a band
+    uint64_t *band;     // rows words of the band being hashed
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3LSHIndex;
+
+static PyTypeObject MMH3LSHIndexType;
+
+/*
+ * Allocate an empty LSHIndex object. Returns NULL with an exception set on
+ * failure.
+ */
+static MMH3LSHIndex *
+mmh3_lsh_alloc(PyTypeObject *type, uint32_t bands, uint32_t rows,
+               uint32_t seed)
+{
+    MMH3LSHIndex *self = (MMH3LSHIndex *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    self->bands = bands;
+    self->rows = rows;
+    self->seed = seed;
+    MMH3_HASHER_INIT_MUTEX(self);
+
+    if (mmh3_tables_init(&self->tables, bands) < 0) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    self->band = PyMem_New(uint64_t, rows);
+    if (self->band == NULL) {
+        Py_DECREF(self);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    return self;
+}
+
+static void
+MMH3LSHIndex_dealloc(MMH3LSHIndex *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    mmh3_tables_release(&self->tables);
+    PyMem_Free(self->band);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+/*
+ * Return the key of the b-th band of the signature starting at the item
+ * `start` of view, which must have been acquired by
+ * mmh3_get_index_buffer(). The values of the band are zero-extended to
+ * 64-bit little-endian words and hashed by murmurhash3_x64_128, so that the
+ * key does not depend on the item size or signedness of the buffer.
+ */
+static uint64_t
+mmh3_lsh_band_key_unlocked(MMH3LSHIndex *self, const Py_buffer *view,
+                           Py_ssize_t start, uint32_t b)
+{
+    const Py_ssize_t offset = start + (Py_ssize_t)b * self->rows;
+    uint64_t out[2];
+
+    for (uint32_t r = 0; r < self->rows; r++) {
+        self->band[r] = mmh3_le64(mmh3_read_bits(view, offset + r));
+    }
+
+    murmurhash3_x64_128(self->band, (Py_ssize_t)self->rows * 8, self->seed,
+                        out);
+    return out[0];
+}
+
+/*
+ * Acquire the signatures of obj as a buffer of native integers and store
+ * the number of signatures in *n. Returns 0 on success and -1 with an
+ * exception set on failure.
+ */
+static int
+mmh3_lsh_get_signatures(MMH3LSHIndex *self, PyObject *obj, const char *name,
+                        Py_buffer *view, Py_ssize_t *n)
+{
+    int is_signed = 0;
+    const Py_ssize_t width = (Py_ssize_t)self->bands * self->rows;
+
+    if (mmh3_get_index_buffer(obj, name, view, &is_signed) < 0) {
+        return -1;
+    }
+
+    const Py_ssize_t items = view->len / view->itemsize;
+    if (items % width != 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "%s must have a multiple of bands * rows = %zd items "
+                     "(%zd given)",
+                     name, width, items);
+        PyBuffer_Release(view);
+        return -1;
+    }
+
+    *n = items / width;
+    return 0;
+}
+
+PyDoc_STRVAR(
+    MMH3LSHIndex_insert_many_doc,
+    "insert_many(signatures, ids=None)\n"
+    "\n"
+    "Insert many signatures into the index.\n"
+    "\n"
+    "Args:\n"
+    "    signatures (Buffer): The signatures as a buffer of native integers\n"
+    "        of the shape ``(n, bands * rows)`` or a flat buffer of\n"
+    "        ``n * bands * rows`` integers, e.g., the concatenated\n"
+    "        results of ``MinHash.signature()`` or a NumPy array of the\n"
+    "        dtype ``uint32`` or ``uint64``.\n"
+    "    ids (Buffer | None): The ids of the signatures as a buffer of ``n``\n"
+    "        non-negative native integers. If None, the signatures are\n"
+    "        numbered consecutively from ``len(self)``.\n");
+
+static PyObject *
+MMH3LSHIndex_insert_many(MMH3LSHIndex *self, PyObject *const *args,
+                         Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *signatures = NULL;
+    PyObject *ids = NULL;
+    Py_buffer view;
+    Py_buffer ids_view;
+    int ids_signed = 0;
+    Py_ssize_t n = 0;
+
+    if (nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 2 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        signatures = args[0];
+    }
+
+    if (nargs >= 2) {
+        ids = args[1];
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "signatures") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "signatures", 1);
+                signatures = args[nargs + i];
+            }
+            else if (strcmp(kwname, "ids") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "ids", 2);
+                ids = args[nargs + i];
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (signatures == NULL) {
+        PyErr_SetString(
+            PyExc_TypeError,
+            "function missing required argument 'signatures' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_lsh_get_signatures(self, signatures, "signatures", &view, &n) <
+        0) {
+        return NULL;
+    }
+
+    if (mmh3_get_nonnegative_items(ids, "ids", n, &ids_view, &ids_signed,
+                                   "signatures") < 0) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+
+    MMH3Tables *t = &self->tables;
+    int retval = -1;
+    if (n > PY_SSIZE_T_MAX - t->n) {
+        PyErr_NoMemory();
+    }
+    else if (mmh3_tables_reserve(t, t->n + n) == 0) {
+        const Py_ssize_t width = (Py_ssize_t)self->bands * self->rows;
+
+        for (Py_ssize_t i = 0; i < n; i++) {
+            const uint64_t id =
+                ids_view.obj != NULL
+                    ? (uint64_t)mmh3_read_nonnegative(&ids_view, ids_signed, i)
+                    : (uint64_t)(t->n + i);
+
+            for (uint32_t b = 0; b < self->bands; b++) {
+                MMH3TableEntry *entry = &t->tables[b][t->n + i];
+                entry->key =
+                    mmh3_lsh_band_key_unlocked(self, &view, i * width, b);
+                entry->id = id;
+            }
+        }
+        t->n += n;
+        retval = 0;
+    }
+
+    MMH3_HASHER_UNLOCK(self);
+
+    if (ids_view.obj != NULL) {
+        PyBuffer_Release(&ids_view);
+    }
+    PyBuffer_Release(&view);
+
+    if (retval < 0) {
+        return NULL;
+    }
+
+    Py_RETURN_NONE;
+}
+
+/*
+ * Return the ids of the signatures sharing at least one band with the
+ * signature starting at the item `start` of view, as a new array.array of
+ * the typecode 'Q' sorted in ascending order without duplicates. The tables
+ * of self must be sorted.
+ */
+static PyObject *
+mmh3_lsh_query_unlocked(MMH3LSHIndex *self, const Py_buffer *view,
+                        Py_ssize_t start)
+{
+    const MMH3Tables *t = &self->tables;
+    MMH3IdList list = {NULL, 0, 0};
+
+    for (uint32_t b = 0; b < self->bands; b++) {
+        const MMH3TableEntry *table = t->tables[b];
+        const uint64_t key = mmh3_lsh_band_key_unlocked(self, view, start, b);
+
+        for (Py_ssize_t i = mmh3_table_lower_bound(table, t->n, key);
+             i < t->n && table[i].key == key; i++) {
+            if (mmh3_id_list_append(&list, table[i].id) < 0) {
+                PyMem_Free(list.ids);
+                return NULL;
+            }
+        }
+    }
+
+    return mmh3_id_list_finish(&list);
+}
+
+PyDoc_STRVAR(
+    MMH3LSHIndex_query_doc,
+    "query(signature) -> array.array[int]\n"
+    "\n"
+    "Return the ids of the candidates similar to a signature.\n"
+    "\n"
+    "A candidate is a signature in the index that agrees with\n"
+    "``signature`` on all the ``rows`` values of at least one band.\n"
+    "\n"
+    "Args:\n"
+    "    signature (Buffer): The signature as a buffer of ``bands * rows``\n"
+    "        native integers.\n"
+    "\n"
+    "Returns:\n"
+    "    array.array[int]: The ids of the candidates of the typecode\n"
+    "    ``'Q'``, in ascending order without duplicates.\n");
+
+static PyObject *
+MMH3LSHIndex_query(MMH3LSHIndex *self, PyObject *obj)
+{
+    Py_buffer view;
+    Py_ssize_t n = 0;
+    PyObject *result = NULL;
+
+    if (mmh3_lsh_get_signatures(self, obj, "signature", &view, &n) < 0) {
+        return NULL;
+    }
+
+    if (n != 1) {
+        PyErr_Format(PyExc_ValueError,
+                     "signature must have bands * rows = %zd items (%zd "
+                     "given)",
+                     (Py_ssize_t)self->bands * self->rows,
+                     view.len / view.itemsize);
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    if (mmh3_tables_sort(&self->tables) == 0) {
+        result = mmh3_lsh_query_unlocked(self, &view, 0);
+    }
+    MMH3_HASHER_UNLOCK(self);
+
+    PyBuffer_Release(&view);
+    return result;
+}
+
+PyDoc_STRVAR(
+    MMH3LSHIndex_query_many_doc,
+    "query_many(signatures) -> list[array.array[int]]\n"
+    "\n"
+    "Return the ids of the candidates similar to each of many signatures.\n"
+    "\n"
+    "Args:\n"
+    "    signatures (Buffer): The signatures in the same format as\n"
+    "        ``insert_many()``.\n"
+    "\n"
+    "Returns:\n"
+    "    list[array.array[int]]: The result of ``query()`` for each\n"
+    "    signature.\n");
+
+static PyObject *
+MMH3LSHIndex_query_many(MMH3LSHIndex *self, PyObject *obj)
+{
+    Py_buffer view;
+    Py_ssize_t n = 0;
+    PyObject *result = NULL;
+
+    if (mmh3_lsh_get_signatures(self, obj, "signatures", &view, &n) < 0) {
+        return NULL;
+    }
+
+    result = PyList_New(n);
+    if (result == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    const Py_ssize_t width = (Py_ssize_t)self->bands * self->rows;
+
+    MMH3_HASHER_LOCK(self);
+    if (mmh3_tables_sort(&self->tables) < 0) {
+        Py_CLEAR(result);
+    }
+    for (Py_ssize_t i = 0; result != NULL && i < n; i++) {
+        PyObject *ids = mmh3_lsh_query_unlocked(self, &view, i * width);
+        if (ids == NULL) {
+            Py_CLEAR(result);
+            break;
+        }
+        PyList_SET_ITEM(result, i, ids);
+    }
+    MMH3_HASHER_UNLOCK(self);
+
+    PyBuffer_Release(&view);
+    return result;
+}
+
+PyDoc_STRVAR(
+    MMH3LSHIndex_tobytes_doc,
+    "tobytes() -> bytes\n"
+    "\n"
+    "Return the index serialized as a ``bytes`` object.\n"
+    "\n"
+    "The result can be written to a file and be loaded by ``frombuffer()``,\n"
+    "e.g., through ``mmap``.\n"
+    "\n"
+    "Returns:\n"
+    "    bytes: The serialized index.\n");
+
+static PyObject *
+MMH3LSHIndex_tobytes(MMH3LSHIndex *self, PyObject *Py_UNUSED(ignored))
+{
+    const MMH3Tables *t = &self->tables;
+    PyObject *result = NULL;
+
+    MMH3_HASHER_LOCK(self);
+
+    if (mmh3_tables_sort(&self->tables) < 0) {
+        MMH3_HASHER_UNLOCK(self);
+        return NULL;
+    }
+
+    const Py_ssize_t table_size = t->n * (Py_ssize_t)sizeof(MMH3TableEntry);
+    if (table_size > (PY_SSIZE_T_MAX - MMH3_LSH_HEADER_SIZE) / t->count) {
+        MMH3_HASHER_UNLOCK(self);
+        return PyErr_NoMemory();
+    }
+
+    result = PyBytes_FromStringAndSize(
+        NULL, MMH3_LSH_HEADER_SIZE + table_size * t->count);
+    if (result == NULL) {
+        MMH3_HASHER_UNLOCK(self);
+        return NULL;
+    }
+
+    char *p = PyBytes_AS_STRING(result);
+    memcpy(p, MMH3_LSH_MAGIC, 8);
+    mmh3_store_le32(p + 8, self->bands);
+    mmh3_store_le32(p + 12, self->rows);
+    mmh3_store_le32(p + 16, self->seed);
+    mmh3_store_le32(p + 20, 0);
+    mmh3_store_le64(p + 24, (uint64_t)t->n);
+    mmh3_tables_write(t, p + MMH3_LSH_HEADER_SIZE);
+
+    MMH3_HASHER_UNLOCK(self);
+
+    return result;
+}
+
+PyDoc_STRVAR(
+    MMH3LSHIndex_frombuffer_doc,
+    "frombuffer(buffer) -> LSHIndex\n"
+    "\n"
+    "Load an index serialized by ``tobytes()``.\n"
+    "\n"
+    "On little-endian platforms, the tables are used in place without being\n"
+    "copied, as long as ``buffer`` is aligned to 8 bytes. Loading is\n"
+    "therefore O(1), and an index loaded from ``mmap`` shares the page cache\n"
+    "with other processes. ``buffer`` is kept exported until the index is\n"
+    "deleted. The tables are copied on the first call to ``insert_many()``.\n"
+    "\n"
+    "Args:\n"
+    "    buffer (Buffer): The serialized index.\n"
+    "\n"
+    "Returns:\n"
+    "    LSHIndex: The loaded index.\n");
+
+static PyObject *
+MMH3LSHIndex_frombuffer(PyTypeObject *type, PyObject *obj)
+{
+    Py_buffer view;
+    MMH3LSHIndex *self = NULL;
+
+    if (PyObject_GetBuffer(obj, &view, PyBUF_SIMPLE) == -1) {
+        return NULL;
+    }
+
+    const char *p = (const char *)view.buf;
+    if (view.len < MMH3_LSH_HEADER_SIZE || memcmp(p, MMH3_LSH_MAGIC, 8) != 0) {
+        PyErr_SetString(PyExc_ValueError, "buffer is not a valid LSHIndex");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    const uint32_t bands = mmh3_load_le32(p + 8);
+    const uint32_t rows = mmh3_load_le32(p + 12);
+    const uint32_t seed = mmh3_load_le32(p + 16);
+    const uint64_t n = mmh3_load_le64(p + 24);
+    const uint64_t max_n = (uint64_t)(view.len - MMH3_LSH_HEADER_SIZE) /
+                           sizeof(MMH3TableEntry) / (bands > 0 ? bands : 1);
+
+    if (bands == 0 || rows == 0 || n > max_n ||
+        view.len != MMH3_LSH_HEADER_SIZE +
+                        (Py_ssize_t)(n * bands * sizeof(MMH3TableEntry))) {
+        PyErr_SetString(PyExc_ValueError, "buffer is not a valid LSHIndex");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    self = mmh3_lsh_alloc(type, bands, rows, seed);
+    if (self == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    if (mmh3_tables_load(&self->tables, &view, p + MMH3_LSH_HEADER_SIZE,
+                         (Py_ssize_t)n) < 0) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    return (PyObject *)self;
+}
+
+static PyObject *
+MMH3LSHIndex_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    Py_ssize_t bands = 0;
+    Py_ssize_t rows = 0;
+    long long seed = 0;
+    static char *kwlist[] = {"bands", "rows", "seed", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "nn|L", kwlist, &bands, &rows,
+                                     &seed)) {
+        return NULL;
+    }
+
+    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
+
+    if (bands < 1 || bands > 0xFFFFFFFF || rows < 1 || rows > 0xFFFFFFFF ||
+        bands > PY_SSIZE_T_MAX / rows / 8) {
+        PyErr_SetString(PyExc_ValueError,
+                        "bands and rows must be positive integers");
+        return NULL;
+    }
+
+    return (PyObject *)mmh3_lsh_alloc(type, (uint32_t)bands, (uint32_t)rows,
+                                      (uint32_t)seed);
+}
+
+static Py_ssize_t
+MMH3LSHIndex_len(MMH3LSHIndex *self)
+{
+    MMH3_HASHER_LOCK(self);
+    const Py_ssize_t n = self->tables.n;
+    MMH3_HASHER_UNLOCK(self);
+
+    return n;
+}
+
+static PyMethodDef MMH3LSHIndex_methods[] = {
+    {"insert_many", (PyCFunction)MMH3LSHIndex_insert_many,
+     METH_FASTCALL | METH_KEYWORDS, MMH3LSHIndex_insert_many_doc},
+    {"query", (PyCFunction)MMH3LSHIndex_query, METH_O, MMH3LSHIndex_query_doc},
+    {"query_many", (PyCFunction)MMH3LSHIndex_query_many, METH_O,
+     MMH3LSHIndex_query_many_doc},
+    {"tobytes", (PyCFunction)MMH3LSHIndex_tobytes, METH_NOARGS,
+     MMH3LSHIndex_tobytes_doc},
+    {"frombuffer", (PyCFunction)MMH3LSHIndex_frombuffer, METH_O | METH_CLASS,
+     MMH3LSHIndex_frombuffer_doc},
+    {NULL} /* Sentinel */
+};
+
+static PyObject *
+MMH3LSHIndex_get_bands(MMH3LSHIndex *self, void *closure)
+{
+    return PyLong_FromUnsignedLong(self->bands);
+}
+
+static PyObject *
+MMH3LSHIndex_get_rows(MMH3LSHIndex *self, void *closure)
+{
+    return PyLong_FromUnsignedLong(self->rows);
+}
+
+static PyObject *
+MMH3LSHIndex_get_seed(MMH3LSHIndex *self, void *closure)
+{
+    return PyLong_FromUnsignedLong(self->seed);
+}
+
+static PyGetSetDef MMH3LSHIndex_getsetters[] = {
+    {"bands", (getter)MMH3LSHIndex_get_bands, NULL,
+     "int: Number of bands of a signature", NULL},
+    {"rows", (getter)MMH3LSHIndex_get_rows, NULL,
+     "int: Number of values in each band", NULL},
+    {"seed", (getter)MMH3LSHIndex_get_seed, NULL,
+     "int: The seed used to hash the bands", NULL},
+    {NULL} /* Sentinel */
+};
+
+static PySequenceMethods MMH3LSHIndex_as_sequence = {
+    .sq_length = (lenfunc)MMH3LSHIndex_len,
+};
+
+PyDoc_STRVAR(
+    MMH3LSHIndexType_doc,
+    "__init__(bands, rows, seed=0)\n"
+    "\n"
+    "Locality-sensitive hashing index for finding similar MinHash\n"
+    "signatures.\n"
+    "\n"
+    "Each signature of ``bands * rows`` values is split into ``bands``\n"
+    "bands of ``rows`` consecutive values. Each band is hashed by\n"
+    "murmurhash3_x64_128 into a 64-bit key, and the pair of the key and the\n"
+    "id of the signature is stored in a sorted array for the band. Two\n"
+    "signatures become candidates of each other if they agree on all the\n"
+    "values of at least one band. The values of a band are widened to\n"
+    "64-bit integers before hashing, so signatures of the typecode ``'I'``\n"
+    "and ``'Q'`` (or ``uint32`` and ``uint64``) with the same values are\n"
+    "treated as the same.\n"
+    "\n"
+    "Each signature takes ``16 * bands`` bytes in the index, and ``len()``\n"
+    "returns the number of signatures inserted.\n"
+    "\n"
+    "Args:\n"
+    "    bands (int): The number of bands. Must be positive.\n"
+    "    rows (int): The number of values in each band. Must be positive.\n"
+    "    seed (int): The seed used to hash the bands. Must be an integer in\n"
+    "        the range [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyTypeObject MMH3LSHIndexType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.LSHIndex",
+    .tp_doc = MMH3LSHIndexType_doc,
+    .tp_basicsize = sizeof(MMH3LSHIndex),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = MMH3LSHIndex_new,
+    .tp_dealloc = (destructor)MMH3LSHIndex_dealloc,
+    .tp_methods = MMH3LSHIndex_methods,
+    .tp_getset = MMH3LSHIndex_getsetters,
+    .tp_as_sequence = &MMH3LSHIndex_as_sequence,
+};
+
+//-----------------------------------------------------------------------------
+//-----------------------------------------------------------------------------
+// Index of SimHash fingerprints by Hamming distance
+
+static FORCE_INLINE int
+mmh3_popcount64(uint64_t x)
+{
+#if defined(__GNUC__) || defined(__clang__)
+    return __builtin_popcountll(x);
+#else
+    x = x - ((x >> 1) & 0x5555555555555555ULL);
+    x = (x & 0x3333333333333333ULL) + ((x >> 2) & 0x3333333333333333ULL);
+    x = (x + (x >> 4)) & 0x0f0f0f0f0f0f0f0fULL;
+    return (int)((x * 0x0101010101010101ULL) >> 56);
+#endif
+}
+
+static FORCE_INLINE uint64_t
+mmh3_rotl64(uint64_t x, int r)
+{
+    return r == 0 ? x : (x << r) | (x >> (64 - r));
+}
+
+/*
+ * Convert obj, an int in the range [-2**63, 2**64 - 1], to the bits of a
+ * 64-bit fingerprint stored in *fingerprint, so that both the signed and
+ * unsigned forms of a fingerprint are accepted. Returns 0 on success and -1
+ * with an exception set on failure.
+ */
+static int
+mmh3_parse_fingerprint(PyObject *obj, uint64_t *fingerprint)
+{
+    int overflow = 0;
+
+    if (!PyLong_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "'%s' object cannot be interpreted as an integer",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    const long long value = PyLong_AsLongLongAndOverflow(obj, &overflow);
+    if (value == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+
+    if (overflow == 0) {
+        *fingerprint = (uint64_t)value;
+        return 0;
+    }
+
+    if (overflow > 0) {
+        *fingerprint = PyLong_AsUnsignedLongLong(obj);
+        if (!PyErr_Occurred()) {
+            return 0;
+        }
+        PyErr_Clear();
+    }
+
+    PyErr_SetString(PyExc_ValueError, "fingerprint is out of range");
+    return -1;
+}
+
+// The maximum number of tables of SimHashIndex, i.e., the maximum distance
+// plus one
+#define MMH3_SIMHASH_MAX_TABLES 64
+
+typedef struct {
+    PyObject_HEAD int k;
+    // The fingerprints are split into k + 1 blocks of consecutive bits. The
+    // c-th table is keyed by the fingerprints rotated by rotations[c] bits,
+    // which moves the c-th block to the most significant bits covered by
+    // masks[c].
+    int rotations[MMH3_SIMHASH_MAX_TABLES];
+    uint64_t masks[MMH3_SIMHASH_MAX_TABLES];
+    MMH3Tables tables;
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3SimHashIndex;
+
+static PyTypeObject MMH3SimHashIndexType;
+
+static void
+MMH3SimHashIndex_dealloc(MMH3SimHashIndex *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    mmh3_tables_release(&self->tables);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+MMH3SimHashIndex_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    int k = 3;
+    MMH3SimHashIndex *self = NULL;
+    static char *kwlist[] = {"k", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|i", kwlist, &k)) {
+        return NULL;
+    }
+
+    if (k < 0 || k >= MMH3_SIMHASH_MAX_TABLES) {
+        PyErr_SetString(PyExc_ValueError,
+                        "k must be an integer in the range [0, 63]");
+        return NULL;
+    }
+
+    self = (MMH3SimHashIndex *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    self->k = k;
+    MMH3_HASHER_INIT_MUTEX(self);
+
+    if (mmh3_tables_init(&self->tables, k + 1) < 0) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    // The widths of the blocks differ by at most one bit.
+    int start = 0;
+    for (int c = 0; c <= k; c++) {
+        const int width = 64 / (k + 1) + (c < 64 % (k + 1));
+        self->rotations[c] = (128 - start - width) % 64;
+        self->masks[c] = width == 64 ? ~(uint64_t)0 : ~(~(uint64_t)0 >> width);
+        start += width;
+    }
+
+    return (PyObject *)self;
+}
+
+/*
+ * Acquire the fingerprints of obj as a buffer of native integers. Returns
+ * 0 on success and -1 with an exception set on failure.
+ */
+static int
+mmh3_simhash_get_fingerprints(PyObject *obj, Py_buffer *view, Py_ssize_t *n)
+{
+    int is_signed = 0;
+
+    if (mmh3_get_index_buffer(obj, "fingerprints", view, &is_signed) < 0) {
+        return -1;
+    }
+
+    *n = view->len / view->itemsize;
+    return 0;
+}
+
+PyDoc_STRVAR(
+    MMH3SimHashIndex_insert_many_doc,
+    "insert_many(fingerprints, ids=None)\n"
+    "\n"
+    "Insert many fingerprints into the index.\n"
+    "\n"
+    "Args:\n"
+    "    fingerprints (Buffer): The fingerprints as a buffer of ``n``\n"
+    "        native 64-bit integers, signed or unsigned, e.g.,\n"
+    "        ``array.array('Q')``.\n"
+    "    ids (Buffer | None): The ids of the fingerprints as a buffer of\n"
+    "        ``n`` non-negative native integers. If None, the fingerprints\n"
+    "        are numbered consecutively from ``len(self)``.\n");
+
+static PyObject *
+MMH3SimHashIndex_insert_many(MMH3SimHashIndex *self, PyObject *const *args,
+                             Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *fingerprints = NULL;
+    PyObject *ids = NULL;
+    Py_buffer view;
+    Py_buffer ids_view;
+    int ids_signed = 0;
+    Py_ssize_t n = 0;
+
+    if (nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 2 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        fingerprints = args[0];
+    }
+
+    if (nargs >= 2) {
+        ids = args[1];
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "fingerprints") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "fingerprints", 1);
+                fingerprints = args[nargs + i];
+            }
+            else if (strcmp(kwname, "ids") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "ids", 2);
+                ids = args[nargs + i];
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (fingerprints == NULL) {
+        PyErr_SetString(
+            PyExc_TypeError,
+            "function missing required argument 'fingerprints' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_simhash_get_fingerprints(fingerprints, &view, &n) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_get_nonnegative_items(ids, "ids", n, &ids_view, &ids_signed,
+                                   "fingerprints") < 0) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+
+    MMH3Tables *t = &self->tables;
+    int retval = -1;
+    if (n > PY_SSIZE_T_MAX - t->n) {
+        PyErr_NoMemory();
+    }
+    else if (mmh3_tables_reserve(t, t->n + n) == 0) {
+        for (Py_ssize_t i = 0; i < n; i++) {
+            const uint64_t fingerprint = mmh3_read_bits(&view, i);
+            const uint64_t id =
+                ids_view.obj != NULL
+                    ? (uint64_t)mmh3_read_nonnegative(&ids_view, ids_signed, i)
+                    : (uint64_t)(t->n + i);
+
+            for (int c = 0; c <= self->k; c++) {
+                MMH3TableEntry *entry = &t->tables[c][t->n + i];
+                entry->key = mmh3_rotl64(fingerprint, self->rotations[c]);
+                entry->id = id;
+            }
+        }
+        t->n += n;
+        retval = 0;
+    }
+
+    MMH3_HASHER_UNLOCK(self);
+
+    if (ids_view.obj != NULL) {
+        PyBuffer_Release(&ids_view);
+    }
+    PyBuffer_Release(&view);
+
+    if (retval < 0) {
+        return NULL;
+    }
+
+    Py_RETURN_NONE;
+}
+
+/*
+ * Return the ids of the fingerprints within the Hamming distance k from
+ * fingerprint, as a new array.array of the typecode 'Q' sorted in ascending
+ * order without duplicates. The tables of self must be sorted.
+ *
+ * Since the fingerprints are split into k + 1 blocks, a fingerprint within
+ * the distance k agrees with the query on at least one block. Therefore,
+ * only the entries sharing the block of each table need to be checked.
+ */
+static PyObject *
+mmh3_simhash_query_unlocked(MMH3SimHashIndex *self, uint64_t fingerprint)
+{
+    const MMH3Tables *t = &self->tables;
+    MMH3IdList list = {NULL, 0, 0};
+
+    for (int c = 0; c <= self->k; c++) {
+        const MMH3TableEntry *table = t->tables[c];
+        const uint64_t key = mmh3_rotl64(fingerprint, self->rotations[c]);
+        const uint64_t prefix = key & self->masks[c];
+
+        for (Py_ssize_t i = mmh3_table_lower_bound(table, t->n, prefix);
+             i < t->n && (table[i].key & self->masks[c]) == prefix; i++) {
+            if (mmh3_popcount64(table[i].key ^ key) <= self->k &&
+                mmh3_id_list_append(&list, table[i].id) < 0) {
+                PyMem_Free(list.ids);
+                return NULL;
+            }
+        }
+    }
+
+    return mmh3_id_list_finish(&list);
+}
+
+PyDoc_STRVAR(
+    MMH3SimHashIndex_query_doc,
+    "query(fingerprint) -> array.array[int]\n"
+    "\n"
+    "Return the ids of the fingerprints within the Hamming distance ``k``.\n"
+    "\n"
+    "Args:\n"
+    "    fingerprint (int): The fingerprint, as a signed or unsigned 64-bit\n"
+    "        integer.\n"
+    "\n"
+    "Returns:\n"
+    "    array.array[int]: The ids of the fingerprints of the typecode\n"
+    "    ``'Q'``, in ascending order without duplicates.\n");
+
+static PyObject *
+MMH3SimHashIndex_query(MMH3SimHashIndex *self, PyObject *obj)
+{
+    uint64_t fingerprint = 0;
+    PyObject *result = NULL;
+
+    if (mmh3_parse_fingerprint(obj, &fingerprint) < 0) {
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    if (mmh3_tables_sort(&self->tables) == 0) {
+        result = mmh3_simhash_query_unlocked(self, fingerprint);
+    }
+    MMH3_HASHER_UNLOCK(self);
+
+    return result;
+}
+
+PyDoc_STRVAR(
+    MMH3SimHashIndex_query_many_doc,
+    "query_many(fingerprints) -> list[array.array[int]]\n"
+    "\n"
+    "Return the ids of the fingerprints within the Hamming distance ``k``\n"
+    "from each of many fingerprints.\n"
+    "\n"
+    "Args:\n"
+    "    fingerprints (Buffer): The fingerprints in the same format as\n"
+    "        ``insert_many()``.\n"
+    "\n"
+    "Returns:\n"
+    "    list[array.array[int]]: The result of ``query()`` for each\n"
+    "    fingerprint.\n");
+
+static PyObject *
+MMH3SimHashIndex_query_many(MMH3SimHashIndex *self, PyObject *obj)
+{
+    Py_buffer view;
+    Py_ssize_t n = 0;
+    PyObject *result = NULL;
+
+    if (mmh3_simhash_get_fingerprints(obj, &view, &n) < 0) {
+        return NULL;
+    }
+
+    result = PyList_New(n);
+    if (result == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    MMH3_HASHER_LOCK(self);
+    if (mmh3_tables_sort(&self->tables) < 0) {
+        Py_CLEAR(result);
+    }
+    for (Py_ssize_t i = 0; result != NULL && i < n; i++) {
+        PyObject *ids =
+            mmh3_simhash_query_unlocked(self, mmh3_read_bits(&view, i));
+        if (ids == NULL) {
+            Py_CLEAR(result);
+            break;
+        }
+        PyList_SET_ITEM(result, i, ids);
+    }
+    MMH3_HASHER_UNLOCK(self);
+
+    PyBuffer_Release(&view);
+    return result;
+}
+
+static Py_ssize_t
+MMH3SimHashIndex_len(MMH3SimHashIndex *self)
+{
+    MMH3_HASHER_LOCK(self);
+    const Py_ssize_t n = self->tables.n;
+    MMH3_HASHER_UNLOCK(self);
+
+    return n;
+}
+
+static PyMethodDef MMH3SimHashIndex_methods[] = {
+    {"insert_many", (PyCFunction)MMH3SimHashIndex_insert_many,
+     METH_FASTCALL | METH_KEYWORDS, MMH3SimHashIndex_insert_many_doc},
+    {"query", (PyCFunction)MMH3SimHashIndex_query, METH_O,
+     MMH3SimHashIndex_query_doc},
+    {"query_many", (PyCFunction)MMH3SimHashIndex_query_many, METH_O,
+     MMH3SimHashIndex_query_many_doc},
+    {NULL} /* Sentinel */
+};
+
+static PyObject *
+MMH3SimHashIndex_get_k(MMH3SimHashIndex *self, void *closure)
+{
+    return PyLong_FromLong(self->k);
+}
+
+static PyGetSetDef MMH3SimHashIndex_getsetters[] = {
+    {"k", (getter)MMH3SimHashIndex_get_k, NULL,
+     "int: The maximum Hamming distance of the fingerprints found", NULL},
+    {NULL} /* Sentinel */
+};
+
+static PySequenceMethods MMH3SimHashIndex_as_sequence = {
+    .sq_length = (lenfunc)MMH3SimHashIndex_len,
+};
+
+PyDoc_STRVAR(
+    MMH3SimHashIndexType_doc,
+    "__init__(k=3)\n"
+    "\n"
+    "Index of 64-bit SimHash fingerprints for finding near-duplicates.\n"
+    "\n"
+    "``query()`` finds all the fingerprints within the Hamming distance\n"
+    "``k`` without scanning all of them. Each fingerprint is split into\n"
+    "``k + 1`` blocks of consecutive bits, and the index keeps ``k + 1``\n"
+    "sorted tables of the fingerprints, each of which is permuted so that\n"
+    "one of the blocks comes first. By the pigeonhole principle, a\n"
+    "fingerprint within the distance ``k`` from a query agrees with it on\n"
+    "at least one block, and is found by a binary search in that table.\n"
+    "\n"
+    "Each fingerprint takes ``16 * (k + 1)`` bytes in the index, and\n"
+    "``len()`` returns the number of fingerprints inserted.\n"
+    "\n"
+    "Args:\n"
+    "    k (int): The maximum Hamming distance. Must be an integer in the\n"
+    "        range [0, 63]. A small ``k`` makes queries faster.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyTypeObject MMH3SimHashIndexType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.SimHashIndex",
+    .tp_doc = MMH3SimHashIndexType_doc,
+    .tp_basicsize = sizeof(MMH3SimHashIndex),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = MMH3SimHashIndex_new,
+    .tp_dealloc = (destructor)MMH3SimHashIndex_dealloc,
+    .tp_methods = MMH3SimHashIndex_methods,
+    .tp_getset = MMH3SimHashIndex_getsetters,
+    .tp_as_sequence = &MMH3SimHashIndex_as_sequence,
+};
+
+//-----------------------------------------------------------------------------
+// Bloom filter
+
+// Serialized format of BloomFilter, in little-endian:
+//
+// offset  size  content
+// 0       8     magic "MMH3BLM1"
+// 8       8     number of bits (num_bits), a positive multiple of 512
+// 16      4     number of bits set per key (num_hashes)
+// 20      4     seed
+// 24      4     hash variant, MMH3_BLOOM_VARIANT_X64_128
+// 28      36    reserved, 0
+// 64            num_bits / 8 bytes of the bits
+//
+// The header takes 64 bytes so that the blocks of the bits are aligned to
+// cache lines in a page-aligned buffer, e.g., a memory-mapped file, on which
+// frombuffer() works in place.
+#define MMH3_BLOOM_MAGIC "MMH3BLM1"
+#define MMH3_BLOOM_HEADER_SIZE 64
+
+// The bits of a key are located by the two 64-bit words of
+// murmurhash3_x64_128, as described in the docstring of BloomFilter.
+#define MMH3_BLOOM_VARIANT_X64_128 1
+
+// The size of a block in bytes. All the bits of a key fall into a single
+// block, so that a lookup touches a single cache line.
+#define MMH3_BLOOM_BLOCK_SIZE 64
+#define MMH3_BLOOM_BLOCK_BITS (MMH3_BLOOM_BLOCK_SIZE * 8)
+
+#define MMH3_BLOOM_MAX_HASHES 64
+
+// The number of keys hashed by a batch function before their blocks are
+// accessed, so that the blocks are prefetched while the next keys are hashed.
+#define MMH3_BLOOM_CHUNK 16
+
+#if defined(__GNUC__) || defined(__clang__)
+#define MMH3_PREFETCH(p) __builtin_prefetch(p)
+#else
+#define MMH3_PREFETCH(p) ((void)(p))
+#endif
+
+// Set bits of a byte atomically, so that processes sharing the bits of a
+// filter through a memory-mapped file do not lose each other's bits.
+#if defined(_MSC_VER)
+#include <intrin.h>
+#define MMH3_ATOMIC_OR8(p, v) _InterlockedOr8((volatile char *)(p), (char)(v))
+#else
+#define MMH3_ATOMIC_OR8(p, v) __atomic_fetch_or((p), (v), __ATOMIC_RELAXED)
+#endif
+
+typedef struct {
+    PyObject_HEAD Py_ssize_t num_blocks;
+    uint32_t num_hashes;
+    uint32_t seed;
+    unsigned char *bits;  // num_blocks * MMH3_BLOOM_BLOCK_SIZE bytes
+    void *alloc;          // the allocation in which bits is aligned, or NULL
+    Py_buffer view;       // the buffer borrowed by frombuffer(), if any
+    int readonly;
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3BloomFilter;
+
+static PyTypeObject MMH3BloomFilterType;
+
+#define MMH3_BLOOM_SIZE(self) ((self)->num_blocks * MMH3_BLOOM_BLOCK_SIZE)
+
+// Return the size passed to MMH3_HASHER_UPDATE_LOCKED for an operation on
+// size bytes. The bits borrowed from a memory-mapped file may have to be
+// read from the disk, so the GIL is always released for them.
+#define MMH3_BLOOM_GIL_SIZE(self, size) \
+    ((self)->view.obj != NULL ? HASHLIB_GIL_MINSIZE : (size))
+
+/*
+ * Create a BloomFilter object without bits. Returns NULL with an exception
+ * set on failure.
+ */
+static MMH3BloomFilter *
+mmh3_bloom_new_object(PyTypeObject *type, Py_ssize_t num_blocks,
+                      uint32_t num_hashes, uint32_t seed)
+{
+    MMH3BloomFilter *self = (MMH3BloomFilter *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    self->num_blocks = num_blocks;
+    self->num_hashes = num_hashes;
+    self->seed = seed;
+    self->bits = NULL;
+    self->alloc = NULL;
+    self->view.obj = NULL;
+    self->readonly = 0;
+    MMH3_HASHER_INIT_MUTEX(self);
+
+    return self;
+}
+
+/*
+ * Allocate a BloomFilter object with all the bits cleared. Returns NULL
+ * with an exception set on failure.
+ */
+static MMH3BloomFilter *
+mmh3_bloom_alloc(PyTypeObject *type, Py_ssize_t num_blocks,
+                 uint32_t num_hashes, uint32_t seed)
+{
+    MMH3BloomFilter *self =
+        mmh3_bloom_new_object(type, num_blocks, num_hashes, seed);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    // Calloc leaves the pages of a large filter to be zeroed lazily by the
+    // OS. The extra block is used to align the bits to a cache line.
+    self->alloc = PyMem_Calloc(num_blocks + 1, MMH3_BLOOM_BLOCK_SIZE);
+    if (self->alloc == NULL) {
+        Py_DECREF(self);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    const uintptr_t addr = (uintptr_t)self->alloc;
+    self->bits = (unsigned char *)self->alloc +
+                 (MMH3_BLOOM_BLOCK_SIZE - addr % MMH3_BLOOM_BLOCK_SIZE) %
+                     MMH3_BLOOM_BLOCK_SIZE;
+
+    return self;
+}
+
+static void
+MMH3BloomFilter_dealloc(MMH3BloomFilter *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    if (self->view.obj != NULL) {
+        PyBuffer_Release(&self->view);
+    }
+    PyMem_Free(self->alloc);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+/*
+ * Hash a key and return its block. The second word of the hash, from which
+ * the positions of the bits in the block are derived, is stored in *probe.
+ */
+static FORCE_INLINE unsigned char *
+mmh3_bloom_locate(const MMH3BloomFilter *self, const char *key, Py_ssize_t len,
+                  uint64_t *probe)
+{
+    uint64_t out[2];
+
+    murmurhash3_x64_128(key, len, self->seed, out);
+    *probe = out[1];
+
+    return self->bits + (Py_ssize_t)(out[0] % (uint64_t)self->num_blocks) *
+                            MMH3_BLOOM_BLOCK_SIZE;
+}
+
+// Kirsch-Mitzenmacher double hashing: the i-th bit of a key in its block is
+// given by the top 9 bits of a + i * b (mod 2**32), where a and b are the
+// low and high halves of the probe.
+//
+// Bits already set are not written again, which keeps the cache lines and
+// the pages of a shared filter clean. If shared is not 0, the bits are set
+// atomically.
+static FORCE_INLINE void
+mmh3_bloom_set(unsigned char *block, uint64_t probe, uint32_t num_hashes,
+               int shared)
+{
+    uint32_t g = (uint32_t)probe;
+    const uint32_t delta = (uint32_t)(probe >> 32);
+
+    for (uint32_t i = 0; i < num_hashes; i++, g += delta) {
+        unsigned char *byte = block + (g >> 26);
+        const unsigned char mask = (unsigned char)(1u << ((g >> 23) & 7));
+
+        if ((*byte & mask) != 0) {
+            continue;
+        }
+        if (shared) {
+            MMH3_ATOMIC_OR8(byte, mask);
+        }
+        else {
+            *byte |= mask;
+        }
+    }
+}
+
+static FORCE_INLINE int
+mmh3_bloom_test(const unsigned char *block, uint64_t probe,
+                uint32_t num_hashes)
+{
+    uint32_t g = (uint32_t)probe;
+    const uint32_t delta = (uint32_t)(probe >> 32);
+
+    for (uint32_t i = 0; i < num_hashes; i++, g += delta) {
+        if ((block[g >> 26] & (1u << ((g >> 23) & 7))) == 0) {
+            return 0;
+        }
+    }
+
+    return 1;
+}
+
+static void
+mmh3_bloom_add_unlocked(MMH3BloomFilter *self, const char *key, Py_ssize_t len)
+{
+    uint64_t probe;
+    unsigned char *block = mmh3_bloom_locate(self, key, len, &probe);
+
+    mmh3_bloom_set(block, probe, self->num_hashes, self->view.obj != NULL);
+}
+
+static int
+mmh3_bloom_contains_unlocked(const MMH3BloomFilter *self, const char *key,
+                             Py_ssize_t len)
+{
+    uint64_t probe;
+    const unsigned char *block = mmh3_bloom_locate(self, key, len, &probe);
+
+    return mmh3_bloom_test(block, probe, self->num_hashes);
+}
+
+static void
+mmh3_bloom_add_batch_unlocked(MMH3BloomFilter *self, const MMH3KeyBatch *batch)
+{
+    unsigned char *blocks[MMH3_BLOOM_CHUNK];
+    uint64_t probes[MMH3_BLOOM_CHUNK];
+
+    for (Py_ssize_t start = 0; start < batch->n; start += MMH3_BLOOM_CHUNK) {
+        const Py_ssize_t m = batch->n - start < MMH3_BLOOM_CHUNK
+                                 ? batch->n - start
+                                 : MMH3_BLOOM_CHUNK;
+
+        for (Py_ssize_t j = 0; j < m; j++) {
+            blocks[j] = mmh3_bloom_locate(self, batch->keys[start + j],
+                                          batch->lens[start + j], &probes[j]);
+            MMH3_PREFETCH(blocks[j]);
+        }
+        for (Py_ssize_t j = 0; j < m; j++) {
+            mmh3_bloom_set(blocks[j], probes[j], self->num_hashes,
+                           self->view.obj != NULL);
+        }
+    }
+}
+
+static void
+mmh3_bloom_contains_batch_unlocked(const MMH3BloomFilter *self,
+                                   const MMH3KeyBatch *batch,
+                                   unsigned char *out)
+{
+    const unsigned char *blocks[MMH3_BLOOM_CHUNK];
+    uint64_t probes[MMH3_BLOOM_CHUNK];
+
+    for (Py_ssize_t start = 0; start < batch->n; start += MMH3_BLOOM_CHUNK) {
+        const Py_ssize_t m = batch->n - start < MMH3_BLOOM_CHUNK
+                                 ? batch->n - start
+                                 : MMH3_BLOOM_CHUNK;
+
+        for (Py_ssize_t j = 0; j < m; j++) {
+            blocks[j] = mmh3_bloom_locate(self, batch->keys[start + j],
+                                          batch->lens[start + j], &probes[j]);
+            MMH3_PREFETCH(blocks[j]);
+        }
+        for (Py_ssize_t j = 0; j < m; j++) {
+            out[start + j] = (unsigned char)mmh3_bloom_test(
+                blocks[j], probes[j], self->num_hashes);
+        }
+    }
+}
+
+/*
+ * Return 0 if keys can be added to self, or -1 with an exception set if self
+ * is loaded from a read-only buffer.
+ */
+static int
+mmh3_bloom_check_writable(MMH3BloomFilter *self)
+{
+    if (self->readonly) {
+        PyErr_SetString(PyExc_TypeError,
+                        "cannot add keys to a read-only BloomFilter");
+        return -1;
+    }
+
+    return 0;
+}
+
+static PyObject *
+MMH3BloomFilter_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    Py_ssize_t num_bits = 0;
+    Py_ssize_t num_hashes = 7;
+    long long seed = 0;
+    static char *kwlist[] = {"num_bits", "num_hashes", "seed", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|nL", kwlist, &num_bits,
+                                     &num_hashes, &seed)) {
+        return NULL;
+    }
+
+    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
+
+    if (num_bits < 1) {
+        PyErr_SetString(PyExc_ValueError,
+                        "num_bits must be a positive integer");
+        return NULL;
+    }
+
+    if (num_hashes < 1 || num_hashes > MMH3_BLOOM_MAX_HASHES) {
+        PyErr_SetString(PyExc_ValueError,
+                        "num_hashes must be an integer in the range [1, 64]");
+        return NULL;
+    }
+
+    const Py_ssize_t num_blocks = num_bits / MMH3_BLOOM_BLOCK_BITS +
+                                  (num_bits % MMH3_BLOOM_BLOCK_BITS != 0);
+
+    return (PyObject *)mmh3_bloom_alloc(type, num_blocks, (uint32_t)num_hashes,
+                                        (uint32_t)seed);
+}
+
+PyDoc_STRVAR(MMH3BloomFilter_add_doc,
+             "add(key)\n"
+             "\n"
+             "Add a key to the filter.\n"
+             "\n"
+             "Args:\n"
+             "    key (bytes | str): The key to add.\n");
+
+static PyObject *
+MMH3BloomFilter_add(MMH3BloomFilter *self, PyObject *obj)
+{
+    PyObject *target = NULL;
+    MMH3Key key;
+
+    MMH3_HASH_VALIDATE_AND_SET_KEY(obj, target);
+
+    if (mmh3_bloom_check_writable(self) < 0) {
+        return NULL;
+    }
+
+    MMH3_HASH_INIT_KEY(key, target);
+
+    MMH3_HASHER_UPDATE_LOCKED(self, MMH3_BLOOM_GIL_SIZE(self, key.len),
+                              mmh3_bloom_add_unlocked(self, key.buf, key.len));
+
+    mmh3_key_release(&key);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3BloomFilter_add_many_doc,
+    "add_many(keys)\n"
+    "\n"
+    "Add many keys to the filter.\n"
+    "\n"
+    "Same as calling ``add()`` for each key, but the keys are hashed in one\n"
+    "batch like ``hash_many()``. If any key is invalid, none of the keys is\n"
+    "added.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys to add.\n");
+
+static PyObject *
+MMH3BloomFilter_add_many(MMH3BloomFilter *self, PyObject *keys)
+{
+    MMH3KeyBatch batch;
+
+    if (mmh3_bloom_check_writable(self) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(self, MMH3_BLOOM_GIL_SIZE(self, batch.size),
+                              mmh3_bloom_add_batch_unlocked(self, &batch));
+
+    mmh3_key_batch_release(&batch);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3BloomFilter_contains_many_doc,
+    "contains_many(keys) -> array.array[int]\n"
+    "\n"
+    "Test whether each of many keys may be in the filter.\n"
+    "\n"
+    "Same as ``key in self`` for each key, but the keys are hashed in one\n"
+    "batch like ``hash_many()``.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys to test.\n"
+    "\n"
+    "Returns:\n"
+    "    array.array[int]: For each key, 1 if the key may have been added\n"
+    "    and 0 if it has definitely not been added, of the typecode\n"
+    "    ``'B'``.\n");
+
+static PyObject *
+MMH3BloomFilter_contains_many(MMH3BloomFilter *self, PyObject *keys)
+{
+    MMH3KeyBatch batch;
+    MMH3Output output;
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, NULL, batch.n, 'B') < 0) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(self, MMH3_BLOOM_GIL_SIZE(self, batch.size),
+                              mmh3_bloom_contains_batch_unlocked(
+                                  self, &batch, (unsigned char *)output.buf));
+
+    mmh3_key_batch_release(&batch);
+
+    return mmh3_output_finish(&output);
+}
+
+static int
+MMH3BloomFilter_contains(MMH3BloomFilter *self, PyObject *obj)
+{
+    MMH3Key key;
+    int result = 0;
+
+    if (!PyBytes_Check(obj) && !PyUnicode_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "argument 1 must be read-only bytes-like object, not "
+                     "'%s'",
+                     Py_TYPE(obj)->tp_name);
+        return -1;
+    }
+
+    if (mmh3_key_init(&key, obj) < 0) {
+        return -1;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, MMH3_BLOOM_GIL_SIZE(self, key.len),
+        result = mmh3_bloom_contains_unlocked(self, key.buf, key.len));
+
+    mmh3_key_release(&key);
+
+    return result;
+}
+
+/*
+ * Return a new BloomFilter object with the same parameters and bits as
+ * self, or NULL with an exception set on failure.
+ */
+static MMH3BloomFilter *
+mmh3_bloom_copy(MMH3BloomFilter *self)
+{
+    MMH3BloomFilter *p = mmh3_bloom_alloc(Py_TYPE(self), self->num_blocks,
+                                          self->num_hashes, self->seed);
+    if (p == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, MMH3_BLOOM_SIZE(self),
+        memcpy(p->bits, self->bits, MMH3_BLOOM_SIZE(self)));
+
+    return p;
+}
+
+static void
+mmh3_bloom_combine_unlocked(unsigned char *dest, const unsigned char *src,
+                            Py_ssize_t size, int intersect)
+{
+    if (intersect) {
+        for (Py_ssize_t i = 0; i < size; i++) {
+            dest[i] &= src[i];
+        }
+    }
+    else {
+        for (Py_ssize_t i = 0; i < size; i++) {
+            dest[i] |= src[i];
+        }
+    }
+}
+
+/*
+ * Return a new BloomFilter object whose bits are the bitwise OR (if
+ * intersect is 0) or AND (otherwise) of the bits of self and other, or NULL
+ * with an exception set on failure. name is the name of the calling method
+ * used in error messages.
+ */
+static PyObject *
+mmh3_bloom_combine(MMH3BloomFilter *self, PyObject *other, const char *name,
+                   int intersect)
+{
+    if (!PyObject_TypeCheck(other, &MMH3BloomFilterType)) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s() argument must be BloomFilter, not '%s'", name,
+                     Py_TYPE(other)->tp_name);
+        return NULL;
+    }
+
+    MMH3BloomFilter *o = (MMH3BloomFilter *)other;
+    if (o->num_blocks != self->num_blocks ||
+        o->num_hashes != self->num_hashes || o->seed != self->seed) {
+        PyErr_Format(PyExc_ValueError,
+                     "cannot compute the %s of BloomFilter objects with "
+                     "different num_bits, num_hashes, or seed",
+                     name);
+        return NULL;
+    }
+
+    MMH3BloomFilter *p = mmh3_bloom_copy(self);
+    if (p == NULL) {
+        return NULL;
+    }
+
+    // The result is not shared yet, so only the lock of other is held.
+    MMH3_HASHER_UPDATE_LOCKED(
+        o, MMH3_BLOOM_SIZE(o),
+        mmh3_bloom_combine_unlocked(p->bits, o->bits, MMH3_BLOOM_SIZE(o),
+                                    intersect));
+
+    return (PyObject *)p;
+}
+
+PyDoc_STRVAR(
+    MMH3BloomFilter_union_doc,
+    "union(other) -> BloomFilter\n"
+    "\n"
+    "Return the union of the two filters.\n"
+    "\n"
+    "The result is the same as the filter to which the keys of both filters\n"
+    "have been added.\n"
+    "\n"
+    "Args:\n"
+    "    other (BloomFilter): A BloomFilter object with the same\n"
+    "        ``num_bits``, ``num_hashes``, and ``seed``.\n"
+    "\n"
+    "Returns:\n"
+    "    BloomFilter: A new filter with the bitwise OR of the bits.\n");
+
+static PyObject *
+MMH3BloomFilter_union(MMH3BloomFilter *self, PyObject *other)
+{
+    return mmh3_bloom_combine(self, other, "union", 0);
+}
+
+PyDoc_STRVAR(
+    MMH3BloomFilter_intersection_doc,
+    "intersection(other) -> BloomFilter\n"
+    "\n"
+    "Return the intersection of the two filters.\n"
+    "\n"
+    "The result contains every key added to both filters, but may have a\n"
+    "higher false positive rate than the filter to which only those keys\n"
+    "have been added.\n"
+    "\n"
+    "Args:\n"
+    "    other (BloomFilter): A BloomFilter object with the same\n"
+    "        ``num_bits``, ``num_hashes``, and ``seed``.\n"
+    "\n"
+    "Returns:\n"
+    "    BloomFilter: A new filter with the bitwise AND of the bits.\n");
+
+static PyObject *
+MMH3BloomFilter_intersection(MMH3BloomFilter *self, PyObject *other)
+{
+    return mmh3_bloom_combine(self, other, "intersection", 1);
+}
+
+PyDoc_STRVAR(MMH3BloomFilter_copy_doc,
+             "copy() -> BloomFilter\n"
+             "\n"
+             "Return a copy of this object.\n"
+             "\n"
+             "Returns:\n"
+             "    BloomFilter: A copy of this object.\n");
+
+static PyObject *
+MMH3BloomFilter_copy(MMH3BloomFilter *self, PyObject *Py_UNUSED(ignored))
+{
+    return (PyObject *)mmh3_bloom_copy(self);
+}
+
+// The size of the chunks of the bits written by tofile()
+#define MMH3_BLOOM_FILE_CHUNK (1 << 20)
+
+// Write the serialized header of self to p.
+static void
+mmh3_bloom_write_header(const MMH3BloomFilter *self, char *p)
+{
+    memset(p, 0, MMH3_BLOOM_HEADER_SIZE);
+    memcpy(p, MMH3_BLOOM_MAGIC, 8);
+    mmh3_store_le64(p + 8, (uint64_t)self->num_blocks * MMH3_BLOOM_BLOCK_BITS);
+    mmh3_store_le32(p + 16, self->num_hashes);
+    mmh3_store_le32(p + 20, self->seed);
+    mmh3_store_le32(p + 24, MMH3_BLOOM_VARIANT_X64_128);
+}
+
+PyDoc_STRVAR(
+    MMH3BloomFilter_tobytes_doc,
+    "tobytes() -> bytes\n"
+    "\n"
+    "Return the filter serialized as a ``bytes`` object.\n"
+    "\n"
+    "The result consists of a 64-byte header and the bits of the filter,\n"
+    "and can be loaded by ``frombuffer()`` on any platform.\n"
+    "\n"
+    "Returns:\n"
+    "    bytes: The serialized filter.\n");
+
+static PyObject *
+MMH3BloomFilter_tobytes(MMH3BloomFilter *self, PyObject *Py_UNUSED(ignored))
+{
+    const Py_ssize_t size = MMH3_BLOOM_SIZE(self);
+
+    PyObject *result =
+        PyBytes_FromStringAndSize(NULL, MMH3_BLOOM_HEADER_SIZE + size);
+    if (result == NULL) {
+        return NULL;
+    }
+
+    char *p = PyBytes_AS_STRING(result);
+    mmh3_bloom_write_header(self, p);
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, size, memcpy(p + MMH3_BLOOM_HEADER_SIZE, self->bits, size));
+
+    return result;
+}
+
+PyDoc_STRVAR(
+    MMH3BloomFilter_tofile_doc,
+    "tofile(file)\n"
+    "\n"
+    "Write the filter serialized by ``tobytes()`` to a file.\n"
+    "\n"
+    "Unlike ``tobytes()``, the bits are written in chunks, so that a large\n"
+    "filter is not copied to memory at once.\n"
+    "\n"
+    "Args:\n"
+    "    file (BinaryIO): A file object opened in binary mode, or any object\n"
+    "        with the ``write()`` method accepting ``bytes``.\n");
+
+static PyObject *
+MMH3BloomFilter_tofile(MMH3BloomFilter *self, PyObject *file)
+{
+    const Py_ssize_t size = MMH3_BLOOM_SIZE(self);
+    PyObject *chunk = NULL;
+    PyObject *result = NULL;
+
+    chunk = PyBytes_FromStringAndSize(NULL, MMH3_BLOOM_HEADER_SIZE);
+    if (chunk == NULL) {
+        return NULL;
+    }
+    mmh3_bloom_write_header(self, PyBytes_AS_STRING(chunk));
+
+    result = PyObject_CallMethod(file, "write", "N", chunk);
+    if (result == NULL) {
+        return NULL;
+    }
+    Py_DECREF(result);
+
+    for (Py_ssize_t offset = 0; offset < size;
+         offset += MMH3_BLOOM_FILE_CHUNK) {
+        const Py_ssize_t n = size - offset < MMH3_BLOOM_FILE_CHUNK
+                                 ? size - offset
+                                 : MMH3_BLOOM_FILE_CHUNK;
+
+        chunk = PyBytes_FromStringAndSize(NULL, n);
+        if (chunk == NULL) {
+            return NULL;
+        }
+
+        char *p = PyBytes_AS_STRING(chunk);
+        MMH3_HASHER_UPDATE_LOCKED(self, n, memcpy(p, self->bits + offset, n));
+
+        result = PyObject_CallMethod(file, "write", "N", chunk);
+        if (result == NULL) {
+            return NULL;
+        }
+        Py_DECREF(result);
+    }
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3BloomFilter_frombuffer_doc,
+    "frombuffer(buffer) -> BloomFilter\n"
+    "\n"
+    "Load a filter serialized by ``tobytes()`` or ``tofile()`` in place.\n"
+    "\n"
+    "The bits are used in place without being copied, so loading takes\n"
+    "O(1) time regardless of the size of the filter, and a filter loaded\n"
+    "from ``mmap`` shares the page cache with other processes. If\n"
+    "``buffer`` is writable, e.g., a memory-mapped file opened with\n"
+    "``mmap.ACCESS_WRITE``, keys added to the filter are written to the\n"
+    "buffer, and are visible to other processes mapping the same file.\n"
+    "Otherwise, the filter is read-only; use ``copy()`` to obtain a\n"
+    "modifiable copy. ``buffer`` is kept exported until the filter is\n"
+    "deleted.\n"
+    "\n"
+    "Args:\n"
+    "    buffer (Buffer): The serialized filter.\n"
+    "\n"
+    "Returns:\n"
+    "    BloomFilter: The loaded filter.\n");
+
+static PyObject *
+MMH3BloomFilter_frombuffer(PyTypeObject *type, PyObject *obj)
+{
+    Py_buffer view;
+    MMH3BloomFilter *self = NULL;
+    int readonly = 0;
+
+    if (PyObject_GetBuffer(obj, &view, PyBUF_WRITABLE) == -1) {
+        PyErr_Clear();
+        if (PyObject_GetBuffer(obj, &view, PyBUF_SIMPLE) == -1) {
+            return NULL;
+        }
+        readonly = 1;
+    }
+
+    const char *p = (const char *)view.buf;
+    if (view.len < MMH3_BLOOM_HEADER_SIZE ||
+        memcmp(p, MMH3_BLOOM_MAGIC, 8) != 0) {
+        PyErr_SetString(PyExc_ValueError, "buffer is not a valid BloomFilter");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    const uint64_t num_bits = mmh3_load_le64(p + 8);
+    const uint32_t num_hashes = mmh3_load_le32(p + 16);
+    const uint32_t seed = mmh3_load_le32(p + 20);
+    const uint32_t variant = mmh3_load_le32(p + 24);
+
+    if (num_bits == 0 || num_bits % MMH3_BLOOM_BLOCK_BITS != 0 ||
+        num_bits / 8 != (uint64_t)(view.len - MMH3_BLOOM_HEADER_SIZE) ||
+        num_hashes < 1 || num_hashes > MMH3_BLOOM_MAX_HASHES ||
+        variant != MMH3_BLOOM_VARIANT_X64_128) {
+        PyErr_SetString(PyExc_ValueError, "buffer is not a valid BloomFilter");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    self = mmh3_bloom_new_object(
+        type, (Py_ssize_t)(num_bits / MMH3_BLOOM_BLOCK_BITS), num_hashes,
+        seed);
+    if (self == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    self->view = view;
+    self->bits = (unsigned char *)view.buf + MMH3_BLOOM_HEADER_SIZE;
+    self->readonly = readonly;
+
+    return (PyObject *)self;
+}
+
+static PyMethodDef MMH3BloomFilter_methods[] = {
+    {"add", (PyCFunction)MMH3BloomFilter_add, METH_O, MMH3BloomFilter_add_doc},
+    {"add_many", (PyCFunction)MMH3BloomFilter_add_many, METH_O,
+     MMH3BloomFilter_add_many_doc},
+    {"contains_many", (PyCFunction)MMH3BloomFilter_contains_many, METH_O,
+     MMH3BloomFilter_contains_many_doc},
+    {"union", (PyCFunction)MMH3BloomFilter_union, METH_O,
+     MMH3BloomFilter_union_doc},
+    {"intersection", (PyCFunction)MMH3BloomFilter_intersection, METH_O,
+     MMH3BloomFilter_intersection_doc},
+    {"copy", (PyCFunction)MMH3BloomFilter_copy, METH_NOARGS,
+     MMH3BloomFilter_copy_doc},
+    {"tobytes", (PyCFunction)MMH3BloomFilter_tobytes, METH_NOARGS,
+     MMH3BloomFilter_tobytes_doc},
+    {"tofile", (PyCFunction)MMH3BloomFilter_tofile, METH_O,
+     MMH3BloomFilter_tofile_doc},
+    {"frombuffer", (PyCFunction)MMH3BloomFilter_frombuffer,
+     METH_O | METH_CLASS, MMH3BloomFilter_frombuffer_doc},
+    {NULL} /* Sentinel */
+};
+
+static PyObject *
+MMH3BloomFilter_get_num_bits(MMH3BloomFilter *self, void *closure)
+{
+    return PyLong_FromUnsignedLongLong((uint64_t)self->num_blocks *
+                                       MMH3_BLOOM_BLOCK_BITS);
+}
+
+static PyObject *
+MMH3BloomFilter_get_num_hashes(MMH3BloomFilter *self, void *closure)
+{
+    return PyLong_FromUnsignedLong(self->num_hashes);
+}
+
+static PyObject *
+MMH3BloomFilter_get_seed(MMH3BloomFilter *self, void *closure)
+{
+    return PyLong_FromUnsignedLong(self->seed);
+}
+
+static PyObject *
+MMH3BloomFilter_get_readonly(MMH3BloomFilter *self, void *closure)
+{
+    return PyBool_FromLong(self->readonly);
+}
+
+static PyGetSetDef MMH3BloomFilter_getsetters[] = {
+    {"num_bits", (getter)MMH3BloomFilter_get_num_bits, NULL,
+     "int: Number of bits, rounded up to a multiple of 512", NULL},
+    {"num_hashes", (getter)MMH3BloomFilter_get_num_hashes, NULL,
+     "int: Number of bits set for each key", NULL},
+    {"seed", (getter)MMH3BloomFilter_get_seed, NULL,
+     "int: The seed used to hash the keys", NULL},
+    {"readonly", (getter)MMH3BloomFilter_get_readonly, NULL,
+     "bool: Whether the filter is loaded from a read-only buffer", NULL},
+    {NULL} /* Sentinel */
+};
+
+static PySequenceMethods MMH3BloomFilter_as_sequence = {
+    .sq_contains = (objobjproc)MMH3BloomFilter_contains,
+};
+
+PyDoc_STRVAR(
+    MMH3BloomFilterType_doc,
+    "__init__(num_bits, num_hashes=7, seed=0)\n"
+    "\n"
+    "Blocked Bloom filter of bytes or str keys.\n"
+    "\n"
+    "The bits are split into blocks of 512 bits, i.e., 64-byte cache\n"
+    "lines. Each key is hashed once by murmurhash3_x64_128: the first\n"
+    "64-bit word of the hash selects a block, and ``num_hashes`` bits in the\n"
+    "block are derived from the second word by double hashing\n"
+    "(Kirsch-Mitzenmacher). A lookup therefore costs a single hash and a\n"
+    "single cache miss, at the price of a slightly higher false positive\n"
+    "rate than that of a standard Bloom filter of the same size.\n"
+    "\n"
+    "For ``n`` keys and a false positive rate ``p``, a good choice is\n"
+    "``num_bits = -n * ln(p) / ln(2)**2`` and\n"
+    "``num_hashes = round(-log2(p))``. ``key in self`` returns True if the\n"
+    "key may have been added, and False if it has definitely not been\n"
+    "added.\n"
+    "\n"
+    "A filter saved by ``tofile()`` can be loaded in place by\n"
+    "``frombuffer()``, e.g., from a memory-mapped file shared by many\n"
+    "processes.\n"
+    "\n"
+    "Args:\n"
+    "    num_bits (int): The number of bits. Must be positive. Rounded up to\n"
+    "        a multiple of 512.\n"
+    "    num_hashes (int): The number of bits set for each key. Must be an\n"
+    "        integer in the range [1, 64].\n"
+    "    seed (int): The seed used to hash the keys. Must be an integer in\n"
+    "        the range [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
+
+static PyTypeObject MMH3BloomFilterType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.BloomFilter",
+    .tp_doc = MMH3BloomFilterType_doc,
+    .tp_basicsize = sizeof(MMH3BloomFilter),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = MMH3BloomFilter_new,
+    .tp_dealloc = (destructor)MMH3BloomFilter_dealloc,
+    .tp_methods = MMH3BloomFilter_methods,
+    .tp_getset = MMH3BloomFilter_getsetters,
+    .tp_as_sequence = &MMH3BloomFilter_as_sequence,
+};
+
+//-----------------------------------------------------------------------------
+// Count-min sketch
+
+// Serialized format of CountMinSketch, in little-endian:
+//
+// offset  size  content
+// 0       8     magic "MMH3CMS1"
+// 8       8     number of counters in each row (width)
+// 16      4     number of rows (depth)
+// 20      4     seed
+// 24      4     size of a counter in bytes: 2, 4, or 8
+// 28      4     flags, 1 if conservative
+// 32      8     sum of the counts added (total)
+// 40            depth rows of width counters
+#define MMH3_CMS_MAGIC "MMH3CMS1"
+#define MMH3_CMS_HEADER_SIZE 40
+#define MMH3_CMS_FLAG_CONSERVATIVE 1
+
+#define MMH3_CMS_MAX_DEPTH 64
+
+// The number of keys hashed by a batch function before their counters are
+// accessed, so that the counters are prefetched while the next keys are
+// hashed.
+#define MMH3_CMS_CHUNK 16
+
+typedef struct {
+    PyObject_HEAD Py_ssize_t width;
+    uint32_t depth;
+    uint32_t seed;
+    Py_ssize_t itemsize;  // size of a counter: 2, 4, or 8
+    int conservative;
+    uint64_t max;       // maximum value of a counter
+    uint64_t total;     // sum of the counts added, saturated at UINT64_MAX
+    char *counters;     // depth rows of width counters
+    Py_ssize_t *index;  // indexes of the counters of a chunk of keys
+#ifdef Py_GIL_DISABLED
+    PyMutex mutex;
+#else
+    PyThread_type_lock lock;
+#endif
+} MMH3CountMinSketch;
+
+static PyTypeObject MMH3CountMinSketchType;
+
+#define MMH3_CMS_SIZE(self) \
+    ((self)->width * (Py_ssize_t)(self)->depth * (self)->itemsize)
+
+/*
+ * Allocate a CountMinSketch object with all the counters zero. Returns NULL
+ * with an exception set on failure.
+ */
+static MMH3CountMinSketch *
+mmh3_cms_alloc(PyTypeObject *type, Py_ssize_t width, uint32_t depth,
+               uint32_t seed, Py_ssize_t itemsize, int conservative)
+{
+    MMH3CountMinSketch *self = (MMH3CountMinSketch *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    self->width = width;
+    self->depth = depth;
+    self->seed = seed;
+    self->itemsize = itemsize;
+    self->conservative = conservative;
+    self->max =
+        itemsize == 8 ? UINT64_MAX : ((uint64_t)1 << (itemsize * 8)) - 1;
+    self->total = 0;
+    MMH3_HASHER_INIT_MUTEX(self);
+
+    self->counters = PyMem_Calloc(width * (Py_ssize_t)depth, itemsize);
+    self->index = PyMem_New(Py_ssize_t, MMH3_CMS_CHUNK * depth);
+    if (self->counters == NULL || self->index == NULL) {
+        Py_DECREF(self);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    return self;
+}
+
+static void
+MMH3CountMinSketch_dealloc(MMH3CountMinSketch *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    PyMem_Free(self->counters);
+    PyMem_Free(self->index);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+// Read and write the i-th counter of an array of counters of itemsize bytes
+static FORCE_INLINE uint64_t
+mmh3_cms_load(const char *counters, Py_ssize_t itemsize, Py_ssize_t i)
+{
+    switch (itemsize) {
+        case 2:
+            return ((const uint16_t *)counters)[i];
+        case 4:
+            return ((const uint32_t *)counters)[i];
+        default:
+            return ((const uint64_t *)counters)[i];
+    }
+}
+
+static FORCE_INLINE void
+mmh3_cms_store(char *counters, Py_ssize_t itemsize, Py_ssize_t i,
+               uint64_t value)
+{
+    switch (itemsize) {
+        case 2:
+            ((uint16_t *)counters)[i] = (uint16_t)value;
+            break;
+        case 4:
+            ((uint32_t *)counters)[i] = (uint32_t)value;
+            break;
+        default:
+            ((uint64_t *)counters)[i] = value;
+            break;
+    }
+}
+
+#define mmh3_cms_get(self, i) \
+    mmh3_cms_load((self)->counters, (self)->itemsize, (i))
+#define mmh3_cms_set(self, i, value) \
+    mmh3_cms_store((self)->counters, (self)->itemsize, (i), (value))
+
+// Return a + b, saturated at max.
+static FORCE_INLINE uint64_t
+mmh3_cms_saturating_add(uint64_t a, uint64_t b, uint64_t max)
+{
+    return b > max - a ? max : a + b;
+}
+
+/*
+ * Hash a key and store the indexes of its counters in index, one for each
+ * row. The counter in the row r is given by h1 + r * h2 modulo width, where
+ * h1 and h2 are the two words of the hash (Kirsch-Mitzenmacher), so that a
+ * single hash serves all the rows.
+ */
+static FORCE_INLINE void
+mmh3_cms_locate(const MMH3CountMinSketch *self, const char *key,
+                Py_ssize_t len, Py_ssize_t *index)
+{
+    uint64_t out[2];
+
+    murmurhash3_x64_128(key, len, self->seed, out);
+
+    for (uint32_t r = 0; r < self->depth; r++) {
+        index[r] = (Py_ssize_t)r * self->width +
+                   (Py_ssize_t)((out[0] + r * out[1]) % (uint64_t)self->width);
+    }
+}
+
+static FORCE_INLINE void
+mmh3_cms_prefetch(const MMH3CountMinSketch *self, const Py_ssize_t *index)
+{
+    for (uint32_t r = 0; r < self->depth; r++) {
+        MMH3_PREFETCH(self->counters + index[r] * self->itemsize);
+    }
+}
+
+static FORCE_INLINE uint64_t
+mmh3_cms_estimate_unlocked(const MMH3CountMinSketch *self,
+                           const Py_ssize_t *index)
+{
+    uint64_t result = self->max;
+
+    for (uint32_t r = 0; r < self->depth; r++) {
+        const uint64_t value = mmh3_cms_get(self, index[r]);
+        if (value < result) {
+            result = value;
+        }
+    }
+
+    return result;
+}
+
+/*
+ * Add count to the counters at index. With conservative update, each
+ * counter is raised only up to the new estimate of the key, which keeps the
+ * estimates of the other keys sharing the counters lower.
+ */
+static FORCE_INLINE void
+mmh3_cms_increment_unlocked(MMH3CountMinSketch *self, const Py_ssize_t *index,
+                            uint64_t count)
+{
+    self->total = mmh3_cms_saturating_add(self->total, count, UINT64_MAX);
+
+    if (self->conservative) {
+        const uint64_t target = mmh3_cms_saturating_add(
+            mmh3_cms_estimate_unlocked(self, index), count, self->max);
+
+        for (uint32_t r = 0; r < self->depth; r++) {
+            if (mmh3_cms_get(self, index[r]) < target) {
+                mmh3_cms_set(self, index[r], target);
+            }
+        }
+        return;
+    }
+
+    for (uint32_t r = 0; r < self->depth; r++) {
+        mmh3_cms_set(self, index[r],
+                     mmh3_cms_saturating_add(mmh3_cms_get(self, index[r]),
+                                             count, self->max));
+    }
+}
+
+static uint64_t
+mmh3_cms_estimate_key_unlocked(MMH3CountMinSketch *self, const char *key,
+                               Py_ssize_t len)
+{
+    mmh3_cms_locate(self, key, len, self->index);
+    return mmh3_cms_estimate_unlocked(self, self->index);
+}
+
+static void
+mmh3_cms_add_unlocked(MMH3CountMinSketch *self, const char *key,
+                      Py_ssize_t len, uint64_t count)
+{
+    mmh3_cms_locate(self, key, len, self->index);
+    mmh3_cms_increment_unlocked(self, self->index, count);
+}
+
+/*
+ * Add the keys of batch with the counts in counts, acquired by
+ * mmh3_get_nonnegative_items(), or 1 for each key if counts->obj is NULL.
+ */
+static void
+mmh3_cms_add_batch_unlocked(MMH3CountMinSketch *self,
+                            const MMH3KeyBatch *batch, const Py_buffer *counts,
+                            int counts_signed)
+{
+    const uint32_t depth = self->depth;
+
+    for (Py_ssize_t start = 0; start < batch->n; start += MMH3_CMS_CHUNK) {
+        const Py_ssize_t m = batch->n - start < MMH3_CMS_CHUNK
+                                 ? batch->n - start
+                                 : MMH3_CMS_CHUNK;
+
+        for (Py_ssize_t j = 0; j < m; j++) {
+            mmh3_cms_locate(self, batch->keys[start + j],
+                            batch->lens[start + j], self->index + j * depth);
+            mmh3_cms_prefetch(self, self->index + j * depth);
+        }
+        for (Py_ssize_t j = 0; j < m; j++) {
+            const uint64_t count = counts->obj != NULL
+                                       ? (uint64_t)mmh3_read_nonnegative(
+                                             counts, counts_signed, start + j)
+                                       : 1;
+            mmh3_cms_increment_unlocked(self, self->index + j * depth, count);
+        }
+    }
+}
+
+static void
+mmh3_cms_estimate_batch_unlocked(MMH3CountMinSketch *self,
+                                 const MMH3KeyBatch *batch, uint64_t *out)
+{
+    const uint32_t depth = self->depth;
+
+    for (Py_ssize_t start = 0; start < batch->n; start += MMH3_CMS_CHUNK) {
+        const Py_ssize_t m = batch->n - start < MMH3_CMS_CHUNK
+                                 ? batch->n - start
+                                 : MMH3_CMS_CHUNK;
+
+        for (Py_ssize_t j = 0; j < m; j++) {
+            mmh3_cms_locate(self, batch->keys[start + j],
+                            batch->lens[start + j], self->index + j * depth);
+            mmh3_cms_prefetch(self, self->index + j * depth);
+        }
+        for (Py_ssize_t j = 0; j < m; j++) {
+            out[start + j] =
+                mmh3_cms_estimate_unlocked(self, self->index + j * depth);
+        }
+    }
+}
+
+/*
+ * Convert a typecode of array.array to the size of a counter. Returns 0 on
+ * success and -1 with an exception set on failure.
+ */
+static int
+mmh3_cms_parse_typecode(const char *typecode, Py_ssize_t *itemsize)
+{
+    if (strcmp(typecode, "H") == 0) {
+        *itemsize = 2;
+    }
+    else if (strcmp(typecode, "I") == 0) {
+        *itemsize = 4;
+    }
+    else if (strcmp(typecode, "Q") == 0) {
+        *itemsize = 8;
+    }
+    else {
+        PyErr_Format(PyExc_ValueError,
+                     "typecode must be 'H', 'I', or 'Q', not '%s'", typecode);
+        return -1;
+    }
+
+    return 0;
+}
+
+static PyObject *
+MMH3CountMinSketch_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    Py_ssize_t width = 0;
+    Py_ssize_t depth = 4;
+    long long seed = 0;
+    const char *typecode = "I";
+    int conservative = 0;
+    Py_ssize_t itemsize = 0;
+    static char *kwlist[] = {"width",    "depth",        "seed",
+                             "typecode", "conservative", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|nLsp", kwlist, &width,
+                                     &depth, &seed, &typecode,
+                                     &conservative)) {
+        return NULL;
+    }
+
+    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
+
+    if (width < 1) {
+        PyErr_SetString(PyExc_ValueError, "width must be a positive integer");
+        return NULL;
+    }
+
+    if (depth < 1 || depth > MMH3_CMS_MAX_DEPTH) {
+        PyErr_SetString(PyExc_ValueError,
+                        "depth must be an integer in the range [1, 64]");
+        return NULL;
+    }
+
+    if (mmh3_cms_parse_typecode(typecode, &itemsize) < 0) {
+        return NULL;
+    }
+
+    if (width > PY_SSIZE_T_MAX / depth / itemsize) {
+        return PyErr_NoMemory();
+    }
+
+    return (PyObject *)mmh3_cms_alloc(type, width, (uint32_t)depth,
+                                      (uint32_t)seed, itemsize, conservative);
+}
+
+PyDoc_STRVAR(MMH3CountMinSketch_add_doc,
+             "add(key, count=1)\n"
+             "\n"
+             "Add a key with a count.\n"
+             "\n"
+             "Args:\n"
+             "    key (bytes | str): The key to add.\n"
+             "    count (int): The count to add. Must be non-negative.\n");
+
+static PyObject *
+MMH3CountMinSketch_add(MMH3CountMinSketch *self, PyObject *const *args,
+                       Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *target = NULL;
+    Py_ssize_t count = 1;
+    MMH3Key key;
+
+    if (nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 2 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        MMH3_HASH_VALIDATE_AND_SET_KEY(args[0], target);
+    }
+
+    if (nargs >= 2 &&
+        mmh3_parse_nonnegative_ssize(args[1], "count", &count) < 0) {
+        return NULL;
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "key") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "key", 1);
+                MMH3_HASH_VALIDATE_AND_SET_KEY(args[nargs + i], target);
+            }
+            else if (strcmp(kwname, "count") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "count", 2);
+                if (mmh3_parse_nonnegative_ssize(args[nargs + i], "count",
+                                                 &count) < 0) {
+                    return NULL;
+                }
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    MMH3_HASH_INIT_KEY(key, target);
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, key.len,
+        mmh3_cms_add_unlocked(self, key.buf, key.len, (uint64_t)count));
+
+    mmh3_key_release(&key);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3CountMinSketch_add_many_doc,
+    "add_many(keys, counts=None)\n"
+    "\n"
+    "Add many keys with counts.\n"
+    "\n"
+    "Same as calling ``add()`` for each key, but the keys are hashed in one\n"
+    "batch like ``hash_many()``. If any argument is invalid, none of the\n"
+    "keys is added.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys to add. A key may appear\n"
+    "        more than once.\n"
+    "    counts (Buffer | None): The counts of the keys as a buffer of\n"
+    "        non-negative native integers, e.g., ``array.array('Q')`` or a\n"
+    "        NumPy array of the dtype ``int64``. If None, each key is added\n"
+    "        with the count 1.\n");
+
+static PyObject *
+MMH3CountMinSketch_add_many(MMH3CountMinSketch *self, PyObject *const *args,
+                            Py_ssize_t nargs, PyObject *kwnames)
+{
+    PyObject *keys = NULL;
+    PyObject *counts = NULL;
+    MMH3KeyBatch batch;
+    Py_buffer counts_view;
+    int counts_signed = 0;
+
+    if (nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "function takes at most 2 arguments (%d given)",
+                     (int)nargs);
+        return NULL;
+    }
+
+    if (nargs >= 1) {
+        keys = args[0];
+    }
+
+    if (nargs >= 2) {
+        counts = args[1];
+    }
+
+    if (kwnames) {
+        for (Py_ssize_t i = 0; i < PyTuple_Size(kwnames); i++) {
+            const char *kwname = PyUnicode_AsUTF8(PyTuple_GetItem(kwnames, i));
+            if (strcmp(kwname, "keys") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "keys", 1);
+                keys = args[nargs + i];
+            }
+            else if (strcmp(kwname, "counts") == 0) {
+                MMH3_HASH_VALIDATE_ARG_DUPLICATION(nargs, "counts", 2);
+                counts = args[nargs + i];
+            }
+            else {
+                PyErr_Format(
+                    PyExc_TypeError,
+                    "'%s' is an invalid keyword argument for this function",
+                    kwname);
+                return NULL;
+            }
+        }
+    }
+
+    if (keys == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "function missing required argument 'keys' (pos 1)");
+        return NULL;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_get_nonnegative_items(counts, "counts", batch.n, &counts_view,
+                                   &counts_signed, "keys") < 0) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(self, batch.size,
+                              mmh3_cms_add_batch_unlocked(
+                                  self, &batch, &counts_view, counts_signed));
+
+    if (counts_view.obj != NULL) {
+        PyBuffer_Release(&counts_view);
+    }
+    mmh3_key_batch_release(&batch);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3CountMinSketch_estimate_doc,
+    "estimate(key) -> int\n"
+    "\n"
+    "Return the estimated count of a key.\n"
+    "\n"
+    "The estimate is the minimum of the counters of the key. It is never\n"
+    "less than the true count, unless a counter has saturated at the\n"
+    "maximum of its type.\n"
+    "\n"
+    "Args:\n"
+    "    key (bytes | str): The key to estimate.\n"
+    "\n"
+    "Returns:\n"
+    "    int: The estimated count.\n");
+
+static PyObject *
+MMH3CountMinSketch_estimate(MMH3CountMinSketch *self, PyObject *obj)
+{
+    PyObject *target = NULL;
+    MMH3Key key;
+    uint64_t result = 0;
+
+    MMH3_HASH_VALIDATE_AND_SET_KEY(obj, target);
+    MMH3_HASH_INIT_KEY(key, target);
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, key.len,
+        result = mmh3_cms_estimate_key_unlocked(self, key.buf, key.len));
+
+    mmh3_key_release(&key);
+
+    return PyLong_FromUnsignedLongLong(result);
+}
+
+PyDoc_STRVAR(
+    MMH3CountMinSketch_estimate_many_doc,
+    "estimate_many(keys) -> array.array[int]\n"
+    "\n"
+    "Return the estimated counts of many keys.\n"
+    "\n"
+    "Same as calling ``estimate()`` for each key, but the keys are hashed in\n"
+    "one batch like ``hash_many()``.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys to estimate.\n"
+    "\n"
+    "Returns:\n"
+    "    array.array[int]: The estimated counts of the typecode ``'Q'``.\n");
+
+static PyObject *
+MMH3CountMinSketch_estimate_many(MMH3CountMinSketch *self, PyObject *keys)
+{
+    MMH3KeyBatch batch;
+    MMH3Output output;
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, NULL, batch.n * sizeof(uint64_t), 'Q') < 0) {
+        mmh3_key_batch_release(&batch);
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(self, batch.size,
+                              mmh3_cms_estimate_batch_unlocked(
+                                  self, &batch, (uint64_t *)output.buf));
+
+    mmh3_key_batch_release(&batch);
+
+    return mmh3_output_finish(&output);
+}
+
+PyDoc_STRVAR(
+    MMH3CountMinSketch_merge_doc,
+    "merge(other)\n"
+    "\n"
+    "Add the counters of another sketch to this sketch.\n"
+    "\n"
+    "After the merge, this sketch estimates the counts of the keys added to\n"
+    "either sketch, e.g., to combine the sketches of many workers. The\n"
+    "counters saturate at the maximum of their type.\n"
+    "\n"
+    "Args:\n"
+    "    other (CountMinSketch): A CountMinSketch object with the same\n"
+    "        ``width``, ``depth``, ``seed``, and ``typecode``.\n");
+
+/*
+ * Copy the counters of self to counters and return the total.
+ */
+static uint64_t
+mmh3_cms_export_unlocked(const MMH3CountMinSketch *self, char *counters)
+{
+    memcpy(counters, self->counters, MMH3_CMS_SIZE(self));
+    return self->total;
+}
+
+/*
+ * Add counters, an array of the same shape as the counters of self, and
+ * total to self.
+ */
+static void
+mmh3_cms_merge_unlocked(MMH3CountMinSketch *self, const char *counters,
+                        uint64_t total)
+{
+    const Py_ssize_t n = self->width * (Py_ssize_t)self->depth;
+
+    self->total = mmh3_cms_saturating_add(self->total, total, UINT64_MAX);
+
+    for (Py_ssize_t i = 0; i < n; i++) {
+        mmh3_cms_set(
+            self, i,
+            mmh3_cms_saturating_add(mmh3_cms_get(self, i),
+                                    mmh3_cms_load(counters, self->itemsize, i),
+                                    self->max));
+    }
+}
+
+static PyObject *
+MMH3CountMinSketch_merge(MMH3CountMinSketch *self, PyObject *other)
+{
+    if (!PyObject_TypeCheck(other, &MMH3CountMinSketchType)) {
+        PyErr_Format(PyExc_TypeError,
+                     "merge() argument must be CountMinSketch, not '%s'",
+                     Py_TYPE(other)->tp_name);
+        return NULL;
+    }
+
+    MMH3CountMinSketch *o = (MMH3CountMinSketch *)other;
+    if (o->width != self->width || o->depth != self->depth ||
+        o->seed != self->seed || o->itemsize != self->itemsize) {
+        PyErr_SetString(PyExc_ValueError,
+                        "cannot merge CountMinSketch objects with different "
+                        "width, depth, seed, or typecode");
+        return NULL;
+    }
+
+    // Copy the counters of other first, so that the two locks are never held
+    // at once.
+    const Py_ssize_t size = MMH3_CMS_SIZE(o);
+    char *counters = PyMem_Malloc(size);
+    if (counters == NULL) {
+        return PyErr_NoMemory();
+    }
+
+    uint64_t total = 0;
+    MMH3_HASHER_UPDATE_LOCKED(o, size,
+                              total = mmh3_cms_export_unlocked(o, counters));
+
+    MMH3_HASHER_UPDATE_LOCKED(self, size,
+                              mmh3_cms_merge_unlocked(self, counters, total));
+
+    PyMem_Free(counters);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(MMH3CountMinSketch_copy_doc,
+             "copy() -> CountMinSketch\n"
+             "\n"
+             "Return a copy of this object.\n"
+             "\n"
+             "Returns:\n"
+             "    CountMinSketch: A copy of this object.\n");
+
+static PyObject *
+MMH3CountMinSketch_copy(MMH3CountMinSketch *self, PyObject *Py_UNUSED(ignored))
+{
+    MMH3CountMinSketch *p =
+        mmh3_cms_alloc(Py_TYPE(self), self->width, self->depth, self->seed,
+                       self->itemsize, self->conservative);
+    if (p == NULL) {
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, MMH3_CMS_SIZE(self),
+        p->total = mmh3_cms_export_unlocked(self, p->counters));
+
+    return (PyObject *)p;
+}
+
+/*
+ * Convert the n counters of itemsize bytes at p between native and
+ * little-endian in place.
+ */
+static void
+mmh3_cms_swap_counters(char *p, Py_ssize_t itemsize, Py_ssize_t n)
+{
+#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
+    for (Py_ssize_t i = 0; i < n; i++) {
+        char *item = p + i * itemsize;
+        for (Py_ssize_t j = 0; j < itemsize / 2; j++) {
+            const char c = item[j];
+            item[j] = item[itemsize - 1 - j];
+            item[itemsize - 1 - j] = c;
+        }
+    }
+#else
+    (void)p;
+    (void)itemsize;
+    (void)n;
+#endif
+}
+
+PyDoc_STRVAR(
+    MMH3CountMinSketch_tobytes_doc,
+    "tobytes() -> bytes\n"
+    "\n"
+    "Return the sketch serialized as a ``bytes`` object.\n"
+    "\n"
+    "The result can be loaded by ``frombuffer()`` on any platform, e.g., to\n"
+    "merge the sketches of many processes or machines.\n"
+    "\n"
+    "Returns:\n"
+    "    bytes: The serialized sketch.\n");
+
+static PyObject *
+MMH3CountMinSketch_tobytes(MMH3CountMinSketch *self,
+                           PyObject *Py_UNUSED(ignored))
+{
+    const Py_ssize_t size = MMH3_CMS_SIZE(self);
+    uint64_t total = 0;
+
+    if (size > PY_SSIZE_T_MAX - MMH3_CMS_HEADER_SIZE) {
+        return PyErr_NoMemory();
+    }
+
+    PyObject *result =
+        PyBytes_FromStringAndSize(NULL, MMH3_CMS_HEADER_SIZE + size);
+    if (result == NULL) {
+        return NULL;
+    }
+
+    char *p = PyBytes_AS_STRING(result);
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, size,
+        total = mmh3_cms_export_unlocked(self, p + MMH3_CMS_HEADER_SIZE));
+    mmh3_cms_swap_counters(p + MMH3_CMS_HEADER_SIZE, self->itemsize,
+                           size / self->itemsize);
+
+    memcpy(p, MMH3_CMS_MAGIC, 8);
+    mmh3_store_le64(p + 8, (uint64_t)self->width);
+    mmh3_store_le32(p + 16, self->depth);
+    mmh3_store_le32(p + 20, self->seed);
+    mmh3_store_le32(p + 24, (uint32_t)self->itemsize);
+    mmh3_store_le32(p + 28,
+                    self->conservative ? MMH3_CMS_FLAG_CONSERVATIVE : 0);
+    mmh3_store_le64(p + 32, total);
+
+    return result;
+}
+
+PyDoc_STRVAR(MMH3CountMinSketch_frombuffer_doc,
+             "frombuffer(buffer) -> CountMinSketch\n"
+             "\n"
+             "Load a sketch serialized by ``tobytes()``.\n"
+             "\n"
+             "Args:\n"
+             "    buffer (Buffer): The serialized sketch.\n"
+             "\n"
+             "Returns:\n"
+             "    CountMinSketch: The loaded sketch.\n");
+
+static PyObject *
+MMH3CountMinSketch_frombuffer(PyTypeObject *type, PyObject *obj)
+{
+    Py_buffer view;
+    MMH3CountMinSketch *self = NULL;
+
+    if (PyObject_GetBuffer(obj, &view, PyBUF_SIMPLE) == -1) {
+        return NULL;
+    }
+
+    const char *p = (const char *)view.buf;
+    if (view.len < MMH3_CMS_HEADER_SIZE || memcmp(p, MMH3_CMS_MAGIC, 8) != 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "buffer is not a valid CountMinSketch");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    const uint64_t width = mmh3_load_le64(p + 8);
+    const uint32_t depth = mmh3_load_le32(p + 16);
+    const uint32_t seed = mmh3_load_le32(p + 20);
+    const uint32_t itemsize = mmh3_load_le32(p + 24);
+    const uint32_t flags = mmh3_load_le32(p + 28);
+    const uint64_t size = (uint64_t)(view.len - MMH3_CMS_HEADER_SIZE);
+
+    if (width == 0 || depth < 1 || depth > MMH3_CMS_MAX_DEPTH ||
+        (itemsize != 2 && itemsize != 4 && itemsize != 8) ||
+        (flags & ~MMH3_CMS_FLAG_CONSERVATIVE) != 0 ||
+        width > size / depth / itemsize || width * depth * itemsize != size) {
+        PyErr_SetString(PyExc_ValueError,
+                        "buffer is not a valid CountMinSketch");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    self = mmh3_cms_alloc(type, (Py_ssize_t)width, depth, seed, itemsize,
+                          (flags & MMH3_CMS_FLAG_CONSERVATIVE) != 0);
+    if (self != NULL) {
+        memcpy(self->counters, p + MMH3_CMS_HEADER_SIZE, (size_t)size);
+        mmh3_cms_swap_counters(self->counters, self->itemsize,
+                               (Py_ssize_t)(size / itemsize));
+        self->total = mmh3_load_le64(p + 32);
+    }
+
+    PyBuffer_Release(&view);
+    return (PyObject *)self;
+}
+
+static PyMethodDef MMH3CountMinSketch_methods[] = {
+    {"add", (PyCFunction)MMH3CountMinSketch_add, METH_FASTCALL | METH_KEYWORDS,
+     MMH3CountMinSketch_add_doc},
+    {"add_many", (PyCFunction)MMH3CountMinSketch_add_many,
+     METH_FASTCALL | METH_KEYWORDS, MMH3CountMinSketch_add_many_doc},
+    {"estimate", (PyCFunction)MMH3CountMinSketch_estimate, METH_O,
+     MMH3CountMinSketch_estimate_doc},
+    {"estimate_many", (PyCFunction)MMH3CountMinSketch_estimate_many, METH_O,
+     MMH3CountMinSketch_estimate_many_doc},
+    {"merge", (PyCFunction)MMH3CountMinSketch_merge, METH_O,
+     MMH3CountMinSketch_merge_doc},
+    {"copy", (PyCFunction)MMH3CountMinSketch_copy, METH_NOARGS,
+     MMH3CountMinSketch_copy_doc},
+    {"tobytes", (PyCFunction)MMH3CountMinSketch_tobytes, METH_NOARGS,
+     MMH3CountMinSketch_tobytes_doc},
+    {"frombuffer", (PyCFunction)MMH3CountMinSketch_frombuffer,
+     METH_O | METH_CLASS, MMH3CountMinSketch_frombuffer_doc},
     {NULL} /* Sentinel */
 };
 
 static PyObject *
-MMH3Hasher32_get_digest_size(PyObject *self, void *closure)
+MMH3CountMinSketch_get_width(MMH3CountMinSketch *self, void *closure)
 {
-    return PyLong_FromLong(MMH3_32_DIGESTSIZE);
+    return PyLong_FromSsize_t(self->width);
 }
 
 static PyObject *
-MMH3Hasher32_get_block_size(PyObject *self, void *closure)
+MMH3CountMinSketch_get_depth(MMH3CountMinSketch *self, void *closure)
 {
-    return PyLong_FromLong(MMH3_32_BLOCKSIZE);
+    return PyLong_FromUnsignedLong(self->depth);
 }
 
 static PyObject *
-MMH3Hasher32_get_name(PyObject *self, void *closure)
+MMH3CountMinSketch_get_seed(MMH3CountMinSketch *self, void *closure)
 {
-    return PyUnicode_FromStringAndSize("mmh3_32", 7);
+    return PyLong_FromUnsignedLong(self->seed);
 }
 
-static PyGetSetDef MMH3Hasher32_getsetters[] = {
-    {"digest_size", (getter)MMH3Hasher32_get_digest_size, NULL,
-     "int: Number of bytes in this hashes output", NULL},
-    {"block_size", (getter)MMH3Hasher32_get_block_size, NULL,
-     "int: Number of bytes of the internal block of this algorithm", NULL},
-    {"name", (getter)MMH3Hasher32_get_name, NULL,
-     "str: The hash algorithm being used by this object", NULL},
+static PyObject *
+MMH3CountMinSketch_get_typecode(MMH3CountMinSketch *self, void *closure)
+{
+    return PyUnicode_FromString(
+        self->itemsize == 2 ? "H" : (self->itemsize == 4 ? "I" : "Q"));
+}
+
+static PyObject *
+MMH3CountMinSketch_get_conservative(MMH3CountMinSketch *self, void *closure)
+{
+    return PyBool_FromLong(self->conservative);
+}
+
+static PyObject *
+MMH3CountMinSketch_get_total(MMH3CountMinSketch *self, void *closure)
+{
+    MMH3_HASHER_LOCK(self);
+    const uint64_t total = self->total;
+    MMH3_HASHER_UNLOCK(self);
+
+    return PyLong_FromUnsignedLongLong(total);
+}
+
+static PyGetSetDef MMH3CountMinSketch_getsetters[] = {
+    {"width", (getter)MMH3CountMinSketch_get_width, NULL,
+     "int: Number of counters in each row", NULL},
+    {"depth", (getter)MMH3CountMinSketch_get_depth, NULL,
+     "int: Number of rows", NULL},
+    {"seed", (getter)MMH3CountMinSketch_get_seed, NULL,
+     "int: The seed used to hash the keys", NULL},
+    {"typecode", (getter)MMH3CountMinSketch_get_typecode, NULL,
+     "str: The typecode of the counters, ``'H'``, ``'I'``, or ``'Q'``", NULL},
+    {"conservative", (getter)MMH3CountMinSketch_get_conservative, NULL,
+     "bool: Whether the counters are updated conservatively", NULL},
+    {"total", (getter)MMH3CountMinSketch_get_total, NULL,
+     "int: Sum of the counts added", NULL},
     {NULL} /* Sentinel */
 };
 
 PyDoc_STRVAR(
-    MMH3Hasher32Type_doc,
-    "__init__(data=None, seed=0)\n"
+    MMH3CountMinSketchType_doc,
+    "__init__(width, depth=4, seed=0, typecode='I', conservative=False)\n"
     "\n"
-    "Hasher for incrementally calculating the murmurhash3_x86_32 hash.\n"
+    "Count-min sketch for estimating the counts of bytes or str keys.\n"
     "\n"
-    "Args:\n"
-    "    data (Buffer | None): The initial data to hash.\n"
-    "    seed (int): The seed value. Must be an integer in the range\n"
-    "        [0, 0xFFFFFFFF].\n"
+    "The sketch has ``depth`` rows of ``width`` counters. Each key is hashed\n"
+    "once by murmurhash3_x64_128, and the counter of the key in each row is\n"
+    "derived from the two 64-bit words of the hash by double hashing\n"
+    "(Kirsch-Mitzenmacher). The estimated count of a key is the minimum of\n"
+    "its counters, which overestimates the true count by at most\n"
+    "``e / width * total`` with probability ``1 - exp(-depth)``.\n"
     "\n"
-    ".. versionchanged:: 5.2.0\n"
-    "    Experimental no-GIL support; thread safety not fully verified.\n"
+    "With conservative update, adding a key raises its counters only up to\n"
+    "its new estimate, which reduces the overestimation considerably. The\n"
+    "counters saturate at the maximum of their type instead of wrapping\n"
+    "around.\n"
     "\n"
-    ".. versionchanged:: 5.0.0\n"
-    "    Added the optional ``data`` parameter as the first argument.\n"
-    "    The ``seed`` argument is now strictly checked for valid range.\n");
+    "Args:\n"
+    "    width (int): The number of counters in each row. Must be positive.\n"
+    "    depth (int): The number of rows. Must be an integer in the range\n"
+    "        [1, 64].\n"
+    "    seed (int): The seed used to hash the keys. Must be an integer in\n"
+    "        the range [0, 0xFFFFFFFF].\n"
+    "    typecode (str): The type of the counters, ``'H'`` (16-bit), ``'I'``\n"
+    "        (32-bit), or ``'Q'`` (64-bit) unsigned integers.\n"
+    "    conservative (bool): Whether to use conservative update.\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
 
-static PyTypeObject MMH3Hasher32Type = {
-    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.mmh3_32",
-    .tp_doc = MMH3Hasher32Type_doc,
-    .tp_basicsize = sizeof(MMH3Hasher32),
+static PyTypeObject MMH3CountMinSketchType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.CountMinSketch",
+    .tp_doc = MMH3CountMinSketchType_doc,
+    .tp_basicsize = sizeof(MMH3CountMinSketch),
     .tp_itemsize = 0,
     .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = MMH3Hasher32_new,
-    .tp_init = (initproc)MMH3Hasher32_init,
-    .tp_dealloc = (destructor)MMH3Hasher32_dealloc,
-    .tp_methods = MMH3Hasher32_methods,
-    .tp_getset = MMH3Hasher32_getsetters,
+    .tp_new = MMH3CountMinSketch_new,
+    .tp_dealloc = (destructor)MMH3CountMinSketch_dealloc,
+    .tp_methods = MMH3CountMinSketch_methods,
+    .tp_getset = MMH3CountMinSketch_getsetters,
 };
 
 //-----------------------------------------------------------------------------
-// Hasher for murmurhash3_x64_128
+// HyperLogLog
+
+// Serialized format of HyperLogLog, in little-endian:
+//
+// offset  size  content
+// 0       8     magic "MMH3HLL1"
+// 8       4     precision (p)
+// 12      4     seed
+// 16      4     encoding, MMH3_HLL_DENSE or MMH3_HLL_SPARSE
+// 20      4     reserved, 0
+// 24            dense: 2**p registers of 1 byte
+//               sparse: sorted entries of 4 bytes (index << 8 | register)
+#define MMH3_HLL_MAGIC "MMH3HLL1"
+#define MMH3_HLL_HEADER_SIZE 24
+#define MMH3_HLL_DENSE 0
+#define MMH3_HLL_SPARSE 1
+
+#define MMH3_HLL_MIN_P 4
+#define MMH3_HLL_MAX_P 18
+
 typedef struct {
-    PyObject_HEAD uint64_t h1;
-    uint64_t h2;
-    uint64_t buffer1;
-    uint64_t buffer2;
-    uint8_t shift;
-    Py_ssize_t length;
+    PyObject_HEAD uint32_t p;
+    uint32_t seed;
+    // registers and entries are allocated by PyMem_Raw*, since they may be
+    // resized while the GIL is released.
+    unsigned char *registers;  // 2**p registers, or NULL in the sparse mode
+    // Entries of the sparse mode, each of which is (index << 8 | value) of a
+    // non-zero register. Entries are appended to the end and are sorted and
+    // deduplicated lazily.
+    uint32_t *entries;
+    Py_ssize_t n;  // number of entries
+    Py_ssize_t capacity;
 #ifdef Py_GIL_DISABLED
     PyMutex mutex;
+#else
+    PyThread_type_lock lock;
 #endif
-} MMH3Hasher128x64;
+} MMH3HyperLogLog;
 
-static PyTypeObject MMH3Hasher128x64Type;
+static PyTypeObject MMH3HyperLogLogType;
 
-static FORCE_INLINE void
-update_x64_128_impl(MMH3Hasher128x64 *self, Py_buffer *buf)
+#define MMH3_HLL_M(self) ((Py_ssize_t)1 << (self)->p)
+
+// The maximum number of entries of the sparse mode. The entries of 4 bytes
+// take as much memory as the dense registers at this point.
+#define MMH3_HLL_MAX_ENTRIES(self) (MMH3_HLL_M(self) / 4)
+
+static FORCE_INLINE int
+mmh3_clz64(uint64_t x)
 {
-    Py_ssize_t i = 0;
-    uint64_t h1 = 0;
-    uint64_t h2 = 0;
-    uint64_t k1 = 0;
-    uint64_t k2 = 0;
+#if defined(__GNUC__) || defined(__clang__)
+    return x == 0 ? 64 : __builtin_clzll(x);
+#else
+    int n = 0;
+    if (x == 0) {
+        return 64;
+    }
+    while ((x & 0x8000000000000000ULL) == 0) {
+        x <<= 1;
+        n++;
+    }
+    return n;
+#endif
+}
 
-    MMH3_HASHER_LOCK(self);
-    h1 = self->h1;
-    h2 = self->h2;
+static int
+mmh3_uint32_compare(const void *a, const void *b)
+{
+    const uint32_t x = *(const uint32_t *)a;
+    const uint32_t y = *(const uint32_t *)b;
 
-    for (; i + 16 <= buf->len; i += 16) {
-        k1 = getblock64(buf->buf, (i / 16) * 2);
-        k2 = getblock64(buf->buf, (i / 16) * 2 + 1);
+    return (x > y) - (x < y);
+}
 
-        if (self->shift == 0) {  // TODO: use bit ops
-            self->buffer1 = k1;
-            self->buffer2 = k2;
-        }
-        else if (self->shift < 64) {
-            self->buffer1 |= k1 << self->shift;
-            self->buffer2 = (k1 >> (64 - self->shift)) | (k2 << self->shift);
-        }
-        else if (self->shift == 64) {
-            self->buffer2 = k1;
-        }
-        else {
-            self->buffer2 |= k1 << (self->shift - 64);
+static MMH3HyperLogLog *
+mmh3_hll_alloc(PyTypeObject *type, uint32_t p, uint32_t seed)
+{
+    MMH3HyperLogLog *self = (MMH3HyperLogLog *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    self->p = p;
+    self->seed = seed;
+    self->registers = NULL;
+    self->entries = NULL;
+    self->n = 0;
+    self->capacity = 0;
+    MMH3_HASHER_INIT_MUTEX(self);
+
+    return self;
+}
+
+static void
+MMH3HyperLogLog_dealloc(MMH3HyperLogLog *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    PyMem_RawFree(self->registers);
+    PyMem_RawFree(self->entries);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+/*
+ * Sort the entries and keep only the entry of the largest value for each
+ * register.
+ */
+static void
+mmh3_hll_compact_unlocked(MMH3HyperLogLog *self)
+{
+    Py_ssize_t n = 0;
+
+    qsort(self->entries, self->n, sizeof(uint32_t), mmh3_uint32_compare);
+
+    for (Py_ssize_t i = 0; i < self->n; i++) {
+        if (n > 0 && self->entries[n - 1] >> 8 == self->entries[i] >> 8) {
+            n--;
         }
+        self->entries[n++] = self->entries[i];
+    }
+    self->n = n;
+}
 
-        h1 ^= mixK1_x64_128(self->buffer1);
-        h1 = mixH_x64_128(h1, h2, 27, 0x52dce729UL);
-        h2 ^= mixK2_x64_128(self->buffer2);
-        h2 = mixH_x64_128(h2, h1, 31, 0x38495ab5UL);
+/*
+ * Switch from the sparse mode to the dense mode. Returns 0 on success and -1
+ * on memory allocation failure, in which case self is not modified.
+ */
+static int
+mmh3_hll_to_dense_unlocked(MMH3HyperLogLog *self)
+{
+    unsigned char *registers = PyMem_RawCalloc(MMH3_HLL_M(self), 1);
+    if (registers == NULL) {
+        return -1;
+    }
 
-        self->length += 16;
-        if (self->shift == 0) {  // TODO: use bit ops
-            self->buffer1 = 0;
-            self->buffer2 = 0;
+    for (Py_ssize_t i = 0; i < self->n; i++) {
+        const uint32_t index = self->entries[i] >> 8;
+        const unsigned char value = (unsigned char)(self->entries[i] & 0xff);
+        if (value > registers[index]) {
+            registers[index] = value;
         }
-        else if (self->shift < 64) {
-            self->buffer1 = k2 >> (64 - self->shift);
-            self->buffer2 = 0;
+    }
+
+    PyMem_RawFree(self->entries);
+    self->entries = NULL;
+    self->n = 0;
+    self->capacity = 0;
+    self->registers = registers;
+
+    return 0;
+}
+
+/*
+ * Set the register index to value if value is larger. Returns 0 on success
+ * and -1 on memory allocation failure.
+ */
+static int
+mmh3_hll_update_unlocked(MMH3HyperLogLog *self, uint32_t index,
+                         unsigned char value)
+{
+    if (self->registers != NULL) {
+        if (value > self->registers[index]) {
+            self->registers[index] = value;
         }
-        else if (self->shift == 64) {
-            self->buffer1 = k2;
-            self->buffer2 = 0;
+        return 0;
+    }
+
+    if (self->n == self->capacity) {
+        const Py_ssize_t max_entries = MMH3_HLL_MAX_ENTRIES(self);
+
+        mmh3_hll_compact_unlocked(self);
+        if (self->capacity == 0 || self->n > self->capacity / 2) {
+            if (self->capacity >= max_entries) {
+                if (mmh3_hll_to_dense_unlocked(self) < 0) {
+                    return -1;
+                }
+                return mmh3_hll_update_unlocked(self, index, value);
+            }
+
+            Py_ssize_t capacity =
+                self->capacity == 0 ? 16 : self->capacity * 2;
+            if (capacity > max_entries) {
+                capacity = max_entries;
+            }
+            uint32_t *entries = PyMem_RawRealloc(
+                self->entries, (size_t)capacity * sizeof(uint32_t));
+            if (entries == NULL) {
+                return -1;
+            }
+            self->entries = entries;
+            self->capacity = capacity;
         }
-        else {
-            self->buffer1 =
-                k1 >> (128 - self->shift) | (k2 << (self->shift - 64));
-            self->buffer2 = k2 >> (128 - self->shift);
+    }
+
+    self->entries[self->n++] = index << 8 | value;
+    return 0;
+}
+
+/*
+ * Hash a key and update its register. Returns 0 on success and -1 on memory
+ * allocation failure.
+ */
+static int
+mmh3_hll_add_unlocked(MMH3HyperLogLog *self, const char *key, Py_ssize_t len)
+{
+    uint64_t out[2];
+
+    murmurhash3_x64_128(key, len, self->seed, out);
+
+    // The top p bits select a register, and the value is the position of
+    // the first 1 in the other bits. The sentinel bit bounds the value by
+    // 64 - p + 1.
+    const uint32_t index = (uint32_t)(out[0] >> (64 - self->p));
+    const uint64_t w = (out[0] << self->p) | ((uint64_t)1 << (self->p - 1));
+
+    return mmh3_hll_update_unlocked(self, index,
+                                    (unsigned char)(mmh3_clz64(w) + 1));
+}
+
+static int
+mmh3_hll_add_batch_unlocked(MMH3HyperLogLog *self, const MMH3KeyBatch *batch)
+{
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        if (mmh3_hll_add_unlocked(self, batch->keys[i], batch->lens[i]) < 0) {
+            return -1;
         }
     }
 
-    for (; i < buf->len; i++) {
-        k1 = ((uint8_t *)buf->buf)[i];
-        if (self->shift < 64) {  // TODO: use bit ops
-            self->buffer1 |= k1 << self->shift;
+    return 0;
+}
+
+// sigma() and tau() of the improved estimator by Ertl, "New cardinality
+// estimation algorithms for HyperLogLog sketches", 2017
+static double
+mmh3_hll_sigma(double x)
+{
+    double y = 1.0;
+    double z = x;
+    double z_prev;
+
+    if (x == 1.0) {
+        return Py_HUGE_VAL;
+    }
+
+    do {
+        x *= x;
+        z_prev = z;
+        z += x * y;
+        y += y;
+    } while (z != z_prev);
+
+    return z;
+}
+
+static double
+mmh3_hll_tau(double x)
+{
+    double y = 1.0;
+    double z = 1.0 - x;
+    double z_prev;
+
+    if (x == 0.0 || x == 1.0) {
+        return 0.0;
+    }
+
+    do {
+        x = sqrt(x);
+        z_prev = z;
+        y *= 0.5;
+        z -= (1.0 - x) * (1.0 - x) * y;
+    } while (z != z_prev);
+
+    return z / 3.0;
+}
+
+/*
+ * Return the estimated cardinality of self. The entries of the sparse mode
+ * must be compacted.
+ */
+static double
+mmh3_hll_count_unlocked(const MMH3HyperLogLog *self)
+{
+    const int q = 64 - (int)self->p;
+    const double m = (double)MMH3_HLL_M(self);
+    Py_ssize_t histogram[64] = {0};
+
+    if (self->registers != NULL) {
+        for (Py_ssize_t i = 0; i < MMH3_HLL_M(self); i++) {
+            histogram[self->registers[i]]++;
         }
-        else {
-            self->buffer2 |= k1 << (self->shift - 64);
+    }
+    else {
+        histogram[0] = MMH3_HLL_M(self) - self->n;
+        for (Py_ssize_t i = 0; i < self->n; i++) {
+            histogram[self->entries[i] & 0xff]++;
         }
-        self->shift += 8;
-        self->length += 1;
+    }
 
-        if (self->shift >= 128) {
-            h1 ^= mixK1_x64_128(self->buffer1);
-            h1 = mixH_x64_128(h1, h2, 27, 0x52dce729UL);
-            h2 ^= mixK2_x64_128(self->buffer2);
-            h2 = mixH_x64_128(h2, h1, 31, 0x38495ab5UL);
+    double z = m * mmh3_hll_tau(1.0 - (double)histogram[q + 1] / m);
+    for (int k = q; k >= 1; k--) {
+        z = 0.5 * (z + (double)histogram[k]);
+    }
+    z += m * mmh3_hll_sigma((double)histogram[0] / m);
 
-            self->buffer1 = 0;
-            self->buffer2 = 0;
-            self->shift -= 128;
+    return 0.5 / log(2.0) * m * m / z;
+}
+
+/*
+ * Return the size of the serialized registers of self, compacting the
+ * entries of the sparse mode.
+ */
+static Py_ssize_t
+mmh3_hll_body_size_unlocked(MMH3HyperLogLog *self)
+{
+    if (self->registers != NULL) {
+        return MMH3_HLL_M(self);
+    }
+
+    mmh3_hll_compact_unlocked(self);
+    return self->n * (Py_ssize_t)sizeof(uint32_t);
+}
+
+/*
+ * Write the serialized registers of self to p, which must have the size
+ * returned by mmh3_hll_body_size_unlocked().
+ */
+static void
+mmh3_hll_write_body_unlocked(const MMH3HyperLogLog *self, char *p)
+{
+    if (self->registers != NULL) {
+        memcpy(p, self->registers, MMH3_HLL_M(self));
+        return;
+    }
+
+    for (Py_ssize_t i = 0; i < self->n; i++) {
+        mmh3_store_le32(p + i * sizeof(uint32_t), self->entries[i]);
+    }
+}
+
+/*
+ * Merge the serialized registers at p of size bytes in the given encoding,
+ * validated by mmh3_hll_validate_body(), into self. Returns 0 on success and
+ * -1 on memory allocation failure.
+ */
+static int
+mmh3_hll_merge_body_unlocked(MMH3HyperLogLog *self, uint32_t encoding,
+                             const char *p, Py_ssize_t size)
+{
+    if (encoding == MMH3_HLL_SPARSE) {
+        for (Py_ssize_t i = 0; i < size / (Py_ssize_t)sizeof(uint32_t); i++) {
+            const uint32_t entry = mmh3_load_le32(p + i * sizeof(uint32_t));
+            if (mmh3_hll_update_unlocked(self, entry >> 8,
+                                         (unsigned char)(entry & 0xff)) < 0) {
+                return -1;
+            }
         }
+        return 0;
     }
 
-    self->h1 = h1;
-    self->h2 = h2;
-    MMH3_HASHER_UNLOCK(self);
+    if (self->registers == NULL && mmh3_hll_to_dense_unlocked(self) < 0) {
+        return -1;
+    }
 
-    PyBuffer_Release(buf);
+    const unsigned char *registers = (const unsigned char *)p;
+    for (Py_ssize_t i = 0; i < size; i++) {
+        if (registers[i] > self->registers[i]) {
+            self->registers[i] = registers[i];
+        }
+    }
+
+    return 0;
 }
 
-static void
-MMH3Hasher128x64_dealloc(MMH3Hasher128x64 *self)
+/*
+ * Return 1 if p of size bytes is valid serialized registers of the given
+ * precision and encoding, or 0 otherwise.
+ */
+static int
+mmh3_hll_validate_body(uint32_t p_bits, uint32_t encoding, const char *p,
+                       Py_ssize_t size)
 {
-    Py_TYPE(self)->tp_free((PyObject *)self);
+    const uint32_t max_value = 64 - p_bits + 1;
+
+    if (encoding == MMH3_HLL_DENSE) {
+        if (size != (Py_ssize_t)1 << p_bits) {
+            return 0;
+        }
+        for (Py_ssize_t i = 0; i < size; i++) {
+            if ((unsigned char)p[i] > max_value) {
+                return 0;
+            }
+        }
+        return 1;
+    }
+
+    if (encoding != MMH3_HLL_SPARSE || size % sizeof(uint32_t) != 0) {
+        return 0;
+    }
+
+    for (Py_ssize_t i = 0; i < size / (Py_ssize_t)sizeof(uint32_t); i++) {
+        const uint32_t entry = mmh3_load_le32(p + i * sizeof(uint32_t));
+        const uint32_t value = entry & 0xff;
+
+        if ((entry >> 8) >> p_bits != 0 || value < 1 || value > max_value ||
+            (i > 0 && mmh3_load_le32(p + (i - 1) * sizeof(uint32_t)) >> 8 >=
+                          entry >> 8)) {
+            return 0;
+        }
+    }
+
+    return 1;
 }
 
 static PyObject *
-MMH3Hasher128x64_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+MMH3HyperLogLog_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
 {
-    MMH3Hasher128x64 *self;
-    self = (MMH3Hasher128x64 *)type->tp_alloc(type, 0);
-    if (self != NULL) {
-        self->h1 = 0;
-        self->h2 = 0;
-        self->buffer1 = 0;
-        self->buffer2 = 0;
-        self->shift = 0;
-        self->length = 0;
-        MMH3_HASHER_INIT_MUTEX(self);
+    PyObject *keys = NULL;
+    int p = 14;
+    long long seed = 0;
+    MMH3HyperLogLog *self = NULL;
+    MMH3KeyBatch batch;
+    int retval = 0;
+    static char *kwlist[] = {"keys", "p", "seed", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OiL", kwlist, &keys, &p,
+                                     &seed)) {
+        return NULL;
+    }
+
+    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
+
+    if (p < MMH3_HLL_MIN_P || p > MMH3_HLL_MAX_P) {
+        PyErr_SetString(PyExc_ValueError,
+                        "p must be an integer in the range [4, 18]");
+        return NULL;
+    }
+
+    self = mmh3_hll_alloc(type, (uint32_t)p, (uint32_t)seed);
+    if (self == NULL || keys == NULL || keys == Py_None) {
+        return (PyObject *)self;
     }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, batch.size, retval = mmh3_hll_add_batch_unlocked(self, &batch));
+
+    mmh3_key_batch_release(&batch);
+
+    if (retval < 0) {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+
     return (PyObject *)self;
 }
 
-static int
-MMH3Hasher128x64_init(MMH3Hasher128x64 *self, PyObject *args, PyObject *kwds)
+PyDoc_STRVAR(MMH3HyperLogLog_add_doc,
+             "add(key)\n"
+             "\n"
+             "Add a key to the set summarized by this object.\n"
+             "\n"
+             "Args:\n"
+             "    key (bytes | str): The key to add.\n");
+
+static PyObject *
+MMH3HyperLogLog_add(MMH3HyperLogLog *self, PyObject *obj)
 {
-    Py_buffer target_buf = {0};
-    long long seed = 0;
-    static char *kwlist[] = {"data", "seed", NULL};
+    PyObject *target = NULL;
+    MMH3Key key;
+    int retval = 0;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|y*L", kwlist, &target_buf,
-                                     &seed))
-        return -1;
+    MMH3_HASH_VALIDATE_AND_SET_KEY(obj, target);
+    MMH3_HASH_INIT_KEY(key, target);
 
-    MMH3_VALIDATE_SEED_RETURN_INT(seed, target_buf);
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, key.len, retval = mmh3_hll_add_unlocked(self, key.buf, key.len));
 
-    self->h1 = (uint64_t)seed;
-    self->h2 = self->h1;
+    mmh3_key_release(&key);
 
-    if (target_buf.buf != NULL) {
-        // target_buf will be released in update_x64_128_impl
-        update_x64_128_impl(self, &target_buf);
+    if (retval < 0) {
+        return PyErr_NoMemory();
     }
 
-    return 0;
+    Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(
+    MMH3HyperLogLog_add_many_doc,
+    "add_many(keys)\n"
+    "\n"
+    "Add many keys to the set summarized by this object.\n"
+    "\n"
+    "Same as calling ``add()`` for each key, but the keys are hashed in one\n"
+    "batch like ``hash_many()``. If any key is invalid, none of the keys is\n"
+    "added.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys to add.\n");
+
 static PyObject *
-MMH3Hasher128x64_update(MMH3Hasher128x64 *self, PyObject *obj)
+MMH3HyperLogLog_add_many(MMH3HyperLogLog *self, PyObject *keys)
 {
-    Py_buffer buf;
+    MMH3KeyBatch batch;
+    int retval = 0;
 
-    GET_BUFFER_VIEW_OR_ERROUT(obj, &buf);
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
 
-    // buf will be released in update_x64_128_impl
-    update_x64_128_impl(self, &buf);
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, batch.size, retval = mmh3_hll_add_batch_unlocked(self, &batch));
+
+    mmh3_key_batch_release(&batch);
+
+    if (retval < 0) {
+        return PyErr_NoMemory();
+    }
 
     Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(
+    MMH3HyperLogLog_count_doc,
+    "count() -> float\n"
+    "\n"
+    "Return the estimated number of distinct keys added.\n"
+    "\n"
+    "Returns:\n"
+    "    float: The estimated cardinality, whose relative standard error is\n"
+    "    about ``1.04 / sqrt(2**p)``.\n");
+
 static PyObject *
-MMH3Hasher128x64_digest(MMH3Hasher128x64 *self, PyObject *Py_UNUSED(ignored))
+MMH3HyperLogLog_count(MMH3HyperLogLog *self, PyObject *Py_UNUSED(ignored))
 {
-    const char out[MMH3_128_DIGESTSIZE];
     MMH3_HASHER_LOCK(self);
-    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
-                        self->length, out);
+    if (self->registers == NULL) {
+        mmh3_hll_compact_unlocked(self);
+    }
+    const double result = mmh3_hll_count_unlocked(self);
     MMH3_HASHER_UNLOCK(self);
-    return PyBytes_FromStringAndSize(out, MMH3_128_DIGESTSIZE);
+
+    return PyFloat_FromDouble(result);
 }
 
-static PyObject *
-MMH3Hasher128x64_sintdigest(MMH3Hasher128x64 *self,
-                            PyObject *Py_UNUSED(ignored))
+/*
+ * Return the serialized registers of self as a new buffer allocated by
+ * PyMem, storing its size in *size and its encoding in *encoding. Returns
+ * NULL with an exception set on failure.
+ */
+static char *
+mmh3_hll_export(MMH3HyperLogLog *self, Py_ssize_t *size, uint32_t *encoding)
 {
-    const char out[MMH3_128_DIGESTSIZE];
     MMH3_HASHER_LOCK(self);
-    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
-                        self->length, out);
+
+    *size = mmh3_hll_body_size_unlocked(self);
+    *encoding = self->registers != NULL ? MMH3_HLL_DENSE : MMH3_HLL_SPARSE;
+
+    char *body = PyMem_Malloc(*size > 0 ? *size : 1);
+    if (body != NULL) {
+        mmh3_hll_write_body_unlocked(self, body);
+    }
+
     MMH3_HASHER_UNLOCK(self);
-    const int little_endian = 1;
-    const int is_signed = 1;
 
-    /**
-     * _PyLong_FromByteArray is not a part of the official Python/C API
-     * and may be removed in the future (although it is practically stable).
-     * cf.
-     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
-     */
-    PyObject *retval = _PyLong_FromByteArray(
-        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+    if (body == NULL) {
+        PyErr_NoMemory();
+    }
 
-    return retval;
+    return body;
 }
 
+PyDoc_STRVAR(
+    MMH3HyperLogLog_merge_doc,
+    "merge(other)\n"
+    "\n"
+    "Update this object with the register-wise maximum of the two objects.\n"
+    "\n"
+    "After the merge, this object summarizes the union of the two sets.\n"
+    "\n"
+    "Args:\n"
+    "    other (HyperLogLog): A HyperLogLog object with the same ``p`` and\n"
+    "        ``seed``.\n");
+
 static PyObject *
-MMH3Hasher128x64_uintdigest(MMH3Hasher128x64 *self,
-                            PyObject *Py_UNUSED(ignored))
+MMH3HyperLogLog_merge(MMH3HyperLogLog *self, PyObject *other)
 {
-    const char out[MMH3_128_DIGESTSIZE];
+    Py_ssize_t size = 0;
+    uint32_t encoding = 0;
+    int retval = 0;
+
+    if (!PyObject_TypeCheck(other, &MMH3HyperLogLogType)) {
+        PyErr_Format(PyExc_TypeError,
+                     "merge() argument must be HyperLogLog, not '%s'",
+                     Py_TYPE(other)->tp_name);
+        return NULL;
+    }
+
+    MMH3HyperLogLog *o = (MMH3HyperLogLog *)other;
+    if (o->p != self->p || o->seed != self->seed) {
+        PyErr_SetString(PyExc_ValueError,
+                        "cannot merge HyperLogLog objects with different p or "
+                        "seed");
+        return NULL;
+    }
+
+    // Export the registers of other first, so that the two locks are never
+    // held at once.
+    char *body = mmh3_hll_export(o, &size, &encoding);
+    if (body == NULL) {
+        return NULL;
+    }
+
     MMH3_HASHER_LOCK(self);
-    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
-                        self->length, out);
+    retval = mmh3_hll_merge_body_unlocked(self, encoding, body, size);
     MMH3_HASHER_UNLOCK(self);
-    const int little_endian = 1;
-    const int is_signed = 0;
 
-    /**
-     * _PyLong_FromByteArray is not a part of the official Python/C API
-     * and may be removed in the future (although it is practically stable).
-     * cf.
-     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
-     */
-    PyObject *retval = _PyLong_FromByteArray(
-        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+    PyMem_Free(body);
 
-    return retval;
+    if (retval < 0) {
+        return PyErr_NoMemory();
+    }
+
+    Py_RETURN_NONE;
 }
 
-PyDoc_STRVAR(MMH3Hasher128_stupledigest_doc,
-             "stupledigest() -> tuple[int, int]\n"
+PyDoc_STRVAR(MMH3HyperLogLog_copy_doc,
+             "copy() -> HyperLogLog\n"
              "\n"
-             "Return the digest value as a tuple of two signed integers.\n"
+             "Return a copy of this object.\n"
              "\n"
              "Returns:\n"
-             "    tuple[int, int]: The digest value as a tuple of two signed\n"
-             "    integers.\n");
+             "    HyperLogLog: A copy of this object.\n");
 
 static PyObject *
-MMH3Hasher128x64_stupledigest(MMH3Hasher128x64 *self,
-                              PyObject *Py_UNUSED(ignored))
+MMH3HyperLogLog_copy(MMH3HyperLogLog *self, PyObject *Py_UNUSED(ignored))
 {
-    const char out[MMH3_128_DIGESTSIZE];
-    MMH3_HASHER_LOCK(self);
-    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
-                        self->length, out);
-    MMH3_HASHER_UNLOCK(self);
+    Py_ssize_t size = 0;
+    uint32_t encoding = 0;
 
-    const char *valflag = "LL";
-    uint64_t result1 = ((uint64_t *)out)[0];
-    uint64_t result2 = ((uint64_t *)out)[1];
+    char *body = mmh3_hll_export(self, &size, &encoding);
+    if (body == NULL) {
+        return NULL;
+    }
 
-#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
-    result1 = bswap_64(result1);
-    result2 = bswap_64(result2);
-#endif
+    MMH3HyperLogLog *p = mmh3_hll_alloc(Py_TYPE(self), self->p, self->seed);
+    if (p != NULL &&
+        mmh3_hll_merge_body_unlocked(p, encoding, body, size) < 0) {
+        Py_CLEAR(p);
+        PyErr_NoMemory();
+    }
 
-    return Py_BuildValue(valflag, result1, result2);
+    PyMem_Free(body);
+    return (PyObject *)p;
 }
 
 PyDoc_STRVAR(
-    MMH3Hasher128_utupledigest_doc,
-    "utupledigest() -> tuple[int, int]\n"
+    MMH3HyperLogLog_tobytes_doc,
+    "tobytes() -> bytes\n"
     "\n"
-    "Return the digest value as a tuple of two unsigned integers.\n"
+    "Return this object serialized as a ``bytes`` object.\n"
+    "\n"
+    "In the sparse mode, only the non-zero registers are serialized, with 4\n"
+    "bytes each. The result can be loaded by ``frombuffer()`` on any\n"
+    "platform, e.g., to merge the sketches of many machines.\n"
     "\n"
     "Returns:\n"
-    "    tuple[int, int]: The digest value as a tuple of two unsigned\n"
-    "    integers.\n");
+    "    bytes: The serialized object.\n");
 
 static PyObject *
-MMH3Hasher128x64_utupledigest(MMH3Hasher128x64 *self,
-                              PyObject *Py_UNUSED(ignored))
+MMH3HyperLogLog_tobytes(MMH3HyperLogLog *self, PyObject *Py_UNUSED(ignored))
 {
-    const char out[MMH3_128_DIGESTSIZE];
-    MMH3_HASHER_LOCK(self);
-    digest_x64_128_impl(self->h1, self->h2, self->buffer1, self->buffer2,
-                        self->length, out);
-    MMH3_HASHER_UNLOCK(self);
+    Py_ssize_t size = 0;
+    uint32_t encoding = 0;
 
-    const char *valflag = "KK";
-    uint64_t result1 = ((uint64_t *)out)[0];
-    uint64_t result2 = ((uint64_t *)out)[1];
+    char *body = mmh3_hll_export(self, &size, &encoding);
+    if (body == NULL) {
+        return NULL;
+    }
 
-#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
-    result1 = bswap_64(result1);
-    result2 = bswap_64(result2);
-#endif
+    PyObject *result =
+        PyBytes_FromStringAndSize(NULL, MMH3_HLL_HEADER_SIZE + size);
+    if (result != NULL) {
+        char *p = PyBytes_AS_STRING(result);
+        memcpy(p, MMH3_HLL_MAGIC, 8);
+        mmh3_store_le32(p + 8, self->p);
+        mmh3_store_le32(p + 12, self->seed);
+        mmh3_store_le32(p + 16, encoding);
+        mmh3_store_le32(p + 20, 0);
+        memcpy(p + MMH3_HLL_HEADER_SIZE, body, size);
+    }
 
-    return Py_BuildValue(valflag, result1, result2);
+    PyMem_Free(body);
+    return result;
 }
 
-PyDoc_STRVAR(MMH3Hasher128x64_copy_doc,
-             "copy() -> mmh3_128x64\n"
+PyDoc_STRVAR(MMH3HyperLogLog_frombuffer_doc,
+             "frombuffer(buffer) -> HyperLogLog\n"
              "\n"
-             "Return a copy of the hash object..\n"
+             "Load an object serialized by ``tobytes()``.\n"
+             "\n"
+             "Args:\n"
+             "    buffer (Buffer): The serialized object.\n"
              "\n"
              "Returns:\n"
-             "    mmh3_128x64: A copy of this hash object.\n");
+             "    HyperLogLog: The loaded object.\n");
 
 static PyObject *
-MMH3Hasher128x64_copy(MMH3Hasher128x64 *self, PyObject *Py_UNUSED(ignored))
+MMH3HyperLogLog_frombuffer(PyTypeObject *type, PyObject *obj)
 {
-    MMH3Hasher128x64 *p;
+    Py_buffer view;
+    MMH3HyperLogLog *self = NULL;
 
-    if ((p = PyObject_New(MMH3Hasher128x64, &MMH3Hasher128x64Type)) == NULL) {
+    if (PyObject_GetBuffer(obj, &view, PyBUF_SIMPLE) == -1) {
         return NULL;
     }
 
-    MMH3_HASHER_LOCK(self);
-    p->h1 = self->h1;
-    p->h2 = self->h2;
-    p->buffer1 = self->buffer1;
-    p->buffer2 = self->buffer2;
-    p->shift = self->shift;
-    p->length = self->length;
-    MMH3_HASHER_INIT_MUTEX(p);
-    MMH3_HASHER_UNLOCK(self);
+    const char *p = (const char *)view.buf;
+    if (view.len < MMH3_HLL_HEADER_SIZE || memcmp(p, MMH3_HLL_MAGIC, 8) != 0) {
+        PyErr_SetString(PyExc_ValueError, "buffer is not a valid HyperLogLog");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
 
-    return (PyObject *)p;
+    const uint32_t p_bits = mmh3_load_le32(p + 8);
+    const uint32_t seed = mmh3_load_le32(p + 12);
+    const uint32_t encoding = mmh3_load_le32(p + 16);
+    const char *body = p + MMH3_HLL_HEADER_SIZE;
+    const Py_ssize_t size = view.len - MMH3_HLL_HEADER_SIZE;
+
+    if (p_bits < MMH3_HLL_MIN_P || p_bits > MMH3_HLL_MAX_P ||
+        !mmh3_hll_validate_body(p_bits, encoding, body, size)) {
+        PyErr_SetString(PyExc_ValueError, "buffer is not a valid HyperLogLog");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    self = mmh3_hll_alloc(type, p_bits, seed);
+    if (self != NULL &&
+        mmh3_hll_merge_body_unlocked(self, encoding, body, size) < 0) {
+        Py_CLEAR(self);
+        PyErr_NoMemory();
+    }
+
+    PyBuffer_Release(&view);
+    return (PyObject *)self;
 }
 
-static PyMethodDef MMH3Hasher128x64_methods[] = {
-    {"update", (PyCFunction)MMH3Hasher128x64_update, METH_O,
-     MMH3Hasher_update_doc},
-    {"digest", (PyCFunction)MMH3Hasher128x64_digest, METH_NOARGS,
-     MMH3Hasher_digest_doc},
-    {"sintdigest", (PyCFunction)MMH3Hasher128x64_sintdigest, METH_NOARGS,
-     MMH3Hasher_sintdigest_doc},
-    {"uintdigest", (PyCFunction)MMH3Hasher128x64_uintdigest, METH_NOARGS,
-     MMH3Hasher_uintdigest_doc},
-    {"stupledigest", (PyCFunction)MMH3Hasher128x64_stupledigest, METH_NOARGS,
-     MMH3Hasher128_stupledigest_doc},
-    {"utupledigest", (PyCFunction)MMH3Hasher128x64_utupledigest, METH_NOARGS,
-     MMH3Hasher128_utupledigest_doc},
-    {"copy", (PyCFunction)MMH3Hasher128x64_copy, METH_NOARGS,
-     MMH3Hasher128x64_copy_doc},
+static PyMethodDef MMH3HyperLogLog_methods[] = {
+    {"add", (PyCFunction)MMH3HyperLogLog_add, METH_O, MMH3HyperLogLog_add_doc},
+    {"add_many", (PyCFunction)MMH3HyperLogLog_add_many, METH_O,
+     MMH3HyperLogLog_add_many_doc},
+    {"count", (PyCFunction)MMH3HyperLogLog_count, METH_NOARGS,
+     MMH3HyperLogLog_count_doc},
+    {"merge", (PyCFunction)MMH3HyperLogLog_merge, METH_O,
+     MMH3HyperLogLog_merge_doc},
+    {"copy", (PyCFunction)MMH3HyperLogLog_copy, METH_NOARGS,
+     MMH3HyperLogLog_copy_doc},
+    {"tobytes", (PyCFunction)MMH3HyperLogLog_tobytes, METH_NOARGS,
+     MMH3HyperLogLog_tobytes_doc},
+    {"frombuffer", (PyCFunction)MMH3HyperLogLog_frombuffer,
+     METH_O | METH_CLASS, MMH3HyperLogLog_frombuffer_doc},
     {NULL} /* Sentinel */
 };
 
 static PyObject *
-MMH3Hasher128x64_get_digest_size(PyObject *self, void *closure)
+MMH3HyperLogLog_get_p(MMH3HyperLogLog *self, void *closure)
 {
-    return PyLong_FromLong(MMH3_128_DIGESTSIZE);
+    return PyLong_FromUnsignedLong(self->p);
 }
 
 static PyObject *
-MMH3Hasher128x64_get_block_size(PyObject *self, void *closure)
+MMH3HyperLogLog_get_seed(MMH3HyperLogLog *self, void *closure)
 {
-    return PyLong_FromLong(MMH3_128_BLOCKSIZE);
+    return PyLong_FromUnsignedLong(self->seed);
 }
 
 static PyObject *
-MMH3Hasher128x64_get_name(PyObject *self, void *closure)
+MMH3HyperLogLog_get_sparse(MMH3HyperLogLog *self, void *closure)
 {
-    return PyUnicode_FromStringAndSize("mmh3_x64_128", 12);
+    MMH3_HASHER_LOCK(self);
+    const int sparse = self->registers == NULL;
+    MMH3_HASHER_UNLOCK(self);
+
+    return PyBool_FromLong(sparse);
 }
 
-static PyGetSetDef MMH3Hasher128x64_getsetters[] = {
-    {"digest_size", (getter)MMH3Hasher128x64_get_digest_size, NULL,
-     "int: Number of bytes in this hashes output.", NULL},
-    {"block_size", (getter)MMH3Hasher128x64_get_block_size, NULL,
-     "int: Number of bytes of the internal block of this algorithm.", NULL},
-    {"name", (getter)MMH3Hasher128x64_get_name, NULL,
-     "str: The hash algorithm being used by this object.", NULL},
+static PyGetSetDef MMH3HyperLogLog_getsetters[] = {
+    {"p", (getter)MMH3HyperLogLog_get_p, NULL,
+     "int: The precision, i.e., the base-2 logarithm of the number of "
+     "registers",
+     NULL},
+    {"seed", (getter)MMH3HyperLogLog_get_seed, NULL,
+     "int: The seed used to hash the keys", NULL},
+    {"sparse", (getter)MMH3HyperLogLog_get_sparse, NULL,
+     "bool: Whether only the non-zero registers are stored", NULL},
     {NULL} /* Sentinel */
 };
 
 PyDoc_STRVAR(
-    MMH3Hasher128x64Type_doc,
-    "__init__(data=None, seed=0)\n"
+    MMH3HyperLogLogType_doc,
+    "__init__(keys=None, p=14, seed=0)\n"
     "\n"
-    "Hasher for incrementally calculating the murmurhash3_x64_128 hash.\n"
+    "HyperLogLog sketch for estimating the number of distinct keys.\n"
     "\n"
-    "Args:\n"
-    "    data (Buffer | None): The initial data to hash.\n"
-    "    seed (int): The seed value. Must be an integer in the range\n"
-    "        [0, 0xFFFFFFFF].\n"
+    "Each key is hashed by murmurhash3_x64_128, and the first 64-bit word of\n"
+    "the hash updates one of the ``2**p`` registers. The cardinality is\n"
+    "estimated by the improved estimator of Ertl (2017), which needs no\n"
+    "empirical bias correction, from small to very large cardinalities.\n"
     "\n"
-    ".. versionchanged:: 5.2.0\n"
-    "    Experimental no-GIL support; thread safety not fully verified.\n"
+    "A new object starts in the sparse mode, in which only the non-zero\n"
+    "registers are kept as 4-byte entries, and switches to ``2**p`` bytes\n"
+    "of dense registers when the entries would take more memory. Both\n"
+    "modes give the same estimates. Objects computed separately, e.g., by\n"
+    "different workers, can be combined by ``merge()``.\n"
     "\n"
-    ".. versionchanged:: 5.0.0\n"
-    "    Added the optional ``data`` parameter as the first argument.\n"
-    "    The ``seed`` argument is now strictly checked for valid range.\n");
+    "Args:\n"
+    "    keys (Iterable[bytes | str] | None): The initial keys to add.\n"
+    "    p (int): The precision. Must be an integer in the range [4, 18].\n"
+    "    seed (int): The seed used to hash the keys. Must be an integer in\n"
+    "        the range [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
 
-static PyTypeObject MMH3Hasher128x64Type = {
-    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.mmh3_x64_128",
-    .tp_doc = MMH3Hasher128x64Type_doc,
-    .tp_basicsize = sizeof(MMH3Hasher128x64),
+static PyTypeObject MMH3HyperLogLogType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.HyperLogLog",
+    .tp_doc = MMH3HyperLogLogType_doc,
+    .tp_basicsize = sizeof(MMH3HyperLogLog),
     .tp_itemsize = 0,
     .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = MMH3Hasher128x64_new,
-    .tp_init = (initproc)MMH3Hasher128x64_init,
-    .tp_dealloc = (destructor)MMH3Hasher128x64_dealloc,
-    .tp_methods = MMH3Hasher128x64_methods,
-    .tp_getset = MMH3Hasher128x64_getsetters,
+    .tp_new = MMH3HyperLogLog_new,
+    .tp_dealloc = (destructor)MMH3HyperLogLog_dealloc,
+    .tp_methods = MMH3HyperLogLog_methods,
+    .tp_getset = MMH3HyperLogLog_getsetters,
 };
 
 //-----------------------------------------------------------------------------
-// Hasher for murmurhash3_x86_128
-typedef struct {
-    PyObject_HEAD uint32_t h1;
-    uint32_t h2;
-    uint32_t h3;
-    uint32_t h4;
-    uint32_t buffer1;
-    uint32_t buffer2;
-    uint32_t buffer3;
-    uint32_t buffer4;
-    uint8_t shift;
-    Py_ssize_t length;
+// Bottom-k sketch
+
+// Serialized format of BottomKSketch, in little-endian:
+//
+// offset  size  content
+// 0       8     magic "MMH3KMV1"
+// 8       4     k
+// 12      4     seed
+// 16      8     theta
+// 24      8     number of hashes (n)
+// 32            n sorted hashes of 8 bytes, each less than theta
+#define MMH3_KMV_MAGIC "MMH3KMV1"
+#define MMH3_KMV_HEADER_SIZE 32
+
+#define MMH3_KMV_MAX_K ((Py_ssize_t)1 << 26)
+
+#define MMH3_KMV_UNION 0
+#define MMH3_KMV_INTERSECTION 1
+#define MMH3_KMV_DIFFERENCE 2
+
+typedef struct {
+    PyObject_HEAD Py_ssize_t k;
+    uint32_t seed;
+    // Only the hashes less than theta are kept. theta is UINT64_MAX until
+    // more than k distinct hashes have been seen, and the (k + 1)-th
+    // smallest hash after that.
+    uint64_t theta;
+    // Hashes less than theta. Hashes are appended to the end and are sorted,
+    // deduplicated, and truncated to the k smallest ones lazily. values is
+    // allocated by PyMem_Raw*, since it may be resized while the GIL is
+    // released.
+    uint64_t *values;
+    Py_ssize_t n;  // number of hashes
+    Py_ssize_t capacity;
 #ifdef Py_GIL_DISABLED
     PyMutex mutex;
+#else
+    PyThread_type_lock lock;
 #endif
-} MMH3Hasher128x86;
+} MMH3BottomKSketch;
 
-static PyTypeObject MMH3Hasher128x86Type;
+static PyTypeObject MMH3BottomKSketchType;
 
-static FORCE_INLINE void
-update_x86_128_impl(MMH3Hasher128x86 *self, Py_buffer *buf)
+static MMH3BottomKSketch *
+mmh3_kmv_alloc(PyTypeObject *type, Py_ssize_t k, uint32_t seed)
 {
-    Py_ssize_t i = 0;
-    uint32_t h1 = 0;
-    uint32_t h2 = 0;
-    uint32_t h3 = 0;
-    uint32_t h4 = 0;
-    uint32_t k1 = 0;
+    MMH3BottomKSketch *self = (MMH3BottomKSketch *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
 
-    MMH3_HASHER_LOCK(self);
-    h1 = self->h1;
-    h2 = self->h2;
-    h3 = self->h3;
-    h4 = self->h4;
+    self->k = k;
+    self->seed = seed;
+    self->theta = UINT64_MAX;
+    self->values = NULL;
+    self->n = 0;
+    self->capacity = 0;
+    MMH3_HASHER_INIT_MUTEX(self);
 
-    for (; i < buf->len; i++) {
-        k1 = ((uint8_t *)buf->buf)[i];
-        if (self->shift < 32) {  // TODO: use bit ops
-            self->buffer1 |= k1 << self->shift;
-        }
-        else if (self->shift < 64) {
-            self->buffer2 |= k1 << (self->shift - 32);
+    return self;
+}
+
+static void
+MMH3BottomKSketch_dealloc(MMH3BottomKSketch *self)
+{
+    MMH3_HASHER_FREE_MUTEX(self);
+    PyMem_RawFree(self->values);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+/*
+ * Sort and deduplicate the hashes, and keep only the k smallest ones.
+ */
+static void
+mmh3_kmv_compact_unlocked(MMH3BottomKSketch *self)
+{
+    Py_ssize_t n = 0;
+
+    qsort(self->values, self->n, sizeof(uint64_t), mmh3_uint64_compare);
+
+    for (Py_ssize_t i = 0; i < self->n; i++) {
+        if (n == 0 || self->values[n - 1] != self->values[i]) {
+            self->values[n++] = self->values[i];
         }
-        else if (self->shift < 96) {
-            self->buffer3 |= k1 << (self->shift - 64);
+    }
+
+    if (n > self->k) {
+        self->theta = self->values[self->k];
+        n = self->k;
+    }
+    self->n = n;
+}
+
+/*
+ * Insert a hash. Returns 0 on success and -1 on memory allocation failure.
+ */
+static int
+mmh3_kmv_insert_unlocked(MMH3BottomKSketch *self, uint64_t h)
+{
+    if (h >= self->theta) {
+        return 0;
+    }
+
+    if (self->n == self->capacity) {
+        // Up to 2 * k hashes are buffered before compaction, so that each
+        // compaction discards at least k hashes.
+        if (self->capacity >= 2 * self->k) {
+            mmh3_kmv_compact_unlocked(self);
+            if (h >= self->theta) {
+                return 0;
+            }
         }
         else {
-            self->buffer4 |= k1 << (self->shift - 96);
+            Py_ssize_t capacity =
+                self->capacity == 0 ? 16 : self->capacity * 2;
+            if (capacity > 2 * self->k) {
+                capacity = 2 * self->k;
+            }
+            uint64_t *values = PyMem_RawRealloc(
+                self->values, (size_t)capacity * sizeof(uint64_t));
+            if (values == NULL) {
+                return -1;
+            }
+            self->values = values;
+            self->capacity = capacity;
         }
-        self->shift += 8;
-        self->length += 1;
+    }
 
-        if (self->shift >= 128) {
-            const uint32_t c1 = 0x239b961b;
-            const uint32_t c2 = 0xab0e9789;
-            const uint32_t c3 = 0x38b34ae5;
-            const uint32_t c4 = 0xa1e38b93;
+    self->values[self->n++] = h;
+    return 0;
+}
+
+static int
+mmh3_kmv_add_unlocked(MMH3BottomKSketch *self, const char *key, Py_ssize_t len)
+{
+    uint64_t out[2];
 
-            h1 ^= mixK_x86_128(self->buffer1, 15, c1, c2);
-            h1 = mixH1(h1, h2, 19, 0x561ccd1bUL);
+    murmurhash3_x64_128(key, len, self->seed, out);
 
-            h2 ^= mixK_x86_128(self->buffer2, 16, c2, c3);
-            h2 = mixH1(h2, h3, 17, 0x0bcaa747UL);
+    return mmh3_kmv_insert_unlocked(self, out[0]);
+}
 
-            h3 ^= mixK_x86_128(self->buffer3, 17, c3, c4);
-            h3 = mixH1(h3, h4, 15, 0x96cd1c35UL);
+static int
+mmh3_kmv_add_batch_unlocked(MMH3BottomKSketch *self, const MMH3KeyBatch *batch)
+{
+    for (Py_ssize_t i = 0; i < batch->n; i++) {
+        if (mmh3_kmv_add_unlocked(self, batch->keys[i], batch->lens[i]) < 0) {
+            return -1;
+        }
+    }
 
-            h4 ^= mixK_x86_128(self->buffer4, 18, c4, c1);
-            h4 = mixH1(h4, h1, 13, 0x32ac3b17UL);
+    return 0;
+}
 
-            self->buffer1 = 0;
-            self->buffer2 = 0;
-            self->buffer3 = 0;
-            self->buffer4 = 0;
-            self->shift -= 128;
+/*
+ * Hash n 64-bit integers by their 8-byte little-endian representations.
+ * swap is the value given by mmh3_get_int64_buffer().
+ */
+static int
+mmh3_kmv_add_int64_unlocked(MMH3BottomKSketch *self, const char *keys,
+                            Py_ssize_t n, int swap)
+{
+    char buf[8];
+    uint64_t key;
+
+    for (Py_ssize_t i = 0; i < n; i++) {
+        memcpy(&key, keys + i * 8, 8);
+        mmh3_store_le64(buf, swap ? mmh3_bswap64(key) : key);
+        if (mmh3_kmv_add_unlocked(self, buf, 8) < 0) {
+            return -1;
         }
     }
 
-    self->h1 = h1;
-    self->h2 = h2;
-    self->h3 = h3;
-    self->h4 = h4;
-    MMH3_HASHER_UNLOCK(self);
+    return 0;
+}
 
-    PyBuffer_Release(buf);
+/*
+ * Return the estimated number of distinct keys of n hashes less than theta.
+ */
+static double
+mmh3_kmv_estimate(Py_ssize_t n, uint64_t theta)
+{
+    if (theta == UINT64_MAX) {
+        return (double)n;
+    }
+
+    return (double)n / ((double)theta / 18446744073709551616.0);
 }
 
-static void
-MMH3Hasher128x86_dealloc(MMH3Hasher128x86 *self)
+/*
+ * Return a copy of the compacted hashes of self as a new buffer allocated by
+ * PyMem_RawMalloc(), storing the number of hashes in *n and theta in *theta.
+ * Returns NULL with an exception set on failure.
+ */
+static uint64_t *
+mmh3_kmv_export(MMH3BottomKSketch *self, Py_ssize_t *n, uint64_t *theta)
 {
-    Py_TYPE(self)->tp_free((PyObject *)self);
+    MMH3_HASHER_LOCK(self);
+
+    mmh3_kmv_compact_unlocked(self);
+    *n = self->n;
+    *theta = self->theta;
+
+    uint64_t *values =
+        PyMem_RawMalloc((*n > 0 ? (size_t)*n : 1) * sizeof(uint64_t));
+    if (values != NULL) {
+        memcpy(values, self->values, *n * sizeof(uint64_t));
+    }
+
+    MMH3_HASHER_UNLOCK(self);
+
+    if (values == NULL) {
+        PyErr_NoMemory();
+    }
+
+    return values;
 }
 
+/*
+ * Return a new sketch of type with the n sorted hashes less than theta,
+ * taking the ownership of values, which is allocated by PyMem_RawMalloc()
+ * and may have a capacity of up to 2 * k.
+ */
 static PyObject *
-MMH3Hasher128x86_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+mmh3_kmv_from_values(PyTypeObject *type, Py_ssize_t k, uint32_t seed,
+                     uint64_t theta, uint64_t *values, Py_ssize_t n,
+                     Py_ssize_t capacity)
 {
-    MMH3Hasher128x86 *self;
-    self = (MMH3Hasher128x86 *)type->tp_alloc(type, 0);
-    if (self != NULL) {
-        self->h1 = 0;
-        self->h2 = 0;
-        self->h3 = 0;
-        self->h4 = 0;
-        self->buffer1 = 0;
-        self->buffer2 = 0;
-        self->buffer3 = 0;
-        self->buffer4 = 0;
-        self->shift = 0;
-        self->length = 0;
-        MMH3_HASHER_INIT_MUTEX(self);
+    MMH3BottomKSketch *self = mmh3_kmv_alloc(type, k, seed);
+    if (self == NULL) {
+        PyMem_RawFree(values);
+        return NULL;
     }
+
+    self->theta = theta;
+    self->values = values;
+    self->n = n;
+    self->capacity = capacity;
+
     return (PyObject *)self;
 }
 
-static int
-MMH3Hasher128x86_init(MMH3Hasher128x86 *self, PyObject *args, PyObject *kwds)
+static PyObject *
+MMH3BottomKSketch_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
 {
-    Py_buffer target_buf = {0};
+    PyObject *keys = NULL;
+    Py_ssize_t k = 4096;
     long long seed = 0;
-    static char *kwlist[] = {"data", "seed", NULL};
+    MMH3BottomKSketch *self = NULL;
+    MMH3KeyBatch batch;
+    int retval = 0;
+    static char *kwlist[] = {"keys", "k", "seed", NULL};
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|y*L", kwlist, &target_buf,
-                                     &seed))
-        return -1;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OnL", kwlist, &keys, &k,
+                                     &seed)) {
+        return NULL;
+    }
 
-    MMH3_VALIDATE_SEED_RETURN_INT(seed, target_buf);
-    self->h1 = (uint32_t)seed;
-    self->h2 = self->h1;
-    self->h3 = self->h1;
-    self->h4 = self->h1;
+    MMH3_VALIDATE_SEED_RETURN_NULL(seed);
 
-    if (target_buf.buf != NULL) {
-        // target_buf will be released in update_x86_128_impl
-        update_x86_128_impl(self, &target_buf);
+    if (k < 1 || k > MMH3_KMV_MAX_K) {
+        PyErr_SetString(PyExc_ValueError,
+                        "k must be an integer in the range [1, 2**26]");
+        return NULL;
     }
 
-    return 0;
+    self = mmh3_kmv_alloc(type, k, (uint32_t)seed);
+    if (self == NULL || keys == NULL || keys == Py_None) {
+        return (PyObject *)self;
+    }
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, batch.size, retval = mmh3_kmv_add_batch_unlocked(self, &batch));
+
+    mmh3_key_batch_release(&batch);
+
+    if (retval < 0) {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+
+    return (PyObject *)self;
 }
 
+PyDoc_STRVAR(MMH3BottomKSketch_add_doc,
+             "add(key)\n"
+             "\n"
+             "Add a key to the set summarized by this object.\n"
+             "\n"
+             "Args:\n"
+             "    key (bytes | str): The key to add.\n");
+
 static PyObject *
-MMH3Hasher128x86_update(MMH3Hasher128x86 *self, PyObject *obj)
+MMH3BottomKSketch_add(MMH3BottomKSketch *self, PyObject *obj)
 {
-    Py_buffer buf;
+    PyObject *target = NULL;
+    MMH3Key key;
+    int retval = 0;
 
-    GET_BUFFER_VIEW_OR_ERROUT(obj, &buf);
+    MMH3_HASH_VALIDATE_AND_SET_KEY(obj, target);
+    MMH3_HASH_INIT_KEY(key, target);
 
-    // buf will be released in update_x86_128_impl
-    update_x86_128_impl(self, &buf);
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, key.len, retval = mmh3_kmv_add_unlocked(self, key.buf, key.len));
+
+    mmh3_key_release(&key);
+
+    if (retval < 0) {
+        return PyErr_NoMemory();
+    }
 
     Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(
+    MMH3BottomKSketch_add_many_doc,
+    "add_many(keys)\n"
+    "\n"
+    "Add many keys to the set summarized by this object.\n"
+    "\n"
+    "Same as calling ``add()`` for each key, but the keys are hashed in one\n"
+    "batch like ``hash_many()``. If any key is invalid, none of the keys is\n"
+    "added.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Iterable[bytes | str]): The keys to add.\n");
+
 static PyObject *
-MMH3Hasher128x86_digest(MMH3Hasher128x86 *self, PyObject *Py_UNUSED(ignored))
+MMH3BottomKSketch_add_many(MMH3BottomKSketch *self, PyObject *keys)
 {
-    char out[MMH3_128_DIGESTSIZE];
-    MMH3_HASHER_LOCK(self);
-    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
-                        self->buffer2, self->buffer3, self->buffer4,
-                        self->length, out);
-    MMH3_HASHER_UNLOCK(self);
-    return PyBytes_FromStringAndSize(out, MMH3_128_DIGESTSIZE);
+    MMH3KeyBatch batch;
+    int retval = 0;
+
+    if (mmh3_key_batch_init(&batch, keys) < 0) {
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, batch.size, retval = mmh3_kmv_add_batch_unlocked(self, &batch));
+
+    mmh3_key_batch_release(&batch);
+
+    if (retval < 0) {
+        return PyErr_NoMemory();
+    }
+
+    Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(
+    MMH3BottomKSketch_add_int64_many_doc,
+    "add_int64_many(keys)\n"
+    "\n"
+    "Add many 64-bit integer keys, such as IDs, from a buffer.\n"
+    "\n"
+    "Each integer is hashed by its 8-byte little-endian representation, so\n"
+    "that adding ``key.to_bytes(8, 'little', signed=True)`` by ``add()``\n"
+    "has the same effect.\n"
+    "\n"
+    "Args:\n"
+    "    keys (Buffer): A C-contiguous buffer of 64-bit integers, such as\n"
+    "        ``array.array('q')`` or a ``numpy`` array of ``int64`` or\n"
+    "        ``uint64``.\n");
+
 static PyObject *
-MMH3Hasher128x86_sintdigest(MMH3Hasher128x86 *self,
-                            PyObject *Py_UNUSED(ignored))
+MMH3BottomKSketch_add_int64_many(MMH3BottomKSketch *self, PyObject *keys)
+{
+    Py_buffer view;
+    int swap = 0;
+    int retval = 0;
+
+    if (mmh3_get_int64_buffer(keys, &view, &swap) < 0) {
+        return NULL;
+    }
+
+    MMH3_HASHER_UPDATE_LOCKED(
+        self, view.len,
+        retval = mmh3_kmv_add_int64_unlocked(self, (const char *)view.buf,
+                                             view.len / 8, swap));
+
+    PyBuffer_Release(&view);
+
+    if (retval < 0) {
+        return PyErr_NoMemory();
+    }
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(
+    MMH3BottomKSketch_count_doc,
+    "count() -> float\n"
+    "\n"
+    "Return the estimated number of distinct keys added.\n"
+    "\n"
+    "The estimate is exact until more than ``k`` distinct keys have been\n"
+    "added.\n"
+    "\n"
+    "Returns:\n"
+    "    float: The estimated cardinality, whose relative standard error is\n"
+    "    about ``1 / sqrt(k)``.\n");
+
+static PyObject *
+MMH3BottomKSketch_count(MMH3BottomKSketch *self, PyObject *Py_UNUSED(ignored))
 {
-    const char out[MMH3_128_DIGESTSIZE];
     MMH3_HASHER_LOCK(self);
-    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
-                        self->buffer2, self->buffer3, self->buffer4,
-                        self->length, out);
+    mmh3_kmv_compact_unlocked(self);
+    const double result = mmh3_kmv_estimate(self->n, self->theta);
     MMH3_HASHER_UNLOCK(self);
-    const int little_endian = 1;
-    const int is_signed = 1;
 
-    /**
-     * _PyLong_FromByteArray is not a part of the official Python/C API
-     * and may be removed in the future (although it is practically stable).
-     * cf.
-     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
-     */
-    PyObject *retval = _PyLong_FromByteArray(
-        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+    return PyFloat_FromDouble(result);
+}
+
+PyDoc_STRVAR(MMH3BottomKSketch_hashes_doc,
+             "hashes() -> array[int]\n"
+             "\n"
+             "Return the hashes kept by this object.\n"
+             "\n"
+             "Returns:\n"
+             "    array[int]: The sorted hashes less than ``theta`` as an\n"
+             "    ``array.array`` of typecode ``'Q'``.\n");
+
+static PyObject *
+MMH3BottomKSketch_hashes(MMH3BottomKSketch *self, PyObject *Py_UNUSED(ignored))
+{
+    Py_ssize_t n = 0;
+    uint64_t theta = 0;
+    MMH3Output output;
+
+    uint64_t *values = mmh3_kmv_export(self, &n, &theta);
+    if (values == NULL) {
+        return NULL;
+    }
+
+    if (mmh3_output_init(&output, NULL, n * (Py_ssize_t)sizeof(uint64_t),
+                         'Q') < 0) {
+        PyMem_RawFree(values);
+        return NULL;
+    }
+
+    memcpy(output.buf, values, n * sizeof(uint64_t));
+    PyMem_RawFree(values);
+
+    return mmh3_output_finish(&output);
+}
+
+/*
+ * Store the hashes less than theta of the set operation op of the sorted
+ * hashes a and b into out, which must have room for na + nb hashes. Returns
+ * the number of hashes stored.
+ */
+static Py_ssize_t
+mmh3_kmv_combine_values(const uint64_t *a, Py_ssize_t na, const uint64_t *b,
+                        Py_ssize_t nb, uint64_t theta, int op, uint64_t *out)
+{
+    Py_ssize_t i = 0;
+    Py_ssize_t j = 0;
+    Py_ssize_t n = 0;
+
+    while (i < na && j < nb) {
+        if (a[i] < b[j]) {
+            if (op != MMH3_KMV_INTERSECTION) {
+                out[n++] = a[i];
+            }
+            i++;
+        }
+        else if (a[i] > b[j]) {
+            if (op == MMH3_KMV_UNION) {
+                out[n++] = b[j];
+            }
+            j++;
+        }
+        else {
+            if (op != MMH3_KMV_DIFFERENCE) {
+                out[n++] = a[i];
+            }
+            i++;
+            j++;
+        }
+    }
+
+    if (op != MMH3_KMV_INTERSECTION) {
+        for (; i < na; i++) {
+            out[n++] = a[i];
+        }
+    }
+
+    if (op == MMH3_KMV_UNION) {
+        for (; j < nb; j++) {
+            out[n++] = b[j];
+        }
+    }
+
+    while (n > 0 && out[n - 1] >= theta) {
+        n--;
+    }
+
+    return n;
+}
+
+static PyObject *
+mmh3_kmv_combine(MMH3BottomKSketch *self, PyObject *other, const char *name,
+                 int op)
+{
+    Py_ssize_t na = 0;
+    Py_ssize_t nb = 0;
+    uint64_t theta_a = 0;
+    uint64_t theta_b = 0;
+
+    if (!PyObject_TypeCheck(other, &MMH3BottomKSketchType)) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s() argument must be BottomKSketch, not '%s'", name,
+                     Py_TYPE(other)->tp_name);
+        return NULL;
+    }
+
+    MMH3BottomKSketch *o = (MMH3BottomKSketch *)other;
+    if (o->k != self->k || o->seed != self->seed) {
+        PyErr_Format(PyExc_ValueError,
+                     "cannot compute the %s of BottomKSketch objects with "
+                     "different k or seed",
+                     name);
+        return NULL;
+    }
+
+    // Export the hashes of both objects first, so that the two locks are
+    // never held at once.
+    uint64_t *a = mmh3_kmv_export(self, &na, &theta_a);
+    if (a == NULL) {
+        return NULL;
+    }
+
+    uint64_t *b = mmh3_kmv_export(o, &nb, &theta_b);
+    if (b == NULL) {
+        PyMem_RawFree(a);
+        return NULL;
+    }
+
+    uint64_t *out = PyMem_RawMalloc((na + nb > 0 ? (size_t)(na + nb) : 1) *
+                                    sizeof(uint64_t));
+    if (out == NULL) {
+        PyMem_RawFree(a);
+        PyMem_RawFree(b);
+        return PyErr_NoMemory();
+    }
+
+    // Only the hashes less than the smaller theta are samples of both sets.
+    uint64_t theta = theta_a < theta_b ? theta_a : theta_b;
+    Py_ssize_t n = mmh3_kmv_combine_values(a, na, b, nb, theta, op, out);
+    if (n > self->k) {
+        theta = out[self->k];
+        n = self->k;
+    }
+
+    PyMem_RawFree(a);
+    PyMem_RawFree(b);
 
-    return retval;
+    return mmh3_kmv_from_values(Py_TYPE(self), self->k, self->seed, theta, out,
+                                n, na + nb > 0 ? na + nb : 1);
 }
 
+PyDoc_STRVAR(
+    MMH3BottomKSketch_union_doc,
+    "union(other) -> BottomKSketch\n"
+    "\n"
+    "Return a sketch of the union of the two sets.\n"
+    "\n"
+    "Args:\n"
+    "    other (BottomKSketch): A BottomKSketch object with the same ``k``\n"
+    "        and ``seed``.\n"
+    "\n"
+    "Returns:\n"
+    "    BottomKSketch: A new sketch of the keys in either set.\n");
+
 static PyObject *
-MMH3Hasher128x86_uintdigest(MMH3Hasher128x86 *self,
-                            PyObject *Py_UNUSED(ignored))
+MMH3BottomKSketch_union(MMH3BottomKSketch *self, PyObject *other)
 {
-    const char out[MMH3_128_DIGESTSIZE];
-    MMH3_HASHER_LOCK(self);
-    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
-                        self->buffer2, self->buffer3, self->buffer4,
-                        self->length, out);
-    MMH3_HASHER_UNLOCK(self);
-    const int little_endian = 1;
-    const int is_signed = 0;
+    return mmh3_kmv_combine(self, other, "union", MMH3_KMV_UNION);
+}
 
-    /**
-     * _PyLong_FromByteArray is not a part of the official Python/C API
-     * and may be removed in the future (although it is practically stable).
-     * cf.
-     * https://mail.python.org/pipermail/python-list/2006-August/372365.html
-     */
-    PyObject *retval = _PyLong_FromByteArray(
-        (unsigned char *)out, MMH3_128_DIGESTSIZE, little_endian, is_signed);
+PyDoc_STRVAR(
+    MMH3BottomKSketch_intersection_doc,
+    "intersection(other) -> BottomKSketch\n"
+    "\n"
+    "Return a sketch of the intersection of the two sets.\n"
+    "\n"
+    "Args:\n"
+    "    other (BottomKSketch): A BottomKSketch object with the same ``k``\n"
+    "        and ``seed``.\n"
+    "\n"
+    "Returns:\n"
+    "    BottomKSketch: A new sketch of the keys in both sets.\n");
 
-    return retval;
+static PyObject *
+MMH3BottomKSketch_intersection(MMH3BottomKSketch *self, PyObject *other)
+{
+    return mmh3_kmv_combine(self, other, "intersection",
+                            MMH3_KMV_INTERSECTION);
 }
 
+PyDoc_STRVAR(
+    MMH3BottomKSketch_difference_doc,
+    "difference(other) -> BottomKSketch\n"
+    "\n"
+    "Return a sketch of the difference (A not B) of the two sets.\n"
+    "\n"
+    "Args:\n"
+    "    other (BottomKSketch): A BottomKSketch object with the same ``k``\n"
+    "        and ``seed``.\n"
+    "\n"
+    "Returns:\n"
+    "    BottomKSketch: A new sketch of the keys in this set but not in\n"
+    "    ``other``.\n");
+
 static PyObject *
-MMH3Hasher128x86_stupledigest(MMH3Hasher128x86 *self,
-                              PyObject *Py_UNUSED(ignored))
+MMH3BottomKSketch_difference(MMH3BottomKSketch *self, PyObject *other)
 {
-    const char out[MMH3_128_DIGESTSIZE];
-    MMH3_HASHER_LOCK(self);
-    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
-                        self->buffer2, self->buffer3, self->buffer4,
-                        self->length, out);
-    MMH3_HASHER_UNLOCK(self);
+    return mmh3_kmv_combine(self, other, "difference", MMH3_KMV_DIFFERENCE);
+}
 
-    const char *valflag = "LL";
-    uint64_t result1 = ((uint64_t *)out)[0];
-    uint64_t result2 = ((uint64_t *)out)[1];
+PyDoc_STRVAR(MMH3BottomKSketch_copy_doc,
+             "copy() -> BottomKSketch\n"
+             "\n"
+             "Return a copy of this object.\n"
+             "\n"
+             "Returns:\n"
+             "    BottomKSketch: A copy of this object.\n");
 
-#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
-    result1 = bswap_64(result1);
-    result2 = bswap_64(result2);
-#endif
+static PyObject *
+MMH3BottomKSketch_copy(MMH3BottomKSketch *self, PyObject *Py_UNUSED(ignored))
+{
+    Py_ssize_t n = 0;
+    uint64_t theta = 0;
 
-    return Py_BuildValue(valflag, result1, result2);
+    uint64_t *values = mmh3_kmv_export(self, &n, &theta);
+    if (values == NULL) {
+        return NULL;
+    }
+
+    return mmh3_kmv_from_values(Py_TYPE(self), self->k, self->seed, theta,
+                                values, n, n > 0 ? n : 1);
 }
 
+PyDoc_STRVAR(
+    MMH3BottomKSketch_tobytes_doc,
+    "tobytes() -> bytes\n"
+    "\n"
+    "Return this object serialized as a ``bytes`` object.\n"
+    "\n"
+    "The result can be loaded by ``frombuffer()`` on any platform, e.g., to\n"
+    "combine the sketches of many machines.\n"
+    "\n"
+    "Returns:\n"
+    "    bytes: The serialized object.\n");
+
 static PyObject *
-MMH3Hasher128x86_utupledigest(MMH3Hasher128x86 *self,
-                              PyObject *Py_UNUSED(ignored))
+MMH3BottomKSketch_tobytes(MMH3BottomKSketch *self,
+                          PyObject *Py_UNUSED(ignored))
 {
-    const char out[MMH3_128_DIGESTSIZE];
-    MMH3_HASHER_LOCK(self);
-    digest_x86_128_impl(self->h1, self->h2, self->h3, self->h4, self->buffer1,
-                        self->buffer2, self->buffer3, self->buffer4,
-                        self->length, out);
-    MMH3_HASHER_UNLOCK(self);
+    Py_ssize_t n = 0;
+    uint64_t theta = 0;
 
-    const char *valflag = "KK";
-    uint64_t result1 = ((uint64_t *)out)[0];
-    uint64_t result2 = ((uint64_t *)out)[1];
+    uint64_t *values = mmh3_kmv_export(self, &n, &theta);
+    if (values == NULL) {
+        return NULL;
+    }
 
-#if defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__)
-    result1 = bswap_64(result1);
-    result2 = bswap_64(result2);
-#endif
+    PyObject *result = PyBytes_FromStringAndSize(
+        NULL, MMH3_KMV_HEADER_SIZE + n * (Py_ssize_t)sizeof(uint64_t));
+    if (result != NULL) {
+        char *p = PyBytes_AS_STRING(result);
+        memcpy(p, MMH3_KMV_MAGIC, 8);
+        mmh3_store_le32(p + 8, (uint32_t)self->k);
+        mmh3_store_le32(p + 12, self->seed);
+        mmh3_store_le64(p + 16, theta);
+        mmh3_store_le64(p + 24, (uint64_t)n);
+        for (Py_ssize_t i = 0; i < n; i++) {
+            mmh3_store_le64(p + MMH3_KMV_HEADER_SIZE + i * sizeof(uint64_t),
+                            values[i]);
+        }
+    }
 
-    return Py_BuildValue(valflag, result1, result2);
+    PyMem_RawFree(values);
+    return result;
 }
 
-PyDoc_STRVAR(MMH3Hasher128x86_copy_doc,
-             "copy() -> mmh3_128x86\n"
+PyDoc_STRVAR(MMH3BottomKSketch_frombuffer_doc,
+             "frombuffer(buffer) -> BottomKSketch\n"
              "\n"
-             "Return a copy of the hash object..\n"
+             "Load an object serialized by ``tobytes()``.\n"
+             "\n"
+             "Args:\n"
+             "    buffer (Buffer): The serialized object.\n"
              "\n"
              "Returns:\n"
-             "    mmh3_128x86: A copy of this hash object.\n");
+             "    BottomKSketch: The loaded object.\n");
 
 static PyObject *
-MMH3Hasher128x86_copy(MMH3Hasher128x86 *self, PyObject *Py_UNUSED(ignored))
+MMH3BottomKSketch_frombuffer(PyTypeObject *type, PyObject *obj)
 {
-    MMH3Hasher128x86 *p;
+    Py_buffer view;
+    const char *p = NULL;
+    Py_ssize_t k = 0;
+    uint32_t seed = 0;
+    uint64_t theta = 0;
+    uint64_t n = 0;
+    uint64_t *values = NULL;
 
-    if ((p = PyObject_New(MMH3Hasher128x86, &MMH3Hasher128x86Type)) == NULL) {
+    if (PyObject_GetBuffer(obj, &view, PyBUF_SIMPLE) == -1) {
         return NULL;
     }
 
+    p = (const char *)view.buf;
+    if (view.len < MMH3_KMV_HEADER_SIZE || memcmp(p, MMH3_KMV_MAGIC, 8) != 0) {
+        goto invalid;
+    }
+
+    k = mmh3_load_le32(p + 8);
+    seed = mmh3_load_le32(p + 12);
+    theta = mmh3_load_le64(p + 16);
+    n = mmh3_load_le64(p + 24);
+
+    if (k < 1 || k > MMH3_KMV_MAX_K || n > (uint64_t)k ||
+        (uint64_t)(view.len - MMH3_KMV_HEADER_SIZE) != n * sizeof(uint64_t)) {
+        goto invalid;
+    }
+
+    values = PyMem_RawMalloc((n > 0 ? (size_t)n : 1) * sizeof(uint64_t));
+    if (values == NULL) {
+        PyBuffer_Release(&view);
+        return PyErr_NoMemory();
+    }
+
+    for (Py_ssize_t i = 0; i < (Py_ssize_t)n; i++) {
+        values[i] =
+            mmh3_load_le64(p + MMH3_KMV_HEADER_SIZE + i * sizeof(uint64_t));
+        if (values[i] >= theta || (i > 0 && values[i - 1] >= values[i])) {
+            PyMem_RawFree(values);
+            goto invalid;
+        }
+    }
+
+    PyBuffer_Release(&view);
+
+    return mmh3_kmv_from_values(type, k, seed, theta, values, (Py_ssize_t)n,
+                                n > 0 ? (Py_ssize_t)n : 1);
+
+invalid:
+    PyErr_SetString(PyExc_ValueError, "buffer is not a valid BottomKSketch");
+    PyBuffer_Release(&view);
+    return NULL;
+}
+
+static Py_ssize_t
+MMH3BottomKSketch_len(MMH3BottomKSketch *self)
+{
     MMH3_HASHER_LOCK(self);
-    p->h1 = self->h1;
-    p->h2 = self->h2;
-    p->h3 = self->h3;
-    p->h4 = self->h4;
-    p->buffer1 = self->buffer1;
-    p->buffer2 = self->buffer2;
-    p->buffer3 = self->buffer3;
-    p->buffer4 = self->buffer4;
-    p->shift = self->shift;
-    p->length = self->length;
-    MMH3_HASHER_INIT_MUTEX(p);
+    mmh3_kmv_compact_unlocked(self);
+    const Py_ssize_t n = self->n;
     MMH3_HASHER_UNLOCK(self);
 
-    return (PyObject *)p;
+    return n;
 }
 
-static PyMethodDef MMH3Hasher128x86_methods[] = {
-    {"update", (PyCFunction)MMH3Hasher128x86_update, METH_O,
-     MMH3Hasher_update_doc},
-    {"digest", (PyCFunction)MMH3Hasher128x86_digest, METH_NOARGS,
-     MMH3Hasher_digest_doc},
-    {"sintdigest", (PyCFunction)MMH3Hasher128x86_sintdigest, METH_NOARGS,
-     MMH3Hasher_sintdigest_doc},
-    {"uintdigest", (PyCFunction)MMH3Hasher128x86_uintdigest, METH_NOARGS,
-     MMH3Hasher_uintdigest_doc},
-    {"stupledigest", (PyCFunction)MMH3Hasher128x86_stupledigest, METH_NOARGS,
-     MMH3Hasher128_stupledigest_doc},
-    {"utupledigest", (PyCFunction)MMH3Hasher128x86_utupledigest, METH_NOARGS,
-     MMH3Hasher128_utupledigest_doc},
-    {"copy", (PyCFunction)MMH3Hasher128x86_copy, METH_NOARGS,
-     MMH3Hasher128x86_copy_doc},
+static PyMethodDef MMH3BottomKSketch_methods[] = {
+    {"add", (PyCFunction)MMH3BottomKSketch_add, METH_O,
+     MMH3BottomKSketch_add_doc},
+    {"add_many", (PyCFunction)MMH3BottomKSketch_add_many, METH_O,
+     MMH3BottomKSketch_add_many_doc},
+    {"add_int64_many", (PyCFunction)MMH3BottomKSketch_add_int64_many, METH_O,
+     MMH3BottomKSketch_add_int64_many_doc},
+    {"count", (PyCFunction)MMH3BottomKSketch_count, METH_NOARGS,
+     MMH3BottomKSketch_count_doc},
+    {"hashes", (PyCFunction)MMH3BottomKSketch_hashes, METH_NOARGS,
+     MMH3BottomKSketch_hashes_doc},
+    {"union", (PyCFunction)MMH3BottomKSketch_union, METH_O,
+     MMH3BottomKSketch_union_doc},
+    {"intersection", (PyCFunction)MMH3BottomKSketch_intersection, METH_O,
+     MMH3BottomKSketch_intersection_doc},
+    {"difference", (PyCFunction)MMH3BottomKSketch_difference, METH_O,
+     MMH3BottomKSketch_difference_doc},
+    {"copy", (PyCFunction)MMH3BottomKSketch_copy, METH_NOARGS,
+     MMH3BottomKSketch_copy_doc},
+    {"tobytes", (PyCFunction)MMH3BottomKSketch_tobytes, METH_NOARGS,
+     MMH3BottomKSketch_tobytes_doc},
+    {"frombuffer", (PyCFunction)MMH3BottomKSketch_frombuffer,
+     METH_O | METH_CLASS, MMH3BottomKSketch_frombuffer_doc},
     {NULL} /* Sentinel */
 };
 
+static PySequenceMethods MMH3BottomKSketch_as_sequence = {
+    .sq_length = (lenfunc)MMH3BottomKSketch_len,
+};
+
 static PyObject *
-MMH3Hasher128x86_get_digest_size(PyObject *self, void *closure)
+MMH3BottomKSketch_get_k(MMH3BottomKSketch *self, void *closure)
 {
-    return PyLong_FromLong(MMH3_128_DIGESTSIZE);
+    return PyLong_FromSsize_t(self->k);
 }
 
 static PyObject *
-MMH3Hasher128x86_get_block_size(PyObject *self, void *closure)
+MMH3BottomKSketch_get_seed(MMH3BottomKSketch *self, void *closure)
 {
-    return PyLong_FromLong(MMH3_128_BLOCKSIZE);
+    return PyLong_FromUnsignedLong(self->seed);
 }
 
 static PyObject *
-MMH3Hasher128x86_get_name(PyObject *self, void *closure)
+MMH3BottomKSketch_get_theta(MMH3BottomKSketch *self, void *closure)
 {
-    return PyUnicode_FromStringAndSize("mmh3_x86_128", 12);
+    MMH3_HASHER_LOCK(self);
+    mmh3_kmv_compact_unlocked(self);
+    const uint64_t theta = self->theta;
+    MMH3_HASHER_UNLOCK(self);
+
+    return PyLong_FromUnsignedLongLong(theta);
 }
 
-static PyGetSetDef MMH3Hasher128x86_getsetters[] = {
-    {"digest_size", (getter)MMH3Hasher128x86_get_digest_size, NULL,
-     "int: Number of bytes in this hashes output", NULL},
-    {"block_size", (getter)MMH3Hasher128x86_get_block_size, NULL,
-     "int: Number of bytes of the internal block of this algorithm", NULL},
-    {"name", (getter)MMH3Hasher128x86_get_name, NULL,
-     "str: The hash algorithm being used by this object", NULL},
+static PyGetSetDef MMH3BottomKSketch_getsetters[] = {
+    {"k", (getter)MMH3BottomKSketch_get_k, NULL,
+     "int: The maximum number of hashes kept", NULL},
+    {"seed", (getter)MMH3BottomKSketch_get_seed, NULL,
+     "int: The seed used to hash the keys", NULL},
+    {"theta", (getter)MMH3BottomKSketch_get_theta, NULL,
+     "int: The threshold below which the hashes are kept, or 2**64 - 1 if "
+     "the sketch is exact",
+     NULL},
     {NULL} /* Sentinel */
 };
 
 PyDoc_STRVAR(
-    MMH3Hasher128x86Type_doc,
-    "__init__(data=None, seed=0)\n"
+    MMH3BottomKSketchType_doc,
+    "__init__(keys=None, k=4096, seed=0)\n"
     "\n"
-    "Hasher for incrementally calculating the murmurhash3_x86_128 hash.\n"
+    "Bottom-k (KMV) sketch for distinct counts and set operations.\n"
     "\n"
-    "Args:\n"
-    "    data (Buffer | None): The initial data to hash.\n"
-    "    seed (int): The seed value. Must be an integer in the range "
-    "[0, 0xFFFFFFFF].\n"
+    "Each key is hashed by murmurhash3_x64_128, and the ``k`` smallest\n"
+    "distinct values of the first 64-bit word of the hashes are kept in a\n"
+    "sorted array. Unlike ``HyperLogLog``, the sketches of two sets can be\n"
+    "combined by ``union()``, ``intersection()``, and ``difference()`` into\n"
+    "a new sketch, whose ``count()`` estimates the size of the result, e.g.,\n"
+    "the overlap of two audiences.\n"
     "\n"
-    ".. versionchanged:: 5.2.0\n"
-    "    Experimental no-GIL support; thread safety not fully verified.\n"
+    "The set operations follow the theta sketch framework: only the hashes\n"
+    "less than the smaller ``theta`` of the two sketches are combined, and\n"
+    "a result with ``n`` hashes less than ``theta`` estimates\n"
+    "``n / (theta / 2**64)`` keys.\n"
     "\n"
-    ".. versionchanged:: 5.0.0\n"
-    "    Added the optional ``data`` parameter as the first argument.\n"
-    "    The ``seed`` argument is now strictly checked for valid range.\n");
+    "Args:\n"
+    "    keys (Iterable[bytes | str] | None): The initial keys to add.\n"
+    "    k (int): The maximum number of hashes kept. Must be an integer in\n"
+    "        the range [1, 2**26].\n"
+    "    seed (int): The seed used to hash the keys. Must be an integer in\n"
+    "        the range [0, 0xFFFFFFFF].\n"
+    "\n"
+    ".. versionadded:: 5.3.0\n");
 
-static PyTypeObject MMH3Hasher128x86Type = {
-    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.mmh3_x86_128",
-    .tp_doc = MMH3Hasher128x86Type_doc,
-    .tp_basicsize = sizeof(MMH3Hasher128x86),
+static PyTypeObject MMH3BottomKSketchType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "mmh3.BottomKSketch",
+    .tp_doc = MMH3BottomKSketchType_doc,
+    .tp_basicsize = sizeof(MMH3BottomKSketch),
     .tp_itemsize = 0,
     .tp_flags = Py_TPFLAGS_DEFAULT,
-    .tp_new = MMH3Hasher128x86_new,
-    .tp_init = (initproc)MMH3Hasher128x86_init,
-    .tp_dealloc = (destructor)MMH3Hasher128x86_dealloc,
-    .tp_methods = MMH3Hasher128x86_methods,
-    .tp_getset = MMH3Hasher128x86_getsetters,
+    .tp_new = MMH3BottomKSketch_new,
+    .tp_dealloc = (destructor)MMH3BottomKSketch_dealloc,
+    .tp_as_sequence = &MMH3BottomKSketch_as_sequence,
+    .tp_methods = MMH3BottomKSketch_methods,
+    .tp_getset = MMH3BottomKSketch_getsetters,
 };
 
 //-----------------------------------------------------------------------------
@@ -2401,6 +14453,67 @@ PyInit_mmh3(void)
     if (PyType_Ready(&MMH3Hasher128x86Type) < 0)
         return NULL;
 
+    if (PyType_Ready(&MMH3ImapType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&MMH3MinHashType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&MMH3LSHIndexType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&MMH3SimHashIndexType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&MMH3BloomFilterType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&MMH3CountMinSketchType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&MMH3HyperLogLogType) < 0)
+        return NULL;
+
+    if (PyType_Ready(&MMH3BottomKSketchType) < 0)
+        return NULL;
+
+    if (mmh3_array_type == NULL) {
+        PyObject *array_module = PyImport_ImportModule("array");
+        if (array_module == NULL)
+            return NULL;
+
+        mmh3_array_type = PyObject_GetAttrString(array_module, "array");
+        Py_DECREF(array_module);
+        if (mmh3_array_type == NULL)
+            return NULL;
+    }
+
+    if (mmh3_kwname_key == NULL) {
+        mmh3_kwname_key = PyUnicode_InternFromString("key");
+        if (mmh3_kwname_key == NULL)
+            return NULL;
+    }
+
+    if (mmh3_kwname_seed == NULL) {
+        mmh3_kwname_seed = PyUnicode_InternFromString("seed");
+        if (mmh3_kwname_seed == NULL)
+            return NULL;
+    }
+
+    if (mmh3_kwname_signed == NULL) {
+        mmh3_kwname_signed = PyUnicode_InternFromString("signed");
+        if (mmh3_kwname_signed == NULL)
+            return NULL;
+    }
+
+    if (mmh3_kwname_data == NULL) {
+        mmh3_kwname_data = PyUnicode_InternFromString("data");
+        if (mmh3_kwname_data == NULL)
+            return NULL;
+    }
+
+    murmurhash3_simd_init();
+
     PyObject *module = PyModule_Create(&mmh3module);
 
     if (module == NULL)
@@ -2434,5 +14547,68 @@ PyInit_mmh3(void)
         return NULL;
     }
 
+    Py_INCREF(&MMH3ImapType);
+    if (PyModule_AddObject(module, "imap", (PyObject *)&MMH3ImapType) < 0) {
+        Py_DECREF(&MMH3ImapType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    Py_INCREF(&MMH3MinHashType);
+    if (PyModule_AddObject(module, "MinHash", (PyObject *)&MMH3MinHashType) <
+        0) {
+        Py_DECREF(&MMH3MinHashType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    Py_INCREF(&MMH3LSHIndexType);
+    if (PyModule_AddObject(module, "LSHIndex", (PyObject *)&MMH3LSHIndexType) <
+        0) {
+        Py_DECREF(&MMH3LSHIndexType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    Py_INCREF(&MMH3SimHashIndexType);
+    if (PyModule_AddObject(module, "SimHashIndex",
+                           (PyObject *)&MMH3SimHashIndexType) < 0) {
+        Py_DECREF(&MMH3SimHashIndexType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    Py_INCREF(&MMH3BloomFilterType);
+    if (PyModule_AddObject(module, "BloomFilter",
+                           (PyObject *)&MMH3BloomFilterType) < 0) {
+        Py_DECREF(&MMH3BloomFilterType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    Py_INCREF(&MMH3CountMinSketchType);
+    if (PyModule_AddObject(module, "CountMinSketch",
+                           (PyObject *)&MMH3CountMinSketchType) < 0) {
+        Py_DECREF(&MMH3CountMinSketchType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    Py_INCREF(&MMH3HyperLogLogType);
+    if (PyModule_AddObject(module, "HyperLogLog",
+                           (PyObject *)&MMH3HyperLogLogType) < 0) {
+        Py_DECREF(&MMH3HyperLogLogType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    Py_INCREF(&MMH3BottomKSketchType);
+    if (PyModule_AddObject(module, "BottomKSketch",
+                           (PyObject *)&MMH3BottomKSketchType) < 0) {
+        Py_DECREF(&MMH3BottomKSketchType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
     return module;
 }
\ No newline at end of file
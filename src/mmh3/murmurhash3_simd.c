@@ -0,0 +1,412 @@
+/***
+ * This file is under MIT <year> Hajime Senuma, just like other files.
+ * See LICENSE for details.
+ *
+ * Multi-lane variants of MurmurHash3 for hashing many independent keys at
+ * once with SIMD instructions. Unlike murmurhash3.c, this file is not
+ * generated by util/refresh.py.
+ *
+ * Any issues should be reported to https://github.com/hajimes/mmh3/issues.
+ */
+
+// A kernel with W lanes hashes W keys at once. The lanes process the
+// blocks shared by all the W keys (i.e., the first min(len) / 4 blocks) in
+// SIMD registers. Then each lane finishes its remaining blocks and tail in
+// scalar code, and the finalization mix is again done in SIMD registers.
+// Therefore, the kernels are most effective for keys of similar lengths.
+
+#include "murmurhash3_simd.h"
+
+#include <stdlib.h>
+#include <string.h>
+
+#if defined(__x86_64__) && (defined(__GNUC__) || defined(__clang__))
+#define MMH3_SIMD_X86_64
+#include <immintrin.h>
+#elif (defined(__aarch64__) || defined(_M_ARM64)) && \
+    !(defined(__BYTE_ORDER__) && (__BYTE_ORDER__ == __ORDER_BIG_ENDIAN__))
+#define MMH3_SIMD_AARCH64
+#include <arm_neon.h>
+#endif
+
+static int mmh3_simd_level = MMH3_SIMD_NONE;
+
+// Marks an intended fallthrough between the cases of a switch statement.
+#if defined(__has_attribute)
+#if __has_attribute(fallthrough)
+#define MMH3_FALLTHROUGH __attribute__((fallthrough))
+#endif
+#endif
+#ifndef MMH3_FALLTHROUGH
+#define MMH3_FALLTHROUGH ((void)0)
+#endif
+
+#if defined(MMH3_SIMD_X86_64) || defined(MMH3_SIMD_AARCH64)
+
+#define MMH3_X86_32_C1 0xcc9e2d51
+#define MMH3_X86_32_C2 0x1b873593
+#define MMH3_X86_32_N1 0xe6546b64
+#define MMH3_FMIX32_C1 0x85ebca6b
+#define MMH3_FMIX32_C2 0xc2b2ae35
+
+static FORCE_INLINE uint32_t
+load32(const char *p)
+{
+    uint32_t v;
+    memcpy(&v, p, 4);
+    return v;
+}
+
+static FORCE_INLINE Py_ssize_t
+min_nblocks(const Py_ssize_t *lens, int lanes)
+{
+    Py_ssize_t len = lens[0];
+
+    for (int l = 1; l < lanes; l++) {
+        if (lens[l] < len) {
+            len = lens[l];
+        }
+    }
+
+    return len / 4;
+}
+
+/*
+ * Continue MurmurHash3_x86_32 for the key from the block start with the
+ * intermediate hash h1, and return the hash just before the finalization
+ * mix.
+ */
+static FORCE_INLINE uint32_t
+x86_32_resume(const char *key, Py_ssize_t len, Py_ssize_t start, uint32_t h1)
+{
+    const Py_ssize_t nblocks = len / 4;
+
+    for (Py_ssize_t i = start; i < nblocks; i++) {
+        uint32_t k1 = load32(key + i * 4);
+
+        k1 *= MMH3_X86_32_C1;
+        k1 = ROTL32(k1, 15);
+        k1 *= MMH3_X86_32_C2;
+
+        h1 ^= k1;
+        h1 = ROTL32(h1, 13);
+        h1 = h1 * 5 + MMH3_X86_32_N1;
+    }
+
+    const uint8_t *tail = (const uint8_t *)(key + nblocks * 4);
+    uint32_t k1 = 0;
+
+    switch (len & 3) {
+        case 3:
+            k1 ^= tail[2] << 16;
+            MMH3_FALLTHROUGH;
+        case 2:
+            k1 ^= tail[1] << 8;
+            MMH3_FALLTHROUGH;
+        case 1:
+            k1 ^= tail[0];
+            k1 *= MMH3_X86_32_C1;
+            k1 = ROTL32(k1, 15);
+            k1 *= MMH3_X86_32_C2;
+            h1 ^= k1;
+    };
+
+    return h1 ^ (uint32_t)len;
+}
+
+#endif  // defined(MMH3_SIMD_X86_64) || defined(MMH3_SIMD_AARCH64)
+
+//-----------------------------------------------------------------------------
+// x86-64 kernels
+
+#if defined(MMH3_SIMD_X86_64)
+
+__attribute__((target("sse4.1"))) static void
+x86_32_lanes_sse41(const char *const *keys, const Py_ssize_t *lens,
+                   uint32_t seed, uint32_t *out)
+{
+    const Py_ssize_t m = min_nblocks(lens, 4);
+    const __m128i c1 = _mm_set1_epi32((int)MMH3_X86_32_C1);
+    const __m128i c2 = _mm_set1_epi32((int)MMH3_X86_32_C2);
+    const __m128i n1 = _mm_set1_epi32((int)MMH3_X86_32_N1);
+    __m128i h = _mm_set1_epi32((int)seed);
+    uint32_t hs[4];
+
+    for (Py_ssize_t b = 0; b < m * 4; b += 4) {
+        __m128i k =
+            _mm_set_epi32((int)load32(keys[3] + b), (int)load32(keys[2] + b),
+                          (int)load32(keys[1] + b), (int)load32(keys[0] + b));
+
+        k = _mm_mullo_epi32(k, c1);
+        k = _mm_or_si128(_mm_slli_epi32(k, 15), _mm_srli_epi32(k, 17));
+        k = _mm_mullo_epi32(k, c2);
+
+        h = _mm_xor_si128(h, k);
+        h = _mm_or_si128(_mm_slli_epi32(h, 13), _mm_srli_epi32(h, 19));
+        h = _mm_add_epi32(_mm_add_epi32(h, _mm_slli_epi32(h, 2)), n1);
+    }
+
+    _mm_storeu_si128((__m128i *)hs, h);
+    for (int l = 0; l < 4; l++) {
+        hs[l] = x86_32_resume(keys[l], lens[l], m, hs[l]);
+    }
+    h = _mm_loadu_si128((const __m128i *)hs);
+
+    h = _mm_xor_si128(h, _mm_srli_epi32(h, 16));
+    h = _mm_mullo_epi32(h, _mm_set1_epi32((int)MMH3_FMIX32_C1));
+    h = _mm_xor_si128(h, _mm_srli_epi32(h, 13));
+    h = _mm_mullo_epi32(h, _mm_set1_epi32((int)MMH3_FMIX32_C2));
+    h = _mm_xor_si128(h, _mm_srli_epi32(h, 16));
+
+    _mm_storeu_si128((__m128i *)out, h);
+}
+
+__attribute__((target("avx2"))) static void
+x86_32_lanes_avx2(const char *const *keys, const Py_ssize_t *lens,
+                  uint32_t seed, uint32_t *out)
+{
+    const Py_ssize_t m = min_nblocks(lens, 8);
+    const __m256i c1 = _mm256_set1_epi32((int)MMH3_X86_32_C1);
+    const __m256i c2 = _mm256_set1_epi32((int)MMH3_X86_32_C2);
+    const __m256i n1 = _mm256_set1_epi32((int)MMH3_X86_32_N1);
+    __m256i h = _mm256_set1_epi32((int)seed);
+    uint32_t hs[8];
+
+    for (Py_ssize_t b = 0; b < m * 4; b += 4) {
+        __m256i k = _mm256_set_epi32(
+            (int)load32(keys[7] + b), (int)load32(keys[6] + b),
+            (int)load32(keys[5] + b), (int)load32(keys[4] + b),
+            (int)load32(keys[3] + b), (int)load32(keys[2] + b),
+            (int)load32(keys[1] + b), (int)load32(keys[0] + b));
+
+        k = _mm256_mullo_epi32(k, c1);
+        k = _mm256_or_si256(_mm256_slli_epi32(k, 15),
+                            _mm256_srli_epi32(k, 17));
+        k = _mm256_mullo_epi32(k, c2);
+
+        h = _mm256_xor_si256(h, k);
+        h = _mm256_or_si256(_mm256_slli_epi32(h, 13),
+                            _mm256_srli_epi32(h, 19));
+        h = _mm256_add_epi32(_mm256_add_epi32(h, _mm256_slli_epi32(h, 2)), n1);
+    }
+
+    _mm256_storeu_si256((__m256i *)hs, h);
+    for (int l = 0; l < 8; l++) {
+        hs[l] = x86_32_resume(keys[l], lens[l], m, hs[l]);
+    }
+    h = _mm256_loadu_si256((const __m256i *)hs);
+
+    h = _mm256_xor_si256(h, _mm256_srli_epi32(h, 16));
+    h = _mm256_mullo_epi32(h, _mm256_set1_epi32((int)MMH3_FMIX32_C1));
+    h = _mm256_xor_si256(h, _mm256_srli_epi32(h, 13));
+    h = _mm256_mullo_epi32(h, _mm256_set1_epi32((int)MMH3_FMIX32_C2));
+    h = _mm256_xor_si256(h, _mm256_srli_epi32(h, 16));
+
+    _mm256_storeu_si256((__m256i *)out, h);
+}
+
+__attribute__((target("avx512f"))) static void
+x86_32_lanes_avx512f(const char *const *keys, const Py_ssize_t *lens,
+                     uint32_t seed, uint32_t *out)
+{
+    const Py_ssize_t m = min_nblocks(lens, 16);
+    const __m512i c1 = _mm512_set1_epi32((int)MMH3_X86_32_C1);
+    const __m512i c2 = _mm512_set1_epi32((int)MMH3_X86_32_C2);
+    const __m512i n1 = _mm512_set1_epi32((int)MMH3_X86_32_N1);
+    __m512i h = _mm512_set1_epi32((int)seed);
+    uint32_t hs[16];
+
+    for (Py_ssize_t b = 0; b < m * 4; b += 4) {
+        __m512i k = _mm512_set_epi32(
+            (int)load32(keys[15] + b), (int)load32(keys[14] + b),
+            (int)load32(keys[13] + b), (int)load32(keys[12] + b),
+            (int)load32(keys[11] + b), (int)load32(keys[10] + b),
+            (int)load32(keys[9] + b), (int)load32(keys[8] + b),
+            (int)load32(keys[7] + b), (int)load32(keys[6] + b),
+            (int)load32(keys[5] + b), (int)load32(keys[4] + b),
+            (int)load32(keys[3] + b), (int)load32(keys[2] + b),
+            (int)load32(keys[1] + b), (int)load32(keys[0] + b));
+
+        k = _mm512_mullo_epi32(k, c1);
+        k = _mm512_rol_epi32(k, 15);
+        k = _mm512_mullo_epi32(k, c2);
+
+        h = _mm512_xor_si512(h, k);
+        h = _mm512_rol_epi32(h, 13);
+        h = _mm512_add_epi32(_mm512_add_epi32(h, _mm512_slli_epi32(h, 2)), n1);
+    }
+
+    _mm512_storeu_si512((void *)hs, h);
+    for (int l = 0; l < 16; l++) {
+        hs[l] = x86_32_resume(keys[l], lens[l], m, hs[l]);
+    }
+    h = _mm512_loadu_si512((const void *)hs);
+
+    h = _mm512_xor_si512(h, _mm512_srli_epi32(h, 16));
+    h = _mm512_mullo_epi32(h, _mm512_set1_epi32((int)MMH3_FMIX32_C1));
+    h = _mm512_xor_si512(h, _mm512_srli_epi32(h, 13));
+    h = _mm512_mullo_epi32(h, _mm512_set1_epi32((int)MMH3_FMIX32_C2));
+    h = _mm512_xor_si512(h, _mm512_srli_epi32(h, 16));
+
+    _mm512_storeu_si512((void *)out, h);
+}
+
+static int
+detect_simd_level(void)
+{
+    __builtin_cpu_init();
+
+    if (__builtin_cpu_supports("avx512f")) {
+        return MMH3_SIMD_AVX512F;
+    }
+    if (__builtin_cpu_supports("avx2")) {
+        return MMH3_SIMD_AVX2;
+    }
+    if (__builtin_cpu_supports("sse4.1")) {
+        return MMH3_SIMD_SSE41;
+    }
+
+    return MMH3_SIMD_NONE;
+}
+
+static const char *const simd_names[] = {"none", "sse41", "avx2", "avx512f"};
+
+//-----------------------------------------------------------------------------
+// AArch64 kernels
+
+#elif defined(MMH3_SIMD_AARCH64)
+
+#define ROTL32X4(x, r) vsriq_n_u32(vshlq_n_u32((x), (r)), (x), 32 - (r))
+
+static void
+x86_32_lanes_neon(const char *const *keys, const Py_ssize_t *lens,
+                  uint32_t seed, uint32_t *out)
+{
+    const Py_ssize_t m = min_nblocks(lens, 4);
+    const uint32x4_t c1 = vdupq_n_u32(MMH3_X86_32_C1);
+    const uint32x4_t c2 = vdupq_n_u32(MMH3_X86_32_C2);
+    const uint32x4_t n1 = vdupq_n_u32(MMH3_X86_32_N1);
+    uint32x4_t h = vdupq_n_u32(seed);
+    uint32_t ks[4];
+    uint32_t hs[4];
+
+    for (Py_ssize_t b = 0; b < m * 4; b += 4) {
+        for (int l = 0; l < 4; l++) {
+            ks[l] = load32(keys[l] + b);
+        }
+        uint32x4_t k = vld1q_u32(ks);
+
+        k = vmulq_u32(k, c1);
+        k = ROTL32X4(k, 15);
+        k = vmulq_u32(k, c2);
+
+        h = veorq_u32(h, k);
+        h = ROTL32X4(h, 13);
+        h = vaddq_u32(vaddq_u32(h, vshlq_n_u32(h, 2)), n1);
+    }
+
+    vst1q_u32(hs, h);
+    for (int l = 0; l < 4; l++) {
+        hs[l] = x86_32_resume(keys[l], lens[l], m, hs[l]);
+    }
+    h = vld1q_u32(hs);
+
+    h = veorq_u32(h, vshrq_n_u32(h, 16));
+    h = vmulq_u32(h, vdupq_n_u32(MMH3_FMIX32_C1));
+    h = veorq_u32(h, vshrq_n_u32(h, 13));
+    h = vmulq_u32(h, vdupq_n_u32(MMH3_FMIX32_C2));
+    h = veorq_u32(h, vshrq_n_u32(h, 16));
+
+    vst1q_u32(out, h);
+}
+
+static int
+detect_simd_level(void)
+{
+    // Advanced SIMD is mandatory on AArch64.
+    return MMH3_SIMD_NEON;
+}
+
+static const char *const simd_names[] = {"none", "neon"};
+
+#else
+
+static int
+detect_simd_level(void)
+{
+    return MMH3_SIMD_NONE;
+}
+
+static const char *const simd_names[] = {"none"};
+
+#endif
+
+//-----------------------------------------------------------------------------
+// Dispatch
+
+void
+murmurhash3_simd_init(void)
+{
+    int level = detect_simd_level();
+    const char *cap = getenv("MMH3_SIMD");
+
+    if (cap != NULL) {
+        int n_names = (int)(sizeof(simd_names) / sizeof(simd_names[0]));
+        for (int i = 0; i < n_names; i++) {
+            if (strcmp(cap, simd_names[i]) == 0) {
+                if (i < level) {
+                    level = i;
+                }
+                break;
+            }
+        }
+    }
+
+    mmh3_simd_level = level;
+}
+
+const char *
+murmurhash3_simd_name(void)
+{
+    return simd_names[mmh3_simd_level];
+}
+
+void
+murmurhash3_x86_32_many(const char *const *keys, const Py_ssize_t *lens,
+                        Py_ssize_t n, uint32_t seed, uint32_t *out)
+{
+    Py_ssize_t i = 0;
+
+    // Each kernel falls through to narrower ones for the remaining keys.
+    switch (mmh3_simd_level) {
+#if defined(MMH3_SIMD_X86_64)
+        case MMH3_SIMD_AVX512F:
+            for (; i + 16 <= n; i += 16) {
+                x86_32_lanes_avx512f(keys + i, lens + i, seed, out + i);
+            }
+            MMH3_FALLTHROUGH;
+        case MMH3_SIMD_AVX2:
+            for (; i + 8 <= n; i += 8) {
+                x86_32_lanes_avx2(keys + i, lens + i, seed, out + i);
+            }
+            MMH3_FALLTHROUGH;
+        case MMH3_SIMD_SSE41:
+            for (; i + 4 <= n; i += 4) {
+                x86_32_lanes_sse41(keys + i, lens + i, seed, out + i);
+            }
+            break;
+#elif defined(MMH3_SIMD_AARCH64)
+        case MMH3_SIMD_NEON:
+            for (; i + 4 <= n; i += 4) {
+                x86_32_lanes_neon(keys + i, lens + i, seed, out + i);
+            }
+            break;
+#endif
+        default:
+            break;
+    }
+
+    for (; i < n; i++) {
+        murmurhash3_x86_32(keys[i], lens[i], seed, &out[i]);
+    }
+}
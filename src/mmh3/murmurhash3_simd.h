@@ -0,0 +1,50 @@
+/***
+ * This file is under MIT <year> Hajime Senuma, just like other files.
+ * See LICENSE for details.
+ *
+ * Multi-lane variants of MurmurHash3 for hashing many independent keys at
+ * once with SIMD instructions. Unlike murmurhash3.h, this file is not
+ * generated by util/refresh.py.
+ *
+ * Any issues should be reported to https://github.com/hajimes/mmh3/issues.
+ */
+
+#ifndef _MURMURHASH3_SIMD_H_
+#define _MURMURHASH3_SIMD_H_
+
+#include "murmurhash3.h"
+
+// Instruction sets for the multi-lane kernels, in ascending order of
+// preference on each architecture.
+#define MMH3_SIMD_NONE 0
+#define MMH3_SIMD_SSE41 1
+#define MMH3_SIMD_AVX2 2
+#define MMH3_SIMD_AVX512F 3
+#define MMH3_SIMD_NEON 1
+
+/*
+ * Select the multi-lane kernel used by the functions below. The best
+ * kernel supported by the CPU is chosen, but it can be capped by the
+ * environment variable MMH3_SIMD ("none", "sse41", "avx2", "avx512f", or
+ * "neon"), which is mainly for testing. Must be called once on module
+ * initialization.
+ */
+void
+murmurhash3_simd_init(void);
+
+/*
+ * Return the name of the selected kernel, e.g., "avx2" or "none".
+ */
+const char *
+murmurhash3_simd_name(void);
+
+/*
+ * Hash each of the n keys by MurmurHash3_x86_32 and store the results in
+ * out. The results are identical to those of murmurhash3_x86_32, as native
+ * integers. Does not touch any Python object.
+ */
+void
+murmurhash3_x86_32_many(const char *const *keys, const Py_ssize_t *lens,
+                        Py_ssize_t n, uint32_t seed, uint32_t *out);
+
+#endif  // _MURMURHASH3_SIMD_H_
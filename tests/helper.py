@@ -1,5 +1,7 @@
 """Helper functions for tests."""
 
+import ctypes
+
 
 # see also https://stackoverflow.com/a/1375939
 def u32_to_s32(v: int) -> int:
@@ -14,3 +16,109 @@ def u32_to_s32(v: int) -> int:
     if v & 0x80000000:
         return -0x100000000 + v
     return v
+
+
+class _ArrowSchema(ctypes.Structure):  # pylint: disable=too-few-public-methods
+    _fields_ = [
+        ("format", ctypes.c_char_p),
+        ("name", ctypes.c_char_p),
+        ("metadata", ctypes.c_char_p),
+        ("flags", ctypes.c_int64),
+        ("n_children", ctypes.c_int64),
+        ("children", ctypes.c_void_p),
+        ("dictionary", ctypes.c_void_p),
+        ("release", ctypes.c_void_p),
+        ("private_data", ctypes.c_void_p),
+    ]
+
+
+class _ArrowArray(ctypes.Structure):  # pylint: disable=too-few-public-methods
+    _fields_ = [
+        ("length", ctypes.c_int64),
+        ("null_count", ctypes.c_int64),
+        ("offset", ctypes.c_int64),
+        ("n_buffers", ctypes.c_int64),
+        ("n_children", ctypes.c_int64),
+        ("buffers", ctypes.POINTER(ctypes.c_void_p)),
+        ("children", ctypes.c_void_p),
+        ("dictionary", ctypes.c_void_p),
+        ("release", ctypes.c_void_p),
+        ("private_data", ctypes.c_void_p),
+    ]
+
+
+# The structures are owned by ArrowStringArray, so releasing them is a no-op.
+_ARROW_RELEASE = ctypes.CFUNCTYPE(None, ctypes.c_void_p)(lambda _: None)
+_ARROW_SCHEMA_NAME = b"arrow_schema"
+_ARROW_ARRAY_NAME = b"arrow_array"
+
+_PyCapsule_New = ctypes.pythonapi.PyCapsule_New
+_PyCapsule_New.restype = ctypes.py_object
+_PyCapsule_New.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_void_p]
+
+
+class ArrowStringArray:  # pylint: disable=too-few-public-methods
+    """Minimal producer of the Arrow PyCapsule interface for tests.
+
+    Exports a utf8 (``"u"``), large_utf8 (``"U"``), binary (``"z"``), or
+    large_binary (``"Z"``) array through ``__arrow_c_array__`` without
+    depending on ``pyarrow``.
+
+    Args:
+        values: The elements of the array. None is a null element.
+        fmt: The Arrow format string of the array.
+        offset: The number of leading elements of ``values`` skipped by the
+            exported array.
+    """
+
+    def __init__(
+        self, values: list[bytes | str | None], fmt: str = "u", offset: int = 0
+    ) -> None:
+        data = [v.encode("utf-8") if isinstance(v, str) else v for v in values]
+        offset_type = ctypes.c_int64 if fmt in ("U", "Z") else ctypes.c_int32
+
+        self._offsets = (offset_type * (len(data) + 1))()
+        for i, v in enumerate(data):
+            self._offsets[i + 1] = self._offsets[i] + len(v or b"")
+        self._data = ctypes.create_string_buffer(b"".join(v or b"" for v in data))
+
+        null_count = sum(v is None for v in data[offset:])
+        self._validity = (ctypes.c_uint8 * ((len(data) + 7) // 8))()
+        for i, v in enumerate(data):
+            if v is not None:
+                self._validity[i // 8] |= 1 << (i % 8)
+
+        self._buffers = (ctypes.c_void_p * 3)(
+            ctypes.addressof(self._validity) if null_count else None,
+            ctypes.addressof(self._offsets),
+            ctypes.addressof(self._data),
+        )
+        self._format = fmt.encode("ascii")
+        release = ctypes.cast(_ARROW_RELEASE, ctypes.c_void_p)
+
+        self.schema = _ArrowSchema(format=self._format, release=release)
+        self.array = _ArrowArray(
+            length=len(data) - offset,
+            null_count=null_count,
+            offset=offset,
+            n_buffers=3,
+            buffers=self._buffers,
+            release=release,
+        )
+
+    def __arrow_c_array__(
+        self, requested_schema: object | None = None
+    ) -> tuple[object, object]:
+        """Export the array as a pair of PyCapsule objects.
+
+        Args:
+            requested_schema: Ignored.
+
+        Returns:
+            The capsules of the ArrowSchema and ArrowArray structures.
+        """
+        del requested_schema
+        return (
+            _PyCapsule_New(ctypes.addressof(self.schema), _ARROW_SCHEMA_NAME, None),
+            _PyCapsule_New(ctypes.addressof(self.array), _ARROW_ARRAY_NAME, None),
+        )
@@ -0,0 +1,476 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+# pylint: disable=no-value-for-parameter, too-many-function-args
+from array import array
+from typing import no_type_check
+
+import pytest
+
+import mmh3
+from helper import ArrowStringArray
+
+
+def test_hash_int64() -> None:
+    keys = [0, 1, -1, 42, -42, 2**31, 2**32, 2**63 - 1, -(2**63)]
+    for key in keys:
+        data = key.to_bytes(8, "little", signed=True)
+        assert mmh3.hash_int64(key) == mmh3.hash(data)
+        assert mmh3.hash_int64(key, 0x9747B28C) == mmh3.hash(data, 0x9747B28C)
+        assert mmh3.hash_int64(key, seed=42, signed=False) == mmh3.hash(data, 42, False)
+        assert mmh3.hash_int64(key=key, seed=2**32 - 1) == mmh3.hash(data, 2**32 - 1)
+
+    # Unsigned keys give the same hash as signed keys with the same bits
+    assert mmh3.hash_int64(2**64 - 1) == mmh3.hash_int64(-1)
+    assert mmh3.hash_int64(2**63) == mmh3.hash_int64(-(2**63))
+
+
+def test_hash_int64_many() -> None:
+    keys = [0, 1, -1, 42, -42, 2**31, 2**32, 2**63 - 1, -(2**63)]
+
+    result = mmh3.hash_int64_many(array("q", keys), 42)
+    assert isinstance(result, array)
+    assert result.typecode == "i"
+    assert list(result) == [mmh3.hash_int64(key, 42) for key in keys]
+
+    ukeys = [key % 2**64 for key in keys]
+    result = mmh3.hash_int64_many(array("Q", ukeys), seed=42, signed=False)
+    assert result.typecode == "I"
+    assert list(result) == [mmh3.hash_int64(key, 42, False) for key in keys]
+
+    data = b"".join(key.to_bytes(8, "big", signed=True) for key in keys)
+    view = memoryview(data).cast("q")
+    assert view.format == "q"
+    assert list(mmh3.hash_int64_many(view, 42)) == [
+        mmh3.hash_int64(key, 42)
+        for key in array("q", data)  # keys read in the native byte order
+    ]
+
+    out = array("I", [0] * 10)
+    assert mmh3.hash_int64_many(array("q", keys), 42, out=out) is out
+    assert list(out) == [mmh3.hash_int64(key, 42, False) for key in keys] + [0]
+
+    unaligned = memoryview(bytearray(41))[1:]
+    assert mmh3.hash_int64_many(array("q", keys), 42, out=unaligned) is unaligned
+    assert unaligned[:36] == mmh3.hash_int64_many(array("q", keys), 42).tobytes()
+
+    assert len(mmh3.hash_int64_many(array("q"))) == 0
+
+    keys = list(range(-10000, 10000))
+    expected = mmh3.hash_int64_many(array("q", keys))
+    assert mmh3.hash_int64_many(array("q", keys), threads=4) == expected
+    assert list(expected) == [mmh3.hash_int64(key) for key in keys]
+
+
+def test_hash_arrow() -> None:
+    values: list[bytes | str | None] = ["foo", None, "", "日本語", "x" * 100, None]
+    keys = [v if v is not None else b"" for v in values]
+    for fmt in ["u", "U", "z", "Z"]:
+        array_ = ArrowStringArray(values, fmt)
+
+        result = mmh3.hash_arrow(array_, 42)
+        assert isinstance(result, array)
+        assert result.typecode == "i"
+        assert list(result) == [
+            mmh3.hash(k, 42) if v is not None else 0
+            for k, v in zip(keys, values, strict=True)
+        ]
+
+        result = mmh3.hash_arrow(array_, seed=42, signed=False, null=2**32 - 1)
+        assert result.typecode == "I"
+        assert list(result) == [
+            mmh3.hash(k, 42, False) if v is not None else 2**32 - 1
+            for k, v in zip(keys, values, strict=True)
+        ]
+
+    # Offset of a sliced array
+    array_ = ArrowStringArray(["skipped", None, "foo", "bar", None], offset=2)
+    assert list(mmh3.hash_arrow(array_, null=-1)) == [
+        mmh3.hash("foo"),
+        mmh3.hash("bar"),
+        -1,
+    ]
+
+    out = array("I", [0] * 4)
+    assert mmh3.hash_arrow(ArrowStringArray(["foo", "bar"]), 42, out=out) is out
+    assert list(out) == [
+        mmh3.hash("foo", 42, False),
+        mmh3.hash("bar", 42, False),
+        0,
+        0,
+    ]
+
+    assert len(mmh3.hash_arrow(ArrowStringArray([]))) == 0
+
+    values = [str(i) * (i % 7) if i % 5 else None for i in range(20000)]
+    array_ = ArrowStringArray(values)
+    expected = mmh3.hash_arrow(array_, 42)
+    assert mmh3.hash_arrow(array_, 42, threads=4) == expected
+    assert expected[1] == mmh3.hash("1", 42)
+
+
+def test_hash64_arrow() -> None:
+    values: list[bytes | str | None] = [b"foo", None, b"", "日本語", b"x" * 100]
+    for fmt in ["u", "U", "z", "Z"]:
+        array_ = ArrowStringArray(values, fmt, offset=1)
+        for x64arch in [True, False]:
+            expected: list[int] = []
+            for v in values[1:]:
+                if v is None:
+                    expected += [-1, -1]
+                else:
+                    expected += mmh3.hash64(v, 42, x64arch)
+            result = mmh3.hash64_arrow(array_, 42, x64arch, null=-1)
+            assert isinstance(result, array)
+            assert result.typecode == "q"
+            assert list(result) == expected
+
+    result = mmh3.hash64_arrow(ArrowStringArray(["foo", None]), signed=False)
+    assert result.typecode == "Q"
+    assert list(result) == [*mmh3.hash64("foo", signed=False), 0, 0]
+
+    out = bytearray(32)
+    assert mmh3.hash64_arrow(ArrowStringArray(["foo", "bar"]), out=out) is out
+    assert array("q", out).tolist() == [*mmh3.hash64("foo"), *mmh3.hash64("bar")]
+
+    values = [str(i) * (i % 7) if i % 5 else None for i in range(20000)]
+    array_ = ArrowStringArray(values, "U")
+    expected_array = mmh3.hash64_arrow(array_, 42)
+    assert mmh3.hash64_arrow(array_, 42, threads=4) == expected_array
+
+
+def test_hash_arrow_pyarrow() -> None:
+    pa = pytest.importorskip("pyarrow")
+
+    for type_ in [pa.string(), pa.large_string(), pa.binary(), pa.large_binary()]:
+        column = pa.array(["foo", None, "日本語", "", "bar"], type_)[1:]
+        assert list(mmh3.hash_arrow(column, 42)) == [
+            0,
+            mmh3.hash("日本語", 42),
+            mmh3.hash("", 42),
+            mmh3.hash("bar", 42),
+        ]
+        assert list(mmh3.hash64_arrow(column, 42)) == [
+            0,
+            0,
+            *mmh3.hash64("日本語", 42),
+            *mmh3.hash64("", 42),
+            *mmh3.hash64("bar", 42),
+        ]
+
+
+def test_hash_numpy() -> None:
+    np = pytest.importorskip("numpy")
+
+    values = ["", "foo", "日本語", "\U0001f600x", "a" * 100]
+    for dtype in ["S", "U", ">U", "<U"]:
+        if dtype == "S":
+            array_ = np.array([v.encode() for v in values])
+        else:
+            array_ = np.array(values, dtype=f"{dtype}100")
+        expected = [mmh3.hash(v, 42) for v in values]
+        result = mmh3.hash_numpy(array_, 42)
+        assert isinstance(result, array)
+        assert result.typecode == "i"
+        assert list(result) == expected
+
+    # Trailing NUL characters are stripped, as NumPy does.
+    array_ = np.array([b"foo\x00", b"\x00bar"], dtype="S8")
+    assert list(mmh3.hash_numpy(array_)) == [mmh3.hash(b"foo"), mmh3.hash(b"\x00bar")]
+
+    assert len(mmh3.hash_numpy(np.array([], dtype="U3"))) == 0
+
+    big = np.array([str(i) * (i % 7) for i in range(20000)])
+    assert mmh3.hash_numpy(big, 42, threads=4) == mmh3.hash_many(big.tolist(), 42)
+
+
+def test_hash_numpy_shape() -> None:
+    np = pytest.importorskip("numpy")
+
+    # The result is flat in C order, and out keeps the shape of the array.
+    matrix = np.array([["a", "bb", "ccc"], ["dd", "e", ""]])
+    for view in [matrix, matrix.T, matrix[::-1, ::2], np.array("foo")]:
+        expected = [mmh3.hash(v, signed=False) for v in view.ravel().tolist()]
+        assert list(mmh3.hash_numpy(view, signed=False)) == expected
+
+        matrix_out = np.empty(view.shape, np.uint32)
+        assert mmh3.hash_numpy(view, out=matrix_out) is matrix_out
+        assert matrix_out.ravel().tolist() == expected
+
+
+def test_hash_numpy_seeds() -> None:
+    np = pytest.importorskip("numpy")
+
+    # Seeds are broadcast to the shape of the array, as in NumPy.
+    matrix = np.array([["a", "bb", "ccc"], ["dd", "e", ""]])
+    seeds = np.arange(6, dtype=np.uint32).reshape(2, 3) * 700000000
+    column = seeds[:, 1:2].copy()
+    for seeds_view in [seeds, seeds[:1], seeds[1], column, seeds[0, 0]]:
+        keys = matrix.ravel().tolist()
+        broadcast = np.broadcast_to(seeds_view, matrix.shape).ravel().tolist()
+        assert list(mmh3.hash_numpy(matrix, seeds_view)) == [
+            mmh3.hash(v, s) for v, s in zip(keys, broadcast, strict=True)
+        ]
+
+
+def test_hash_numpy_string_dtype() -> None:
+    np = pytest.importorskip("numpy")
+    if not hasattr(np.dtypes, "StringDType"):
+        pytest.skip("StringDType requires NumPy 2.0 or later")
+
+    # StringDType is not supported, but either workaround gives the same hashes.
+    values = ["", "foo", "日本語", "\U0001f600x", "a" * 100]
+    strings = np.array(values, dtype=np.dtypes.StringDType())
+    expected = mmh3.hash_many(strings.ravel().tolist())
+    assert mmh3.hash_numpy(strings.astype("U100")) == expected
+
+
+def test_hash64_numpy() -> None:
+    np = pytest.importorskip("numpy")
+
+    values = ["", "foo", "日本語", "\U0001f600x", "a" * 100]
+    for dtype in ["S", "U"]:
+        if dtype == "S":
+            array_ = np.array([v.encode() for v in values])
+        else:
+            array_ = np.array(values)
+        for x64arch in [True, False]:
+            expected = [h for v in values for h in mmh3.hash64(v, 42, x64arch)]
+            result = mmh3.hash64_numpy(array_, 42, x64arch)
+            assert isinstance(result, array)
+            assert result.typecode == "q"
+            assert list(result) == expected
+
+    matrix = np.array([["a", "bb", "ccc"], ["dd", "e", ""]]).T
+    out = np.empty(matrix.shape + (2,), np.uint64)
+    assert mmh3.hash64_numpy(matrix, out=out) is out
+    assert out.ravel().tolist() == [
+        h for v in matrix.ravel().tolist() for h in mmh3.hash64(v, signed=False)
+    ]
+
+    seeds = np.arange(2, dtype=np.int64) * 700000000
+    assert list(mmh3.hash64_numpy(matrix, seeds, signed=False)) == [
+        h
+        for v, s in zip(matrix.ravel().tolist(), [0, 700000000] * 3, strict=True)
+        for h in mmh3.hash64(v, s, signed=False)
+    ]
+
+    big = np.array([str(i) * (i % 7) for i in range(20000)])
+    assert mmh3.hash64_numpy(big, 42, threads=4) == mmh3.hash64_many(big.tolist(), 42)
+
+
+@no_type_check
+def test_hash_int64_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.hash_int64()
+    with pytest.raises(TypeError):
+        mmh3.hash_int64(b"hello, world")
+    with pytest.raises(TypeError):
+        mmh3.hash_int64(1.0)
+    with pytest.raises(TypeError):
+        mmh3.hash_int64(42, "42")
+    with pytest.raises(TypeError):
+        mmh3.hash_int64(42, 42, True, 1234)
+    with pytest.raises(TypeError):
+        mmh3.hash_int64(42, key=42)
+    with pytest.raises(TypeError):
+        mmh3.hash_int64(42, foo=42)
+    with pytest.raises(TypeError):
+        mmh3.hash_int64(seed=42)
+
+
+@no_type_check
+def test_hash_int64_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.hash_int64(2**64)
+    with pytest.raises(ValueError):
+        mmh3.hash_int64(-(2**63) - 1)
+    with pytest.raises(ValueError):
+        mmh3.hash_int64(42, -1)
+    with pytest.raises(ValueError):
+        mmh3.hash_int64(42, 2**32)
+
+
+@no_type_check
+def test_hash_int64_many_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many()
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many([1, 2, 3])
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(bytes(16))
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(array("i", [1, 2]))
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(array("d", [1.0, 2.0]))
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(array("q"), "42")
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(array("q"), 42, keys=array("q"))
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(array("q"), foo=42)
+    with pytest.raises(BufferError):
+        mmh3.hash_int64_many(array("q", [1]), out=bytes(4))
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(array("q", [1]), out=array("d", [0.0]))
+    with pytest.raises(TypeError):
+        mmh3.hash_int64_many(array("q", [1]), out=array("H", [0, 0]))
+
+
+@no_type_check
+def test_hash_int64_many_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.hash_int64_many(array("q", [1]), -1)
+    with pytest.raises(ValueError):
+        mmh3.hash_int64_many(array("q", [1, 2]), out=bytearray(7))
+    with pytest.raises(ValueError):
+        mmh3.hash_int64_many(array("q", [1]), threads=0)
+
+
+class _BadArrowArray:  # pylint: disable=too-few-public-methods
+    def __init__(self, capsules: object) -> None:
+        self.capsules = capsules
+
+    def __arrow_c_array__(self, requested_schema: object = None) -> object:
+        del requested_schema
+        return self.capsules
+
+
+@no_type_check
+def test_hash_arrow_raises_typeerror() -> None:
+    for f in [mmh3.hash_arrow, mmh3.hash64_arrow]:
+        with pytest.raises(TypeError):
+            f()
+        with pytest.raises(TypeError):
+            f(["foo", "bar"])
+        with pytest.raises(TypeError):
+            f(b"foo")
+        with pytest.raises(TypeError):
+            f(ArrowStringArray(["foo"], "i"))
+        with pytest.raises(TypeError):
+            f(ArrowStringArray(["foo"], "vu"))
+        with pytest.raises(TypeError):
+            f(_BadArrowArray(None))
+        with pytest.raises(TypeError):
+            f(_BadArrowArray((1, 2, 3)))
+        with pytest.raises(TypeError):
+            f(ArrowStringArray(["foo"]), "42")
+        with pytest.raises(TypeError):
+            f(ArrowStringArray(["foo"]), null="0")
+        with pytest.raises(TypeError):
+            f(ArrowStringArray(["foo"]), array=ArrowStringArray(["foo"]))
+        with pytest.raises(TypeError):
+            f(ArrowStringArray(["foo"]), foo=42)
+        with pytest.raises(TypeError):
+            f(ArrowStringArray(["foo"]), 0, True, 0, None, 1, 1, 1)
+        with pytest.raises(BufferError):
+            f(ArrowStringArray(["foo"]), out=bytes(16))
+
+
+@no_type_check
+def test_hash_arrow_raises_typeerror_for_unsupported_pyarrow_types() -> None:
+    pa = pytest.importorskip("pyarrow")
+
+    chunked = pa.chunked_array([["foo"], ["bar"]])
+    for f in [mmh3.hash_arrow, mmh3.hash64_arrow]:
+        with pytest.raises(TypeError):
+            f(chunked)
+        for type_ in [pa.string_view(), pa.binary_view()]:
+            with pytest.raises(TypeError):
+                f(pa.array(["foo"], type_))
+
+
+@no_type_check
+def test_hash_arrow_raises_valueerror() -> None:
+    for f in [mmh3.hash_arrow, mmh3.hash64_arrow]:
+        with pytest.raises(ValueError):
+            f(ArrowStringArray(["foo"]), -1)
+        with pytest.raises(ValueError):
+            f(ArrowStringArray(["foo"]), 2**32)
+        with pytest.raises(ValueError):
+            f(ArrowStringArray(["foo"]), null=2**64)
+        with pytest.raises(ValueError):
+            f(ArrowStringArray(["foo"]), null=-(2**63) - 1)
+        with pytest.raises(ValueError):
+            f(ArrowStringArray(["foo", "bar"]), out=bytearray(7))
+        with pytest.raises(ValueError):
+            f(ArrowStringArray(["foo"]), threads=0)
+
+        producer = ArrowStringArray(["foo"])
+        capsules = producer.__arrow_c_array__()
+        with pytest.raises(ValueError):
+            f(_BadArrowArray(capsules[::-1]))
+
+        released = ArrowStringArray(["foo"])
+        released.array.release = None
+        with pytest.raises(ValueError):
+            f(released)
+
+    with pytest.raises(ValueError):
+        mmh3.hash_arrow(ArrowStringArray(["foo"]), null=2**32)
+    with pytest.raises(ValueError):
+        mmh3.hash_arrow(ArrowStringArray(["foo"]), null=-(2**31) - 1)
+
+
+@no_type_check
+def test_hash_numpy_raises_typeerror() -> None:
+    for f in [mmh3.hash_numpy, mmh3.hash64_numpy]:
+        with pytest.raises(TypeError):
+            f()
+        with pytest.raises(TypeError):
+            f([b"foo", b"bar"])
+        with pytest.raises(TypeError):
+            f(b"foo")
+        with pytest.raises(TypeError):
+            f("foo")
+        with pytest.raises(TypeError):
+            f(array("i", [1, 2]))
+        with pytest.raises(TypeError):
+            f(array=b"foo", foo=42)
+
+
+@no_type_check
+def test_hash_numpy_raises_valueerror() -> None:
+    np = pytest.importorskip("numpy")
+
+    surrogate = np.frombuffer(array("I", [0x61, 0xD800]).tobytes(), dtype="U2")
+    beyond = np.frombuffer(array("I", [0x61, 0x110000]).tobytes(), dtype="U2")
+    for f in [mmh3.hash_numpy, mmh3.hash64_numpy]:
+        keys = np.array(["foo", "bar"])
+        with pytest.raises(TypeError):
+            f(keys, "42")
+        with pytest.raises(TypeError):
+            f(keys, 1.5)
+        with pytest.raises(TypeError):
+            f(keys, np.array([1.0, 2.0]))
+        with pytest.raises(TypeError):
+            f(keys, array=keys)
+        with pytest.raises(TypeError):
+            f(np.array([b"foo", None]))
+        if hasattr(np.dtypes, "StringDType"):
+            with pytest.raises(TypeError, match="StringDType"):
+                f(keys.astype(np.dtypes.StringDType()))
+        with pytest.raises(TypeError):
+            f(keys, 0, True, True, None, 1, 1)
+        with pytest.raises(BufferError):
+            f(keys, out=bytes(32))
+        with pytest.raises(ValueError):
+            f(keys, -1)
+        with pytest.raises(ValueError):
+            f(keys, 2**32)
+        with pytest.raises(ValueError):
+            f(keys, np.array([1, 2, 3]))
+        with pytest.raises(ValueError):
+            f(np.array([["a", "b"], ["c", "d"]]), np.arange(4))
+        with pytest.raises(ValueError):
+            f(keys, np.array([[1, 2], [3, 4]]))
+        with pytest.raises(ValueError):
+            f(keys, np.array([1, -1]))
+        with pytest.raises(ValueError):
+            f(keys, np.array([1, 2**32]))
+        with pytest.raises(ValueError):
+            f(keys, out=bytearray(7))
+        with pytest.raises(ValueError):
+            f(keys, threads=0)
+        with pytest.raises(UnicodeEncodeError):
+            f(surrogate)
+        with pytest.raises(ValueError):
+            f(beyond)
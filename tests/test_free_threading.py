@@ -49,3 +49,51 @@ def test_parallel_hasher_mmh3_x86_128_update() -> None:
     assert hasher.sintdigest() == mmh3.hash128(
         b"foo" * 8000, x64arch=False, signed=True
     )
+
+
+def test_parallel_hash_large_inputs() -> None:
+    # Large inputs are hashed without holding the GIL.
+    data = bytes(range(256)) * 1024
+    key = data.decode("latin-1")
+    expected = (
+        mmh3.hash(key),
+        mmh3.hash128(key),
+        mmh3.mmh3_32_digest(data),
+        mmh3.mmh3_x64_128_digest(memoryview(data)),
+        mmh3.mmh3_x86_128_digest(bytearray(data)),
+    )
+
+    def closure() -> None:
+        for _ in range(10):
+            assert (
+                mmh3.hash(key),
+                mmh3.hash128(key),
+                mmh3.mmh3_32_digest(data),
+                mmh3.mmh3_x64_128_digest(memoryview(data)),
+                mmh3.mmh3_x86_128_digest(bytearray(data)),
+            ) == expected
+
+    run_threaded(closure, num_threads=8)
+
+
+def test_parallel_hasher_large_update() -> None:
+    # Large chunks are processed without holding the GIL, while the state of
+    # the hasher is protected by its own lock.
+    chunk = bytes(range(256)) * 64
+
+    for hasher_type, hash_func in [
+        (mmh3.mmh3_32, mmh3.mmh3_32_digest),
+        (mmh3.mmh3_x64_128, mmh3.mmh3_x64_128_digest),
+        (mmh3.mmh3_x86_128, mmh3.mmh3_x86_128_digest),
+    ]:
+        hasher = hasher_type(b"foo")
+
+        def closure(hasher: Any = hasher) -> None:
+            for _ in range(20):
+                hasher.update(chunk)
+                hasher.digest()
+                hasher.copy()
+
+        run_threaded(closure, num_threads=8)
+
+        assert hasher.digest() == hash_func(b"foo" + chunk * 160)
@@ -1,5 +1,6 @@
 # pylint: disable=missing-module-docstring, missing-function-docstring
 # pylint: disable=no-value-for-parameter, too-many-function-args
+from array import array
 from typing import no_type_check
 
 import pytest
@@ -22,6 +23,22 @@ def test_hash_raises_typeerror() -> None:
     # pylint: disable=redundant-keyword-arg
     with pytest.raises(TypeError):
         mmh3.hash(b"hello, world", key=b"42")
+    with pytest.raises(TypeError):
+        mmh3.hash(seed=42)
+
+
+@no_type_check
+def test_hash_raises_unicodeencodeerror() -> None:
+    with pytest.raises(UnicodeEncodeError):
+        mmh3.hash("\ud800")
+    with pytest.raises(UnicodeEncodeError):
+        mmh3.hash64("foo\udfff")
+    with pytest.raises(UnicodeEncodeError):
+        mmh3.hash128("\u3042\udc80")
+    with pytest.raises(UnicodeEncodeError):
+        mmh3.hash_bytes("\U0001f600\ud800")
+    with pytest.raises(UnicodeEncodeError):
+        mmh3.hash_many(["foo", "\ud800"])
 
 
 @no_type_check
@@ -110,6 +127,13 @@ def test_hash_from_buffer_raises_typeerror() -> None:
         mmh3.hash_from_buffer(b"hello, world", seed="42")
     with pytest.raises(TypeError):
         mmh3.hash_from_buffer([1, 2, 3], 42)
+    with pytest.raises(TypeError):
+        mmh3.hash_from_buffer(seed=42)
+    # pylint: disable=redundant-keyword-arg
+    with pytest.raises(TypeError):
+        mmh3.hash_from_buffer(b"hello, world", key=b"42")
+    with pytest.raises(TypeError):
+        mmh3.hash_from_buffer(b"hello, world", seed=42, size=4)
 
 
 @no_type_check
@@ -416,6 +440,13 @@ def test_mmh3_32_init_raises_typeerror() -> None:
         mmh3.mmh3_32(b"hello, world", "42")
     with pytest.raises(TypeError):
         mmh3.mmh3_32([1, 2, 3], 42)
+    # pylint: disable=redundant-keyword-arg
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32(b"hello, world", data=b"42")
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32(b"hello, world", 42, seed=42)
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32(b"hello, world", key=42)
 
 
 @no_type_check
@@ -436,6 +467,13 @@ def test_mmh3_x64_128_init_raises_typeerror() -> None:
         mmh3.mmh3_x64_128(b"hello, world", "42")
     with pytest.raises(TypeError):
         mmh3.mmh3_x64_128([1, 2, 3], 42)
+    # pylint: disable=redundant-keyword-arg
+    with pytest.raises(TypeError):
+        mmh3.mmh3_x64_128(b"hello, world", data=b"42")
+    with pytest.raises(TypeError):
+        mmh3.mmh3_x64_128(b"hello, world", 42, seed=42)
+    with pytest.raises(TypeError):
+        mmh3.mmh3_x64_128(b"hello, world", key=42)
 
 
 @no_type_check
@@ -456,6 +494,13 @@ def test_mmh3_x86_128_init_raises_typeerror() -> None:
         mmh3.mmh3_x86_128(b"hello, world", "42")
     with pytest.raises(TypeError):
         mmh3.mmh3_x86_128([1, 2, 3], 42)
+    # pylint: disable=redundant-keyword-arg
+    with pytest.raises(TypeError):
+        mmh3.mmh3_x86_128(b"hello, world", data=b"42")
+    with pytest.raises(TypeError):
+        mmh3.mmh3_x86_128(b"hello, world", 42, seed=42)
+    with pytest.raises(TypeError):
+        mmh3.mmh3_x86_128(b"hello, world", key=42)
 
 
 @no_type_check
@@ -464,3 +509,333 @@ def test_mmh3_x86_128_init_raises_valueerror() -> None:
         mmh3.mmh3_x86_128(b"hello, world", -1)
     with pytest.raises(ValueError):
         mmh3.mmh3_x86_128(b"hello, world", 2**32)
+
+
+@no_type_check
+def test_hash_many_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.hash_many()
+    with pytest.raises(TypeError):
+        mmh3.hash_many(42)
+    with pytest.raises(TypeError):
+        mmh3.hash_many("hello, world")
+    with pytest.raises(TypeError):
+        mmh3.hash_many([b"hello", 42])
+    with pytest.raises(TypeError):
+        mmh3.hash_many([b"hello, world"], "42")
+    with pytest.raises(TypeError):
+        mmh3.hash_many([b"hello, world"], 42, True, 1, 1234)
+    with pytest.raises(TypeError):
+        mmh3.hash_many([b"hello, world"], threads="4")
+    with pytest.raises(TypeError):
+        mmh3.hash_many([b"hello, world"], keys=[b"42"])
+
+
+@no_type_check
+def test_hash_many_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.hash_many([b"hello, world"], -1)
+    with pytest.raises(ValueError):
+        mmh3.hash_many([b"hello, world"], 2**32)
+    with pytest.raises(ValueError):
+        mmh3.hash_many([b"hello, world"], threads=0)
+    with pytest.raises(ValueError):
+        mmh3.hash_many([b"hello, world"], threads=-1)
+
+
+@no_type_check
+def test_hash64_many_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.hash64_many()
+    with pytest.raises(TypeError):
+        mmh3.hash64_many(b"hello, world")
+    with pytest.raises(TypeError):
+        mmh3.hash64_many([b"hello", None])
+    with pytest.raises(TypeError):
+        mmh3.hash64_many([b"hello, world"], 42, True, False, 1, 1234)
+
+
+@no_type_check
+def test_hash64_many_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.hash64_many([b"hello, world"], -1)
+    with pytest.raises(ValueError):
+        mmh3.hash64_many([b"hello, world"], 2**32)
+    with pytest.raises(ValueError):
+        mmh3.hash64_many([b"hello, world"], threads=0)
+
+
+@no_type_check
+def test_hash_bytes_many_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.hash_bytes_many()
+    with pytest.raises(TypeError):
+        mmh3.hash_bytes_many(b"hello, world")
+    with pytest.raises(TypeError):
+        mmh3.hash_bytes_many([bytearray(b"hello")])
+    with pytest.raises(TypeError):
+        mmh3.hash_bytes_many([b"hello, world"], 42, True, 1, 1234)
+
+
+@no_type_check
+def test_hash_bytes_many_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.hash_bytes_many([b"hello, world"], -1)
+    with pytest.raises(ValueError):
+        mmh3.hash_bytes_many([b"hello, world"], 2**32)
+    with pytest.raises(ValueError):
+        mmh3.hash_bytes_many([b"hello, world"], threads=0)
+
+
+@no_type_check
+def test_mmh3_32_uintdigest_rows_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows()
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows("hello, world", record_size=4)
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", record_size="4")
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", 0, 4, None, 1, 1234)
+    with pytest.raises(BufferError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", record_size=4, out=bytes(12))
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", 0, 4, seed=1)
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", 0, 4, threads=1.0)
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", 0, 4, array("d", [0.0] * 3))
+    with pytest.raises(TypeError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", 0, 4, array("q", [0] * 3))
+
+
+@no_type_check
+def test_mmh3_32_uintdigest_rows_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world")
+    with pytest.raises(ValueError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", record_size=5)
+    with pytest.raises(ValueError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", record_size=-1)
+    with pytest.raises(ValueError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", -1, 4)
+    with pytest.raises(ValueError):
+        mmh3.mmh3_32_uintdigest_rows(
+            memoryview(b"hello, world").cast("B", (3, 4)), record_size=3
+        )
+    with pytest.raises(ValueError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", 0, 4, bytearray(11))
+    with pytest.raises(ValueError):
+        mmh3.mmh3_32_uintdigest_rows(b"hello, world", 0, 4, threads=0)
+
+
+@no_type_check
+def test_mmh3_x64_128_digest_rows_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.mmh3_x64_128_digest_rows(b"hello, world")
+    with pytest.raises(ValueError):
+        mmh3.mmh3_x64_128_digest_rows(b"hello, world", 2**32, 4)
+    with pytest.raises(ValueError):
+        mmh3.mmh3_x64_128_digest_rows(b"hello, world", 0, 4, bytearray(47))
+
+
+@no_type_check
+def test_spans_raises_typeerror() -> None:
+    offsets = array("q", [0])
+    for f in [mmh3.mmh3_32_uintdigest_spans, mmh3.mmh3_x64_128_digest_spans]:
+        with pytest.raises(TypeError):
+            f()
+        with pytest.raises(TypeError):
+            f(b"hello, world")
+        with pytest.raises(TypeError):
+            f("hello, world", offsets, offsets)
+        with pytest.raises(TypeError):
+            f(b"hello, world", [0], [1])
+        with pytest.raises(TypeError):
+            f(b"hello, world", array("d", [0.0]), offsets)
+        with pytest.raises(TypeError):
+            f(b"hello, world", offsets, array("f", [1.0]))
+        with pytest.raises(TypeError):
+            f(b"hello, world", offsets, offsets, "42")
+        with pytest.raises(TypeError):
+            f(b"hello, world", offsets, offsets, key=b"foo")
+        with pytest.raises(TypeError):
+            f(b"hello, world", offsets, offsets, foo=1)
+        with pytest.raises(TypeError):
+            f(b"hello, world", offsets, offsets, 0, None, 1, 1)
+        with pytest.raises(BufferError):
+            f(b"hello, world", offsets, offsets, out=bytes(16))
+
+
+@no_type_check
+def test_spans_raises_valueerror() -> None:
+    data = b"hello, world"
+    for f in [mmh3.mmh3_32_uintdigest_spans, mmh3.mmh3_x64_128_digest_spans]:
+        with pytest.raises(ValueError):
+            f(data, array("q", [0]), array("q", [13]))
+        with pytest.raises(ValueError):
+            f(data, array("q", [13]), array("q", [0]))
+        with pytest.raises(ValueError):
+            f(data, array("q", [-1]), array("q", [1]))
+        with pytest.raises(ValueError):
+            f(data, array("q", [1]), array("q", [-1]))
+        with pytest.raises(ValueError):
+            f(data, array("Q", [2**64 - 1]), array("q", [1]))
+        with pytest.raises(ValueError):
+            f(data, array("q", [0, 1]), array("q", [1]))
+        with pytest.raises(ValueError):
+            f(data, array("q", [0, 1, 2]))
+        with pytest.raises(ValueError):
+            f(data, memoryview(array("q", [0, 1, 2])).cast("B").cast("q", (1, 3)))
+        with pytest.raises(ValueError):
+            f(data, array("q", [0, 1]), seed=-1)
+        with pytest.raises(ValueError):
+            f(data, array("q", [0, 1, 2, 3]), out=bytearray(7))
+        with pytest.raises(ValueError):
+            f(data, array("q", [0, 1]), threads=0)
+
+
+@no_type_check
+def test_digest_into_raises_typeerror() -> None:
+    for f in [
+        mmh3.mmh3_32_digest_into,
+        mmh3.mmh3_x64_128_digest_into,
+        mmh3.mmh3_x86_128_digest_into,
+    ]:
+        with pytest.raises(TypeError):
+            f(b"hello, world")
+        with pytest.raises(TypeError):
+            f(b"hello, world", bytearray(16), 0, 42, 1234)
+        with pytest.raises(TypeError):
+            f("hello, world", bytearray(16))
+        with pytest.raises(TypeError):
+            f(b"hello, world", bytearray(16), "0")
+        with pytest.raises(TypeError):
+            f(b"hello, world", bytearray(16), 0, "42")
+        with pytest.raises(TypeError):
+            f(b"hello, world", out=bytearray(16))
+        with pytest.raises(BufferError):
+            f(b"hello, world", bytes(16))
+
+
+@no_type_check
+def test_digest_into_raises_valueerror() -> None:
+    for f in [
+        mmh3.mmh3_32_digest_into,
+        mmh3.mmh3_x64_128_digest_into,
+        mmh3.mmh3_x86_128_digest_into,
+    ]:
+        with pytest.raises(ValueError):
+            f(b"hello, world", bytearray(3))
+        with pytest.raises(ValueError):
+            f(b"hello, world", bytearray(16), 13)
+        with pytest.raises(ValueError):
+            f(b"hello, world", bytearray(16), -1)
+        with pytest.raises(ValueError):
+            f(b"hello, world", bytearray(16), 2**64)
+        with pytest.raises(ValueError):
+            f(b"hello, world", bytearray(16), 0, -1)
+        with pytest.raises(ValueError):
+            f(b"hello, world", bytearray(16), 0, 2**32)
+
+
+@no_type_check
+def test_hasher_digest_into_raises_errors() -> None:
+    for hasher in [mmh3.mmh3_32(), mmh3.mmh3_x64_128(), mmh3.mmh3_x86_128()]:
+        with pytest.raises(TypeError):
+            hasher.digest_into()
+        with pytest.raises(TypeError):
+            hasher.digest_into(bytearray(16), 0, 0)
+        with pytest.raises(TypeError):
+            hasher.digest_into(bytearray(16), "0")
+        with pytest.raises(BufferError):
+            hasher.digest_into(bytes(16))
+        with pytest.raises(ValueError):
+            hasher.digest_into(bytearray(3))
+        with pytest.raises(ValueError):
+            hasher.digest_into(bytearray(16), 13)
+        with pytest.raises(ValueError):
+            hasher.digest_into(bytearray(16), -1)
+
+
+@no_type_check
+def test_imap_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.imap()
+    with pytest.raises(TypeError):
+        mmh3.imap(42)
+    with pytest.raises(TypeError):
+        mmh3.imap([b"foo"], 42)
+    with pytest.raises(TypeError):
+        mmh3.imap([b"foo"], seed="42")
+    with pytest.raises(TypeError):
+        mmh3.imap([b"foo"], chunk=1.5)
+    with pytest.raises(TypeError):
+        mmh3.imap([b"foo"], foo=42)
+    with pytest.raises(TypeError):
+        list(mmh3.imap([b"foo", 42]))
+
+    def keys():
+        yield b"foo"
+        raise KeyError("bar")
+
+    with pytest.raises(KeyError):
+        list(mmh3.imap(keys()))
+
+
+@no_type_check
+def test_imap_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.imap([b"foo"], "md5")
+    with pytest.raises(ValueError):
+        mmh3.imap([b"foo"], seed=-1)
+    with pytest.raises(ValueError):
+        mmh3.imap([b"foo"], seed=2**32)
+    with pytest.raises(ValueError):
+        mmh3.imap([b"foo"], chunk=0)
+    with pytest.raises(UnicodeEncodeError):
+        list(mmh3.imap(["\ud800"]))
+
+
+@no_type_check
+def test_hash_seeds_raises_typeerror() -> None:
+    for f in [mmh3.hash_seeds, mmh3.hash64_seeds]:
+        with pytest.raises(TypeError):
+            f(b"foo")
+        with pytest.raises(TypeError):
+            f(42, [1])
+        with pytest.raises(TypeError):
+            f(b"foo", 42)
+        with pytest.raises(TypeError):
+            f(b"foo", [1.5])
+        with pytest.raises(TypeError):
+            f(b"foo", array("d", [1.0]))
+        with pytest.raises(TypeError):
+            f(b"foo", [1], seed=42)
+        with pytest.raises(TypeError):
+            f(b"foo", [1], key=b"bar")
+    for f in [mmh3.hash_seeds_many, mmh3.hash64_seeds_many]:
+        with pytest.raises(TypeError):
+            f([b"foo"])
+        with pytest.raises(TypeError):
+            f([b"foo", 42], [1])
+        with pytest.raises(TypeError):
+            f([b"foo"], [1], threads=1.5)
+
+
+@no_type_check
+def test_hash_seeds_raises_valueerror() -> None:
+    for f in [mmh3.hash_seeds, mmh3.hash64_seeds]:
+        with pytest.raises(ValueError):
+            f(b"foo", [-1])
+        with pytest.raises(ValueError):
+            f(b"foo", [2**32])
+        with pytest.raises(ValueError):
+            f(b"foo", array("q", [-1]))
+        with pytest.raises(ValueError):
+            f(b"foo", [1], out=bytearray(3))
+    for f in [mmh3.hash_seeds_many, mmh3.hash64_seeds_many]:
+        with pytest.raises(ValueError):
+            f([b"foo"], [2**32])
+        with pytest.raises(ValueError):
+            f([b"foo"], [1], threads=0)
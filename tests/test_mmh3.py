@@ -1,5 +1,9 @@
 # pylint: disable=missing-module-docstring,missing-function-docstring
+import itertools
 import sys
+from array import array
+
+import pytest
 
 import mmh3
 from helper import u32_to_s32
@@ -157,6 +161,9 @@ def test_hash_from_buffer() -> None:
     mview = memoryview(b"foo")
     assert mmh3.hash_from_buffer(mview) == -156908512
     assert mmh3.hash_from_buffer(mview, signed=False) == 4138058784
+    assert mmh3.hash_from_buffer(key=mview, seed=0, signed=False) == 4138058784
+    assert mmh3.hash_from_buffer(bytearray(b"foo"), 0, False) == 4138058784
+    assert mmh3.hash_from_buffer("foo", seed=42) == mmh3.hash("foo", 42)
 
 
 def test_hash_bytes() -> None:
@@ -226,6 +233,35 @@ def test_hash128() -> None:
     assert mmh3.hash128("", 123, False, False) == 0x26F3E79926F3E79926F3E799FEDC5245
 
 
+def test_hash_str() -> None:
+    # Latin-1, BMP, and astral characters, on the stack and on the heap
+    for key in ["\u00e9t\u00e9", "\u65e5\u672c\u8a9e" * 100, "\U0001f600x" * 77]:
+        encoded = key.encode("utf-8")
+        assert mmh3.hash(key, 42) == mmh3.hash(encoded, 42)
+        assert mmh3.hash64(key, 42, False) == mmh3.hash64(encoded, 42, False)
+        assert mmh3.hash128(key, 42, True) == mmh3.hash128(encoded, 42, True)
+        assert mmh3.hash_bytes(key, 42, False) == mmh3.hash_bytes(encoded, 42, False)
+        assert list(mmh3.hash_many([key, "foo", key], 42)) == [
+            mmh3.hash(encoded, 42),
+            mmh3.hash(b"foo", 42),
+            mmh3.hash(encoded, 42),
+        ]
+
+
+def test_hash_str_does_not_cache_utf8() -> None:
+    # sys.getsizeof() includes the UTF-8 representation cached in a str.
+    key = "".join(chr(0x3042 + i) for i in range(100))
+    size = sys.getsizeof(key)
+
+    mmh3.hash(key)
+    mmh3.hash64(key)
+    mmh3.hash128(key)
+    mmh3.hash_bytes(key)
+    mmh3.hash_many([key])
+
+    assert sys.getsizeof(key) == size
+
+
 def test_mmh3_32_digest() -> None:
     assert mmh3.mmh3_32_digest(b"") == b"\0\0\0\0"
     assert mmh3.mmh3_32_digest(b"", 0) == b"\0\0\0\0"
@@ -532,6 +568,372 @@ def test_mmh3_x86_128_utupledigest() -> None:
     )
 
 
+def test_strided_buffers() -> None:
+    data = bytes(range(256)) * 40
+    views = [
+        memoryview(data)[::3],
+        memoryview(data)[1::7000],
+        memoryview(data)[::-1],
+        memoryview(data)[5:5],
+        memoryview(data)[:8192].cast("B", (32, 256)),
+        memoryview(array("q", range(2000)))[::-3],
+    ]
+    functions = [
+        mmh3.mmh3_32_digest,
+        mmh3.mmh3_32_sintdigest,
+        mmh3.mmh3_32_uintdigest,
+        mmh3.mmh3_x64_128_digest,
+        mmh3.mmh3_x64_128_sintdigest,
+        mmh3.mmh3_x64_128_uintdigest,
+        mmh3.mmh3_x64_128_stupledigest,
+        mmh3.mmh3_x64_128_utupledigest,
+        mmh3.mmh3_x86_128_digest,
+        mmh3.mmh3_x86_128_sintdigest,
+        mmh3.mmh3_x86_128_uintdigest,
+        mmh3.mmh3_x86_128_stupledigest,
+        mmh3.mmh3_x86_128_utupledigest,
+    ]
+
+    for view in views:
+        contiguous = view.tobytes()
+        for f in functions:
+            assert f(view, 42) == f(contiguous, 42)
+        assert mmh3.hash_from_buffer(view, 42) == mmh3.hash_from_buffer(contiguous, 42)
+
+        record = bytearray(16)
+        mmh3.mmh3_x64_128_digest_into(view, record, 0, 42)
+        assert record == mmh3.mmh3_x64_128_digest(contiguous, 42)
+
+
+def test_strided_numpy_arrays() -> None:
+    np = pytest.importorskip("numpy")
+
+    matrix = np.arange(10000, dtype=np.int32).reshape(100, 100)
+    for view in [matrix[:, 3], matrix[::2, 1:50:3], matrix.T, matrix[::-1, ::-7]]:
+        contiguous = view.tobytes()
+        assert mmh3.mmh3_32_digest(view, 42) == mmh3.mmh3_32_digest(contiguous, 42)
+        assert mmh3.mmh3_x64_128_digest(view) == mmh3.mmh3_x64_128_digest(contiguous)
+        assert mmh3.mmh3_x86_128_digest(view) == mmh3.mmh3_x86_128_digest(contiguous)
+
+        hasher = mmh3.mmh3_x64_128()
+        hasher.update(view)
+        assert hasher.digest() == mmh3.mmh3_x64_128_digest(contiguous)
+
+
+def test_hash_many() -> None:
+    keys: list[bytes | str] = [
+        b"",
+        b"\x21\x43\x65\x87",
+        b"\x21\x43\x65",
+        b"\x21\x43",
+        b"\x21",
+        "Hello, world!",
+        "ππππππππ",
+        "a" * 256,
+        "The quick brown fox jumps over the lazy dog",
+    ]
+
+    result = mmh3.hash_many(keys, 0x9747B28C)
+    assert result.typecode == "i"
+    assert list(result) == [mmh3.hash(key, 0x9747B28C) for key in keys]
+
+    result = mmh3.hash_many(tuple(keys), seed=0x9747B28C, signed=False)
+    assert result.typecode == "I"
+    assert list(result) == [mmh3.hash(key, 0x9747B28C, signed=False) for key in keys]
+
+    mixed: list[bytes | str] = ["foo", b"bar"]
+    assert list(mmh3.hash_many(key for key in mixed)) == [
+        mmh3.hash("foo"),
+        mmh3.hash(b"bar"),
+    ]
+    assert len(mmh3.hash_many([])) == 0
+
+
+def test_hash64_many() -> None:
+    keys: list[bytes | str] = [
+        "foo",
+        b"",
+        "Hello, world!",
+        "The quick brown fox jumps over the lazy dog",
+    ]
+
+    result = mmh3.hash64_many(keys, 123)
+    assert result.typecode == "q"
+    assert list(zip(result[::2], result[1::2], strict=True)) == [
+        mmh3.hash64(key, 123) for key in keys
+    ]
+
+    result = mmh3.hash64_many(keys, 123, x64arch=False, signed=False)
+    assert result.typecode == "Q"
+    assert list(zip(result[::2], result[1::2], strict=True)) == [
+        mmh3.hash64(key, 123, x64arch=False, signed=False) for key in keys
+    ]
+
+
+def test_hash_bytes_many() -> None:
+    keys: list[bytes | str] = [
+        "foo",
+        b"",
+        "Hello, world!",
+        "The quick brown fox jumps over the lazy dog",
+    ]
+
+    assert mmh3.hash_bytes_many(keys) == b"".join(mmh3.hash_bytes(k) for k in keys)
+    assert mmh3.hash_bytes_many(keys, 123, x64arch=False) == b"".join(
+        mmh3.hash_bytes(k, 123, x64arch=False) for k in keys
+    )
+    assert mmh3.hash_bytes_many([]) == b""
+
+
+def test_hash_many_vectors() -> None:
+    # Test vectors devised by Ian Boyd, hashed in batches of mixed and
+    # uniform lengths so that every lane of the multi-lane kernels is used.
+    vectors = [
+        (b"a", 0x7FA09EA6),
+        (b"aa", 0x5D211726),
+        (b"aaa", 0x283E0130),
+        (b"ab", 0x74875592),
+        (b"abc", 0xC84A62DD),
+        (b"abcd", 0xF0478627),
+        (b"aaaa", 0x5A97808A),
+        (b"Hello, world!", 0x24884CBA),
+        ("ππππππππ".encode(), 0xD58063C1),
+        (b"a" * 256, 0x37405BDC),
+        (b"The quick brown fox jumps over the lazy dog", 0x2FA826CD),
+    ]
+
+    for batch in (vectors * 7, sorted(vectors * 7), vectors[:1] + vectors * 5):
+        keys = [key for key, _ in batch]
+        expected = [value for _, value in batch]
+        assert list(mmh3.hash_many(keys, 0x9747B28C, signed=False)) == expected
+
+    for size in range(0, 70):
+        data = bytes(range(256))[:size] * 33
+        assert list(mmh3.mmh3_32_uintdigest_rows(data, 0x9747B28C, size or 1)) == [
+            mmh3.mmh3_32_uintdigest(data[i : i + size], 0x9747B28C)
+            for i in range(0, len(data), size or 1)
+        ]
+
+
+def test_hash_many_threads() -> None:
+    keys = [str(i) * (i % 7) for i in range(20000)]
+
+    expected = mmh3.hash_many(keys, 42)
+    assert mmh3.hash_many(keys, 42, threads=4) == expected
+    assert mmh3.hash_many(keys, 42, threads=1000) == expected
+    assert mmh3.hash_many(keys[:10], 42, threads=4) == expected[:10]
+
+    expected = mmh3.hash64_many(keys, 42, x64arch=False)
+    assert mmh3.hash64_many(keys, 42, x64arch=False, threads=3) == expected
+
+    digests = mmh3.hash_bytes_many(keys, 42)
+    assert mmh3.hash_bytes_many(keys, 42, threads=3) == digests
+
+
+def test_mmh3_32_uintdigest_rows() -> None:
+    data = b"The quick brown fox jumps over the lazy dog!!!!!"
+    rows = [data[i : i + 16] for i in range(0, len(data), 16)]
+    expected = [mmh3.mmh3_32_uintdigest(row, 0x9747B28C) for row in rows]
+
+    result = mmh3.mmh3_32_uintdigest_rows(data, 0x9747B28C, 16)
+    assert isinstance(result, array)
+    assert result.typecode == "I"
+    assert list(result) == expected
+
+    view = memoryview(data).cast("B", (3, 16))
+    assert list(mmh3.mmh3_32_uintdigest_rows(view, seed=0x9747B28C)) == expected
+    assert list(mmh3.mmh3_32_uintdigest_rows(view, 0x9747B28C, 16)) == expected
+
+    out = array("I", [0] * 4)
+    assert mmh3.mmh3_32_uintdigest_rows(data, 0x9747B28C, 16, out) is out
+    assert list(out) == expected + [0]
+
+    assert not mmh3.mmh3_32_uintdigest_rows(b"", record_size=4)
+
+    data = bytes(range(256)) * 1024
+    result = mmh3.mmh3_32_uintdigest_rows(data, 42, 8)
+    assert mmh3.mmh3_32_uintdigest_rows(data, 42, 8, threads=4) == result
+    assert list(mmh3.mmh3_32_uintdigest_rows(data, 42, 8192, threads=4)) == [
+        mmh3.mmh3_32_uintdigest(data[i : i + 8192], 42)
+        for i in range(0, len(data), 8192)
+    ]
+
+
+def test_mmh3_x64_128_digest_rows() -> None:
+    data = b"The quick brown fox jumps over the lazy dog!!!!!"
+    expected = b"".join(
+        mmh3.mmh3_x64_128_digest(data[i : i + 12], 42) for i in range(0, len(data), 12)
+    )
+
+    assert mmh3.mmh3_x64_128_digest_rows(data, 42, record_size=12) == expected
+
+    view = memoryview(data).cast("B", (4, 3, 4))
+    assert mmh3.mmh3_x64_128_digest_rows(view, 42) == expected
+
+    out = bytearray(64)
+    assert mmh3.mmh3_x64_128_digest_rows(view, 42, out=out) is out
+    assert out == expected
+
+    # An unaligned output buffer gets the same results.
+    unaligned = memoryview(bytearray(65))[1:]
+    assert mmh3.mmh3_x64_128_digest_rows(view, 42, out=unaligned) is unaligned
+    assert unaligned == expected
+
+    data = bytes(range(256)) * 1024
+    assert mmh3.mmh3_x64_128_digest_rows(
+        data, 42, 8, threads=4
+    ) == mmh3.mmh3_x64_128_digest_rows(data, 42, 8)
+
+
+def test_mmh3_32_uintdigest_spans() -> None:
+    data = b"The quick brown fox jumps over the lazy dog"
+    spans = [(0, 3), (4, 5), (10, 0), (40, 3), (0, len(data))]
+    expected = [mmh3.mmh3_32_uintdigest(data[o : o + n], 42) for o, n in spans]
+
+    offsets = array("q", [o for o, _ in spans])
+    lengths = array("I", [n for _, n in spans])
+    result = mmh3.mmh3_32_uintdigest_spans(data, offsets, lengths, 42)
+    assert isinstance(result, array)
+    assert result.typecode == "I"
+    assert list(result) == expected
+    assert list(result) == [
+        mmh3.hash_from_buffer(data[o : o + n], 42, signed=False) for o, n in spans
+    ]
+
+    pairs = array("Q", [x for span in spans for x in span])
+    assert list(mmh3.mmh3_32_uintdigest_spans(data, pairs, seed=42)) == expected
+    view = memoryview(pairs).cast("B").cast("Q", (len(spans), 2))
+    assert list(mmh3.mmh3_32_uintdigest_spans(memoryview(data), view, seed=42)) == (
+        expected
+    )
+
+    out = array("I", [0] * 6)
+    assert mmh3.mmh3_32_uintdigest_spans(data, pairs, None, 42, out) is out
+    assert list(out) == expected + [0]
+
+    assert len(mmh3.mmh3_32_uintdigest_spans(data, array("q"), array("q"))) == 0
+
+    data = bytes(range(256)) * 1024
+    pairs = array("q", [x for i in range(20000) for x in (i * 13, i % 61)])
+    expected_array = mmh3.mmh3_32_uintdigest_spans(data, pairs, seed=42)
+    assert mmh3.mmh3_32_uintdigest_spans(data, pairs, seed=42, threads=4) == (
+        expected_array
+    )
+
+
+def test_mmh3_x64_128_digest_spans() -> None:
+    data = bytearray(b"The quick brown fox jumps over the lazy dog")
+    spans = [(0, 3), (4, 5), (10, 0), (40, 3), (0, len(data))]
+    expected = b"".join(mmh3.mmh3_x64_128_digest(data[o : o + n], 42) for o, n in spans)
+
+    offsets = array("i", [o for o, _ in spans])
+    lengths = array("H", [n for _, n in spans])
+    assert mmh3.mmh3_x64_128_digest_spans(data, offsets, lengths, 42) == expected
+
+    pairs = array("l", [x for span in spans for x in span])
+    assert mmh3.mmh3_x64_128_digest_spans(data, pairs, seed=42) == expected
+
+    out = bytearray(96)
+    assert mmh3.mmh3_x64_128_digest_spans(data, pairs, seed=42, out=out) is out
+    assert out == expected + bytes(16)
+
+    data = bytearray(range(256)) * 1024
+    pairs = array("q", [x for i in range(20000) for x in (i * 13, i % 61)])
+    assert mmh3.mmh3_x64_128_digest_spans(
+        data, pairs, seed=42, threads=4
+    ) == mmh3.mmh3_x64_128_digest_spans(data, pairs, seed=42)
+
+
+def test_mmh3_digest_into() -> None:
+    record = bytearray(40)
+
+    mmh3.mmh3_32_digest_into(b"foo", record)
+    assert record[0:4] == mmh3.mmh3_32_digest(b"foo")
+
+    mmh3.mmh3_x64_128_digest_into(b"foo", record, 4, 42)
+    assert record[4:20] == mmh3.mmh3_x64_128_digest(b"foo", 42)
+
+    mmh3.mmh3_x86_128_digest_into(memoryview(b"foo"), memoryview(record), 24, 42)
+    assert record[24:40] == mmh3.mmh3_x86_128_digest(b"foo", 42)
+
+    words = array("I", [0, 0])
+    mmh3.mmh3_32_digest_into(b"foo", words, 4, 42)
+    assert words.tobytes() == b"\x00" * 4 + mmh3.mmh3_32_digest(b"foo", 42)
+
+
+def test_imap() -> None:
+    keys: list[bytes | str] = [b"", "foo", "日本語", b"x" * 100] * 3000
+
+    result = mmh3.imap(iter(keys))
+    assert iter(result) is result
+    assert list(result) == [mmh3.hash(k) for k in keys]
+    assert not list(result)
+
+    assert list(mmh3.imap(keys, seed=42, signed=False, chunk=7)) == [
+        mmh3.hash(k, 42, False) for k in keys
+    ]
+    for x64arch, algo in [(True, "mmh3_x64_128"), (False, "mmh3_x86_128")]:
+        for signed in [True, False]:
+            assert list(mmh3.imap((k for k in keys), algo, 42, signed, 1)) == [
+                mmh3.hash128(k, 42, x64arch=x64arch, signed=signed) for k in keys
+            ]
+
+    assert not list(mmh3.imap([]))
+
+    # An unbounded iterable is consumed only as far as needed.
+    counter = itertools.count()
+    head = itertools.islice(mmh3.imap(str(i) for i in counter), 3)
+    assert list(head) == [mmh3.hash(str(i)) for i in range(3)]
+    assert next(counter) == 4096
+
+
+def test_hash_seeds() -> None:
+    keys: list[bytes | str] = [b"", b"a" * 3, "foo", "日本語", b"x" * 100]
+    seeds = [0, 1, 42, 0x7FFFFFFF, 0xFFFFFFFF] + list(range(1000, 1020))
+
+    for key in keys:
+        assert list(mmh3.hash_seeds(key, seeds)) == [mmh3.hash(key, s) for s in seeds]
+        assert list(mmh3.hash_seeds(key, array("I", seeds), signed=False)) == [
+            mmh3.hash(key, s, signed=False) for s in seeds
+        ]
+        for x64arch in [True, False]:
+            assert list(mmh3.hash64_seeds(key, seeds, x64arch)) == [
+                h for s in seeds for h in mmh3.hash64(key, s, x64arch=x64arch)
+            ]
+
+    assert not mmh3.hash_seeds(b"foo", [])
+    out = bytearray(8)
+    assert mmh3.hash_seeds(b"foo", (s for s in [1, 2]), out=out) is out
+    assert out == mmh3.mmh3_32_digest(b"foo", 1) + mmh3.mmh3_32_digest(b"foo", 2)
+    result = mmh3.hash64_seeds(key=b"foo", seeds=[1], signed=False)
+    assert result.typecode == "Q"
+
+
+def test_hash_seeds_many() -> None:
+    keys: list[bytes | str] = [b"", "foo", "日本語", b"x" * 100] * 50
+    seeds = [0, 42, 0xFFFFFFFF]
+
+    assert list(mmh3.hash_seeds_many(keys, seeds)) == [
+        mmh3.hash(k, s) for k in keys for s in seeds
+    ]
+    assert list(mmh3.hash_seeds_many(keys, seeds, False, threads=4)) == [
+        mmh3.hash(k, s, signed=False) for k in keys for s in seeds
+    ]
+    for x64arch in [True, False]:
+        for signed in [True, False]:
+            assert list(
+                mmh3.hash64_seeds_many(keys, seeds, x64arch, signed, threads=3)
+            ) == [
+                h
+                for k in keys
+                for s in seeds
+                for h in mmh3.hash64(k, s, x64arch=x64arch, signed=signed)
+            ]
+
+    assert not mmh3.hash_seeds_many([], seeds)
+    assert not mmh3.hash64_seeds_many(keys, [])
+
+
 def test_64bit() -> None:
     if sys.maxsize < (1 << 32):  # Skip this test under 32-bit environments
         return
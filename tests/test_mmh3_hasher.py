@@ -1,4 +1,6 @@
 # pylint: disable=missing-module-docstring,missing-function-docstring
+from array import array
+
 import mmh3
 from helper import u32_to_s32
 
@@ -32,6 +34,10 @@ def test_mmh3_32_digest() -> None:
     hasher.update(b" world!")
     assert hasher.digest() == b"\xba\x4c\x88\x24"
 
+    hasher = mmh3.mmh3_32(data=b"Hello,", seed=0x9747B28C)
+    hasher.update(b" world!")
+    assert hasher.digest() == b"\xba\x4c\x88\x24"
+
 
 def test_mmh3_32_sintdigest() -> None:
     hasher = mmh3.mmh3_32()
@@ -134,6 +140,36 @@ def test_mmh3_32_copy() -> None:
     assert hasher2.uintdigest() == 0x2FA826CD
 
 
+def test_mmh3_32_digest_into() -> None:
+    hasher = mmh3.mmh3_32(b"The quick brown fox", 0x9747B28C)
+    record = bytearray(24)
+
+    size = hasher.digest_size
+    hasher.digest_into(record)
+    assert record[:size] == hasher.digest()
+    hasher.digest_into(record, 8)
+    assert record[8 : 8 + size] == hasher.digest()
+
+    hasher.update(b" jumps over the lazy dog")
+    hasher.digest_into(memoryview(record)[-size:])
+    assert record[-size:] == hasher.digest()
+
+
+def test_mmh3_32_chunked_updates() -> None:
+    data = bytes(range(256)) * 2
+
+    for chunk_size in range(1, 34):
+        hasher = mmh3.mmh3_32(seed=0x9747B28C)
+        for i in range(0, len(data), chunk_size):
+            hasher.update(data[i : i + chunk_size])
+        assert hasher.digest() == mmh3.mmh3_32_digest(data, 0x9747B28C)
+
+    for head in range(8):
+        hasher = mmh3.mmh3_32(data[:head], 0x9747B28C)
+        hasher.update(memoryview(data)[head:])
+        assert hasher.digest() == mmh3.mmh3_32_digest(data, 0x9747B28C)
+
+
 def test_mmh3_x64_128_basic_ops() -> None:
     hasher = mmh3.mmh3_x64_128()
     assert hasher.digest_size == 16
@@ -281,6 +317,36 @@ def test_mmh3_x64_128_copy() -> None:
     assert hasher2.digest() == b"!1c\xd2;\x7f\x8as\xe5\x16\xc0~rsE\xf9"
 
 
+def test_mmh3_x64_128_digest_into() -> None:
+    hasher = mmh3.mmh3_x64_128(b"The quick brown fox", 0x9747B28C)
+    record = bytearray(24)
+
+    size = hasher.digest_size
+    hasher.digest_into(record)
+    assert record[:size] == hasher.digest()
+    hasher.digest_into(record, 8)
+    assert record[8 : 8 + size] == hasher.digest()
+
+    hasher.update(b" jumps over the lazy dog")
+    hasher.digest_into(memoryview(record)[-size:])
+    assert record[-size:] == hasher.digest()
+
+
+def test_mmh3_x64_128_chunked_updates() -> None:
+    data = bytes(range(256)) * 2
+
+    for chunk_size in range(1, 34):
+        hasher = mmh3.mmh3_x64_128(seed=0x9747B28C)
+        for i in range(0, len(data), chunk_size):
+            hasher.update(data[i : i + chunk_size])
+        assert hasher.digest() == mmh3.mmh3_x64_128_digest(data, 0x9747B28C)
+
+    for head in range(32):
+        hasher = mmh3.mmh3_x64_128(data[:head], 0x9747B28C)
+        hasher.update(memoryview(data)[head:])
+        assert hasher.digest() == mmh3.mmh3_x64_128_digest(data, 0x9747B28C)
+
+
 def test_mmh3_x86_128_basic_ops() -> None:
     hasher = mmh3.mmh3_x86_128()
     assert hasher.digest_size == 16
@@ -377,3 +443,52 @@ def test_mmh3_x86_128_utupledigest() -> None:
     hasher = mmh3.mmh3_x86_128(seed=0x9747B28C)
     hasher.update(b"The quick brown fox jumps over the lazy dog")
     assert hasher.utupledigest() == (5528275682885686622, 14823168533124823708)
+
+
+def test_mmh3_x86_128_digest_into() -> None:
+    hasher = mmh3.mmh3_x86_128(b"The quick brown fox", 0x9747B28C)
+    record = bytearray(24)
+
+    size = hasher.digest_size
+    hasher.digest_into(record)
+    assert record[:size] == hasher.digest()
+    hasher.digest_into(record, 8)
+    assert record[8 : 8 + size] == hasher.digest()
+
+    hasher.update(b" jumps over the lazy dog")
+    hasher.digest_into(memoryview(record)[-size:])
+    assert record[-size:] == hasher.digest()
+
+
+def test_mmh3_x86_128_chunked_updates() -> None:
+    data = bytes(range(256)) * 2
+
+    for chunk_size in range(1, 34):
+        hasher = mmh3.mmh3_x86_128(seed=0x9747B28C)
+        for i in range(0, len(data), chunk_size):
+            hasher.update(data[i : i + chunk_size])
+        assert hasher.digest() == mmh3.mmh3_x86_128_digest(data, 0x9747B28C)
+
+    for head in range(32):
+        hasher = mmh3.mmh3_x86_128(data[:head], 0x9747B28C)
+        hasher.update(memoryview(data)[head:])
+        assert hasher.digest() == mmh3.mmh3_x86_128_digest(data, 0x9747B28C)
+
+
+def test_update_strided_buffers() -> None:
+    data = bytes(range(256)) * 40
+    views = [
+        memoryview(data)[::3],
+        memoryview(data)[::-1],
+        memoryview(data)[:8192].cast("B", (32, 256)),
+        memoryview(array("q", range(2000)))[1::2],
+    ]
+
+    for hasher_type in [mmh3.mmh3_32, mmh3.mmh3_x64_128, mmh3.mmh3_x86_128]:
+        for view in views:
+            hasher = hasher_type(b"foo", 42)
+            hasher.update(view)
+            hasher.update(view)
+            expected = hasher_type(b"foo", 42)
+            expected.update(view.tobytes() * 2)
+            assert hasher.digest() == expected.digest()
@@ -0,0 +1,52 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Kernels available on each architecture, from narrowest to widest.
+LEVELS = {
+    "x86": ["none", "sse41", "avx2", "avx512f"],
+    "aarch64": ["none", "neon"],
+}
+
+
+def run_with_simd_level(code: str, level: str | None) -> str:
+    env = dict(os.environ)
+    env.pop("MMH3_SIMD", None)
+    if level is not None:
+        env["MMH3_SIMD"] = level
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(__file__),
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def supported_levels() -> list[str]:
+    best = run_with_simd_level("import mmh3; print(mmh3._simd_name())", None)
+    for levels in LEVELS.values():
+        if best in levels:
+            return levels[: levels.index(best) + 1]
+    return ["none"]
+
+
+# The environment variable MMH3_SIMD caps the instruction set used by the
+# multi-lane kernels, which is read once on module initialization. A level not
+# supported by the CPU falls back to the best supported one, so such levels are
+# skipped rather than silently tested against another kernel.
+@pytest.mark.parametrize("level", ["none", "sse41", "avx2", "avx512f", "neon"])
+def test_hash_many_with_simd_level(level: str) -> None:
+    if level not in supported_levels():
+        pytest.skip(f"{level} is not supported on this CPU")
+
+    name = run_with_simd_level(
+        "import mmh3, test_mmh3; test_mmh3.test_hash_many_vectors(); "
+        "print(mmh3._simd_name())",
+        level,
+    )
+    assert name == level
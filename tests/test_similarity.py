@@ -0,0 +1,277 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+# pylint: disable=no-value-for-parameter, too-many-function-args
+from array import array
+from typing import no_type_check
+
+import pytest
+
+import mmh3
+
+
+def test_minhash() -> None:
+    keys: list[bytes | str] = [b"", "foo", "日本語", b"x" * 100, "bar", b"baz"]
+
+    m = mmh3.MinHash(keys, num_perm=20, seed=0xFFFFFFF0)
+    assert m.num_perm == 20
+    assert m.seed == 0xFFFFFFF0
+    assert m.signature().typecode == "I"
+    assert list(m.signature()) == [
+        min(mmh3.hash(k, (0xFFFFFFF0 + j) & 0xFFFFFFFF, False) for k in keys)
+        for j in range(20)
+    ]
+    for x64arch, algo in [(True, "mmh3_x64_128"), (False, "mmh3_x86_128")]:
+        m = mmh3.MinHash(keys, 20, 42, algo)
+        assert m.signature().typecode == "Q"
+        assert list(m.signature()) == [
+            min(mmh3.hash64(k, 42 + j, x64arch=x64arch, signed=False)[0] for k in keys)
+            for j in range(20)
+        ]
+
+    assert list(mmh3.MinHash(num_perm=2).signature()) == [0xFFFFFFFF] * 2
+
+    a = mmh3.MinHash()
+    for k in keys[:4]:
+        a.update(k)
+    b = mmh3.MinHash()
+    b.update_many(k for k in keys[2:])
+    assert a.jaccard(b) == b.jaccard(a)
+    assert a.jaccard(a) == 1.0
+
+    c = a.copy()
+    c.merge(b)
+    assert c.signature() == mmh3.MinHash(keys).signature()
+    assert a.signature() == mmh3.MinHash(keys[:4]).signature()
+
+    # The estimate is close to the exact similarity 1000 / 3000.
+    x = mmh3.MinHash((str(i) for i in range(2000)), num_perm=1024)
+    y = mmh3.MinHash((str(i) for i in range(1000, 3000)), num_perm=1024)
+    assert abs(x.jaccard(y) - 1 / 3) < 0.05
+
+
+def test_lsh_index() -> None:
+    tokens = [[str(i + j) for j in range(50)] for i in range(0, 1000, 5)]
+    signatures = array("I")
+    for t in tokens:
+        signatures.extend(mmh3.MinHash(t, num_perm=32).signature())
+
+    def candidates(query: "array[int]") -> list[int]:
+        return [
+            i
+            for i in range(len(tokens))
+            if any(
+                signatures[i * 32 + b * 4 : i * 32 + b * 4 + 4]
+                == query[b * 4 : b * 4 + 4]
+                for b in range(8)
+            )
+        ]
+
+    index = mmh3.LSHIndex(8, 4)
+    assert (index.bands, index.rows, index.seed) == (8, 4, 0)
+    index.insert_many(signatures[: 32 * 100])
+    index.insert_many(signatures[32 * 100 :])
+    assert len(index) == len(tokens)
+
+    results = index.query_many(signatures)
+    for i in range(len(tokens)):
+        query = signatures[i * 32 : i * 32 + 32]
+        assert list(index.query(query)) == candidates(query)
+        assert results[i] == index.query(array("Q", query))
+
+    ids = mmh3.LSHIndex(8, 4, seed=42)
+    ids.insert_many(signatures[:64], ids=array("q", [100, 200]))
+    assert list(ids.query(signatures[32:64])) == [
+        [100, 200][i] for i in candidates(signatures[32:64]) if i < 2
+    ]
+
+    data = index.tobytes()
+    assert mmh3.LSHIndex.frombuffer(data).query_many(signatures) == results
+    # An unaligned buffer is copied instead of being used in place.
+    loaded = mmh3.LSHIndex.frombuffer(memoryview(b"\0" + data)[1:])
+    assert loaded.tobytes() == data
+    loaded.insert_many(signatures[:32])
+    assert list(loaded.query(signatures[:32]))[-1] == len(tokens)
+
+
+def test_simhash() -> None:
+    keys: list[bytes | str] = [f"token{i}" for i in range(100)] + [b"x" * 100]
+    weights = [(i % 7) / 2 - 1 for i in range(len(keys))]
+
+    def expected(weights: list[float], seed: int = 0) -> int:
+        acc = [0.0] * 64
+        for k, w in zip(keys, weights, strict=True):
+            h = mmh3.hash64(k, seed, signed=False)[0]
+            for b in range(64):
+                acc[b] += w if (h >> b) & 1 else -w
+        return sum(1 << b for b in range(64) if acc[b] > 0)
+
+    assert mmh3.simhash(keys) == expected([1.0] * len(keys))
+    assert mmh3.simhash(keys, weights, 42) == expected(weights, 42)
+    assert mmh3.simhash(iter(keys), array("d", weights)) == expected(weights)
+    assert mmh3.simhash([]) == 0
+
+
+def test_simhash_index() -> None:
+    fingerprints = [mmh3.hash64(str(i), signed=False)[0] for i in range(2000)]
+    for i in range(100):
+        fingerprints.append(fingerprints[i] ^ (0x10101010101 << (i % 20)))
+    queries = fingerprints[:50]
+    queries += [mmh3.hash64(str(-i), signed=False)[0] for i in range(20)]
+
+    for k in [0, 3, 12, 63]:
+        index = mmh3.SimHashIndex(k)
+        assert index.k == k
+        index.insert_many(array("Q", fingerprints[:1000]))
+        index.insert_many(array("Q", fingerprints[1000:]))
+        assert len(index) == len(fingerprints)
+
+        results = index.query_many(array("Q", queries))
+        for q, result in zip(queries, results, strict=True):
+            assert list(index.query(q)) == [
+                i for i, f in enumerate(fingerprints) if bin(f ^ q).count("1") <= k
+            ]
+            assert result == index.query(q - (1 << 64) if q >= 1 << 63 else q)
+
+    index = mmh3.SimHashIndex()
+    index.insert_many(array("Q", fingerprints[:2]), ids=array("q", [7, 3]))
+    assert list(index.query(fingerprints[0])) == [7]
+
+
+@no_type_check
+def test_minhash_raises_typeerror() -> None:
+    m = mmh3.MinHash()
+    with pytest.raises(TypeError):
+        mmh3.MinHash(42)
+    with pytest.raises(TypeError):
+        mmh3.MinHash(num_perm=1.5)
+    with pytest.raises(TypeError):
+        mmh3.MinHash(foo=42)
+    with pytest.raises(TypeError):
+        m.update(42)
+    with pytest.raises(TypeError):
+        m.update_many([b"foo", 42])
+    with pytest.raises(TypeError):
+        m.merge(42)
+    with pytest.raises(TypeError):
+        m.jaccard(mmh3.mmh3_32())
+    assert list(m.signature()) == [0xFFFFFFFF] * 128
+
+
+@no_type_check
+def test_minhash_raises_valueerror() -> None:
+    m = mmh3.MinHash()
+    with pytest.raises(ValueError):
+        mmh3.MinHash(num_perm=0)
+    with pytest.raises(ValueError):
+        mmh3.MinHash(seed=-1)
+    with pytest.raises(ValueError):
+        mmh3.MinHash(algo="md5")
+    with pytest.raises(ValueError):
+        m.merge(mmh3.MinHash(num_perm=64))
+    with pytest.raises(ValueError):
+        m.merge(mmh3.MinHash(seed=1))
+    with pytest.raises(ValueError):
+        m.jaccard(mmh3.MinHash(algo="mmh3_x64_128"))
+    with pytest.raises(UnicodeEncodeError):
+        m.update("\ud800")
+
+
+@no_type_check
+def test_lsh_index_raises_typeerror() -> None:
+    index = mmh3.LSHIndex(2, 2)
+    with pytest.raises(TypeError):
+        mmh3.LSHIndex(2)
+    with pytest.raises(TypeError):
+        mmh3.LSHIndex(2, 2, seed="42")
+    with pytest.raises(TypeError):
+        index.insert_many([1, 2, 3, 4])
+    with pytest.raises(TypeError):
+        index.insert_many(array("d", [1.0] * 4))
+    with pytest.raises(TypeError):
+        index.insert_many(array("I", [1] * 4), foo=42)
+    with pytest.raises(TypeError):
+        index.query(array("d", [1.0] * 4))
+    with pytest.raises(TypeError):
+        mmh3.LSHIndex.frombuffer("foo")
+
+
+@no_type_check
+def test_lsh_index_raises_valueerror() -> None:
+    index = mmh3.LSHIndex(2, 2)
+    with pytest.raises(ValueError):
+        mmh3.LSHIndex(0, 2)
+    with pytest.raises(ValueError):
+        mmh3.LSHIndex(2, -1)
+    with pytest.raises(ValueError):
+        mmh3.LSHIndex(2, 2, seed=-1)
+    with pytest.raises(ValueError):
+        index.insert_many(array("I", [1] * 5))
+    with pytest.raises(ValueError):
+        index.insert_many(array("I", [1] * 4), array("q", [-1]))
+    with pytest.raises(ValueError):
+        index.insert_many(array("I", [1] * 4), array("q", [1, 2]))
+    with pytest.raises(ValueError):
+        index.query(array("I", [1] * 8))
+    assert len(index) == 0
+
+    data = index.tobytes()
+    with pytest.raises(ValueError):
+        mmh3.LSHIndex.frombuffer(data[:-1])
+    with pytest.raises(ValueError):
+        mmh3.LSHIndex.frombuffer(b"x" + data[1:])
+    with pytest.raises(ValueError):
+        mmh3.LSHIndex.frombuffer(data + b"\0" * 16)
+
+
+@no_type_check
+def test_simhash_raises_typeerror() -> None:
+    with pytest.raises(TypeError):
+        mmh3.simhash()
+    with pytest.raises(TypeError):
+        mmh3.simhash([b"foo", 42])
+    with pytest.raises(TypeError):
+        mmh3.simhash([b"foo"], ["1"])
+    with pytest.raises(TypeError):
+        mmh3.simhash([b"foo"], 1)
+    with pytest.raises(TypeError):
+        mmh3.simhash([b"foo"], foo=1)
+
+
+@no_type_check
+def test_simhash_raises_valueerror() -> None:
+    with pytest.raises(ValueError):
+        mmh3.simhash([b"foo"], [1.0, 2.0])
+    with pytest.raises(ValueError):
+        mmh3.simhash([b"foo"], seed=-1)
+
+
+@no_type_check
+def test_simhash_index_raises_typeerror() -> None:
+    index = mmh3.SimHashIndex()
+    with pytest.raises(TypeError):
+        mmh3.SimHashIndex(1.5)
+    with pytest.raises(TypeError):
+        index.insert_many([1, 2])
+    with pytest.raises(TypeError):
+        index.insert_many(array("d", [1.0]))
+    with pytest.raises(TypeError):
+        index.query(1.0)
+    with pytest.raises(TypeError):
+        index.query_many(array("f", [1.0]))
+
+
+@no_type_check
+def test_simhash_index_raises_valueerror() -> None:
+    index = mmh3.SimHashIndex()
+    with pytest.raises(ValueError):
+        mmh3.SimHashIndex(-1)
+    with pytest.raises(ValueError):
+        mmh3.SimHashIndex(64)
+    with pytest.raises(ValueError):
+        index.query(2**64)
+    with pytest.raises(ValueError):
+        index.query(-(2**63) - 1)
+    with pytest.raises(ValueError):
+        index.insert_many(array("Q", [1]), array("q", [-1]))
+    with pytest.raises(ValueError):
+        index.insert_many(array("Q", [1]), array("q", [1, 2]))
+    assert len(index) == 0
@@ -0,0 +1,553 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+# pylint: disable=no-value-for-parameter, too-many-function-args
+import itertools
+import mmap
+import sys
+from array import array
+from pathlib import Path
+from typing import no_type_check
+
+import pytest
+
+import mmh3
+
+BLOOM_FILTER_KEYS: list[bytes | str] = [
+    *(f"key{i}" for i in range(2000)),
+    "日本語",
+    b"",
+]
+
+
+def bloom_filter_bits(
+    keys: list[bytes | str], num_bits: int, num_hashes: int, seed: int
+) -> bytes:
+    num_blocks = -(-num_bits // 512)
+    bits = bytearray(num_blocks * 64)
+    for key in keys:
+        h = mmh3.hash128(key, seed, signed=False)
+        block = (h & 0xFFFFFFFFFFFFFFFF) % num_blocks * 64
+        a, b = (h >> 64) & 0xFFFFFFFF, h >> 96
+        for i in range(num_hashes):
+            bit = ((a + i * b) & 0xFFFFFFFF) >> 23
+            bits[block + bit // 8] |= 1 << (bit % 8)
+    return bytes(bits)
+
+
+def test_bloom_filter() -> None:
+    keys = BLOOM_FILTER_KEYS
+    for num_bits, num_hashes, seed in [(1, 1, 0), (10000, 7, 42), (65536, 64, 1)]:
+        bf = mmh3.BloomFilter(num_bits, num_hashes, seed)
+        assert bf.num_bits == -(-num_bits // 512) * 512
+        assert (bf.num_hashes, bf.seed) == (num_hashes, seed)
+        bf.add_many(keys[:1000])
+        for key in keys[1000:]:
+            bf.add(key)
+
+        data = bf.tobytes()
+        assert len(data) == 64 + bf.num_bits // 8
+        assert data[64:] == bloom_filter_bits(keys, num_bits, num_hashes, seed)
+        assert all(key in bf for key in keys)
+        assert bf.contains_many(keys) == array("B", [1] * len(keys))
+        assert mmh3.BloomFilter.frombuffer(data).tobytes() == data
+
+
+def test_bloom_filter_false_positives() -> None:
+    bf = mmh3.BloomFilter(100000)
+    bf.add_many(BLOOM_FILTER_KEYS)
+    assert sum(bf.contains_many([f"other{i}" for i in range(10000)])) < 100
+    assert "other" not in mmh3.BloomFilter(512)
+
+
+def test_bloom_filter_union_intersection() -> None:
+    a = mmh3.BloomFilter(4096, seed=1)
+    b = mmh3.BloomFilter(4096, seed=1)
+    a.add_many(BLOOM_FILTER_KEYS[:20])
+    b.add_many(BLOOM_FILTER_KEYS[10:30])
+    bits_a, bits_b = a.tobytes(), b.tobytes()
+    union = a.union(b).tobytes()
+    intersection = a.intersection(b).tobytes()
+    assert union[:64] == intersection[:64] == bits_a[:64]
+    pairs = list(zip(bits_a[64:], bits_b[64:], strict=True))
+    assert union[64:] == bytes(x | y for x, y in pairs)
+    assert intersection[64:] == bytes(x & y for x, y in pairs)
+
+
+def test_bloom_filter_copy() -> None:
+    a = mmh3.BloomFilter(4096, seed=1)
+    a.add_many(BLOOM_FILTER_KEYS[:20])
+    bits_a = a.tobytes()
+
+    c = a.copy()
+    c.add_many(BLOOM_FILTER_KEYS[20:])
+    assert a.tobytes() == bits_a
+    assert c.tobytes() == c.union(a).tobytes()
+
+
+def test_bloom_filter_frombuffer(tmp_path: Path) -> None:
+    keys = [f"key{i}" for i in range(1000)]
+    bf = mmh3.BloomFilter(1 << 22, 5, seed=1)
+    bf.add_many(keys[:500])
+    path = tmp_path / "filter.bin"
+    with open(path, "wb") as f:
+        bf.tofile(f)
+    assert path.read_bytes() == bf.tobytes()
+
+    loaded = mmh3.BloomFilter.frombuffer(bf.tobytes())
+    assert loaded.readonly
+    assert loaded.contains_many(keys) == bf.contains_many(keys)
+    assert not loaded.copy().readonly
+
+    with open(path, "r+b") as f:
+        mm = mmap.mmap(f.fileno(), 0)
+    shared = mmh3.BloomFilter.frombuffer(mm)
+    assert not shared.readonly
+    assert (shared.num_bits, shared.num_hashes, shared.seed) == (1 << 22, 5, 1)
+    shared.add_many(keys[500:])
+    shared.add("foo")
+    del shared
+    mm.close()
+
+    bf.add_many(keys[500:] + ["foo"])
+    assert path.read_bytes() == bf.tobytes()
+
+    buffer = bytearray(bf.tobytes())
+    mmh3.BloomFilter.frombuffer(buffer).add("bar")
+    assert "bar" not in bf
+    assert "bar" in mmh3.BloomFilter.frombuffer(bytes(buffer))
+
+
+COUNT_MIN_SKETCH_KEYS = [f"key{i % 300}" for i in range(3000)]
+COUNT_MIN_SKETCH_COUNTS = [(i * 7) % 50 for i in range(3000)]
+
+
+def count_min_sketch_table(
+    width: int, depth: int, maximum: int, conservative: bool
+) -> list[int]:
+    table = [0] * (width * depth)
+    for key, count in zip(COUNT_MIN_SKETCH_KEYS, COUNT_MIN_SKETCH_COUNTS, strict=True):
+        h = mmh3.hash128(key, 1, signed=False)
+        h1, h2 = h & 0xFFFFFFFFFFFFFFFF, h >> 64
+        index = [r * width + (h1 + r * h2) % (1 << 64) % width for r in range(depth)]
+        if conservative:
+            target = min(min(table[i] for i in index) + count, maximum)
+            for i in index:
+                table[i] = max(table[i], target)
+        else:
+            for i in index:
+                table[i] = min(table[i] + count, maximum)
+    return table
+
+
+def new_count_min_sketch(
+    width: int, depth: int, typecode: str, conservative: bool
+) -> mmh3.CountMinSketch:
+    keys, counts = COUNT_MIN_SKETCH_KEYS, COUNT_MIN_SKETCH_COUNTS
+    cms = mmh3.CountMinSketch(width, depth, 1, typecode, conservative)
+    cms.add_many(keys[:1000], array("H", counts[:1000]))
+    for key, count in zip(keys[1000:2000], counts[1000:2000], strict=True):
+        cms.add(key, count)
+    cms.add_many(keys[2000:], counts=array("q", counts[2000:]))
+    return cms
+
+
+def test_count_min_sketch() -> None:
+    for typecode, maximum in [("H", 0xFFFF), ("I", 0xFFFFFFFF), ("Q", 2**64 - 1)]:
+        for conservative in [False, True]:
+            for width, depth in [(1, 1), (97, 4)]:
+                cms = new_count_min_sketch(width, depth, typecode, conservative)
+                assert (cms.width, cms.depth, cms.seed) == (width, depth, 1)
+                assert cms.typecode == typecode
+                assert cms.conservative == conservative
+                assert cms.total == sum(COUNT_MIN_SKETCH_COUNTS)
+
+                data = cms.tobytes()
+                table = array(typecode, data[40:])
+                if sys.byteorder == "big":
+                    table.byteswap()
+                assert list(table) == count_min_sketch_table(
+                    width, depth, maximum, conservative
+                )
+                assert mmh3.CountMinSketch.frombuffer(data).tobytes() == data
+
+
+def test_count_min_sketch_estimate() -> None:
+    keys, counts = COUNT_MIN_SKETCH_KEYS[:300], COUNT_MIN_SKETCH_COUNTS
+    for typecode, conservative in itertools.product("HIQ", [False, True]):
+        for width, depth in [(1, 1), (97, 4)]:
+            cms = new_count_min_sketch(width, depth, typecode, conservative)
+            estimates = cms.estimate_many(keys)
+            for i, key in enumerate(keys):
+                assert estimates[i] == cms.estimate(key)
+                assert estimates[i] >= sum(counts[i::300])
+
+
+def test_count_min_sketch_saturation() -> None:
+    cms = mmh3.CountMinSketch(1000, typecode="H")
+    cms.add_many(["foo", "foo"], array("Q", [65000, 1000]))
+    assert cms.estimate("foo") == 65535
+    assert cms.estimate("bar") == 0
+    cms.add_many(["bar"] * 3)
+    assert cms.estimate("bar") == 3
+
+
+def test_count_min_sketch_merge() -> None:
+    a = mmh3.CountMinSketch(1000)
+    a.add_many(["foo", "bar"])
+    b = a.copy()
+    b.add("foo", 5)
+    a.merge(b)
+    assert a.estimate_many(["foo", "bar", "baz"]) == array("Q", [7, 2, 0])
+    assert (a.total, b.total) == (9, 7)
+
+
+def test_hyperloglog() -> None:
+    def registers(keys: list[str], p: int) -> list[int]:
+        result = [0] * (1 << p)
+        for key in keys:
+            h = mmh3.hash64(key, 1, signed=False)[0]
+            w = (h << p) & 0xFFFFFFFFFFFFFFFF | 1 << (p - 1)
+            result[h >> (64 - p)] = max(result[h >> (64 - p)], 65 - w.bit_length())
+        return result
+
+    for p in [4, 10, 14]:
+        for n in [0, 1, 100, 5000]:
+            keys = [f"key{i}" for i in range(n)]
+            hll = mmh3.HyperLogLog(keys[: n // 2], p, 1)
+            assert (hll.p, hll.seed) == (p, 1)
+            for key in keys[n // 2 :]:
+                hll.add(key)
+
+            dense = mmh3.HyperLogLog(p=p, seed=1)
+            dense.merge(mmh3.HyperLogLog(map(str, range(100000)), p, 1))
+            dense.merge(hll)
+            assert not dense.sparse
+
+            data = hll.tobytes()
+            if hll.sparse:
+                expected = [0] * (1 << p)
+                for i in range(24, len(data), 4):
+                    entry = int.from_bytes(data[i : i + 4], "little")
+                    expected[entry >> 8] = entry & 0xFF
+                assert expected == registers(keys, p)
+                if n > 0:
+                    assert dense.count() > hll.count()
+            else:
+                assert list(data[24:]) == registers(keys, p)
+            assert mmh3.HyperLogLog.frombuffer(data).tobytes() == data
+            assert hll.copy().tobytes() == data
+
+    assert mmh3.HyperLogLog().count() == 0.0
+    assert round(mmh3.HyperLogLog(["foo", "foo"]).count(), 3) == 1.0
+
+    a = mmh3.HyperLogLog(map(str, range(3000)))
+    b = mmh3.HyperLogLog(map(str, range(2000, 8000)))
+    assert a.sparse and not b.sparse
+    a.merge(b)
+    assert not a.sparse
+    assert abs(a.count() / 8000 - 1) < 0.05
+
+    # The estimates are the same in the sparse and dense modes.
+    sparse = mmh3.HyperLogLog(map(str, range(500)))
+    dense = mmh3.HyperLogLog.frombuffer(
+        mmh3.HyperLogLog().tobytes()[:16] + bytes(8) + bytes(1 << 14)
+    )
+    dense.merge(sparse)
+    assert sparse.sparse and not dense.sparse
+    assert dense.count() == sparse.count()
+
+
+def bottom_k(keys: list[str], k: int) -> tuple[list[int], int]:
+    values = sorted({mmh3.hash64(key, 1, signed=False)[0] for key in keys})
+    if len(values) > k:
+        return values[:k], values[k]
+    return values, 2**64 - 1
+
+
+def test_bottom_k_sketch() -> None:
+    for k in [1, 100]:
+        for n in [0, 1, 100, 101, 3000]:
+            keys = [f"key{i % max(n, 1)}" for i in range(2 * n)]
+            sketch = mmh3.BottomKSketch(keys[:n], k, 1)
+            assert (sketch.k, sketch.seed) == (k, 1)
+            for key in keys[n:]:
+                sketch.add(key)
+            values, theta = bottom_k(keys, k)
+            assert list(sketch.hashes()) == values
+            assert (len(sketch), sketch.theta) == (len(values), theta)
+            if n <= k:
+                assert sketch.count() == n
+
+            data = sketch.tobytes()
+            assert mmh3.BottomKSketch.frombuffer(data).tobytes() == data
+            assert sketch.copy().tobytes() == data
+
+
+def test_bottom_k_sketch_add_int64_many() -> None:
+    ids = array("q", range(-500, 500))
+    a = mmh3.BottomKSketch(k=64)
+    a.add_int64_many(ids)
+    b = mmh3.BottomKSketch(i.to_bytes(8, "little", signed=True) for i in ids)
+    assert a.hashes() == b.hashes()[:64]
+
+
+def test_bottom_k_sketch_set_operations() -> None:
+    keys_a = [str(i) for i in range(6000)]
+    keys_b = [str(i) for i in range(4000, 9000)]
+    for k in [16, 256]:
+        a = mmh3.BottomKSketch(keys_a, k, 1)
+        b = mmh3.BottomKSketch(keys_b, k, 1)
+        values_a, theta_a = bottom_k(keys_a, k)
+        values_b, theta_b = bottom_k(keys_b, k)
+        theta = min(theta_a, theta_b)
+        expected = [
+            set(values_a) | set(values_b),
+            set(values_a) & set(values_b),
+            set(values_a) - set(values_b),
+        ]
+        results = [a.union(b), a.intersection(b), a.difference(b)]
+        for hashes, result in zip(expected, results, strict=True):
+            sorted_values = sorted(v for v in hashes if v < theta) + [theta]
+            assert list(result.hashes()) == sorted_values[:-1][:k]
+            assert result.theta == sorted_values[min(k, len(sorted_values) - 1)]
+
+
+def test_bottom_k_sketch_count() -> None:
+    a = mmh3.BottomKSketch(map(str, range(60000)), 1024)
+    b = mmh3.BottomKSketch(map(str, range(40000, 100000)), 1024)
+    assert abs(a.union(b).count() / 100000 - 1) < 0.15
+    assert abs(a.intersection(b).count() / 20000 - 1) < 0.3
+    assert abs(a.difference(b).count() / 40000 - 1) < 0.3
+
+    # A loaded sketch grows its hashes in add_many(), which may release the GIL.
+    loaded = mmh3.BottomKSketch.frombuffer(a.tobytes())
+    loaded.add_many(map(str, range(60000, 100000)))
+    assert loaded.hashes() == a.union(b).hashes()
+
+
+@no_type_check
+def test_bloom_filter_raises_typeerror() -> None:
+    bf = mmh3.BloomFilter(1024)
+    with pytest.raises(TypeError):
+        mmh3.BloomFilter()
+    with pytest.raises(TypeError):
+        mmh3.BloomFilter(1.5)
+    with pytest.raises(TypeError):
+        bf.add(42)
+    with pytest.raises(TypeError):
+        bf.add_many("foo")
+    with pytest.raises(TypeError):
+        bf.add_many([b"foo", 42])
+    with pytest.raises(TypeError):
+        bf.contains_many([b"foo", None])
+    with pytest.raises(TypeError):
+        _ = 42 in bf
+    with pytest.raises(TypeError):
+        bf.union(mmh3.MinHash())
+    with pytest.raises(TypeError):
+        mmh3.BloomFilter.frombuffer("foo")
+    with pytest.raises(AttributeError):
+        bf.tofile(None)
+
+    readonly = mmh3.BloomFilter.frombuffer(bf.tobytes())
+    with pytest.raises(TypeError):
+        readonly.add(b"foo")
+    with pytest.raises(TypeError):
+        readonly.add_many([b"foo"])
+
+
+@no_type_check
+def test_bloom_filter_raises_valueerror() -> None:
+    bf = mmh3.BloomFilter(1024, 3, seed=1)
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter(0)
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter(1024, 0)
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter(1024, 65)
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter(1024, seed=-1)
+    with pytest.raises(ValueError):
+        bf.union(mmh3.BloomFilter(2048, 3, seed=1))
+    with pytest.raises(ValueError):
+        bf.intersection(mmh3.BloomFilter(1024, 4, seed=1))
+    with pytest.raises(ValueError):
+        bf.union(mmh3.BloomFilter(1024, 3, seed=2))
+
+    data = bf.tobytes()
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter.frombuffer(data[:-1])
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter.frombuffer(b"MMH3LSH1" + data[8:])
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter.frombuffer(data[:16] + b"\0" * 4 + data[20:])
+    with pytest.raises(ValueError):
+        mmh3.BloomFilter.frombuffer(data[:24] + b"\2" + data[25:])
+
+
+@no_type_check
+def test_count_min_sketch_raises_typeerror() -> None:
+    cms = mmh3.CountMinSketch(1024)
+    with pytest.raises(TypeError):
+        mmh3.CountMinSketch()
+    with pytest.raises(TypeError):
+        mmh3.CountMinSketch(1.5)
+    with pytest.raises(TypeError):
+        cms.add()
+    with pytest.raises(TypeError):
+        cms.add(42)
+    with pytest.raises(TypeError):
+        cms.add(b"foo", 1.5)
+    with pytest.raises(TypeError):
+        cms.add(b"foo", 1, 2)
+    with pytest.raises(TypeError):
+        cms.add(b"foo", key=b"bar")
+    with pytest.raises(TypeError):
+        cms.add(b"foo", foo=1)
+    with pytest.raises(TypeError):
+        cms.add_many()
+    with pytest.raises(TypeError):
+        cms.add_many([b"foo", 42])
+    with pytest.raises(TypeError):
+        cms.add_many([b"foo"], [1])
+    with pytest.raises(TypeError):
+        cms.add_many([b"foo"], array("d", [1.0]))
+    with pytest.raises(TypeError):
+        cms.estimate(42)
+    with pytest.raises(TypeError):
+        cms.estimate_many("foo")
+    with pytest.raises(TypeError):
+        cms.merge(mmh3.BloomFilter(1024))
+
+
+@no_type_check
+def test_count_min_sketch_raises_valueerror() -> None:
+    cms = mmh3.CountMinSketch(1024)
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch(0)
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch(1024, 0)
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch(1024, 65)
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch(1024, seed=-1)
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch(1024, typecode="B")
+    with pytest.raises(ValueError):
+        cms.add(b"foo", -1)
+    with pytest.raises(ValueError):
+        cms.add_many([b"foo"], array("q", [-1]))
+    with pytest.raises(ValueError):
+        cms.add_many([b"foo"], array("q", [1, 2]))
+    with pytest.raises(ValueError):
+        cms.merge(mmh3.CountMinSketch(1024, typecode="Q"))
+    with pytest.raises(ValueError):
+        cms.merge(mmh3.CountMinSketch(1024, 5))
+    assert cms.total == 0
+
+    data = cms.tobytes()
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch.frombuffer(data[:-1])
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch.frombuffer(b"MMH3BLM1" + data[8:])
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch.frombuffer(data[:24] + b"\3" + data[25:])
+    with pytest.raises(ValueError):
+        mmh3.CountMinSketch.frombuffer(data[:28] + b"\2" + data[29:])
+
+
+@no_type_check
+def test_hyperloglog_raises_typeerror() -> None:
+    hll = mmh3.HyperLogLog()
+    with pytest.raises(TypeError):
+        mmh3.HyperLogLog(42)
+    with pytest.raises(TypeError):
+        mmh3.HyperLogLog(p=14.0)
+    with pytest.raises(TypeError):
+        hll.add(42)
+    with pytest.raises(TypeError):
+        hll.add_many([b"foo", 42])
+    with pytest.raises(TypeError):
+        hll.merge(mmh3.CountMinSketch(1024))
+    with pytest.raises(TypeError):
+        mmh3.HyperLogLog.frombuffer("foo")
+
+
+@no_type_check
+def test_hyperloglog_raises_valueerror() -> None:
+    hll = mmh3.HyperLogLog(["foo"])
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog(p=3)
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog(p=19)
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog(seed=-1)
+    with pytest.raises(ValueError):
+        hll.merge(mmh3.HyperLogLog(p=12))
+    with pytest.raises(ValueError):
+        hll.merge(mmh3.HyperLogLog(seed=1))
+
+    data = hll.tobytes()
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog.frombuffer(data[:-1])
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog.frombuffer(b"MMH3CMS1" + data[8:])
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog.frombuffer(data[:8] + b"\3" + data[9:])
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog.frombuffer(data[:16] + b"\2" + data[17:])
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog.frombuffer(data[:24] + b"\0" + data[25:])
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog.frombuffer(data + data[24:])
+    with pytest.raises(ValueError):
+        mmh3.HyperLogLog.frombuffer(data[:16] + b"\0" + data[17:])
+
+
+@no_type_check
+def test_bottom_k_sketch_raises_typeerror() -> None:
+    sketch = mmh3.BottomKSketch()
+    with pytest.raises(TypeError):
+        mmh3.BottomKSketch(42)
+    with pytest.raises(TypeError):
+        mmh3.BottomKSketch(k=1.5)
+    with pytest.raises(TypeError):
+        sketch.add(42)
+    with pytest.raises(TypeError):
+        sketch.add_many([b"foo", 42])
+    with pytest.raises(TypeError):
+        sketch.add_int64_many(array("i", [1, 2]))
+    with pytest.raises(TypeError):
+        sketch.add_int64_many([1, 2])
+    with pytest.raises(TypeError):
+        sketch.union(mmh3.HyperLogLog())
+    with pytest.raises(TypeError):
+        sketch.intersection(None)
+    with pytest.raises(TypeError):
+        mmh3.BottomKSketch.frombuffer("foo")
+
+
+@no_type_check
+def test_bottom_k_sketch_raises_valueerror() -> None:
+    sketch = mmh3.BottomKSketch(["foo", "bar"], k=16)
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch(k=0)
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch(k=2**26 + 1)
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch(seed=-1)
+    with pytest.raises(ValueError):
+        sketch.union(mmh3.BottomKSketch(k=32))
+    with pytest.raises(ValueError):
+        sketch.difference(mmh3.BottomKSketch(k=16, seed=1))
+
+    data = sketch.tobytes()
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch.frombuffer(data[:-1])
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch.frombuffer(b"MMH3HLL1" + data[8:])
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch.frombuffer(data[:8] + b"\1" + data[9:])
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch.frombuffer(data[:16] + bytes(8) + data[24:])
+    with pytest.raises(ValueError):
+        mmh3.BottomKSketch.frombuffer(data[:32] + data[40:] + data[32:40])